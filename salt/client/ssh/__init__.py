@@ -55,6 +55,11 @@ from salt.template import compile_template
 # Import 3rd-party libs
 from salt.ext import six
 from salt.ext.six.moves import input  # pylint: disable=import-error,redefined-builtin
+import concurrent.futures
+import tornado.gen
+import tornado.ioloop
+import tornado.process
+import tornado.queues
 try:
     import saltwinshell
     HAS_WINSHELL = True
@@ -373,9 +378,10 @@ class SSH(object):
     def _update_roster(self):
         '''
         Update default flat roster with the passed in information.
+        The entry is appended, the roster is neither parsed nor rewritten.
         :return:
         '''
-        roster_file = self._get_roster()
+        roster_file = salt.roster.get_roster_file(self.opts)
         if os.access(roster_file, os.W_OK):
             if self.__parsed_rosters[self.ROSTER_UPDATE_FLAG]:
                 with salt.utils.files.fopen(roster_file, 'a') as roster_fp:
@@ -505,6 +511,34 @@ class SSH(object):
             return {host: stderr}
         return {host: stdout}
 
+    @staticmethod
+    def _format_return(stdout, stderr, retcode):
+        '''
+        Return the data from a Single run, or its raw output if the output did
+        not contain a return
+        '''
+        try:
+            data = salt.utils.json.find_json(stdout)
+            if len(data) < 2 and 'local' in data:
+                return data['local']
+        except Exception:
+            pass
+        return {
+            'stdout': stdout,
+            'stderr': stderr,
+            'retcode': retcode,
+        }
+
+    def _set_target_defaults(self, host):
+        '''
+        Fill in the defaults for the options a target does not set
+        '''
+        for default in self.defaults:
+            if default not in self.targets[host]:
+                self.targets[host][default] = self.defaults[default]
+        if 'host' not in self.targets[host]:
+            self.targets[host]['host'] = host
+
     def handle_routine(self, que, opts, host, target, mine=False):
         '''
         Run the routine in a "Thread", put a dict on the queue
@@ -522,37 +556,136 @@ class SSH(object):
         ret = {'id': single.id}
         stdout, stderr, retcode = single.run()
         # This job is done, yield
+        ret['ret'] = self._format_return(stdout, stderr, retcode)
+        que.put(ret)
+
+    @tornado.gen.coroutine
+    def handle_routine_async(self, host, target, timeout=0):
+        '''
+        Run the routine from the IOLoop, returning the same dict that
+        handle_routine puts on the queue
+        '''
+        ret = {'id': host}
+        deadline = None
+        if timeout:
+            deadline = tornado.ioloop.IOLoop.current().time() + timeout
         try:
-            data = salt.utils.json.find_json(stdout)
-            if len(data) < 2 and 'local' in data:
-                ret['ret'] = data['local']
+            single = Single(
+                    copy.deepcopy(self.opts),
+                    self.opts['argv'],
+                    host,
+                    mods=self.mods,
+                    fsclient=self.fsclient,
+                    thin=self.thin,
+                    **target)
+            stdout, stderr, retcode = yield single.run_async(deadline=deadline)
+        except Exception as exc:
+            error = ('Target \'{0}\' did not return any data, '
+                     'probably due to an error: {1}').format(host, exc)
+            log.error(error, exc_info_on_loglevel=logging.DEBUG)
+            ret['ret'] = error
+        else:
+            ret['ret'] = self._format_return(stdout, stderr, retcode)
+        raise tornado.gen.Return(ret)
+
+    def _async_targets(self, mine=False):
+        '''
+        Split the targets into the ones which can be run from the IOLoop and
+        the ones which need a process of their own: wrapper functions run
+        salt on the master, and targets which need a tty, winrm or password
+        prompts need a terminal.
+        '''
+        async_targets = {}
+        proc_targets = {}
+        if self.opts.get('raw_shell', False):
+            use_async = True
+        else:
+            fun = self.opts['argv'][0] if self.opts['argv'] else ''
+            wfuncs = salt.loader.ssh_wrapper(
+                self.opts, None, {'master_opts': self.opts,
+                                  'fileclient': self.fsclient})
+            use_async = not mine and fun not in wfuncs
+        for host in self.targets:
+            self._set_target_defaults(host)
+            target = self.targets[host]
+            if use_async and not any(target.get(key) for key in
+                                     ('tty', 'winrm', 'passwd', 'priv_passwd')):
+                async_targets[host] = target
             else:
-                ret['ret'] = {
-                    'stdout': stdout,
-                    'stderr': stderr,
-                    'retcode': retcode,
-                }
-        except Exception:
-            ret['ret'] = {
-                'stdout': stdout,
-                'stderr': stderr,
-                'retcode': retcode,
-            }
-        que.put(ret)
+                proc_targets[host] = target
+        return async_targets, proc_targets
+
+    def handle_ssh_async(self, mine=False):
+        '''
+        Run the targets from a single tornado IOLoop, with up to
+        ssh_async_concurrency of them in flight at once, and yield the returns
+        as they complete. The targets which cannot be run from the IOLoop are
+        run afterwards by handle_ssh_procs.
+        '''
+        async_targets, proc_targets = self._async_targets(mine=mine)
+        if async_targets:
+            log.debug(
+                'Running %d targets asynchronously, %d in processes',
+                len(async_targets), len(proc_targets)
+            )
+            io_loop = tornado.ioloop.IOLoop()
+            returns = tornado.queues.Queue()
+            hosts = iter(async_targets)
+            timeout = self.opts.get('ssh_async_timeout', 0)
+            workers = []
+
+            @tornado.gen.coroutine
+            def _worker():
+                for host in hosts:
+                    ret = yield self.handle_routine_async(
+                        host, async_targets[host], timeout=timeout)
+                    yield returns.put(ret)
+
+            @tornado.gen.coroutine
+            def _next_return():
+                if not workers:
+                    concurrency = max(
+                        self.opts.get('ssh_async_concurrency', 500), 1)
+                    for _ in range(min(concurrency, len(async_targets))):
+                        workers.append(_worker())
+                ret = yield returns.get()
+                raise tornado.gen.Return(ret)
+
+            try:
+                for _ in range(len(async_targets)):
+                    ret = io_loop.run_sync(_next_return)
+                    yield {ret['id']: ret['ret']}
+            finally:
+                # The exits of the ssh processes are reported to the IOLoop
+                # which started the first of them
+                tornado.process.Subprocess.uninitialize()
+                io_loop.close(all_fds=True)
+        if proc_targets:
+            for ret in self.handle_ssh_procs(proc_targets, mine=mine):
+                yield ret
 
     def handle_ssh(self, mine=False):
         '''
         Spin up the needed threads or processes and execute the subsequent
         routines
         '''
+        if self.opts.get('ssh_async', False) and self.targets:
+            return self.handle_ssh_async(mine=mine)
+        return self.handle_ssh_procs(self.targets, mine=mine)
+
+    def handle_ssh_procs(self, targets, mine=False):
+        '''
+        Run each target in a process of its own, with up to ssh_max_procs of
+        them running at once
+        '''
         que = multiprocessing.Queue()
         running = {}
-        target_iter = self.targets.__iter__()
+        target_iter = targets.__iter__()
         returned = set()
         rets = set()
         init = False
         while True:
-            if not self.targets:
+            if not targets:
                 log.error('No matching targets found in roster.')
                 break
             if len(running) < self.opts.get('ssh_max_procs', 25) and not init:
@@ -561,11 +694,7 @@ class SSH(object):
                 except StopIteration:
                     init = True
                     continue
-                for default in self.defaults:
-                    if default not in self.targets[host]:
-                        self.targets[host][default] = self.defaults[default]
-                if 'host' not in self.targets[host]:
-                    self.targets[host]['host'] = host
+                self._set_target_defaults(host)
                 if self.targets[host].get('winrm') and not HAS_WINSHELL:
                     returned.add(host)
                     rets.add(host)
@@ -630,10 +759,10 @@ class SSH(object):
             for host in rets:
                 if host in running:
                     running.pop(host)
-            if len(rets) >= len(self.targets):
+            if len(rets) >= len(targets):
                 break
             # Sleep when limit or all threads started
-            if len(running) >= self.opts.get('ssh_max_procs', 25) or len(self.targets) >= len(running):
+            if len(running) >= self.opts.get('ssh_max_procs', 25) or len(targets) >= len(running):
                 time.sleep(0.1)
 
     def run_iter(self, mine=False, jid=None):
@@ -673,22 +802,64 @@ class SSH(object):
         else:
             self.returners['{0}.save_load'.format(self.opts['master_job_cache'])](jid, job_load)
 
-        for ret in self.handle_ssh(mine=mine):
-            host = next(six.iterkeys(ret))
-            self.cache_job(jid, host, ret[host], fun)
-            if self.event:
-                id_, data = next(six.iteritems(ret))
-                if isinstance(data, six.text_type):
-                    data = {'return': data}
-                if 'id' not in data:
-                    data['id'] = id_
-                data['jid'] = jid  # make the jid in the payload the same as the jid in the tag
-                self.event.fire_event(
-                    data,
-                    salt.utils.event.tagify(
-                        [jid, 'ret', host],
-                        'job'))
-            yield ret
+        try:
+            for ret in self.handle_ssh(mine=mine):
+                host = next(six.iterkeys(ret))
+                self.cache_job(jid, host, ret[host], fun)
+                if self.event:
+                    id_, data = next(six.iteritems(ret))
+                    if isinstance(data, six.text_type):
+                        data = {'return': data}
+                    if 'id' not in data:
+                        data['id'] = id_
+                    data['jid'] = jid  # make the jid in the payload the same as the jid in the tag
+                    self.event.fire_event(
+                        data,
+                        salt.utils.event.tagify(
+                            [jid, 'ret', host],
+                            'job'))
+                yield ret
+        finally:
+            self.close_sessions()
+
+    def close_sessions(self):
+        '''
+        Close the persistent ssh sessions opened during the run, unless they
+        are kept for later runs with ssh_control_persist
+        '''
+        if not self.opts.get('ssh_control_master', False) \
+                or self.opts.get('ssh_control_persist', 0):
+            return
+        # The sessions are closed in parallel, up to ssh_max_procs at once
+        limit = max(self.opts.get('ssh_max_procs', 25), 1)
+        procs = []
+
+        def _wait():
+            for host, proc in procs:
+                if proc.wait() != 0:
+                    log.debug('Unable to close the ssh session to %s', host)
+            del procs[:]
+
+        try:
+            for host, target in six.iteritems(self.targets):
+                if target.get('winrm'):
+                    continue
+                shell = salt.client.ssh.shell.Shell(
+                    self.opts,
+                    target.get('host', host),
+                    user=target.get('user', self.defaults.get('user')),
+                    port=target.get('port', self.defaults.get('port')))
+                try:
+                    proc = shell.close_control_master(wait=False)
+                except Exception as exc:
+                    log.debug('Unable to close the ssh session to %s: %s', host, exc)
+                    continue
+                if proc is not None:
+                    procs.append((host, proc))
+                if len(procs) >= limit:
+                    _wait()
+        finally:
+            _wait()
 
     def cache_job(self, jid, id_, ret, fun):
         '''
@@ -761,48 +932,51 @@ class SSH(object):
         sret = {}
         outputter = self.opts.get('output', 'nested')
         final_exit = 0
-        for ret in self.handle_ssh():
-            host = next(six.iterkeys(ret))
-            if isinstance(ret[host], dict):
-                host_ret = ret[host].get('retcode', 0)
-                if host_ret != 0:
+        try:
+            for ret in self.handle_ssh():
+                host = next(six.iterkeys(ret))
+                if isinstance(ret[host], dict):
+                    host_ret = ret[host].get('retcode', 0)
+                    if host_ret != 0:
+                        final_exit = 1
+                else:
+                    # Error on host
                     final_exit = 1
-            else:
-                # Error on host
-                final_exit = 1
 
-            self.cache_job(jid, host, ret[host], fun)
-            ret = self.key_deploy(host, ret)
+                self.cache_job(jid, host, ret[host], fun)
+                ret = self.key_deploy(host, ret)
 
-            if isinstance(ret[host], dict) and (ret[host].get('stderr') or '').startswith('ssh:'):
-                ret[host] = ret[host]['stderr']
+                if isinstance(ret[host], dict) and (ret[host].get('stderr') or '').startswith('ssh:'):
+                    ret[host] = ret[host]['stderr']
 
-            if not isinstance(ret[host], dict):
-                p_data = {host: ret[host]}
-            elif 'return' not in ret[host]:
-                p_data = ret
-            else:
-                outputter = ret[host].get('out', self.opts.get('output', 'nested'))
-                p_data = {host: ret[host].get('return', {})}
-            if self.opts.get('static'):
-                sret.update(p_data)
-            else:
-                salt.output.display_output(
-                        p_data,
-                        outputter,
-                        self.opts)
-            if self.event:
-                id_, data = next(six.iteritems(ret))
-                if isinstance(data, six.text_type):
-                    data = {'return': data}
-                if 'id' not in data:
-                    data['id'] = id_
-                data['jid'] = jid  # make the jid in the payload the same as the jid in the tag
-                self.event.fire_event(
-                    data,
-                    salt.utils.event.tagify(
-                        [jid, 'ret', host],
-                        'job'))
+                if not isinstance(ret[host], dict):
+                    p_data = {host: ret[host]}
+                elif 'return' not in ret[host]:
+                    p_data = ret
+                else:
+                    outputter = ret[host].get('out', self.opts.get('output', 'nested'))
+                    p_data = {host: ret[host].get('return', {})}
+                if self.opts.get('static'):
+                    sret.update(p_data)
+                else:
+                    salt.output.display_output(
+                            p_data,
+                            outputter,
+                            self.opts)
+                if self.event:
+                    id_, data = next(six.iteritems(ret))
+                    if isinstance(data, six.text_type):
+                        data = {'return': data}
+                    if 'id' not in data:
+                        data['id'] = id_
+                    data['jid'] = jid  # make the jid in the payload the same as the jid in the tag
+                    self.event.fire_event(
+                        data,
+                        salt.utils.event.tagify(
+                            [jid, 'ret', host],
+                            'job'))
+        finally:
+            self.close_sessions()
         if self.opts.get('static'):
             salt.output.display_output(
                     sret,
@@ -976,6 +1150,79 @@ class Single(object):
             )
         return True
 
+    def _thin_delta(self, code_checksum):
+        '''
+        Return the path of the thin delta from the passed code checksum, or
+        None if there is none
+        '''
+        if '_caller_cachedir' in self.opts:
+            cachedir = self.opts['_caller_cachedir']
+        else:
+            cachedir = self.opts['cachedir']
+        try:
+            return salt.utils.thin.gen_thin_delta(cachedir, code_checksum)
+        except Exception as exc:
+            log.warning('Unable to generate the thin delta from %s: %s',
+                        code_checksum, exc)
+            return None
+
+    def deploy_delta(self, code_checksum):
+        '''
+        Deploy only the files of salt-thin which changed since the thin with
+        the passed code checksum. Returns False if that thin is not known.
+        '''
+        delta = self._thin_delta(code_checksum)
+        if delta is None:
+            return False
+        self.shell.send(
+            delta,
+            os.path.join(self.thin_dir, 'salt-thin-delta.tgz'),
+        )
+        self.deploy_ext()
+        return True
+
+    @tornado.gen.coroutine
+    def deploy_delta_async(self, code_checksum, deadline=None):
+        '''
+        Deploy the thin delta without blocking
+        '''
+        delta = self._thin_delta(code_checksum)
+        if delta is None:
+            raise tornado.gen.Return(False)
+        yield self.shell.send_async(
+            delta,
+            os.path.join(self.thin_dir, 'salt-thin-delta.tgz'),
+            deadline=deadline,
+        )
+        yield self.deploy_ext_async(deadline=deadline)
+        raise tornado.gen.Return(True)
+
+    @tornado.gen.coroutine
+    def deploy_async(self, deadline=None):
+        '''
+        Deploy salt-thin without blocking
+        '''
+        yield self.shell.send_async(
+            self.thin,
+            os.path.join(self.thin_dir, 'salt-thin.tgz'),
+            deadline=deadline,
+        )
+        yield self.deploy_ext_async(deadline=deadline)
+        raise tornado.gen.Return(True)
+
+    @tornado.gen.coroutine
+    def deploy_ext_async(self, deadline=None):
+        '''
+        Deploy the ext_mods tarball without blocking
+        '''
+        if self.mods.get('file'):
+            yield self.shell.send_async(
+                self.mods['file'],
+                os.path.join(self.thin_dir, 'salt-ext_mods.tgz'),
+                deadline=deadline,
+            )
+        raise tornado.gen.Return(True)
+
     def run(self, deploy_attempted=False):
         '''
         Execute the routine, the routine can be either:
@@ -1002,6 +1249,22 @@ class Single(object):
 
         return stdout, stderr, retcode
 
+    @tornado.gen.coroutine
+    def run_async(self, deadline=None):
+        '''
+        Execute a raw shell command or a remote Salt command like run, from a
+        tornado IOLoop. Wrapper functions, and targets which need a tty or
+        winrm, are not supported.
+
+        Returns a future which resolves to (stdout, stderr, retcode)
+        '''
+        if self.opts.get('raw_shell', False):
+            cmd_str = ' '.join([self._escape_arg(arg) for arg in self.argv])
+            ret = yield self.shell.exec_cmd_async(cmd_str, deadline=deadline)
+        else:
+            ret = yield self.cmd_block_async(deadline=deadline)
+        raise tornado.gen.Return(ret)
+
     def run_wfunc(self):
         '''
         Execute a wrapper function
@@ -1222,6 +1485,7 @@ OPTIONS.hashfunc = '{hashfunc}'
 OPTIONS.version = '{version}'
 OPTIONS.ext_mods = '{ext_mods}'
 OPTIONS.wipe = {wipe}
+OPTIONS.delta = {delta}
 OPTIONS.tty = {tty}
 OPTIONS.cmd_umask = {cmd_umask}
 OPTIONS.code_checksum = {code_checksum}
@@ -1233,6 +1497,7 @@ ARGS = {arguments}\n'''.format(config=self.minion_config,
                                version=salt.version.__version__,
                                ext_mods=self.mods.get('version', ''),
                                wipe=self.wipe,
+                               delta=bool(self.opts.get('ssh_thin_delta', False)),
                                tty=self.tty,
                                cmd_umask=self.cmd_umask,
                                code_checksum=thin_code_digest,
@@ -1320,7 +1585,86 @@ ARGS = {arguments}\n'''.format(config=self.minion_config,
             ' '.join([six.text_type(arg) for arg in self.argv])
         )
         cmd_str = self._cmd_str()
-        stdout, stderr, retcode = self.shim_cmd(cmd_str)
+        steps = self._cmd_block_steps(cmd_str)
+        result = None
+        while True:
+            step = steps.send(result)
+            if step[0] == 'shim':
+                result = self.shim_cmd(step[1])
+            elif step[0] == 'deploy':
+                result = self.deploy()
+            elif step[0] == 'deploy_delta':
+                result = self.deploy_delta(step[1])
+            elif step[0] == 'deploy_ext':
+                result = self.deploy_ext()
+            elif step[0] == 'deploy_python':
+                result = saltwinshell.deploy_python(self)
+            elif step[0] == 'retry':
+                return self.cmd_block()
+            else:
+                return step[1]
+
+    @tornado.gen.coroutine
+    def cmd_block_async(self, deadline=None):
+        '''
+        Run the shimmed command like cmd_block, from a tornado IOLoop, with
+        the ssh and scp commands run without blocking
+        '''
+        self.argv = _convert_args(self.argv)
+        log.debug(
+            'Performing shimmed, asynchronous command as follows:\n%s',
+            ' '.join([six.text_type(arg) for arg in self.argv])
+        )
+        cmd_str = self._cmd_str()
+        for _ in range(3):
+            steps = self._cmd_block_steps(cmd_str)
+            result = None
+            while True:
+                step = steps.send(result)
+                if step[0] == 'shim':
+                    result = yield self.shell.exec_cmd_async(
+                        step[1], deadline=deadline)
+                elif step[0] == 'deploy':
+                    result = yield self.deploy_async(deadline=deadline)
+                elif step[0] == 'deploy_delta':
+                    result = yield self.deploy_delta_async(
+                        step[1], deadline=deadline)
+                elif step[0] == 'deploy_ext':
+                    result = yield self.deploy_ext_async(deadline=deadline)
+                elif step[0] == 'deploy_python':
+                    # saltwinshell blocks, keep it off the IOLoop
+                    executor = concurrent.futures.ThreadPoolExecutor(1)
+                    try:
+                        result = yield executor.submit(
+                            saltwinshell.deploy_python, self)
+                    finally:
+                        executor.shutdown(wait=False)
+                elif step[0] == 'retry':
+                    break
+                else:
+                    raise tornado.gen.Return(step[1])
+        raise tornado.gen.Return(
+            ('ERROR: Failure deploying thin', result[1], result[2]))
+
+    def _cmd_block_steps(self, cmd_str):
+        '''
+        Generator holding the shim protocol used by cmd_block and
+        cmd_block_async. It yields the actions to take, each a tuple of the
+        action name and its arguments, and is sent back their results:
+
+        shim
+            Run the shim command, send back (stdout, stderr, retcode)
+        deploy, deploy_ext, deploy_python
+            Deploy the thin, the ext_mods or the Windows Python environment
+        deploy_delta
+            Deploy the thin files changed since the code checksum passed,
+            send back False if that is not possible
+        retry
+            Start over
+        done
+            The second item is the (stdout, stderr, retcode) to return
+        '''
+        stdout, stderr, retcode = yield ('shim', cmd_str)
 
         log.trace('STDOUT %s\n%s', self.target['host'], stdout)
         log.trace('STDERR %s\n%s', self.target['host'], stderr)
@@ -1329,25 +1673,27 @@ ARGS = {arguments}\n'''.format(config=self.minion_config,
         error = self.categorize_shim_errors(stdout, stderr, retcode)
         if error:
             if error == 'Python environment not found on Windows system':
-                saltwinshell.deploy_python(self)
-                stdout, stderr, retcode = self.shim_cmd(cmd_str)
+                yield ('deploy_python',)
+                stdout, stderr, retcode = yield ('shim', cmd_str)
                 while re.search(RSTR_RE, stdout):
                     stdout = re.split(RSTR_RE, stdout, 1)[1].strip()
                 while re.search(RSTR_RE, stderr):
                     stderr = re.split(RSTR_RE, stderr, 1)[1].strip()
             elif error == 'Undefined SHIM state':
-                self.deploy()
-                stdout, stderr, retcode = self.shim_cmd(cmd_str)
+                yield ('deploy',)
+                stdout, stderr, retcode = yield ('shim', cmd_str)
                 if not re.search(RSTR_RE, stdout) or not re.search(RSTR_RE, stderr):
                     # If RSTR is not seen in both stdout and stderr then there
                     # was a thin deployment problem.
-                    return 'ERROR: Failure deploying thin, undefined state: {0}'.format(stdout), stderr, retcode
+                    yield ('done', ('ERROR: Failure deploying thin, undefined state: {0}'.format(stdout), stderr, retcode))
+                    return
                 while re.search(RSTR_RE, stdout):
                     stdout = re.split(RSTR_RE, stdout, 1)[1].strip()
                 while re.search(RSTR_RE, stderr):
                     stderr = re.split(RSTR_RE, stderr, 1)[1].strip()
             else:
-                return 'ERROR: {0}'.format(error), stderr, retcode
+                yield ('done', ('ERROR: {0}'.format(error), stderr, retcode))
+                return
 
         # FIXME: this discards output from ssh_shim if the shim succeeds.  It should
         # always save the shim output regardless of shim success or failure.
@@ -1365,9 +1711,15 @@ ARGS = {arguments}\n'''.format(config=self.minion_config,
             # is a SHIM command for the master.
             shim_command = re.split(r'\r?\n', stdout, 1)[0].strip()
             log.debug('SHIM retcode(%s) and command: %s', retcode, shim_command)
-            if 'deploy' == shim_command and retcode == salt.defaults.exitcodes.EX_THIN_DEPLOY:
-                self.deploy()
-                stdout, stderr, retcode = self.shim_cmd(cmd_str)
+            if shim_command in ('deploy', 'deploy_delta') \
+                    and retcode == salt.defaults.exitcodes.EX_THIN_DEPLOY:
+                deployed = False
+                if shim_command == 'deploy_delta':
+                    # The shim reports the code checksum of the thin it has
+                    deployed = yield ('deploy_delta', (stdout.split() + [''])[1])
+                if not deployed:
+                    yield ('deploy',)
+                stdout, stderr, retcode = yield ('shim', cmd_str)
                 if not re.search(RSTR_RE, stdout) or not re.search(RSTR_RE, stderr):
                     if not self.tty:
                         # If RSTR is not seen in both stdout and stderr then there
@@ -1377,7 +1729,8 @@ ARGS = {arguments}\n'''.format(config=self.minion_config,
                             'STDOUT:\n%s\nSTDERR:\n%s\nRETCODE: %s',
                             stdout, stderr, retcode
                         )
-                        return self.cmd_block()
+                        yield ('retry',)
+                        return
                     elif not re.search(RSTR_RE, stdout):
                         # If RSTR is not seen in stdout with tty, then there
                         # was a thin deployment problem.
@@ -1394,18 +1747,19 @@ ARGS = {arguments}\n'''.format(config=self.minion_config,
                     while re.search(RSTR_RE, stderr):
                         stderr = re.split(RSTR_RE, stderr, 1)[1].strip()
             elif 'ext_mods' == shim_command:
-                self.deploy_ext()
-                stdout, stderr, retcode = self.shim_cmd(cmd_str)
+                yield ('deploy_ext',)
+                stdout, stderr, retcode = yield ('shim', cmd_str)
                 if not re.search(RSTR_RE, stdout) or not re.search(RSTR_RE, stderr):
                     # If RSTR is not seen in both stdout and stderr then there
                     # was a thin deployment problem.
-                    return 'ERROR: Failure deploying ext_mods: {0}'.format(stdout), stderr, retcode
+                    yield ('done', ('ERROR: Failure deploying ext_mods: {0}'.format(stdout), stderr, retcode))
+                    return
                 while re.search(RSTR_RE, stdout):
                     stdout = re.split(RSTR_RE, stdout, 1)[1].strip()
                 while re.search(RSTR_RE, stderr):
                     stderr = re.split(RSTR_RE, stderr, 1)[1].strip()
 
-        return stdout, stderr, retcode
+        yield ('done', (stdout, stderr, retcode))
 
     def categorize_shim_errors(self, stdout_bytes, stderr_bytes, retcode):
         stdout = salt.utils.stringutils.to_unicode(stdout_bytes)
@@ -8,18 +8,25 @@ from __future__ import absolute_import, print_function, unicode_literals
 import re
 import os
 import sys
+import hashlib
 import time
 import logging
 import subprocess
 
 # Import salt libs
 import salt.defaults.exitcodes
+import salt.utils.files
 import salt.utils.json
 import salt.utils.nb_popen
+import salt.utils.stringutils
 import salt.utils.vt
 
 from salt.ext import six
 
+# Import 3rd-party libs
+import tornado.gen
+import tornado.process
+
 log = logging.getLogger(__name__)
 
 SSH_PASSWORD_PROMPT_RE = re.compile(r'(?:.*)[Pp]assword(?: for .*)?:', re.M)
@@ -157,9 +164,10 @@ class Shell(object):
         '''
         Return options to pass to ssh
         '''
-        # TODO ControlMaster does not work without ControlPath
-        # user could take advantage of it if they set ControlPath in their
-        # ssh config.  Also, ControlPersist not widely available.
+        # ControlMaster does not work without ControlPath, which is set by
+        # _control_opts when ssh_control_master is enabled. Otherwise the
+        # user could take advantage of it by setting ControlPath in their
+        # ssh config.
         options = ['ControlMaster=auto',
                    'StrictHostKeyChecking=no',
                    ]
@@ -193,6 +201,66 @@ class Shell(object):
             ret.append('-o {0} '.format(option))
         return ''.join(ret)
 
+    def _control_path(self):
+        '''
+        Return the path of the control socket for the persistent session to
+        the host, or None if ssh_control_master is disabled
+        '''
+        if not self.opts.get('ssh_control_master', False):
+            return None
+        control_dir = self.opts.get('ssh_control_path') or \
+            os.path.join(self.opts['cachedir'], 'ssh_control')
+        if not os.path.isdir(control_dir):
+            try:
+                os.makedirs(control_dir, 0o700)
+            except OSError:
+                if not os.path.isdir(control_dir):
+                    raise
+        # Unix socket paths are limited to about 100 characters, so the
+        # socket is named after a hash of the destination
+        dest = '{0}@{1}:{2}'.format(self.user, self.host, self.port)
+        return os.path.join(
+            control_dir,
+            hashlib.sha1(salt.utils.stringutils.to_bytes(dest)).hexdigest()[:16]
+        )
+
+    def _control_opts(self):
+        '''
+        Return options to share one persistent ssh session per host
+        '''
+        control_path = self._control_path()
+        if control_path is None:
+            return ''
+        # Without an idle expiry the session lasts until the end of the run,
+        # when close_control_master is called
+        persist = self.opts.get('ssh_control_persist', 0) or 'yes'
+        options = ['ControlMaster=auto',
+                   'ControlPath={0}'.format(control_path),
+                   'ControlPersist={0}'.format(persist)]
+        return ' '.join(['-o {0}'.format(opt) for opt in options])
+
+    def close_control_master(self, wait=True):
+        '''
+        Close the persistent session to the host, if one is open. With wait
+        set to False the ``ssh -O exit`` process is returned without waiting
+        for it, or None if no session is open.
+        '''
+        control_path = self._control_path()
+        if control_path is None or not os.path.exists(control_path):
+            return False if wait else None
+        cmd = 'ssh -O exit -o ControlPath={0} {1}'.format(control_path,
+                                                           self.host)
+        log.debug('Closing persistent ssh session: %s', cmd)
+        with salt.utils.files.fopen(os.devnull, 'w+') as devnull:
+            proc = subprocess.Popen(cmd,
+                                    shell=True,
+                                    stdin=devnull,
+                                    stdout=devnull,
+                                    stderr=devnull)
+        if not wait:
+            return proc
+        return proc.wait() == 0
+
     def _ssh_opts(self):
         return ' '.join(['-o {0}'.format(opt)
                           for opt in self.ssh_options])
@@ -241,7 +309,7 @@ class Shell(object):
             stdout, stderr, retcode = self._run_cmd(self._copy_id_str_new())
         return stdout, stderr, retcode
 
-    def _cmd_str(self, cmd, ssh='ssh'):
+    def _cmd_str(self, cmd, ssh='ssh', batch_mode=False):
         '''
         Return the cmd string to execute
         '''
@@ -261,6 +329,12 @@ class Shell(object):
                                       for item in self.remote_port_forwards.split(',')]))
         if self.ssh_options:
             command.append(self._ssh_opts())
+        control_opts = self._control_opts()
+        if control_opts:
+            command.append(control_opts)
+        if batch_mode:
+            # There is no terminal to answer prompts on
+            command.append('-o BatchMode=yes')
 
         command.append(cmd)
 
@@ -347,6 +421,104 @@ class Shell(object):
         ret = self._run_cmd(cmd)
         return ret
 
+    def exec_cmd_async(self, cmd, deadline=None):
+        '''
+        Execute a remote command without blocking, from a tornado IOLoop.
+        Returns a future which resolves to (stdout, stderr, retcode).
+        '''
+        cmd = self._cmd_str(cmd, batch_mode=True)
+
+        logmsg = 'Executing asynchronous command: {0}'.format(cmd)
+        if self.passwd:
+            logmsg = logmsg.replace(self.passwd, ('*' * 6))
+        if 'decode("base64")' in logmsg or 'base64.b64decode(' in logmsg:
+            log.debug('Executed SHIM command. Command logged to TRACE')
+            log.trace(logmsg)
+        else:
+            log.debug(logmsg)
+
+        return self._run_cmd_async(cmd, deadline=deadline)
+
+    @tornado.gen.coroutine
+    def send_async(self, local, remote, makedirs=False, deadline=None):
+        '''
+        scp a file or files to a remote system without blocking, from a
+        tornado IOLoop
+        '''
+        if makedirs:
+            yield self.exec_cmd_async(
+                'mkdir -p {0}'.format(os.path.dirname(remote)),
+                deadline=deadline)
+
+        # scp needs [<ipv6}
+        host = self.host
+        if ':' in host:
+            host = '[{0}]'.format(host)
+
+        cmd = '{0} {1}:{2}'.format(local, host, remote)
+        cmd = self._cmd_str(cmd, ssh='scp', batch_mode=True)
+
+        logmsg = 'Executing asynchronous command: {0}'.format(cmd)
+        if self.passwd:
+            logmsg = logmsg.replace(self.passwd, ('*' * 6))
+        log.debug(logmsg)
+
+        ret = yield self._run_cmd_async(cmd, deadline=deadline)
+        raise tornado.gen.Return(ret)
+
+    @tornado.gen.coroutine
+    def _run_cmd_async(self, cmd, deadline=None):
+        '''
+        Execute a shell command with non-blocking pipes, from a tornado
+        IOLoop. No terminal is allocated, so the command must not prompt for
+        anything. The command is killed if it is still running at the
+        deadline, an IOLoop time.
+        '''
+        if not cmd:
+            raise tornado.gen.Return(('', 'No command or passphrase', 245))
+
+        with salt.utils.files.fopen(os.devnull, 'rb') as devnull:
+            proc = tornado.process.Subprocess(
+                cmd,
+                shell=True,
+                close_fds=True,
+                stdin=devnull,
+                stdout=tornado.process.Subprocess.STREAM,
+                stderr=tornado.process.Subprocess.STREAM,
+            )
+        waits = [proc.stdout.read_until_close(),
+                 proc.stderr.read_until_close()]
+        try:
+            exit_future = proc.wait_for_exit(raise_error=False)
+            waits.append(exit_future)
+        except ValueError:
+            # SIGCHLD can only be handled from the main thread
+            exit_future = None
+        try:
+            waiting = tornado.gen.multi(waits)
+            if deadline is not None:
+                waiting = tornado.gen.with_timeout(deadline, waiting)
+            stdout, stderr = (yield waiting)[:2]
+        except tornado.gen.TimeoutError:
+            proc.proc.kill()
+            proc.stdout.close()
+            proc.stderr.close()
+            if exit_future is not None:
+                yield exit_future
+            else:
+                proc.proc.wait()
+            raise tornado.gen.Return(
+                ('', 'ssh: Timed out waiting for {0}'.format(self.host),
+                 salt.defaults.exitcodes.EX_GENERIC))
+
+        if exit_future is None:
+            # Both pipes are closed, the process is exiting
+            while proc.proc.poll() is None:
+                yield tornado.gen.sleep(0.01)
+        raise tornado.gen.Return((salt.utils.stringutils.to_unicode(stdout),
+                                  salt.utils.stringutils.to_unicode(stderr),
+                                  proc.proc.returncode))
+
     def send(self, local, remote, makedirs=False):
         '''
         scp a file or files to a remote system
@@ -19,6 +19,8 @@ import subprocess
 import time
 
 THIN_ARCHIVE = 'salt-thin.tgz'
+THIN_DELTA_ARCHIVE = 'salt-thin-delta.tgz'
+THIN_MANIFEST = 'manifest'
 EXT_ARCHIVE = 'salt-ext_mods.tgz'
 
 # Keep these in sync with salt/defaults/exitcodes.py
@@ -140,6 +142,15 @@ def need_deployment():
     sys.exit(EX_THIN_DEPLOY)
 
 
+def need_delta(code_checksum):
+    '''
+    Signal that the thin needs to be updated, and report the code checksum of
+    the thin which is deployed so that only the changed files are sent.
+    '''
+    sys.stdout.write("{0}\ndeploy_delta\n{1}\n".format(OPTIONS.delimiter, code_checksum))
+    sys.exit(EX_THIN_DEPLOY)
+
+
 # Adapted from salt.utils.hashutils.get_hash()
 def get_hash(path, form='sha1', chunk_size=4096):
     '''
@@ -159,8 +170,18 @@ def get_hash(path, form='sha1', chunk_size=4096):
 
 def unpack_thin(thin_path):
     '''
-    Unpack the Salt thin archive.
+    Unpack the Salt thin archive. Anything else in the thin directory is
+    removed first, the master falls back to sending the full thin when it
+    can not send a delta, and files left from the old thin must not remain.
     '''
+    for name in os.listdir(OPTIONS.saltdir):
+        path = os.path.join(OPTIONS.saltdir, name)
+        if path == thin_path:
+            continue
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
     tfile = tarfile.TarFile.gzopen(thin_path)
     old_umask = os.umask(0o077)  # pylint: disable=blacklisted-function
     tfile.extractall(path=OPTIONS.saltdir)
@@ -173,6 +194,53 @@ def unpack_thin(thin_path):
     reset_time(OPTIONS.saltdir)
 
 
+def read_manifest():
+    '''
+    Read the manifest of the deployed thin, mapping each file to its sha1
+    digest.
+    '''
+    manifest = {}
+    manifest_path = os.path.join(OPTIONS.saltdir, THIN_MANIFEST)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path) as _fp:
+            for line in _fp.readlines():
+                digest, _, name = line.rstrip('\n').partition('  ')
+                if name:
+                    manifest[name] = digest
+    return manifest
+
+
+def unpack_delta(delta_path):
+    '''
+    Unpack a Salt thin delta, which only holds the new and changed files, and
+    remove the files which are no longer part of the thin.
+    '''
+    old_manifest = read_manifest()
+    tfile = tarfile.TarFile.gzopen(delta_path)
+    old_umask = os.umask(0o077)  # pylint: disable=blacklisted-function
+    tfile.extractall(path=OPTIONS.saltdir)
+    names = tfile.getnames()
+    tfile.close()
+    os.umask(old_umask)  # pylint: disable=blacklisted-function
+    try:
+        os.unlink(delta_path)
+    except OSError:
+        pass
+    manifest = read_manifest()
+    for name in old_manifest:
+        if name not in manifest:
+            try:
+                os.unlink(os.path.join(OPTIONS.saltdir, name))
+            except OSError:
+                pass
+    for name in names:
+        if name in manifest \
+                and get_hash(os.path.join(OPTIONS.saltdir, name)) != manifest[name]:
+            sys.stderr.write('WARNING: {0} is corrupted, redeploying the thin.\n'.format(name))
+            need_deployment()
+    reset_time(OPTIONS.saltdir)
+
+
 def need_ext():
     '''
     Signal that external modules need to be deployed.
@@ -250,6 +318,12 @@ def main(argv):  # pylint: disable=W0613
     Main program body
     '''
     thin_path = os.path.join(OPTIONS.saltdir, THIN_ARCHIVE)
+    delta_path = os.path.join(OPTIONS.saltdir, THIN_DELTA_ARCHIVE)
+    delta_applied = os.path.isfile(delta_path)
+    if delta_applied:
+        unpack_delta(delta_path)
+        # The thin is now up-to-date, unless the delta was incomplete, which
+        # is caught by the code checksum check below
     if os.path.isfile(thin_path):
         if OPTIONS.checksum != get_hash(thin_path, OPTIONS.hashfunc):
             need_deployment()
@@ -280,6 +354,9 @@ def main(argv):  # pylint: disable=W0613
         if cur_code_cs != OPTIONS.code_checksum:
             sys.stderr.write('WARNING: current code checksum {0} is different to {1}.\n'.format(cur_code_cs,
                                                                                                 OPTIONS.code_checksum))
+            if OPTIONS.delta and not delta_applied and cur_code_cs \
+                    and os.path.isfile(os.path.join(OPTIONS.saltdir, THIN_MANIFEST)):
+                need_delta(cur_code_cs)
             need_deployment()
         # Salt thin exists and is up-to-date - fall through and use it
 
@@ -4,10 +4,12 @@ Create ssh executor system
 '''
 from __future__ import absolute_import, print_function
 # Import python libs
+import hashlib
 import logging
 import os
 import tarfile
 import tempfile
+import time
 import shutil
 from contextlib import closing
 
@@ -167,16 +169,101 @@ def salt_refs(data, ret=None):
     return ret
 
 
-def prep_trans_tar(file_client, chunks, file_refs, pillar=None, id_=None, roster_grains=None):
+def state_cache_key(opts, matches, pillar=None, extras='', exclude=None):
     '''
-    Generate the execution package from the saltenv file refs and a low state
-    data structure
+    Return the key of the state compiled for a host in the state cache, made
+    from the sls matched in the top file or requested, the pillar and the
+    grains listed in ssh_state_cache_grains. Returns None if the state cache is
+    disabled or the data cannot be serialized.
+    '''
+    if not opts.get('ssh_state_cache', False):
+        return None
+    grains = opts.get('grains') or {}
+    data = {
+        'matches': matches,
+        'exclude': exclude,
+        'extras': extras,
+        'pillar': pillar or {},
+        'grains': dict((name, grains.get(name))
+                       for name in opts.get('ssh_state_cache_grains') or []),
+    }
+    try:
+        serial = salt.utils.json.dumps(data, sort_keys=True, default=repr)
+    except (TypeError, ValueError) as exc:
+        log.debug('Not caching the compiled state: %s', exc)
+        return None
+    return hashlib.sha256(salt.utils.stringutils.to_bytes(serial)).hexdigest()
+
+
+def _state_cache_dir(opts):
+    '''
+    Return the directory of the state cache
+    '''
+    return os.path.join(opts['cachedir'], 'salt-ssh', 'state_cache')
+
+
+def get_cached_state(opts, key):
+    '''
+    Return the low chunks and the path of the files tarball cached under key,
+    or (None, None) if they are not cached or are older than
+    ssh_state_cache_ttl
+    '''
+    if key is None:
+        return None, None
+    cache_dir = _state_cache_dir(opts)
+    lowfn = os.path.join(cache_dir, '{0}.json'.format(key))
+    files_tar = os.path.join(cache_dir, '{0}.tar'.format(key))
+    try:
+        if time.time() - os.path.getmtime(lowfn) > opts.get('ssh_state_cache_ttl', 60) \
+                or not os.path.isfile(files_tar):
+            return None, None
+        with salt.utils.files.fopen(lowfn, 'r') as fp_:
+            chunks = salt.utils.json.load(fp_)
+    except (IOError, OSError, ValueError):
+        return None, None
+    log.debug('Using the state compiled for cache key %s', key)
+    return chunks, files_tar
+
+
+def cache_state(opts, key, chunks, files_tar):
+    '''
+    Move the files tarball made by prep_files_tar into the state cache under
+    key, along with the low chunks, and return its new path. Hosts sharing the
+    key may store the same state at the same time, the last one wins.
+    '''
+    cache_dir = _state_cache_dir(opts)
+    ttl = opts.get('ssh_state_cache_ttl', 60)
+    if not os.path.isdir(cache_dir):
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            if not os.path.isdir(cache_dir):
+                raise
+    # The entries are kept for twice their lifetime, so that the hosts which
+    # found them fresh are done sending them before they are removed
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            if time.time() - os.path.getmtime(path) > 2 * ttl:
+                os.remove(path)
+        except OSError:
+            pass
+    cached_tar = os.path.join(cache_dir, '{0}.tar'.format(key))
+    tmp_tar = salt.utils.files.mkstemp(dir=cache_dir)
+    shutil.move(files_tar, tmp_tar)
+    os.rename(tmp_tar, cached_tar)
+    tmp_low = salt.utils.files.mkstemp(dir=cache_dir)
+    with salt.utils.files.fopen(tmp_low, 'w+') as fp_:
+        salt.utils.json.dump(chunks, fp_)
+    os.rename(tmp_low, os.path.join(cache_dir, '{0}.json'.format(key)))
+    return cached_tar
+
+
+def _stage_file_refs(file_client, file_refs, gendir, id_=None):
+    '''
+    Cache the files of the saltenv file refs, along with the custom modules,
+    into a directory per saltenv in gendir
     '''
-    gendir = tempfile.mkdtemp()
-    trans_tar = salt.utils.files.mkstemp()
-    lowfn = os.path.join(gendir, 'lowstate.json')
-    pillarfn = os.path.join(gendir, 'pillar.json')
-    roster_grainsfn = os.path.join(gendir, 'roster_grains.json')
     sync_refs = [
             [salt.utils.url.create('_modules')],
             [salt.utils.url.create('_states')],
@@ -186,15 +273,6 @@ def prep_trans_tar(file_client, chunks, file_refs, pillar=None, id_=None, roster
             [salt.utils.url.create('_output')],
             [salt.utils.url.create('_utils')],
             ]
-    with salt.utils.files.fopen(lowfn, 'w+') as fp_:
-        salt.utils.json.dump(chunks, fp_)
-    if pillar:
-        with salt.utils.files.fopen(pillarfn, 'w+') as fp_:
-            salt.utils.json.dump(pillar, fp_)
-    if roster_grains:
-        with salt.utils.files.fopen(roster_grainsfn, 'w+') as fp_:
-            salt.utils.json.dump(roster_grains, fp_)
-
     if id_ is None:
         id_ = ''
     try:
@@ -242,6 +320,50 @@ def prep_trans_tar(file_client, chunks, file_refs, pillar=None, id_=None, roster
                             os.makedirs(tgt_dir)
                         shutil.copy(filename, tgt)
                     continue
+
+
+def prep_files_tar(file_client, file_refs, id_=None):
+    '''
+    Generate an uncompressed tarball of the files of the saltenv file refs,
+    which prep_trans_tar can reuse for the hosts compiling the same state
+    '''
+    gendir = tempfile.mkdtemp()
+    files_tar = salt.utils.files.mkstemp()
+    try:
+        _stage_file_refs(file_client, file_refs, gendir, id_)
+        with closing(tarfile.open(files_tar, 'w')) as tfp:
+            for root, dirs, files in salt.utils.path.os_walk(gendir):
+                for name in files:
+                    full = os.path.join(root, name)
+                    tfp.add(full, arcname=full[len(gendir):].lstrip(os.sep))
+    finally:
+        shutil.rmtree(gendir)
+    return files_tar
+
+
+def prep_trans_tar(file_client, chunks, file_refs, pillar=None, id_=None, roster_grains=None,
+                   files_tar=None):
+    '''
+    Generate the execution package from the saltenv file refs and a low state
+    data structure. If files_tar, as generated by prep_files_tar, is passed,
+    the files are taken from it instead of from the file refs.
+    '''
+    gendir = tempfile.mkdtemp()
+    trans_tar = salt.utils.files.mkstemp()
+    lowfn = os.path.join(gendir, 'lowstate.json')
+    pillarfn = os.path.join(gendir, 'pillar.json')
+    roster_grainsfn = os.path.join(gendir, 'roster_grains.json')
+    with salt.utils.files.fopen(lowfn, 'w+') as fp_:
+        salt.utils.json.dump(chunks, fp_)
+    if pillar:
+        with salt.utils.files.fopen(pillarfn, 'w+') as fp_:
+            salt.utils.json.dump(pillar, fp_)
+    if roster_grains:
+        with salt.utils.files.fopen(roster_grainsfn, 'w+') as fp_:
+            salt.utils.json.dump(roster_grains, fp_)
+
+    if files_tar is None:
+        _stage_file_refs(file_client, file_refs, gendir, id_)
     try:
         # cwd may not exist if it was removed but salt was run from it
         cwd = os.getcwd()
@@ -249,6 +371,10 @@ def prep_trans_tar(file_client, chunks, file_refs, pillar=None, id_=None, roster
         cwd = None
     os.chdir(gendir)
     with closing(tarfile.open(trans_tar, 'w:gz')) as tfp:
+        if files_tar is not None:
+            with closing(tarfile.open(files_tar, 'r')) as ftp:
+                for member in ftp:
+                    tfp.addfile(member, ftp.extractfile(member) if member.isfile() else None)
         for root, dirs, files in salt.utils.path.os_walk(gendir):
             for name in files:
                 full = os.path.join(root, name)
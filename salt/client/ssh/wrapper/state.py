@@ -89,6 +89,41 @@ def _ssh_state(chunks, st_kwargs,
     return salt.utils.data.decode(stdout)
 
 
+def _prep_trans_tar(opts, chunks, extra_filerefs, st_kwargs, roster_grains,
+                    cache_key=None, files_tar=None):
+    '''
+    Create the tar containing the state pkg and relevant files. With a
+    cache_key, the files are stored in the state cache for the other hosts
+    which compile the same state, or taken from files_tar if one of them did.
+    '''
+    if files_tar is None:
+        file_refs = salt.client.ssh.state.lowstate_file_refs(chunks, extra_filerefs)
+        if cache_key is None:
+            return salt.client.ssh.state.prep_trans_tar(
+                    __context__['fileclient'],
+                    chunks,
+                    file_refs,
+                    __pillar__,
+                    st_kwargs['id_'],
+                    roster_grains)
+        files_tar = salt.client.ssh.state.cache_state(
+                opts,
+                cache_key,
+                chunks,
+                salt.client.ssh.state.prep_files_tar(
+                    __context__['fileclient'],
+                    file_refs,
+                    st_kwargs['id_']))
+    return salt.client.ssh.state.prep_trans_tar(
+            __context__['fileclient'],
+            chunks,
+            {},
+            __pillar__,
+            st_kwargs['id_'],
+            roster_grains,
+            files_tar=files_tar)
+
+
 def _set_retcode(ret, highstate=None):
     '''
     Set the return code based on the data back from the state system
@@ -192,47 +227,50 @@ def sls(mods, saltenv='base', test=None, exclude=None, **kwargs):
             __context__['fileclient'])
     st_.push_active()
     mods = _parse_mods(mods)
-    high_data, errors = st_.render_highstate({saltenv: mods})
     if exclude:
         if isinstance(exclude, six.string_types):
             exclude = exclude.split(',')
-        if '__exclude__' in high_data:
-            high_data['__exclude__'].extend(exclude)
-        else:
-            high_data['__exclude__'] = exclude
-    high_data, ext_errors = st_.state.reconcile_extend(high_data)
-    errors += ext_errors
-    errors += st_.state.verify_high(high_data)
-    if errors:
-        return errors
-    high_data, req_in_errors = st_.state.requisite_in(high_data)
-    errors += req_in_errors
-    high_data = st_.state.apply_exclude(high_data)
-    # Verify that the high data is structurally sound
-    if errors:
-        return errors
-    # Compile and verify the raw chunks
-    chunks = st_.state.compile_high_data(high_data)
-    file_refs = salt.client.ssh.state.lowstate_file_refs(
-            chunks,
-            _merge_extra_filerefs(
-                kwargs.get('extra_filerefs', ''),
-                opts.get('extra_filerefs', '')
-                )
+    extra_filerefs = _merge_extra_filerefs(
+            kwargs.get('extra_filerefs', ''),
+            opts.get('extra_filerefs', '')
             )
+    cache_key = salt.client.ssh.state.state_cache_key(
+            opts, {saltenv: mods}, __pillar__, extra_filerefs, exclude)
+    chunks, files_tar = salt.client.ssh.state.get_cached_state(opts, cache_key)
+    if chunks is None:
+        high_data, errors = st_.render_highstate({saltenv: mods})
+        if exclude:
+            if '__exclude__' in high_data:
+                high_data['__exclude__'].extend(exclude)
+            else:
+                high_data['__exclude__'] = exclude
+        high_data, ext_errors = st_.state.reconcile_extend(high_data)
+        errors += ext_errors
+        errors += st_.state.verify_high(high_data)
+        if errors:
+            return errors
+        high_data, req_in_errors = st_.state.requisite_in(high_data)
+        errors += req_in_errors
+        high_data = st_.state.apply_exclude(high_data)
+        # Verify that the high data is structurally sound
+        if errors:
+            return errors
+        # Compile and verify the raw chunks
+        chunks = st_.state.compile_high_data(high_data)
+        _cleanup_slsmod_low_data(chunks)
 
     roster = salt.roster.Roster(opts, opts.get('roster', 'flat'))
     roster_grains = roster.opts['grains']
 
     # Create the tar containing the state pkg and relevant files.
-    _cleanup_slsmod_low_data(chunks)
-    trans_tar = salt.client.ssh.state.prep_trans_tar(
-            __context__['fileclient'],
+    trans_tar = _prep_trans_tar(
+            opts,
             chunks,
-            file_refs,
-            __pillar__,
-            st_kwargs['id_'],
-            roster_grains)
+            extra_filerefs,
+            st_kwargs,
+            roster_grains,
+            cache_key,
+            files_tar)
     trans_tar_sum = salt.utils.hashutils.get_hash(trans_tar, opts['hash_type'])
     cmd = 'state.pkg {0}/salt_state.tgz test={1} pkg_sum={2} hash_type={3}'.format(
             opts['thin_dir'],
@@ -686,32 +724,37 @@ def highstate(test=None, **kwargs):
             __salt__,
             __context__['fileclient'])
     st_.push_active()
-    chunks = st_.compile_low_chunks()
-    file_refs = salt.client.ssh.state.lowstate_file_refs(
-            chunks,
-            _merge_extra_filerefs(
-                kwargs.get('extra_filerefs', ''),
-                opts.get('extra_filerefs', '')
-                )
+    extra_filerefs = _merge_extra_filerefs(
+            kwargs.get('extra_filerefs', ''),
+            opts.get('extra_filerefs', '')
             )
-    # Check for errors
-    for chunk in chunks:
-        if not isinstance(chunk, dict):
-            __context__['retcode'] = 1
-            return chunks
+    matches = cache_key = None
+    if opts.get('ssh_state_cache', False):
+        matches = st_.top_matches(st_.get_top())
+        cache_key = salt.client.ssh.state.state_cache_key(
+                opts, matches, __pillar__, extra_filerefs)
+    chunks, files_tar = salt.client.ssh.state.get_cached_state(opts, cache_key)
+    if chunks is None:
+        chunks = st_.compile_low_chunks(matches)
+        # Check for errors
+        for chunk in chunks:
+            if not isinstance(chunk, dict):
+                __context__['retcode'] = 1
+                return chunks
+        _cleanup_slsmod_low_data(chunks)
 
     roster = salt.roster.Roster(opts, opts.get('roster', 'flat'))
     roster_grains = roster.opts['grains']
 
     # Create the tar containing the state pkg and relevant files.
-    _cleanup_slsmod_low_data(chunks)
-    trans_tar = salt.client.ssh.state.prep_trans_tar(
-            __context__['fileclient'],
+    trans_tar = _prep_trans_tar(
+            opts,
             chunks,
-            file_refs,
-            __pillar__,
-            st_kwargs['id_'],
-            roster_grains)
+            extra_filerefs,
+            st_kwargs,
+            roster_grains,
+            cache_key,
+            files_tar)
     trans_tar_sum = salt.utils.hashutils.get_hash(trans_tar, opts['hash_type'])
     cmd = 'state.pkg {0}/salt_state.tgz test={1} pkg_sum={2} hash_type={3}'.format(
             opts['thin_dir'],
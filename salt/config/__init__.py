@@ -286,6 +286,28 @@ VALID_OPTS = immutabletypes.freeze({
     # a master for remote execution.
     'use_master_when_local': bool,
 
+    # Store files fetched from the master in a content-addressed blob cache
+    # which is shared between saltenvs, and batch hash lookups
+    'fileclient_blob_cache': bool,
+
+    # Sync directory trees with the master by exchanging a manifest of cached
+    # file hashes and fetching stale files in batches
+    'fileclient_manifest_sync': bool,
+    'fileclient_manifest_sync_batch_size': int,
+    'fileclient_manifest_sync_gzip': int,
+
+    # The number of file_buffer_size chunks to request at a time when fetching
+    # a file from the master
+    'fileclient_chunks_per_request': int,
+
+    # The maximum number of file_buffer_size chunks the master will serve in
+    # response to a single request
+    'fileserver_max_chunks': int,
+
+    # The maximum number of bytes of file contents the master will serve in
+    # response to a single batched request from a minion
+    'fileserver_serve_files_max_size': int,
+
     # A map of saltenvs and fileserver backend locations
     'file_roots': dict,
 
@@ -363,6 +385,19 @@ VALID_OPTS = immutabletypes.freeze({
     # before trying to generate a new process.
     'process_count_max_sleep_secs': int,
 
+    # Run published jobs in a pool of warm, prefork job workers (or threads
+    # when multiprocessing is disabled) instead of a new process per job
+    'minion_job_pool': bool,
+
+    # The number of job workers in the minion job pool
+    'minion_job_pool_size': int,
+
+    # Restart a job pool worker after it has run this many jobs, 0 disables
+    'minion_job_pool_max_jobs': int,
+
+    # Function globs which always run in a dedicated process or thread
+    'minion_job_pool_isolate': list,
+
     # Whether or not the salt minion should run scheduled mine updates
     'mine_enabled': bool,
 
@@ -372,6 +407,20 @@ VALID_OPTS = immutabletypes.freeze({
     # The number of minutes between mine updates.
     'mine_interval': int,
 
+    # Coalesce scheduled job returns, mine updates and beacon events into
+    # batched requests to the master
+    'minion_return_batch': bool,
+
+    # Send the batch once it holds this many loads
+    'minion_return_batch_size': int,
+
+    # Send the batch at least every this many seconds
+    'minion_return_batch_interval': float,
+
+    # Only send the changes to the mine data and grains since they were last
+    # sent to the master
+    'minion_data_delta': bool,
+
     # The ipc strategy. (i.e., sockets versus tcp, etc)
     'ipc_mode': six.string_types,
 
@@ -497,6 +546,10 @@ VALID_OPTS = immutabletypes.freeze({
     # for normal operation
     'loop_interval': float,
 
+    # Only evaluate the scheduled jobs once their next fire time is reached, and
+    # have the minion wait for the next one instead of evaluating every second
+    'schedule_lazy_eval': bool,
+
     # Perform pre-flight verification steps before daemon startup, such as checking configuration
     # files and certain directories.
     'verify_env': bool,
@@ -680,6 +733,22 @@ VALID_OPTS = immutabletypes.freeze({
     's3fs_update_interval': int,
     'svnfs_update_interval': int,
 
+    # Run the fileserver updates in a pool of this many worker threads, one
+    # job per backend or remote, with up to fileserver_update_jitter seconds
+    # of random delay added to each run
+    'fileserver_update_workers': int,
+    'fileserver_update_jitter': int,
+
+    # Keep an index of the file_roots, maintained using inotify where
+    # available, in place of walking them to build the file lists
+    'roots_index': bool,
+    'roots_index_latency': float,
+
+    # Keep the hashes of the files in the file_roots in a single index which
+    # is computed ahead of time by the FileserverUpdate process
+    'roots_hash_index': bool,
+    'roots_hash_index_workers': int,
+
     # NOTE: git_pillar_base, git_pillar_branch, git_pillar_env, and
     # git_pillar_root omitted here because their values could conceivably be
     # loaded as non-string types, which is OK because git_pillar will normalize
@@ -695,6 +764,9 @@ VALID_OPTS = immutabletypes.freeze({
     'git_pillar_passphrase': six.string_types,
     'git_pillar_refspecs': list,
     'git_pillar_includes': bool,
+    'git_pillar_fetch_workers': int,
+    'git_pillar_fetch_timeout': int,
+    'git_pillar_fetch_on_change': bool,
     'git_pillar_verify_config': bool,
     # NOTE: gitfs_base, gitfs_mountpoint, and gitfs_root omitted here because
     # their values could conceivably be loaded as non-string types, which is OK
@@ -715,6 +787,10 @@ VALID_OPTS = immutabletypes.freeze({
     'gitfs_ref_types': list,
     'gitfs_refspecs': list,
     'gitfs_disable_saltenv_mapping': bool,
+    'gitfs_fetch_workers': int,
+    'gitfs_fetch_timeout': int,
+    'gitfs_fetch_on_change': bool,
+    'gitfs_tree_index': bool,
     'hgfs_remotes': list,
     'hgfs_mountpoint': six.string_types,
     'hgfs_root': six.string_types,
@@ -807,6 +883,10 @@ VALID_OPTS = immutabletypes.freeze({
     'fileserver_followsymlinks': bool,
     'fileserver_ignoresymlinks': bool,
     'fileserver_limit_traversal': bool,
+
+    # Hold fileserver file lists in memory in each worker until the backend
+    # update bumps the generation counter of its file lists
+    'fileserver_list_cache_generations': bool,
     'fileserver_verify_config': bool,
 
     # Optionally apply '*' permissioins to any user. By default '*' is a fallback case that is
@@ -879,6 +959,10 @@ VALID_OPTS = immutabletypes.freeze({
     # The queue size for workers in the reactor
     'reactor_worker_hwm': int,
 
+    # Compile the reactor SLS files once, and cache the salt:// reactor SLS files for
+    # reactor_refresh_interval seconds
+    'reactor_render_cache': bool,
+
     # Defines engines. See https://docs.saltstack.com/en/latest/topics/engines/
     'engines': list,
 
@@ -964,6 +1048,19 @@ VALID_OPTS = immutabletypes.freeze({
     # If this is set to True the first newline after a Jinja block is removed
     'jinja_trim_blocks': bool,
 
+    # Cache compiled Jinja templates, keyed by a hash of their source
+    'jinja_bytecode_cache': bool,
+
+    # Reuse Jinja environments for all the templates rendered in one run
+    'jinja_env_reuse': bool,
+
+    # Skip Jinja for sources without template syntax, and cache the data
+    # parsed by the yaml renderer by content hash
+    'render_cache': bool,
+
+    # The number of entries kept in the render cache of each process
+    'render_cache_size': int,
+
     # Cache minion ID to file
     'minion_id_caching': bool,
 
@@ -1015,6 +1112,29 @@ VALID_OPTS = immutabletypes.freeze({
     # The length that the syndic event queue must hit before events are popped off and forwarded
     'syndic_jid_forward_cache_hwm': int,
 
+    # The size in bytes of the batches of job returns a syndic forwards, 0 sends all the
+    # returns gathered for a master at once
+    'syndic_forward_batch_size': int,
+
+    # Compress the job returns a syndic forwards, the upper masters must support it
+    'syndic_forward_compress': bool,
+
+    # The size in bytes of the job returns a syndic keeps in memory while its masters
+    # are busy, the next ones are spooled to disk. 0 keeps all of them in memory
+    'syndic_forward_spool_size': int,
+
+    # The number of seconds between the events a syndic fires with its forward queue
+    # and lag statistics, 0 disables them
+    'syndic_forward_stats_interval': int,
+
+    # Syndics report the minions behind them to their masters, which then only publish
+    # list and glob targets to the syndics with matching minions
+    'syndic_membership': bool,
+
+    # The number of seconds after which a master forgets the minions reported by a syndic
+    # which has not reported them again, syndics report them twice as often
+    'syndic_membership_expire': int,
+
     # Salt SSH configuration
     'ssh_passwd': six.string_types,
     'ssh_port': six.string_types,
@@ -1024,11 +1144,41 @@ VALID_OPTS = immutabletypes.freeze({
     'ssh_user': six.string_types,
     'ssh_scan_ports': six.string_types,
     'ssh_scan_timeout': float,
+    # The number of hosts the scan roster probes at a time
+    'ssh_scan_workers': int,
+    # Keep the inventories parsed by the ansible and terraform rosters in the
+    # master cache until their source file changes
+    'roster_cache': bool,
     'ssh_identities_only': bool,
     'ssh_log_file': six.string_types,
     'ssh_config_file': six.string_types,
     'ssh_merge_pillar': bool,
 
+    # Run salt-ssh targets from a single event loop, with up to
+    # ssh_async_concurrency of them in flight, in place of a process per target
+    'ssh_async': bool,
+    'ssh_async_concurrency': int,
+    'ssh_async_timeout': float,
+
+    # Share one persistent ssh session per target host, through a control
+    # socket in ssh_control_path, for the duration of a salt-ssh run or, with
+    # ssh_control_persist, until it has been idle for that many seconds
+    'ssh_control_master': bool,
+    'ssh_control_path': six.string_types,
+    'ssh_control_persist': int,
+
+    # Send salt-ssh targets which hold an earlier thin only the thin files
+    # which have changed since, instead of the whole thin
+    'ssh_thin_delta': bool,
+
+    # Share the low state and the files compiled for a salt-ssh state run between
+    # the hosts which match the same sls, with the same pillar and the same
+    # values of the grains in ssh_state_cache_grains, for ssh_state_cache_ttl
+    # seconds
+    'ssh_state_cache': bool,
+    'ssh_state_cache_grains': list,
+    'ssh_state_cache_ttl': int,
+
     'cluster_mode': bool,
     'sqlite_queue_dir': six.string_types,
     'queue_dirs': list,
@@ -1214,6 +1364,9 @@ VALID_OPTS = immutabletypes.freeze({
     # Thorium top file location
     'thorium_top': six.string_types,
 
+    # Only evaluate the thorium chunks whose events or registers changed since the last run
+    'thorium_incremental': bool,
+
     # Use Adler32 hashing algorithm for server_id (default False until Sodium, "adler32" after)
     # Possible values are: False, adler32, crc32
     'server_id_use_crc': (bool, six.string_types),
@@ -1260,6 +1413,10 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'sock_pool_size': 1,
     'backup_mode': '',
     'renderer': 'jinja|yaml',
+    'jinja_bytecode_cache': False,
+    'jinja_env_reuse': False,
+    'render_cache': False,
+    'render_cache_size': 128,
     'renderer_whitelist': [],
     'renderer_blacklist': [],
     'random_startup_delay': 0,
@@ -1287,12 +1444,18 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'thoriumenv': None,
     'thorium_top': 'top.sls',
     'thorium_interval': 0.5,
+    'thorium_incremental': False,
     'thorium_roots': {
         'base': [salt.syspaths.BASE_THORIUM_ROOTS_DIR],
         },
     'file_client': 'remote',
     'local': False,
     'use_master_when_local': False,
+    'fileclient_blob_cache': False,
+    'fileclient_manifest_sync': False,
+    'fileclient_manifest_sync_batch_size': 4194304,
+    'fileclient_manifest_sync_gzip': 0,
+    'fileclient_chunks_per_request': 1,
     'file_roots': {
         'base': [salt.syspaths.BASE_FILE_ROOTS_DIR,
                  salt.syspaths.SPM_FORMULA_PATH]
@@ -1341,6 +1504,9 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'git_pillar_passphrase': '',
     'git_pillar_refspecs': _DFLT_REFSPECS,
     'git_pillar_includes': True,
+    'git_pillar_fetch_workers': 1,
+    'git_pillar_fetch_timeout': 0,
+    'git_pillar_fetch_on_change': False,
     'gitfs_remotes': [],
     'gitfs_mountpoint': '',
     'gitfs_root': '',
@@ -1361,6 +1527,10 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'gitfs_ref_types': ['branch', 'tag', 'sha'],
     'gitfs_refspecs': _DFLT_REFSPECS,
     'gitfs_disable_saltenv_mapping': False,
+    'gitfs_fetch_workers': 1,
+    'gitfs_fetch_timeout': 0,
+    'gitfs_fetch_on_change': False,
+    'gitfs_tree_index': False,
     'unique_jid': False,
     'hash_type': 'sha256',
     'optimization_order': [0, 1, 2],
@@ -1384,9 +1554,17 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'multiprocessing': True,
     'process_count_max': -1,
     'process_count_max_sleep_secs': 10,
+    'minion_job_pool': False,
+    'minion_job_pool_size': 4,
+    'minion_job_pool_max_jobs': 1000,
+    'minion_job_pool_isolate': ['state.*', 'pkg.*'],
     'mine_enabled': True,
     'mine_return_job': False,
     'mine_interval': 60,
+    'minion_return_batch': False,
+    'minion_return_batch_size': 100,
+    'minion_return_batch_interval': 1.0,
+    'minion_data_delta': False,
     'ipc_mode': _DFLT_IPC_MODE,
     'ipc_write_buffer': _DFLT_IPC_WBUFFER,
     'ipc_so_rcvbuf': None,
@@ -1427,6 +1605,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'acceptance_wait_time_max': 0,
     'rejected_retry': False,
     'loop_interval': 1,
+    'schedule_lazy_eval': False,
     'verify_env': True,
     'grains': {},
     'permissive_pki_access': False,
@@ -1464,6 +1643,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze({
     'reactor_refresh_interval': 60,
     'reactor_worker_threads': 10,
     'reactor_worker_hwm': 10000,
+    'reactor_render_cache': False,
     'engines': [],
     'tcp_keepalive': True,
     'tcp_keepalive_idle': 300,
@@ -1562,6 +1742,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'thoriumenv': None,
     'thorium_top': 'top.sls',
     'thorium_interval': 0.5,
+    'thorium_incremental': False,
     'thorium_roots': {
         'base': [salt.syspaths.BASE_THORIUM_ROOTS_DIR],
         },
@@ -1582,6 +1763,12 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'minionfs_update_interval': DEFAULT_INTERVAL,
     's3fs_update_interval': DEFAULT_INTERVAL,
     'svnfs_update_interval': DEFAULT_INTERVAL,
+    'roots_index': False,
+    'roots_index_latency': 0.2,
+    'roots_hash_index': False,
+    'roots_hash_index_workers': 4,
+    'fileserver_update_workers': 0,
+    'fileserver_update_jitter': 0,
 
     'git_pillar_base': 'master',
     'git_pillar_branch': 'master',
@@ -1597,6 +1784,9 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'git_pillar_passphrase': '',
     'git_pillar_refspecs': _DFLT_REFSPECS,
     'git_pillar_includes': True,
+    'git_pillar_fetch_workers': 1,
+    'git_pillar_fetch_timeout': 0,
+    'git_pillar_fetch_on_change': False,
     'git_pillar_verify_config': True,
     'gitfs_remotes': [],
     'gitfs_mountpoint': '',
@@ -1618,6 +1808,10 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'gitfs_ref_types': ['branch', 'tag', 'sha'],
     'gitfs_refspecs': _DFLT_REFSPECS,
     'gitfs_disable_saltenv_mapping': False,
+    'gitfs_fetch_workers': 1,
+    'gitfs_fetch_timeout': 0,
+    'gitfs_fetch_on_change': False,
+    'gitfs_tree_index': False,
     'hgfs_remotes': [],
     'hgfs_mountpoint': '',
     'hgfs_root': '',
@@ -1684,12 +1878,15 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'file_recv': False,
     'file_recv_max_size': 100,
     'file_buffer_size': 1048576,
+    'fileserver_max_chunks': 16,
+    'fileserver_serve_files_max_size': 16777216,
     'file_ignore_regex': [],
     'file_ignore_glob': [],
     'fileserver_backend': ['roots'],
     'fileserver_followsymlinks': True,
     'fileserver_ignoresymlinks': False,
     'fileserver_limit_traversal': False,
+    'fileserver_list_cache_generations': False,
     'fileserver_verify_config': True,
     'max_open_files': 100000,
     'hash_type': 'sha256',
@@ -1740,6 +1937,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'reactor_refresh_interval': 60,
     'reactor_worker_threads': 10,
     'reactor_worker_hwm': 10000,
+    'reactor_render_cache': False,
     'engines': [],
     'event_return': '',
     'event_return_queue': 0,
@@ -1757,6 +1955,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'state_aggregate': False,
     'search': '',
     'loop_interval': 60,
+    'schedule_lazy_eval': False,
     'nodegroups': {},
     'ssh_list_nodegroups': {},
     'ssh_use_home_key': False,
@@ -1788,6 +1987,10 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'jinja_sls_env': {},
     'jinja_lstrip_blocks': False,
     'jinja_trim_blocks': False,
+    'jinja_bytecode_cache': False,
+    'jinja_env_reuse': False,
+    'render_cache': False,
+    'render_cache_size': 128,
     'tcp_keepalive': True,
     'tcp_keepalive_idle': 300,
     'tcp_keepalive_cnt': -1,
@@ -1798,6 +2001,12 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'gather_job_timeout': 10,
     'syndic_event_forward_timeout': 0.5,
     'syndic_jid_forward_cache_hwm': 100,
+    'syndic_forward_batch_size': 0,
+    'syndic_forward_compress': False,
+    'syndic_forward_spool_size': 0,
+    'syndic_forward_stats_interval': 0,
+    'syndic_membership': False,
+    'syndic_membership_expire': 3600,
     'regen_thin': False,
     'ssh_passwd': '',
     'ssh_priv_passwd': '',
@@ -1808,9 +2017,21 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze({
     'ssh_user': 'root',
     'ssh_scan_ports': '22',
     'ssh_scan_timeout': 0.01,
+    'ssh_scan_workers': 1,
+    'roster_cache': False,
     'ssh_identities_only': False,
     'ssh_log_file': os.path.join(salt.syspaths.LOGS_DIR, 'ssh'),
     'ssh_config_file': os.path.join(salt.syspaths.HOME_DIR, '.ssh', 'config'),
+    'ssh_async': False,
+    'ssh_async_concurrency': 500,
+    'ssh_async_timeout': 0,
+    'ssh_control_master': False,
+    'ssh_control_path': '',
+    'ssh_control_persist': 0,
+    'ssh_thin_delta': False,
+    'ssh_state_cache': False,
+    'ssh_state_cache_grains': [],
+    'ssh_state_cache_ttl': 60,
     'cluster_mode': False,
     'sqlite_queue_dir': os.path.join(salt.syspaths.CACHE_DIR, 'master', 'queues'),
     'queue_dirs': [],
@@ -2522,6 +2743,7 @@ def syndic_config(master_config_path,
         'log_level': master_opts['log_level'],
         'id': minion_opts['id'],
         'pki_dir': minion_opts['pki_dir'],
+        'master_pki_dir': master_opts['pki_dir'],
         'master': opts['syndic_master'],
         'interface': master_opts['interface'],
         'master_port': int(
@@ -822,6 +822,8 @@ class AsyncAuth(object):
         payload = {}
         payload['cmd'] = '_auth'
         payload['id'] = self.opts['id']
+        if self.opts.get('__role') == 'syndic':
+            payload['syndic'] = True
         if 'autosign_grains' in self.opts:
             autosign_grains = {}
             for grain in self.opts['autosign_grains']:
@@ -30,6 +30,7 @@ import salt.key
 import salt.fileserver
 import salt.utils.args
 import salt.utils.atomicfile
+import salt.utils.dictdiffer
 import salt.utils.dictupdate
 import salt.utils.event
 import salt.utils.files
@@ -662,11 +663,30 @@ class RemoteFuncs(object):
         Return the mine data
         '''
         if not skip_verify:
-            if 'id' not in load or 'data' not in load:
+            if 'id' not in load or ('data' not in load and 'mine_delta' not in load):
                 return False
         if self.opts.get('minion_data_cache', False) or self.opts.get('enforce_mine_cache', False):
             cbank = 'minions/{0}'.format(load['id'])
             ckey = 'mine'
+            if 'mine_delta' in load:
+                # The minion only sent the changes to the mine functions it
+                # sent last time, if that is not what we have the minion
+                # needs to send the full mine data again
+                cached = self.cache.fetch(cbank, ckey)
+                if not isinstance(cached, dict):
+                    cached = {}
+                keys = load['mine_delta'].get('keys', [])
+                data = salt.utils.dictdiffer.apply_delta(
+                    dict((key, cached[key]) for key in keys if key in cached),
+                    load['mine_delta'])
+                if data is None:
+                    return False
+                if load.get('clear', False):
+                    cached = data
+                else:
+                    cached.update(data)
+                self.cache.store(cbank, ckey, cached)
+                return True
             if not load.get('clear', False):
                 data = self.cache.fetch(cbank, ckey)
                 if isinstance(data, dict):
@@ -17,7 +17,7 @@ import salt.utils.atomicfile
 
 # Import salt libs
 from salt.exceptions import (
-    CommandExecutionError, MinionError
+    CommandExecutionError, MinionError, SaltClientError
 )
 import salt.client
 import salt.loader
@@ -165,6 +165,134 @@ class Client(object):
             cachedir = os.path.join(self.opts['cachedir'], cachedir)
         return cachedir
 
+    def _blob_path(self, hash_data):
+        '''
+        Return the location of the content-addressed blob matching the passed
+        hash data, or None if the blob cache is disabled or the hash data is
+        not usable. Blobs always live under the main cachedir so that they
+        are shared between saltenvs and alternate cachedirs.
+        '''
+        if not self.opts.get('fileclient_blob_cache', False):
+            return None
+        try:
+            hsum = hash_data['hsum']
+            hash_type = hash_data['hash_type']
+        except (KeyError, TypeError):
+            return None
+        hsum = salt.utils.stringutils.to_unicode(hsum)
+        hash_type = salt.utils.stringutils.to_unicode(hash_type)
+        if not hsum or not hsum.isalnum() or not hash_type.isalnum():
+            return None
+        return os.path.join(self.opts['cachedir'],
+                            'blobs',
+                            hash_type,
+                            hsum[:2],
+                            hsum)
+
+    @staticmethod
+    def _blob_link(src, dest, copy=False):
+        '''
+        Atomically place ``src`` at ``dest``, hardlinking where possible and
+        falling back to a copy when hardlinks are unavailable or ``copy`` is
+        set.
+        '''
+        tmp = '{0}.blob.{1}'.format(dest, os.getpid())
+        try:
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+            linked = False
+            if not copy:
+                try:
+                    os.link(src, tmp)
+                    linked = True
+                except (AttributeError, OSError):
+                    pass
+            if not linked:
+                shutil.copyfile(src, tmp)
+            if os.path.isdir(dest):
+                salt.utils.files.rm_rf(dest)
+            salt.utils.files.rename(tmp, dest)
+        except (IOError, OSError) as exc:
+            log.debug('Unable to place blob %s at %s: %s', src, dest, exc)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def _blob_fetch(self, hash_data, dest, copy=False):
+        '''
+        Populate ``dest`` from the blob cache if a blob matching the passed
+        hash data exists and still verifies. Returns True on success.
+        '''
+        blob = self._blob_path(hash_data)
+        if blob is None or not os.path.isfile(blob):
+            return False
+        hash_type = salt.utils.stringutils.to_str(hash_data['hash_type'])
+        hsum = salt.utils.stringutils.to_unicode(hash_data['hsum'])
+        if salt.utils.hashutils.get_hash(blob, hash_type) != hsum:
+            # The blob has been modified through one of its links, drop it
+            log.warning('Removing corrupt blob %s from the file cache', blob)
+            try:
+                os.remove(blob)
+            except OSError:
+                pass
+            return False
+        if not self._blob_link(blob, dest, copy=copy):
+            return False
+        log.debug('Populated %s from cached blob %s', dest, blob)
+        return True
+
+    def _blob_store(self, path, hash_data):
+        '''
+        Add a freshly cached file to the blob cache. If an identical blob is
+        already present the cached file is replaced by a link to it so the
+        content is only stored once. Returns True if the file is now backed
+        by a blob.
+        '''
+        blob = self._blob_path(hash_data)
+        if blob is None or not os.path.isfile(path):
+            return False
+        hash_type = salt.utils.stringutils.to_str(hash_data['hash_type'])
+        hsum = salt.utils.stringutils.to_unicode(hash_data['hsum'])
+        if salt.utils.hashutils.get_hash(path, hash_type) != hsum:
+            log.debug('Not caching blob for %s, hash does not match', path)
+            return False
+        if os.path.isfile(blob):
+            return self._blob_link(blob, path)
+        blobdir = os.path.dirname(blob)
+        with salt.utils.files.set_umask(0o077):
+            try:
+                os.makedirs(blobdir)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    log.debug('Unable to create blob dir %s: %s', blobdir, exc)
+                    return False
+        return self._blob_link(path, blob)
+
+    def _prefetch_hashes(self, paths, saltenv='base'):
+        '''
+        Look up the hashes of many files at once ahead of caching them. This
+        is a no-op unless overridden by a client that can batch the lookups.
+        '''
+        pass
+
+    def _clear_prefetch(self):
+        '''
+        Drop any prefetched hashes which were not consumed
+        '''
+        pass
+
+    def _manifest_sync(self, prefix, saltenv='base', include_pat=None,
+                       exclude_pat=None, cachedir=None):
+        '''
+        Bring the cached copy of a directory tree up to date in bulk. Returns
+        the list of cached files, or None if bulk sync is not available and
+        the files need to be cached one at a time.
+        '''
+        return None
+
     def get_file(self,
                  path,
                  dest='',
@@ -200,20 +328,30 @@ class Client(object):
         ret = []
         if isinstance(paths, six.string_types):
             paths = paths.split(',')
-        for path in paths:
-            ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
+        self._prefetch_hashes(paths, saltenv)
+        try:
+            for path in paths:
+                ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
+        finally:
+            self._clear_prefetch()
         return ret
 
     def cache_master(self, saltenv='base', cachedir=None):
         '''
         Download and cache all files on a master in a specified environment
         '''
+        synced = self._manifest_sync('', saltenv, cachedir=cachedir)
+        if synced is not None:
+            return synced
         ret = []
-        for path in self.file_list(saltenv):
-            ret.append(
-                self.cache_file(
-                    salt.utils.url.create(path), saltenv, cachedir=cachedir)
-            )
+        paths = [salt.utils.url.create(path)
+                 for path in self.file_list(saltenv)]
+        self._prefetch_hashes(paths, saltenv)
+        try:
+            for path in paths:
+                ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
+        finally:
+            self._clear_prefetch()
         return ret
 
     def cache_dir(self, path, saltenv='base', include_empty=False,
@@ -233,17 +371,31 @@ class Client(object):
         log.info(
             'Caching directory \'%s\' for environment \'%s\'', path, saltenv
         )
-        # go through the list of all files finding ones that are in
-        # the target directory and caching them
-        for fn_ in self.file_list(saltenv):
-            fn_ = salt.utils.data.decode(fn_)
-            if fn_.strip() and fn_.startswith(path):
-                if salt.utils.stringutils.check_include_exclude(
-                        fn_, include_pat, exclude_pat):
-                    fn_ = self.cache_file(
-                        salt.utils.url.create(fn_), saltenv, cachedir=cachedir)
+        synced = self._manifest_sync(path,
+                                     saltenv,
+                                     include_pat=include_pat,
+                                     exclude_pat=exclude_pat,
+                                     cachedir=cachedir)
+        if synced is not None:
+            ret.extend(synced)
+        else:
+            # go through the list of all files finding ones that are in
+            # the target directory and caching them
+            paths = []
+            for fn_ in self.file_list(saltenv):
+                fn_ = salt.utils.data.decode(fn_)
+                if fn_.strip() and fn_.startswith(path):
+                    if salt.utils.stringutils.check_include_exclude(
+                            fn_, include_pat, exclude_pat):
+                        paths.append(salt.utils.url.create(fn_))
+            self._prefetch_hashes(paths, saltenv)
+            try:
+                for fn_ in paths:
+                    fn_ = self.cache_file(fn_, saltenv, cachedir=cachedir)
                     if fn_:
                         ret.append(fn_)
+            finally:
+                self._clear_prefetch()
 
         if include_empty:
             # Break up the path into a list containing the bottom-level
@@ -1031,6 +1183,7 @@ class RemoteClient(Client):
     def __init__(self, opts):
         Client.__init__(self, opts)
         self._closing = False
+        self._prefetched = {}
         self.channel = salt.transport.client.ReqChannel.factory(self.opts)
         if hasattr(self.channel, 'auth'):
             self.auth = self.channel.auth
@@ -1047,6 +1200,215 @@ class RemoteClient(Client):
     def __del__(self):
         self.destroy()
 
+    def _prefetch_hashes(self, paths, saltenv='base'):
+        '''
+        Fetch the hash and stat data for many master files with a single
+        request, the results are consumed by ``hash_and_stat_file``.
+        '''
+        if not self.opts.get('fileclient_blob_cache', False):
+            return
+        rel_paths = {}
+        for path in paths:
+            path, senv = salt.utils.url.split_env(path)
+            if senv and senv != saltenv:
+                continue
+            try:
+                rel_paths[self._check_proto(path)] = path
+            except MinionError:
+                continue
+        if not rel_paths:
+            return
+        load = {'paths': list(rel_paths),
+                'saltenv': saltenv,
+                'cmd': '_file_hash_and_stat_list'}
+        try:
+            ret = self.channel.send(load)
+        except SaltClientError as exc:
+            log.debug('Unable to prefetch file hashes: %s', exc)
+            return
+        if not isinstance(ret, dict):
+            # Older masters do not support batched hash lookups
+            return
+        ret = salt.utils.data.decode(ret, keep=True)
+        for rel_path, result in six.iteritems(ret):
+            try:
+                hash_result, stat_result = result
+            except (TypeError, ValueError):
+                continue
+            self._prefetched[(saltenv, rel_path)] = (hash_result, stat_result)
+
+    def _clear_prefetch(self):
+        '''
+        Drop any prefetched hashes which were not consumed
+        '''
+        self._prefetched.clear()
+
+    def _manifest_sync(self, prefix, saltenv='base', include_pat=None,
+                       exclude_pat=None, cachedir=None):
+        '''
+        Bring the cached copy of a directory tree up to date in bulk. The
+        hashes of the locally cached files are sent to the master in a single
+        request, which answers with the files that are stale. These are then
+        fetched in batches of whole files rather than chunk by chunk.
+
+        Returns the list of cached files, or None if bulk sync is disabled or
+        not supported by the master.
+        '''
+        if not self.opts.get('fileclient_manifest_sync', False):
+            return None
+        hash_type = self.opts.get('hash_type', 'sha256')
+        root = salt.utils.path.join(
+            self.get_cachedir(cachedir), 'files', saltenv)
+
+        manifest = {}
+        local_root = os.path.join(root, prefix) if prefix else root
+        for dirpath, _, filenames in salt.utils.path.os_walk(local_root):
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                rel_path = os.path.relpath(full, root).replace(os.sep, '/')
+                try:
+                    manifest[rel_path] = salt.utils.hashutils.get_hash(
+                        full, hash_type)
+                except (IOError, OSError):
+                    continue
+
+        load = {'saltenv': saltenv,
+                'prefix': prefix,
+                'hash_type': hash_type,
+                'manifest': manifest,
+                'cmd': '_file_manifest_sync'}
+        try:
+            sync = self.channel.send(load)
+        except SaltClientError as exc:
+            log.debug('Manifest sync of \'%s\' failed: %s', prefix, exc)
+            return None
+        if not isinstance(sync, dict) or 'stale' not in sync:
+            # Older masters do not support manifest sync
+            return None
+        sync = salt.utils.data.decode(sync, keep=True)
+
+        def _wanted(path):
+            return path.startswith(prefix) \
+                and salt.utils.stringutils.check_include_exclude(
+                    path, include_pat, exclude_pat)
+
+        ret = [salt.utils.path.join(root, path)
+               for path in sync.get('current', []) if _wanted(path)]
+        stale = dict((path, tuple(result))
+                     for path, result in six.iteritems(sync['stale'])
+                     if _wanted(path))
+        log.debug(
+            'Manifest sync of \'%s\' in saltenv \'%s\': %d current, %d stale',
+            prefix, saltenv, len(ret), len(stale)
+        )
+
+        batch_size = self.opts.get('fileclient_manifest_sync_batch_size',
+                                   4194304)
+        batch = []
+        batch_bytes = 0
+        singles = []
+        for path in sorted(stale):
+            hash_result, stat_result = stale[path]
+            with self._cache_loc(path, saltenv, cachedir=cachedir) as dest:
+                if self._blob_fetch(hash_result, dest):
+                    ret.append(dest)
+                    continue
+            try:
+                size = stat_result[6]
+            except (IndexError, TypeError):
+                size = None
+            if size is None or size > batch_size:
+                singles.append(path)
+                continue
+            if batch and batch_bytes + size > batch_size:
+                ret.extend(self._fetch_batch(batch, stale, saltenv, cachedir,
+                                             singles))
+                batch = []
+                batch_bytes = 0
+            batch.append(path)
+            batch_bytes += size
+        if batch:
+            ret.extend(self._fetch_batch(batch, stale, saltenv, cachedir,
+                                         singles))
+
+        # Anything which could not be sent in a batch is fetched on its own
+        try:
+            for path in singles:
+                self._prefetched[(saltenv, path)] = stale[path]
+                dest = self.cache_file(
+                    salt.utils.url.create(path), saltenv, cachedir=cachedir)
+                if dest:
+                    ret.append(dest)
+        finally:
+            self._clear_prefetch()
+        return sorted(ret)
+
+    def _fetch_batch(self, paths, stale, saltenv, cachedir, failed):
+        '''
+        Fetch the complete contents of several files with one request and
+        write them to the cache. Paths which are missing from the response or
+        do not match their expected hash are added to ``failed``.
+        '''
+        load = {'paths': paths,
+                'saltenv': saltenv,
+                'cmd': '_serve_files'}
+        gzip = self.opts.get('fileclient_manifest_sync_gzip')
+        if gzip:
+            load['gzip'] = int(gzip)
+        try:
+            data = self.channel.send(load, raw=True)
+        except SaltClientError as exc:
+            log.debug('Unable to fetch batch of files: %s', exc)
+            data = None
+        if six.PY3 and isinstance(data, dict):
+            data = decode_dict_keys_to_str(data)
+        try:
+            files = dict(
+                (salt.utils.stringutils.to_unicode(path), contents)
+                for path, contents in six.iteritems(data['files']))
+        except (AttributeError, KeyError, TypeError):
+            failed.extend(paths)
+            return []
+        compressed = data.get('gzip')
+
+        ret = []
+        for path in paths:
+            contents = files.get(path)
+            if contents is None:
+                failed.append(path)
+                continue
+            contents = salt.utils.stringutils.to_bytes(contents)
+            if compressed and contents:
+                contents = salt.utils.gzip_util.uncompress(contents)
+            hash_result = stale[path][0]
+            with self._cache_loc(path, saltenv, cachedir=cachedir) as dest:
+                if os.path.isdir(dest):
+                    salt.utils.files.rm_rf(dest)
+                with salt.utils.atomicfile.atomic_open(dest, 'wb+') as fp_:
+                    fp_.write(contents)
+            hsum = salt.utils.hashutils.get_hash(
+                dest, salt.utils.stringutils.to_str(hash_result['hash_type']))
+            if hsum != hash_result['hsum']:
+                log.warning('Bad download of file %s in batch, retrying', path)
+                failed.append(path)
+                continue
+            self._blob_store(dest, hash_result)
+            ret.append(dest)
+        return ret
+
+    def _pop_prefetched(self, path, saltenv):
+        '''
+        Return and forget the prefetched hash and stat data for a master
+        file, or None if it was not prefetched.
+        '''
+        if not self._prefetched:
+            return None
+        try:
+            path = self._check_proto(path)
+        except MinionError:
+            return None
+        return self._prefetched.pop((saltenv, path), None)
+
     def destroy(self):
         if self._closing:
             return
@@ -1077,7 +1439,14 @@ class RemoteClient(Client):
         if senv:
             saltenv = senv
 
-        if not salt.utils.platform.is_windows():
+        prefetched = self._pop_prefetched(path, saltenv)
+        if prefetched is not None:
+            hash_server, stat_server = prefetched
+            try:
+                mode_server = stat_server[0]
+            except (IndexError, TypeError):
+                mode_server = None
+        elif not salt.utils.platform.is_windows():
             hash_server, stat_server = self.hash_and_stat_file(path, saltenv)
             try:
                 mode_server = stat_server[0]
@@ -1107,6 +1476,7 @@ class RemoteClient(Client):
 
         # Hash compare local copy with master and skip download
         # if no difference found.
+        user_dest = bool(dest)
         dest2check = dest
         if not dest2check:
             rel_path = self._check_proto(path)
@@ -1139,6 +1509,13 @@ class RemoteClient(Client):
             if hash_local == hash_server:
                 return dest2check
 
+        # Reuse identical content from the blob cache instead of transferring
+        # it again. A user supplied dest gets a copy rather than a link so
+        # that changes to it cannot corrupt the blob.
+        if dest2check and self._blob_fetch(hash_server, dest2check,
+                                           copy=user_dest):
+            return dest2check
+
         log.debug(
             'Fetching file from saltenv \'%s\', ** attempting ** \'%s\'',
             saltenv, path
@@ -1152,6 +1529,9 @@ class RemoteClient(Client):
         if gzip:
             gzip = int(gzip)
             load['gzip'] = gzip
+        chunks = self.opts.get('fileclient_chunks_per_request', 1)
+        if chunks > 1:
+            load['chunks'] = chunks
 
         fn_ = None
         if dest:
@@ -1252,6 +1632,8 @@ class RemoteClient(Client):
                 'Fetching file from saltenv \'%s\', ** done ** \'%s\'',
                 saltenv, path
             )
+            if dest and not user_dest:
+                self._blob_store(dest, hash_server)
         else:
             log.debug(
                 'In saltenv \'%s\', we are ** missing ** the file \'%s\'',
@@ -1412,6 +1794,7 @@ class FSClient(RemoteClient):
     def __init__(self, opts):  # pylint: disable=W0231
         Client.__init__(self, opts)  # pylint: disable=W0233
         self._closing = False
+        self._prefetched = {}
         self.channel = salt.fileserver.FSChan(opts)
         self.auth = DumbAuth()
 
@@ -16,9 +16,12 @@ import time
 
 # Import salt libs
 import salt.loader
+import salt.utils.atomicfile
 import salt.utils.data
 import salt.utils.files
+import salt.utils.gzip_util
 import salt.utils.path
+import salt.utils.stringutils
 import salt.utils.url
 import salt.utils.versions
 from salt.utils.args import get_function_argspec as _argspec
@@ -35,6 +38,10 @@ from salt.ext import six
 
 log = logging.getLogger(__name__)
 
+# File lists held in memory when fileserver_list_cache_generations is enabled,
+# keyed by the path of their list cache file
+_FILE_LIST_CACHE = {}
+
 
 def _unlock_cache(w_lock):
     '''
@@ -109,12 +116,97 @@ def wait_lock(lk_fn, dest, wait_timeout=0):
     return False
 
 
+def _generation_path(list_cachedir):
+    '''
+    Return the location of the generation counter of a file list cachedir
+    '''
+    return os.path.join(list_cachedir, '.generation')
+
+
+def get_file_list_generation(list_cachedir):
+    '''
+    Return the generation counter of the file lists cached in
+    ``list_cachedir``, or None if the backend does not maintain one
+    '''
+    try:
+        with salt.utils.files.fopen(_generation_path(list_cachedir), 'r') as fp_:
+            return int(fp_.read().strip())
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def bump_file_list_generation(opts, list_cachedir):
+    '''
+    Invalidate the file lists cached from ``list_cachedir`` in every worker by
+    incrementing its generation counter. Backends call this from their update
+    function when they detect changes.
+    '''
+    if not opts.get('fileserver_list_cache_generations', False):
+        return
+    generation = (get_file_list_generation(list_cachedir) or 0) + 1
+    if not os.path.isdir(list_cachedir):
+        try:
+            os.makedirs(list_cachedir)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+    with salt.utils.atomicfile.atomic_open(
+            _generation_path(list_cachedir), 'w') as fp_:
+        fp_.write(six.text_type(generation))
+    log.trace('Bumped file list generation of %s to %d',
+              list_cachedir, generation)
+
+
+def _check_file_list_generation(opts, form, list_cache, generation):
+    '''
+    Generation counter based variant of check_file_list_cache. File lists are
+    valid until the backend bumps the generation, so they are held in memory
+    and the cache file is only read after a bump. No lock files are used: a
+    worker which finds no list written for the current generation rebuilds
+    it itself.
+    '''
+    cached = _FILE_LIST_CACHE.get(list_cache)
+    if cached is not None and cached['generation'] == generation \
+            and cached['data'] is not None:
+        return cached['data'].get(form, []), False, False
+
+    serial = salt.payload.Serial(opts)
+
+    def _load():
+        try:
+            with salt.utils.files.fopen(list_cache, 'rb') as fp_:
+                data = salt.utils.data.decode(serial.load(fp_))
+        except Exception:
+            return None
+        if not isinstance(data, dict) \
+                or data.get('__generation__') != generation:
+            return None
+        _FILE_LIST_CACHE[list_cache] = {'generation': generation,
+                                        'data': data}
+        log.debug('Loaded file list cache %s for generation %d',
+                  list_cache, generation)
+        return data.get(form, [])
+
+    ret = _load()
+    if ret is not None:
+        return ret, False, False
+    _FILE_LIST_CACHE[list_cache] = {'generation': generation,
+                                    'data': None}
+    return None, True, True
+
+
 def check_file_list_cache(opts, form, list_cache, w_lock):
     '''
     Checks the cache file to see if there is a new enough file list cache, and
     returns the match (if found, along with booleans used by the fileserver
     backend to determine if the cache needs to be refreshed/written).
     '''
+    if opts.get('fileserver_list_cache_generations', False):
+        generation = get_file_list_generation(os.path.dirname(list_cache))
+        if generation is not None:
+            return _check_file_list_generation(
+                opts, form, list_cache, generation)
+
     refresh_cache = False
     save_cache = True
     serial = salt.payload.Serial(opts)
@@ -180,6 +272,16 @@ def write_file_list_cache(opts, data, list_cache, w_lock):
     backend to determine if the cache needs to be refreshed/written).
     '''
     serial = salt.payload.Serial(opts)
+    cached = _FILE_LIST_CACHE.get(list_cache)
+    if cached is not None and cached['data'] is None:
+        # The list was refreshed for a generation, record it alongside the
+        # data so that other workers know whether it is current
+        data = dict(data, __generation__=cached['generation'])
+        cached['data'] = data
+        # Several workers may write it at once, none of them holds the lock
+        with salt.utils.atomicfile.atomic_open(list_cache, 'wb') as fp_:
+            fp_.write(serial.dumps(data))
+        return
     with salt.utils.files.fopen(list_cache, 'w+b') as fp_:
         fp_.write(serial.dumps(data))
         _unlock_cache(w_lock)
@@ -650,6 +752,102 @@ class Fileserver(object):
             return self.servers[fstr](load, fnd)
         return ret
 
+    def serve_files(self, load):
+        '''
+        Serve up the complete contents of several files in one response. The
+        load contains a list of ``paths``, the ``saltenv`` and optionally a
+        ``gzip`` compression level. Paths which cannot be found are left out
+        of the returned ``files`` dict, as are files which would take the
+        response over ``fileserver_serve_files_max_size`` bytes. The minion
+        fetches those on their own.
+        '''
+        ret = {'files': {}}
+
+        if 'env' in load:
+            # "env" is not supported; Use "saltenv".
+            load.pop('env')
+
+        paths = load.get('paths')
+        if not isinstance(paths, list) or 'saltenv' not in load:
+            return ret
+        if not isinstance(load['saltenv'], six.string_types):
+            load['saltenv'] = six.text_type(load['saltenv'])
+        gzip = load.get('gzip', None)
+        max_size = self.opts.get('fileserver_serve_files_max_size', 16777216)
+        total = 0
+
+        for path in paths:
+            if total >= max_size:
+                break
+            if not isinstance(path, six.string_types):
+                continue
+            fnd = self.find_file(path, load['saltenv'])
+            fstr = '{0}.serve_file'.format(fnd.get('back'))
+            if fstr not in self.servers:
+                continue
+            try:
+                if total + os.path.getsize(fnd['path']) > max_size:
+                    continue
+            except (KeyError, TypeError, OSError):
+                pass
+            chunk_load = {'path': path,
+                          'saltenv': load['saltenv'],
+                          'loc': 0}
+            chunks = []
+            while total + chunk_load['loc'] <= max_size:
+                chunk = self.servers[fstr](chunk_load, fnd).get('data')
+                if not chunk:
+                    break
+                chunk = salt.utils.stringutils.to_bytes(chunk)
+                chunks.append(chunk)
+                chunk_load['loc'] += len(chunk)
+            if total + chunk_load['loc'] > max_size:
+                # The file grew since it was looked up
+                continue
+            total += chunk_load['loc']
+            data = b''.join(chunks)
+            if gzip and data:
+                data = salt.utils.gzip_util.compress(data, gzip)
+            ret['files'][path] = data
+        if gzip:
+            ret['gzip'] = gzip
+        return ret
+
+    def file_manifest_sync(self, load):
+        '''
+        Compare a minion's manifest of cached files with the fileserver. The
+        load contains the ``saltenv``, a ``prefix``, the ``hash_type`` used by
+        the minion and a ``manifest`` mapping each cached path to its hash.
+        Returns the paths under the prefix which are ``current`` on the minion
+        and the hash and stat data of the ``stale`` ones.
+        '''
+        if 'env' in load:
+            # "env" is not supported; Use "saltenv".
+            load.pop('env')
+
+        ret = {'hash_type': self.opts['hash_type'],
+               'current': [],
+               'stale': {}}
+        if 'saltenv' not in load:
+            return ret
+        manifest = load.get('manifest')
+        if not isinstance(manifest, dict) \
+                or load.get('hash_type') != self.opts['hash_type']:
+            manifest = {}
+
+        for path in self.file_list({'saltenv': load['saltenv'],
+                                    'prefix': load.get('prefix', '')}):
+            hash_result, stat_result = self.file_hash_and_stat(
+                {'path': path, 'saltenv': load['saltenv']})
+            if not isinstance(hash_result, dict) \
+                    or not hash_result.get('hsum'):
+                continue
+            if manifest.get(path) == hash_result['hsum']:
+                ret['current'].append(path)
+            else:
+                ret['stale'][path] = [hash_result, stat_result]
+        return ret
+
     def __file_hash_and_stat(self, load):
         '''
         Common code for hashing and stating files
@@ -691,6 +889,28 @@ class Fileserver(object):
         except (IndexError, TypeError):
             return '', None
 
+    def file_hash_and_stat_list(self, load):
+        '''
+        Return the hash and stat result of many files in a single call. The
+        load contains a list of ``paths`` and a ``saltenv``, the return is a
+        dict mapping each path to a ``[hash, stat]`` pair.
+        '''
+        if 'env' in load:
+            # "env" is not supported; Use "saltenv".
+            load.pop('env')
+
+        ret = {}
+        paths = load.get('paths')
+        if not isinstance(paths, list) or 'saltenv' not in load:
+            return ret
+        for path in paths:
+            if not isinstance(path, six.string_types):
+                continue
+            hash_result, stat_result = self.file_hash_and_stat(
+                {'path': path, 'saltenv': load['saltenv']})
+            ret[path] = [hash_result, stat_result]
+        return ret
+
     def clear_file_list_cache(self, load):
         '''
         Deletes the file_lists cache files
@@ -766,6 +986,11 @@ class Fileserver(object):
                         'Removed %s file list cache for saltenv \'%s\'',
                         cache_saltenv, back
                     )
+            if back in ret and get_file_list_generation(
+                    os.path.join(list_cachedir, back)) is not None:
+                # Make the workers drop the lists they hold in memory
+                bump_file_list_generation(
+                    self.opts, os.path.join(list_cachedir, back))
         return ret
 
     @ensure_unicode_args
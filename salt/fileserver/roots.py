@@ -21,9 +21,15 @@ from __future__ import absolute_import, print_function, unicode_literals
 import os
 import errno
 import logging
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 
 # Import salt libs
 import salt.fileserver
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.data
 import salt.utils.event
 import salt.utils.files
 import salt.utils.gzip_util
@@ -34,8 +40,21 @@ import salt.utils.stringutils
 import salt.utils.versions
 from salt.ext import six
 
+try:
+    import pyinotify
+    HAS_PYINOTIFY = True
+except ImportError:
+    HAS_PYINOTIFY = False
+
 log = logging.getLogger(__name__)
 
+# Set once the inotify watcher is maintaining the file_roots index, at which
+# point the periodic update no longer needs to walk the file_roots
+WATCHING = threading.Event()
+
+# Per-process cache of the loaded index snapshots, keyed by saltenv
+_INDEX_CACHE = {}
+
 
 def find_file(path, saltenv='base', **kwargs):
     '''
@@ -130,9 +149,18 @@ def serve_file(load, fnd):
     ret['dest'] = fnd['rel']
     gzip = load.get('gzip', None)
     fpath = os.path.normpath(fnd['path'])
-    with salt.utils.files.fopen(fpath, 'rb') as fp_:
+    # Clients may ask for several chunks at once to cut down on round trips
+    # when transferring large files
+    try:
+        chunks = int(load.get('chunks', 1))
+    except (TypeError, ValueError):
+        chunks = 1
+    chunks = max(1, min(chunks, __opts__.get('fileserver_max_chunks', 1)))
+    # The read goes straight into the returned bytes, without the extra copy
+    # made by a buffered file object
+    with salt.utils.files.fopen(fpath, 'rb', buffering=0) as fp_:
         fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
+        data = fp_.read(__opts__['file_buffer_size'] * chunks)
         if gzip and data:
             data = salt.utils.gzip_util.compress(data, gzip)
             ret['gzip'] = gzip
@@ -153,6 +181,10 @@ def update():
         # Hash file won't exist if no files have yet been served up
         pass
 
+    if WATCHING.is_set():
+        # The inotify watcher keeps the index current and fires the events
+        return
+
     mtime_map_path = os.path.join(__opts__['cachedir'], 'roots', 'mtime_map')
     # data to send on event
     data = {'changed': False,
@@ -201,6 +233,27 @@ def update():
                 )
             )
 
+    if __opts__.get('roots_index', False):
+        for saltenv in __opts__['file_roots']:
+            if data['changed'] or not os.path.isfile(_index_path(saltenv)):
+                _write_index(saltenv, _walk_file_lists(saltenv))
+
+    if __opts__.get('roots_hash_index', False):
+        if data['changed'] or not os.path.isfile(_hash_index_path()):
+            _update_hash_index(new_mtime_map)
+
+    list_cachedir = os.path.join(__opts__['cachedir'], 'file_lists', 'roots')
+    if data['changed'] \
+            or salt.fileserver.get_file_list_generation(list_cachedir) is None:
+        salt.fileserver.bump_file_list_generation(__opts__, list_cachedir)
+
+    _fire_update_event(data)
+
+
+def _fire_update_event(data):
+    '''
+    Fire a fileserver update event, if fileserver events are enabled
+    '''
     if __opts__.get('fileserver_events', False):
         # if there is a change, fire an event
         with salt.utils.event.get_event(
@@ -214,6 +267,143 @@ def update():
                 salt.utils.event.tagify(['roots', 'update'], prefix='fileserver'))
 
 
+def watch():
+    '''
+    Keep the file_roots index current using inotify, firing fileserver update
+    events as changes happen. This runs in a thread of the FileserverUpdate
+    process. It returns immediately if :conf_master:`roots_index` is disabled
+    or pyinotify is not installed, in which case the index is refreshed by the
+    periodic update instead.
+    '''
+    if not __opts__.get('roots_index', False):
+        return
+    if not HAS_PYINOTIFY:
+        log.warning(
+            'pyinotify is not installed, the roots index will be refreshed '
+            'every roots_update_interval seconds'
+        )
+        return
+
+    latency = __opts__.get('roots_index_latency', 0.2)
+    pending = {}
+    events = {'added': set(), 'removed': set(), 'changed': set()}
+    link_or_dir = pyinotify.IN_ISDIR | pyinotify.IN_DELETE_SELF \
+        | pyinotify.IN_MOVE_SELF
+
+    def _queue(event):
+        '''
+        Record which saltenvs an inotify event affects
+        '''
+        pathname = os.path.normpath(event.pathname)
+        if event.mask & link_or_dir:
+            # Only files are reported in the update event
+            pass
+        elif event.mask & (pyinotify.IN_CREATE | pyinotify.IN_MOVED_TO):
+            events['added'].add(pathname)
+        elif event.mask & (pyinotify.IN_DELETE | pyinotify.IN_MOVED_FROM):
+            events['removed'].add(pathname)
+        else:
+            events['changed'].add(pathname)
+        full_rebuild = event.mask & link_or_dir \
+            or salt.utils.path.islink(pathname)
+        for saltenv, fs_roots in six.iteritems(__opts__['file_roots']):
+            for fs_root in fs_roots:
+                fs_root = os.path.normpath(fs_root)
+                if pathname != fs_root \
+                        and not pathname.startswith(fs_root + os.sep):
+                    continue
+                if full_rebuild:
+                    pending[saltenv] = None
+                elif pending.get(saltenv, ()) is not None:
+                    pending.setdefault(saltenv, set()).add(
+                        os.path.relpath(pathname, fs_root).replace(
+                            os.path.sep, '/'))
+
+    watch_manager = pyinotify.WatchManager()
+    mask = pyinotify.IN_CREATE | pyinotify.IN_DELETE \
+        | pyinotify.IN_MOVED_FROM | pyinotify.IN_MOVED_TO \
+        | pyinotify.IN_CLOSE_WRITE | pyinotify.IN_ATTRIB \
+        | pyinotify.IN_DELETE_SELF | pyinotify.IN_MOVE_SELF
+    notifier = pyinotify.Notifier(watch_manager,
+                                  default_proc_fun=_queue,
+                                  timeout=int(latency * 1000))
+    watched = set()
+
+    def _watch_roots():
+        '''
+        Watch any file_roots which are not watched yet
+        '''
+        for fs_roots in six.itervalues(__opts__['file_roots']):
+            for fs_root in fs_roots:
+                if fs_root not in watched and os.path.isdir(fs_root):
+                    watch_manager.add_watch(fs_root, mask, rec=True,
+                                            auto_add=True)
+                    watched.add(fs_root)
+
+    _watch_roots()
+    indexes = {}
+    for saltenv in __opts__['file_roots']:
+        indexes[saltenv] = _walk_file_lists(saltenv)
+        _write_index(saltenv, indexes[saltenv])
+    if __opts__.get('roots_hash_index', False):
+        _update_hash_index(_indexed_paths(indexes))
+    WATCHING.set()
+    log.debug('Watching file_roots for changes')
+
+    try:
+        first_event = None
+        while True:
+            if notifier.check_events():
+                notifier.read_events()
+                notifier.process_events()
+                if first_event is None:
+                    first_event = time.time()
+                # Let bursts of changes settle before updating the index,
+                # but don't let a steady stream hold the update back
+                if time.time() - first_event < latency * 5:
+                    continue
+            if not pending and not any(six.itervalues(events)):
+                first_event = None
+                continue
+            _watch_roots()
+            _flush_index(indexes, pending, events)
+            pending.clear()
+            for paths in six.itervalues(events):
+                paths.clear()
+            first_event = None
+    finally:
+        WATCHING.clear()
+        notifier.stop()
+
+
+def _flush_index(indexes, pending, events):
+    '''
+    Apply the changes collected by the watcher to the index snapshots and
+    fire an update event
+    '''
+    for saltenv, changes in six.iteritems(pending):
+        if changes is None or saltenv not in indexes:
+            indexes[saltenv] = _walk_file_lists(saltenv)
+        else:
+            indexes[saltenv] = _index_apply(indexes[saltenv], saltenv, changes)
+        _write_index(saltenv, indexes[saltenv])
+
+    if __opts__.get('roots_hash_index', False):
+        _update_hash_index(_indexed_paths(indexes))
+
+    salt.fileserver.bump_file_list_generation(
+        __opts__,
+        os.path.join(__opts__['cachedir'], 'file_lists', 'roots'))
+
+    changed = events['changed'] - events['added'] - events['removed']
+    _fire_update_event({
+        'changed': True,
+        'files': {'changed': sorted(changed),
+                  'added': sorted(events['added'] - events['removed']),
+                  'removed': sorted(events['removed'] - events['added'])},
+        'backend': 'roots'})
+
+
 def file_hash(load, fnd):
     '''
     Return a file hash, the hash type is set in the master config file
@@ -237,6 +427,13 @@ def file_hash(load, fnd):
     # set the hash_type as it is determined by config-- so mechanism won't change that
     ret['hash_type'] = __opts__['hash_type']
 
+    # the hash index is kept current by the FileserverUpdate process
+    if __opts__.get('roots_hash_index', False):
+        hsum = _indexed_hash(path)
+        if hsum is not None:
+            ret['hsum'] = hsum
+            return ret
+
     # check if the hash is cached
     # cache file's contents should be "hash:mtime"
     cache_path = os.path.join(__opts__['cachedir'],
@@ -293,6 +490,323 @@ def file_hash(load, fnd):
     return ret
 
 
+def _walk_file_lists(saltenv):
+    '''
+    Walk the file_roots of a saltenv and return a dict containing the file
+    lists for files, dirs, empty dirs and symlinks
+    '''
+    ret = {
+        'files': set(),
+        'dirs': set(),
+        'empty_dirs': set(),
+        'links': {}
+    }
+
+    def _add_to(tgt, fs_root, parent_dir, items):
+        '''
+        Add the files to the target set
+        '''
+        def _translate_sep(path):
+            '''
+            Translate path separators for Windows masterless minions
+            '''
+            return path.replace('\\', '/') if os.path.sep == '\\' else path
+
+        for item in items:
+            abs_path = os.path.join(parent_dir, item)
+            log.trace('roots: Processing %s', abs_path)
+            is_link = salt.utils.path.islink(abs_path)
+            log.trace(
+                'roots: %s is %sa link',
+                abs_path, 'not ' if not is_link else ''
+            )
+            if is_link and __opts__['fileserver_ignoresymlinks']:
+                continue
+            rel_path = _translate_sep(os.path.relpath(abs_path, fs_root))
+            log.trace('roots: %s relative path is %s', abs_path, rel_path)
+            if salt.fileserver.is_file_ignored(__opts__, rel_path):
+                continue
+            tgt.add(rel_path)
+            try:
+                if not os.listdir(abs_path):
+                    ret['empty_dirs'].add(rel_path)
+            except Exception:
+                # Generic exception because running os.listdir() on a
+                # non-directory path raises an OSError on *NIX and a
+                # WindowsError on Windows.
+                pass
+            if is_link:
+                link_dest = salt.utils.path.readlink(abs_path)
+                log.trace(
+                    'roots: %s symlink destination is %s',
+                    abs_path, link_dest
+                )
+                if salt.utils.platform.is_windows() \
+                        and link_dest.startswith('\\\\'):
+                    # Symlink points to a network path. Since you can't
+                    # join UNC and non-UNC paths, just assume the original
+                    # path.
+                    log.trace(
+                        'roots: %s is a UNC path, using %s instead',
+                        link_dest, abs_path
+                    )
+                    link_dest = abs_path
+                if link_dest.startswith('..'):
+                    joined = os.path.join(abs_path, link_dest)
+                else:
+                    joined = os.path.join(
+                        os.path.dirname(abs_path), link_dest
+                    )
+                rel_dest = _translate_sep(
+                    os.path.relpath(
+                        os.path.realpath(os.path.normpath(joined)),
+                        os.path.realpath(fs_root)
+                    )
+                )
+                log.trace(
+                    'roots: %s relative path is %s',
+                    abs_path, rel_dest
+                )
+                if not rel_dest.startswith('..'):
+                    # Only count the link if it does not point
+                    # outside of the root dir of the fileserver
+                    # (i.e. the "path" variable)
+                    ret['links'][rel_path] = link_dest
+
+    for path in __opts__['file_roots'][saltenv]:
+        for root, dirs, files in salt.utils.path.os_walk(
+                path,
+                followlinks=__opts__['fileserver_followsymlinks']):
+            _add_to(ret['dirs'], path, root, dirs)
+            _add_to(ret['files'], path, root, files)
+
+    ret['files'] = sorted(ret['files'])
+    ret['dirs'] = sorted(ret['dirs'])
+    ret['empty_dirs'] = sorted(ret['empty_dirs'])
+    return ret
+
+
+def _index_path(saltenv):
+    '''
+    Return the location of the index snapshot of a saltenv
+    '''
+    return os.path.join(
+        __opts__['cachedir'],
+        'roots',
+        'index',
+        '{0}.p'.format(salt.utils.files.safe_filename_leaf(saltenv)))
+
+
+def _write_index(saltenv, data):
+    '''
+    Atomically replace the index snapshot of a saltenv, it is read by every
+    MWorker in place of walking the file_roots
+    '''
+    path = _index_path(saltenv)
+    index_dir = os.path.dirname(path)
+    if not os.path.isdir(index_dir):
+        try:
+            os.makedirs(index_dir)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+    serial = salt.payload.Serial(__opts__)
+    with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+        fp_.write(serial.dumps(data))
+
+
+def _read_index(saltenv):
+    '''
+    Return the index snapshot of a saltenv, or None if there is none. The
+    snapshot is only loaded again once it has been replaced.
+    '''
+    path = _index_path(saltenv)
+    try:
+        st = os.stat(path)
+    except OSError:
+        _INDEX_CACHE.pop(saltenv, None)
+        return None
+    key = (st.st_ino, st.st_mtime, st.st_size)
+    cached = _INDEX_CACHE.get(saltenv)
+    if cached is not None and cached['key'] == key:
+        return cached
+    serial = salt.payload.Serial(__opts__)
+    try:
+        with salt.utils.files.fopen(path, 'rb') as fp_:
+            data = salt.utils.data.decode(serial.load(fp_))
+    except Exception as exc:
+        log.debug('Unable to read roots index %s: %s', path, exc)
+        return None
+    cached = {'key': key, 'data': data}
+    _INDEX_CACHE[saltenv] = cached
+    return cached
+
+
+def _index_apply(data, saltenv, changes):
+    '''
+    Update the file lists of a saltenv for the passed relative file paths,
+    which have been created, modified or removed. Changes to directories and
+    symlinks need a full walk instead.
+    '''
+    files = set(data.get('files', []))
+    empty_dirs = set(data.get('empty_dirs', []))
+    fs_roots = __opts__['file_roots'][saltenv]
+    for rel_path in changes:
+        if salt.fileserver.is_file_ignored(__opts__, rel_path):
+            continue
+        if any(os.path.isfile(os.path.join(x, rel_path)) for x in fs_roots):
+            files.add(rel_path)
+        else:
+            files.discard(rel_path)
+        parent = rel_path.rpartition('/')[0]
+        if not parent:
+            continue
+        parent_dirs = [os.path.join(x, parent) for x in fs_roots]
+        if any(os.path.isdir(x) and not os.listdir(x) for x in parent_dirs):
+            empty_dirs.add(parent)
+        else:
+            empty_dirs.discard(parent)
+    ret = dict(data)
+    ret['files'] = sorted(files)
+    ret['empty_dirs'] = sorted(empty_dirs)
+    return ret
+
+
+def _indexed_paths(indexes):
+    '''
+    Return the absolute paths of the files in the passed file lists
+    '''
+    ret = set()
+    for saltenv, index in six.iteritems(indexes):
+        for fs_root in __opts__['file_roots'].get(saltenv, []):
+            for rel_path in index.get('files', []):
+                ret.add(os.path.join(fs_root, rel_path))
+    return ret
+
+
+def _hash_index_path():
+    '''
+    Return the location of the hash index for the configured hash_type
+    '''
+    return os.path.join(
+        __opts__['cachedir'],
+        'roots',
+        'hash_index.{0}.p'.format(__opts__['hash_type']))
+
+
+def _stat_key(path):
+    '''
+    Return the size, mtime in nanoseconds and inode of a file, used to tell
+    whether a hash in the hash index still applies, or None if the file
+    cannot be stat'ed
+    '''
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    mtime_ns = getattr(st, 'st_mtime_ns', None)
+    if mtime_ns is None:
+        mtime_ns = int(st.st_mtime * 1000000000)
+    return [st.st_size, mtime_ns, st.st_ino]
+
+
+def _update_hash_index(paths):
+    '''
+    Bring the hash index up to date for the passed absolute file paths. Hashes
+    of unchanged files are kept, the others are computed by a pool of
+    ``roots_hash_index_workers`` threads.
+    '''
+    old_index = _read_hash_index() or {}
+    hash_type = __opts__['hash_type']
+    index = {}
+    stale = []
+    for path in paths:
+        key = _stat_key(path)
+        if key is None:
+            continue
+        entry = old_index.get(path)
+        if entry is not None and entry[:3] == key:
+            index[path] = entry
+        else:
+            stale.append((path, key))
+
+    def _hash(item):
+        path, key = item
+        try:
+            return path, key + [salt.utils.hashutils.get_hash(path, hash_type)]
+        except (IOError, OSError):
+            return path, None
+
+    if stale:
+        workers = max(1, min(__opts__.get('roots_hash_index_workers', 4),
+                             len(stale)))
+        pool = ThreadPool(workers)
+        try:
+            for path, entry in pool.imap_unordered(_hash, stale):
+                if entry is not None:
+                    index[path] = entry
+        finally:
+            pool.close()
+            pool.join()
+        log.debug('roots: hashed %d files for the hash index', len(stale))
+
+    if stale or len(index) != len(old_index) \
+            or not os.path.isfile(_hash_index_path()):
+        path = _hash_index_path()
+        index_dir = os.path.dirname(path)
+        if not os.path.isdir(index_dir):
+            try:
+                os.makedirs(index_dir)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+        serial = salt.payload.Serial(__opts__)
+        with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+            fp_.write(serial.dumps(index))
+    return index
+
+
+def _read_hash_index():
+    '''
+    Return the hash index, mapping absolute paths to their size, mtime in
+    nanoseconds, inode and hash, or None if it has not been written. The
+    index is only loaded again once it has been replaced.
+    '''
+    path = _hash_index_path()
+    try:
+        st = os.stat(path)
+    except OSError:
+        _INDEX_CACHE.pop(path, None)
+        return None
+    key = (st.st_ino, st.st_mtime, st.st_size)
+    cached = _INDEX_CACHE.get(path)
+    if cached is not None and cached['key'] == key:
+        return cached['data']
+    serial = salt.payload.Serial(__opts__)
+    try:
+        with salt.utils.files.fopen(path, 'rb') as fp_:
+            data = salt.utils.data.decode(serial.load(fp_))
+    except Exception as exc:
+        log.debug('Unable to read roots hash index %s: %s', path, exc)
+        return None
+    _INDEX_CACHE[path] = {'key': key, 'data': data}
+    return data
+
+
+def _indexed_hash(path):
+    '''
+    Return the hash of a file from the hash index, or None if the index has
+    no current hash for it
+    '''
+    index = _read_hash_index()
+    if not index:
+        return None
+    entry = index.get(path)
+    if entry is None or entry[:3] != _stat_key(path):
+        return None
+    return entry[3]
+
+
 def _file_lists(load, form):
     '''
     Return a dict containing the file lists for files, dirs, emtydirs and symlinks
@@ -309,6 +823,11 @@ def _file_lists(load, form):
         else:
             return []
 
+    if __opts__.get('roots_index', False):
+        index = _read_index(saltenv)
+        if index is not None:
+            return index['data'].get(form, [])
+
     list_cachedir = os.path.join(__opts__['cachedir'], 'file_lists', 'roots')
     if not os.path.isdir(list_cachedir):
         try:
@@ -325,95 +844,7 @@ def _file_lists(load, form):
     if cache_match is not None:
         return cache_match
     if refresh_cache:
-        ret = {
-            'files': set(),
-            'dirs': set(),
-            'empty_dirs': set(),
-            'links': {}
-        }
-
-        def _add_to(tgt, fs_root, parent_dir, items):
-            '''
-            Add the files to the target set
-            '''
-            def _translate_sep(path):
-                '''
-                Translate path separators for Windows masterless minions
-                '''
-                return path.replace('\\', '/') if os.path.sep == '\\' else path
-
-            for item in items:
-                abs_path = os.path.join(parent_dir, item)
-                log.trace('roots: Processing %s', abs_path)
-                is_link = salt.utils.path.islink(abs_path)
-                log.trace(
-                    'roots: %s is %sa link',
-                    abs_path, 'not ' if not is_link else ''
-                )
-                if is_link and __opts__['fileserver_ignoresymlinks']:
-                    continue
-                rel_path = _translate_sep(os.path.relpath(abs_path, fs_root))
-                log.trace('roots: %s relative path is %s', abs_path, rel_path)
-                if salt.fileserver.is_file_ignored(__opts__, rel_path):
-                    continue
-                tgt.add(rel_path)
-                try:
-                    if not os.listdir(abs_path):
-                        ret['empty_dirs'].add(rel_path)
-                except Exception:
-                    # Generic exception because running os.listdir() on a
-                    # non-directory path raises an OSError on *NIX and a
-                    # WindowsError on Windows.
-                    pass
-                if is_link:
-                    link_dest = salt.utils.path.readlink(abs_path)
-                    log.trace(
-                        'roots: %s symlink destination is %s',
-                        abs_path, link_dest
-                    )
-                    if salt.utils.platform.is_windows() \
-                            and link_dest.startswith('\\\\'):
-                        # Symlink points to a network path. Since you can't
-                        # join UNC and non-UNC paths, just assume the original
-                        # path.
-                        log.trace(
-                            'roots: %s is a UNC path, using %s instead',
-                            link_dest, abs_path
-                        )
-                        link_dest = abs_path
-                    if link_dest.startswith('..'):
-                        joined = os.path.join(abs_path, link_dest)
-                    else:
-                        joined = os.path.join(
-                            os.path.dirname(abs_path), link_dest
-                        )
-                    rel_dest = _translate_sep(
-                        os.path.relpath(
-                            os.path.realpath(os.path.normpath(joined)),
-                            os.path.realpath(fs_root)
-                        )
-                    )
-                    log.trace(
-                        'roots: %s relative path is %s',
-                        abs_path, rel_dest
-                    )
-                    if not rel_dest.startswith('..'):
-                        # Only count the link if it does not point
-                        # outside of the root dir of the fileserver
-                        # (i.e. the "path" variable)
-                        ret['links'][rel_path] = link_dest
-
-        for path in __opts__['file_roots'][saltenv]:
-            for root, dirs, files in salt.utils.path.os_walk(
-                    path,
-                    followlinks=__opts__['fileserver_followsymlinks']):
-                _add_to(ret['dirs'], path, root, dirs)
-                _add_to(ret['files'], path, root, files)
-
-        ret['files'] = sorted(ret['files'])
-        ret['dirs'] = sorted(ret['dirs'])
-        ret['empty_dirs'] = sorted(ret['empty_dirs'])
-
+        ret = _walk_file_lists(saltenv)
         if save_cache:
             try:
                 salt.fileserver.write_file_list_cache(
@@ -469,6 +469,11 @@ def update():
             fp_.write(serial.dumps(new_envs))
             log.trace('Wrote env cache data to %s', env_cache)
 
+    list_cachedir = os.path.join(__opts__['cachedir'], 'file_lists/svnfs')
+    if data.get('changed', False) is True \
+            or salt.fileserver.get_file_list_generation(list_cachedir) is None:
+        salt.fileserver.bump_file_list_generation(__opts__, list_cachedir)
+
     # if there is a change, fire an event
     if __opts__.get('fileserver_events', False):
         with salt.utils.event.get_event(
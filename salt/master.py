@@ -10,6 +10,7 @@ import copy
 import ctypes
 import functools
 import os
+import random
 import re
 import sys
 import time
@@ -18,7 +19,9 @@ import stat
 import logging
 import collections
 import multiprocessing
+from multiprocessing.pool import ThreadPool
 import threading
+import zlib
 import salt.serializers.msgpack
 
 # pylint: disable=import-error,no-name-in-module,redefined-builtin
@@ -52,6 +55,7 @@ import salt.log.setup
 import salt.utils.args
 import salt.utils.atomicfile
 import salt.utils.crypt
+import salt.utils.dictdiffer
 import salt.utils.event
 import salt.utils.files
 import salt.utils.gitfs
@@ -476,6 +480,90 @@ class FileserverUpdate(salt.utils.process.SignalHandlingMultiprocessingProcess):
                 condition.wait(interval)
             _do_update()
 
+    def update_jobs(self):
+        '''
+        Split the update buckets into one job per backend, or per remote for
+        backends which support per-remote intervals
+        '''
+        jobs = []
+        for interval, backends in six.iteritems(self.buckets):
+            for (backend_name, update_func), update_args in \
+                    six.iteritems(backends):
+                for id_ in update_args or [None]:
+                    jobs.append({
+                        'name': backend_name if id_ is None
+                            else '{0}:{1}'.format(backend_name, id_),
+                        'func': update_func,
+                        'args': () if id_ is None else ([id_],),
+                        'interval': interval,
+                        'next': 0,
+                        'running': False,
+                    })
+        return jobs
+
+    def _jitter(self):
+        return random.uniform(0, self.opts.get('fileserver_update_jitter', 0))
+
+    def _run_update_job(self, job, lock):
+        '''
+        Run a single update job, from a worker thread. The lock guards the
+        job's running flag.
+        '''
+        start = time.time()
+        try:
+            log.debug('Updating %s fileserver cache', job['name'])
+            job['func'](*job['args'])
+        except Exception:
+            log.exception(
+                'Uncaught exception while updating %s fileserver cache',
+                job['name']
+            )
+        finally:
+            log.debug(
+                'Completed %s fileserver update in %.2f seconds, next update '
+                'in %d seconds', job['name'], time.time() - start,
+                job['interval']
+            )
+            with lock:
+                job['running'] = False
+
+    def schedule_updates(self, jobs, stop=None):
+        '''
+        Run each update job on its own interval, with at most
+        fileserver_update_workers of them running at once. A job is skipped
+        when its previous run has not finished yet, and a random delay of up
+        to fileserver_update_jitter seconds is added to each run so that
+        masters sharing remotes do not all update at once.
+        '''
+        if stop is None:
+            stop = threading.Event()
+        lock = threading.Lock()
+        pool = ThreadPool(self.opts['fileserver_update_workers'])
+        try:
+            for job in jobs:
+                job['next'] = time.time() + self._jitter()
+            while not stop.is_set():
+                now = time.time()
+                for job in jobs:
+                    if job['next'] > now:
+                        continue
+                    job['next'] = now + job['interval'] + self._jitter()
+                    with lock:
+                        running = job['running']
+                        job['running'] = True
+                    if running:
+                        log.warning(
+                            'The previous %s fileserver update is still '
+                            'running, skipping this one', job['name']
+                        )
+                        continue
+                    pool.apply_async(self._run_update_job, (job, lock))
+                wait = min(job['next'] for job in jobs) - time.time() \
+                    if jobs else 60
+                stop.wait(max(min(wait, 60), 0.05))
+        finally:
+            pool.close()
+
     def run(self):
         '''
         Start the update threads
@@ -484,12 +572,33 @@ class FileserverUpdate(salt.utils.process.SignalHandlingMultiprocessingProcess):
         # Clean out the fileserver backend cache
         salt.daemons.masterapi.clean_fsbackend(self.opts)
 
-        for interval in self.buckets:
-            self.update_threads[interval] = threading.Thread(
-                target=self.update_fileserver,
-                args=(interval, self.buckets[interval]),
+        if self.opts.get('fileserver_update_workers', 0) > 0:
+            scheduler = threading.Thread(
+                target=self.schedule_updates,
+                args=(self.update_jobs(),),
+                name='fileserver_update_scheduler',
             )
-            self.update_threads[interval].start()
+            scheduler.daemon = True
+            scheduler.start()
+        else:
+            for interval in self.buckets:
+                self.update_threads[interval] = threading.Thread(
+                    target=self.update_fileserver,
+                    args=(interval, self.buckets[interval]),
+                )
+                self.update_threads[interval].start()
+
+        # Start the watchers of any backends which can follow changes as
+        # they happen
+        for backend in self.fileserver.backends():
+            fstr = '{0}.watch'.format(backend)
+            if fstr in self.fileserver.servers:
+                watch_thread = threading.Thread(
+                    target=self.fileserver.servers[fstr],
+                    name='{0}_watch'.format(backend),
+                )
+                watch_thread.daemon = True
+                watch_thread.start()
 
         # Keep the process alive
         while True:
@@ -1181,9 +1290,12 @@ class AESFuncs(object):
         import salt.fileserver
         self.fs_ = salt.fileserver.Fileserver(self.opts)
         self._serve_file = self.fs_.serve_file
+        self._serve_files = self.fs_.serve_files
+        self._file_manifest_sync = self.fs_.file_manifest_sync
         self._file_find = self.fs_._find_file
         self._file_hash = self.fs_.file_hash
         self._file_hash_and_stat = self.fs_.file_hash_and_stat
+        self._file_hash_and_stat_list = self.fs_.file_hash_and_stat_list
         self._file_list = self.fs_.file_list
         self._file_list_emptydirs = self.fs_.file_list_emptydirs
         self._dir_list = self.fs_.dir_list
@@ -1400,8 +1512,8 @@ class AESFuncs(object):
         :rtype: bool
         :return: True if the data has been stored in the mine
         '''
-        load = self.__verify_load(load, ('id', 'data', 'tok'))
-        if load is False:
+        load = self.__verify_load(load, ('id', 'tok'))
+        if load is False or ('data' not in load and 'mine_delta' not in load):
             return {}
         return self.masterapi._mine(load, skip_verify=True)
 
@@ -1522,10 +1634,21 @@ class AESFuncs(object):
         :rtype: dict
         :return: The pillar data for the minion
         '''
-        if any(key not in load for key in ('id', 'grains')):
+        if 'id' not in load or ('grains' not in load and 'grains_delta' not in load):
             return False
         if not salt.utils.verify.valid_id(self.opts, load['id']):
             return False
+        if 'grains' not in load:
+            # The minion only sent the changes to the grains it sent last
+            # time, returning False makes it send the full grains again
+            if not self.opts.get('minion_data_cache', False):
+                return False
+            cdata = self.masterapi.cache.fetch('minions/{0}'.format(load['id']), 'data')
+            if not isinstance(cdata, dict):
+                return False
+            load['grains'] = salt.utils.dictdiffer.apply_delta(cdata.get('grains'), load['grains_delta'])
+            if load['grains'] is None:
+                return False
         load['grains']['id'] = load['id']
 
         pillar = salt.pillar.get_pillar(
@@ -1594,6 +1717,51 @@ class AESFuncs(object):
                         minions, jid, exc
                     )
 
+    def _minion_batch(self, load):
+        '''
+        Receive a batch of loads coalesced by a minion with
+        ``minion_return_batch`` enabled and handle each of them as if it had
+        been sent on its own. The minion token is verified once per batch.
+
+        :param dict load: The minion payload
+        '''
+        load = self.__verify_load(load, ('id', 'loads', 'tok'))
+        if load is False:
+            return {}
+        for item in load['loads']:
+            if not isinstance(item, dict):
+                continue
+            # Minions may only send loads on their own behalf
+            item['id'] = load['id']
+            item.pop('tok', None)
+            cmd = item.get('cmd')
+            try:
+                if cmd == '_return':
+                    self._return(item)
+                elif cmd == '_minion_event':
+                    self.masterapi._minion_event(item)
+                    self._handle_minion_event(item)
+                elif cmd == '_mine':
+                    # Mine deltas are never batched, they need a reply
+                    if 'data' in item:
+                        self.masterapi._mine(item, skip_verify=True)
+                    else:
+                        log.error(
+                            'Received a batched mine load without data from %s',
+                            load['id']
+                        )
+                else:
+                    log.error(
+                        'Received unsupported command %s in a batch from %s',
+                        cmd, load['id']
+                    )
+            except Exception:
+                log.error(
+                    'Error handling batched command %s from %s',
+                    cmd, load['id'], exc_info=True
+                )
+        return True
+
     def _return(self, load):
         '''
         Handle the return data sent from the minions.
@@ -1642,6 +1810,9 @@ class AESFuncs(object):
 
         :param dict load: The minion payload
         '''
+        if 'zload' in load:
+            # Compressed returns of a syndic with syndic_forward_compress
+            load = {'load': self.serial.loads(zlib.decompress(load['zload']))}
         loads = load.get('load')
         if not isinstance(loads, list):
             loads = [load]  # support old syndics not aggregating returns
@@ -1680,6 +1851,26 @@ class AESFuncs(object):
                     ret['sig'] = load['sig']
                 self._return(ret)
 
+    def _syndic_membership(self, load):
+        '''
+        Store the ids of the minions behind a syndic, so that publishes to
+        list and glob targets are only sent to the syndics with matching
+        minions
+
+        :param dict load: The syndic payload
+        '''
+        load = self.__verify_load(load, ('id', 'minions', 'tok'))
+        if load is False:
+            return False
+        if not salt.utils.verify.valid_id(self.opts, load['id']):
+            return False
+        salt.utils.minions.store_syndic_members(self.opts, load['id'], load['minions'])
+        log.debug('Syndic %s reported %d minions', load['id'], len(load['minions']))
+        # A syndic running on this master reports the change further up
+        self.event.fire_event({'id': load['id']},
+                              tagify([load['id'], 'membership'], 'syndic'))
+        return True
+
     def minion_runner(self, clear_load):
         '''
         Execute a runner from a minion, return the runner's function data
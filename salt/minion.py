@@ -17,6 +17,8 @@ import threading
 import traceback
 import contextlib
 import multiprocessing
+import zlib
+from collections import deque
 from random import randint, shuffle
 from stat import S_IMODE
 import salt.serializers.msgpack
@@ -76,6 +78,7 @@ import salt.syspaths
 import salt.utils.args
 import salt.utils.context
 import salt.utils.data
+import salt.utils.dictdiffer
 import salt.utils.error
 import salt.utils.event
 import salt.utils.files
@@ -116,6 +119,7 @@ from salt.exceptions import (
 )
 
 
+import tornado.concurrent  # pylint: disable=F0401
 import tornado.gen  # pylint: disable=F0401
 import tornado.ioloop  # pylint: disable=F0401
 
@@ -804,6 +808,69 @@ class MinionBase(object):
             return self.opts.get('return_retry_timer')
 
 
+class ScheduleTimer(object):
+    '''
+    Call the schedule callback when the next scheduled job is due instead of
+    every second, used in place of a PeriodicCallback when
+    ``schedule_lazy_eval`` is enabled
+    '''
+    # The longest wait, to pick up the changes the schedule is not told
+    # about, such as grains changed by a module
+    max_wait = 60
+
+    def __init__(self, callback, schedule, io_loop):
+        self.callback = callback
+        self.schedule = schedule
+        self.io_loop = io_loop
+        self._timeout = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self.schedule.wakeup = self.wakeup
+        self._call_later(1)
+
+    def stop(self):
+        self._running = False
+        if self.schedule.wakeup == self.wakeup:
+            self.schedule.wakeup = None
+        if self._timeout is not None:
+            self.io_loop.remove_timeout(self._timeout)
+            self._timeout = None
+
+    def is_running(self):
+        return self._running
+
+    def wakeup(self):
+        '''
+        Evaluate the schedule on the next loop iteration, it changed
+        '''
+        self.io_loop.add_callback(self._wakeup)
+
+    def _wakeup(self):
+        if self._running:
+            self._call_later(0)
+
+    def _call_later(self, delay):
+        if self._timeout is not None:
+            self.io_loop.remove_timeout(self._timeout)
+        self._timeout = self.io_loop.call_later(delay, self._run)
+
+    def _run(self):
+        self._timeout = None
+        if not self._running:
+            return
+        try:
+            self.callback()
+        finally:
+            if self._running:
+                delay = self.schedule.next_deadline()
+                if delay is None:
+                    delay = self.max_wait
+                # Jobs are not run more than once a second
+                self._call_later(min(max(delay, 1), self.max_wait))
+
+
 class SMinion(MinionBase):
     '''
     Create an object that has loaded all of the minion module functions,
@@ -1140,6 +1207,10 @@ class Minion(MinionBase):
         self.ready = False
         self.jid_queue = [] if jid_queue is None else jid_queue
         self.periodic_callbacks = {}
+        self.job_pool = None
+        self.batch_loads = []
+        # The mine data the master has from this minion, by function
+        self.mine_data = {}
 
         if io_loop is None:
             install_zmq()
@@ -1456,9 +1527,69 @@ class Minion(MinionBase):
         finally:
             channel.close()
 
-    def _fire_master(self, data=None, tag=None, events=None, pretag=None, timeout=60, sync=True, timeout_handler=None):
+    def _batch_load(self, load):
+        '''
+        Queue a load for the next batch sent to the master if
+        ``minion_return_batch`` is enabled, the batch is sent once it holds
+        ``minion_return_batch_size`` loads or every
+        ``minion_return_batch_interval`` seconds.
+
+        Returns False if the load has not been queued and needs to be sent
+        on its own.
+        '''
+        if not self.opts.get('minion_return_batch', False):
+            return False
+        # The token is sent once for the whole batch
+        load.pop('tok', None)
+        if self.opts['minion_sign_messages'] and load.get('cmd') == '_return':
+            minion_privkey_path = os.path.join(self.opts['pki_dir'], 'minion.pem')
+            load['sig'] = salt.crypt.sign_message(minion_privkey_path, salt.serializers.msgpack.serialize(load))
+        self.batch_loads.append(load)
+        if len(self.batch_loads) >= self.opts['minion_return_batch_size']:
+            self._flush_batch_loads()
+        return True
+
+    def _flush_batch_loads(self, timeout=60, sync=False):
+        '''
+        Send the queued loads to the master in a single request
+
+        If ``sync`` is True the request is sent without the io_loop, this is
+        used when the minion shuts down.
+        '''
+        if not self.batch_loads:
+            return
+        load = {'cmd': '_minion_batch',
+                'id': self.opts['id'],
+                'tok': self.tok,
+                'loads': self.batch_loads}
+        self.batch_loads = []
+
+        if sync:
+            try:
+                self._send_req_sync(load, timeout)
+            except Exception:
+                log.warning(
+                    'The minion failed to send a batch of %s returns and '
+                    'events to the master.', len(load['loads']), exc_info=True
+                )
+            return
+
+        def timeout_handler(*_):
+            log.warning(
+                'The minion failed to send a batch of %s returns and events '
+                'to the master.', len(load['loads'])
+            )
+            return True
+
+        with tornado.stack_context.ExceptionStackContext(timeout_handler):
+            self._send_req_async(load, timeout, callback=lambda f: None)  # pylint: disable=unexpected-keyword-arg
+
+    def _fire_master(self, data=None, tag=None, events=None, pretag=None, timeout=60, sync=True, timeout_handler=None, batch=False):
         '''
         Fire an event on the master, or drop message if unable to send.
+
+        If ``batch`` is True the event may be coalesced with other events and
+        returns, see ``minion_return_batch``.
         '''
         load = {'id': self.opts['id'],
                 'cmd': '_minion_event',
@@ -1475,6 +1606,9 @@ class Minion(MinionBase):
         else:
             return
 
+        if batch and self._batch_load(load):
+            return True
+
         if sync:
             try:
                 self._send_req_sync(load, timeout)
@@ -1535,6 +1669,13 @@ class Minion(MinionBase):
                 self.functions, self.returners, self.function_errors, self.executors = self._load_modules()
                 self.schedule.functions = self.functions
                 self.schedule.returners = self.returners
+                self._recycle_job_pool()
+
+        if self._use_job_pool(data):
+            if self.job_pool is None:
+                self.job_pool = salt.utils.minion.JobPool(self.opts, self._target, self)
+            self.job_pool.submit(data, self.connected)
+            return
 
         process_count_max = self.opts.get('process_count_max')
         process_count_max_sleep_secs = self.opts.get('process_count_max_sleep_secs')
@@ -1586,6 +1727,17 @@ class Minion(MinionBase):
         elif salt.utils.platform.is_windows():
             self.win_proc.append(process)
 
+    def _use_job_pool(self, data):
+        '''
+        Return True if the job should be handed to the minion job pool
+        '''
+        if not self.opts.get('minion_job_pool', False):
+            return False
+        if self.opts.get('multiprocessing', True) and salt.utils.platform.is_windows():
+            # Windows can not fork, the prefork pool would not be warm
+            return False
+        return not salt.utils.minion.job_pool_isolated(self.opts, data)
+
     def ctx(self):
         '''
         Return a single context manager for the minion's data
@@ -1643,7 +1795,8 @@ class Minion(MinionBase):
         '''
         fn_ = os.path.join(minion_instance.proc_dir, data['jid'])
 
-        if opts['multiprocessing'] and not salt.utils.platform.is_windows():
+        if opts['multiprocessing'] and not salt.utils.platform.is_windows() \
+                and not getattr(minion_instance, 'job_pool_worker', False):
             # Shutdown the multiprocessing before daemonizing
             salt.log.setup.shutdown_multiprocessing_logging()
 
@@ -1698,6 +1851,9 @@ class Minion(MinionBase):
                     func = function_name
                     args, kwargs = data['arg'], data
                 minion_instance.functions.pack['__context__']['retcode'] = 0
+                # Jinja environments are only reused within a job
+                minion_instance.functions.pack['__context__'].pop(
+                    'jinja.env_cache', None)
                 if isinstance(executors, six.string_types):
                     executors = [executors]
                 elif not isinstance(executors, list) or not executors:
@@ -1866,7 +2022,8 @@ class Minion(MinionBase):
         '''
         fn_ = os.path.join(minion_instance.proc_dir, data['jid'])
 
-        if opts['multiprocessing'] and not salt.utils.platform.is_windows():
+        if opts['multiprocessing'] and not salt.utils.platform.is_windows() \
+                and not getattr(minion_instance, 'job_pool_worker', False):
             # Shutdown the multiprocessing before daemonizing
             salt.log.setup.shutdown_multiprocessing_logging()
 
@@ -1924,6 +2081,9 @@ class Minion(MinionBase):
                     data['arg'][ind],
                     data)
                 minion_instance.functions.pack['__context__']['retcode'] = 0
+                # Jinja environments are only reused within a job
+                minion_instance.functions.pack['__context__'].pop(
+                    'jinja.env_cache', None)
                 key = ind if multifunc_ordered else data['fun'][ind]
                 ret['return'][key] = func(*args, **kwargs)
                 retcode = minion_instance.functions.pack['__context__'].get(
@@ -1978,9 +2138,12 @@ class Minion(MinionBase):
                         data['jid'], exc
                     )
 
-    def _return_pub(self, ret, ret_cmd='_return', timeout=60, sync=True):
+    def _return_pub(self, ret, ret_cmd='_return', timeout=60, sync=True, batch=False):
         '''
         Return the data from the executed command to the master server
+
+        If ``batch`` is True the return may be coalesced with other returns
+        and events, see ``minion_return_batch``.
         '''
         jid = ret.get('jid', ret.get('__jid__'))
         fun = ret.get('fun', ret.get('__fun__'))
@@ -2041,6 +2204,9 @@ class Minion(MinionBase):
         if not self.opts['pub_ret']:
             return ''
 
+        if batch and self._batch_load(load):
+            return ''
+
         def timeout_handler(*_):
             log.warning(
                'The minion failed to return the job information for job %s. '
@@ -2126,6 +2292,10 @@ class Minion(MinionBase):
 
         load = {'cmd': ret_cmd,
                 'load': list(six.itervalues(jids))}
+        if ret_cmd == '_syndic_return' and self.opts.get('syndic_forward_compress', False):
+            # Unpacked by the upper master in AESFuncs._syndic_return
+            load = {'cmd': ret_cmd,
+                    'zload': zlib.compress(salt.payload.Serial(self.opts).dumps(load['load']))}
 
         def timeout_handler(*_):
             log.warning(
@@ -2221,6 +2391,14 @@ class Minion(MinionBase):
 
         self.schedule.functions = self.functions
         self.schedule.returners = self.returners
+        self._recycle_job_pool()
+
+    def _recycle_job_pool(self):
+        '''
+        Make the job pool workers pick up the refreshed minion state
+        '''
+        if self.job_pool is not None:
+            self.job_pool.recycle()
 
     def beacons_refresh(self):
         '''
@@ -2265,6 +2443,9 @@ class Minion(MinionBase):
         self.module_refresh(force_refresh, notify)
         self.matchers_refresh()
         self.beacons_refresh()
+        if hasattr(self, 'schedule'):
+            # The pillar schedule may have changed
+            self.schedule.changed()
 
     def manage_schedule(self, tag, data):
         '''
@@ -2389,10 +2570,17 @@ class Minion(MinionBase):
         '''
         Send mine data to the master
         '''
+        if self._batch_load(data):
+            # We can not tell whether the batch made it
+            self.mine_data = {}
+            return True
         channel = salt.transport.client.ReqChannel.factory(self.opts)
         data['tok'] = self.tok
         try:
-            ret = channel.send(data)
+            if self.opts.get('minion_data_delta', False) and 'data' in data:
+                ret = self._mine_send_delta(channel, data)
+            else:
+                ret = channel.send(data)
             return ret
         except SaltReqTimeoutError:
             log.warning('Unable to send mine data to master.')
@@ -2400,6 +2588,28 @@ class Minion(MinionBase):
         finally:
             channel.close()
 
+    def _mine_send_delta(self, channel, data):
+        '''
+        Send only the changes to the mine functions since they were last sent
+        to the master. If the master does not have what we sent last time,
+        send the full mine data instead.
+        '''
+        keys = list(data['data'])
+        old = dict((key, self.mine_data[key]) for key in keys if key in self.mine_data)
+        load = dict((key, val) for key, val in six.iteritems(data) if key != 'data')
+        load['mine_delta'] = salt.utils.dictdiffer.delta(old, data['data'])
+        load['mine_delta']['keys'] = keys
+        ret = channel.send(load)
+        if ret is not True:
+            log.debug('Master did not accept the mine delta, sending all mine data')
+            ret = channel.send(data)
+        if ret is True:
+            if data.get('clear', False):
+                self.mine_data = copy.deepcopy(data['data'])
+            else:
+                self.mine_data.update(copy.deepcopy(data['data']))
+        return ret
+
     def _handle_tag_module_refresh(self, tag, data):
         '''
         Handle a module_refresh event
@@ -2629,7 +2839,7 @@ class Minion(MinionBase):
                     'Connected to master %s',
                     data['schedule'].split(master_event(type='alive', master=''))[1]
                 )
-        self._return_pub(data, ret_cmd='_return', sync=False)
+        self._return_pub(data, ret_cmd='_return', sync=False, batch=True)
 
     def _handle_tag_salt_error(self, tag, data):
         '''
@@ -2693,6 +2903,10 @@ class Minion(MinionBase):
         # Add an extra fallback in case a forked process leaks through
         multiprocessing.active_children()
 
+        # Replace job pool workers which were recycled or have exited
+        if self.job_pool is not None:
+            self.job_pool.maintain()
+
         # Cleanup Windows threads
         if not salt.utils.platform.is_windows():
             return
@@ -2744,7 +2958,7 @@ class Minion(MinionBase):
                 except Exception:
                     log.critical('The beacon errored: ', exc_info=True)
                 if beacons and self.connected:
-                    self._fire_master(events=beacons)
+                    self._fire_master(events=beacons, batch=True)
 
             new_periodic_callbacks['beacons'] = tornado.ioloop.PeriodicCallback(
                     handle_beacons, loop_interval * 1000)
@@ -2799,7 +3013,11 @@ class Minion(MinionBase):
             # TODO: actually listen to the return and change period
             def handle_schedule():
                 self.process_schedule(self, loop_interval)
-            new_periodic_callbacks['schedule'] = tornado.ioloop.PeriodicCallback(handle_schedule, 1000)
+            if self.opts.get('schedule_lazy_eval', False):
+                new_periodic_callbacks['schedule'] = ScheduleTimer(
+                    handle_schedule, self.schedule, self.io_loop)
+            else:
+                new_periodic_callbacks['schedule'] = tornado.ioloop.PeriodicCallback(handle_schedule, 1000)
 
             if before_connect:
                 # Make sure there is a chance for one iteration to occur before connect
@@ -2876,6 +3094,12 @@ class Minion(MinionBase):
             self.periodic_callbacks['ping'] = tornado.ioloop.PeriodicCallback(ping_master, ping_interval * 1000)
             self.periodic_callbacks['ping'].start()
 
+        if self.opts.get('minion_return_batch', False):
+            self.periodic_callbacks['return_batch'] = tornado.ioloop.PeriodicCallback(
+                self._flush_batch_loads,
+                self.opts['minion_return_batch_interval'] * 1000)
+            self.periodic_callbacks['return_batch'].start()
+
         # add handler to subscriber
         if hasattr(self, 'pub_channel') and self.pub_channel is not None:
             self.pub_channel.on_recv(self._handle_payload)
@@ -2941,6 +3165,10 @@ class Minion(MinionBase):
             return
 
         self._running = False
+        # Send what is still queued for the master before the channels go
+        if getattr(self, 'batch_loads', None):
+            self._flush_batch_loads(
+                timeout=self.opts.get('return_retry_timer', 5), sync=True)
         if hasattr(self, 'schedule'):
             del self.schedule
         if hasattr(self, 'pub_channel') and self.pub_channel is not None:
@@ -2951,6 +3179,9 @@ class Minion(MinionBase):
         if hasattr(self, 'periodic_callbacks'):
             for cb in six.itervalues(self.periodic_callbacks):
                 cb.stop()
+        if getattr(self, 'job_pool', None) is not None:
+            self.job_pool.stop()
+            self.job_pool = None
 
     def __del__(self):
         self.destroy()
@@ -3038,6 +3269,16 @@ class Syndic(Minion):
             sync=False,
         )
 
+    def send_membership(self, minions, timeout=60):
+        '''
+        Report the ids of the minions behind this syndic to the master
+        '''
+        load = {'cmd': '_syndic_membership',
+                'id': self.opts['id'],
+                'tok': self.tok,
+                'minions': minions}
+        return self._send_req_async(load, timeout)
+
     # TODO: clean up docs
     def tune_in_no_block(self):
         '''
@@ -3146,6 +3387,25 @@ class SyndicManager(MinionBase):
         self.delayed = []
         # Active pub futures: {master_id: (future, [job_ret, ...]), ...}
         self.pub_futures = {}
+        # Batches of job_rets waiting to be sent to their master:
+        # {master_id: deque([(size, [job_ret, ...]), ...]), ...}
+        self.pending = {}
+        # Size of the pending batches, the batches over syndic_forward_spool_size
+        # are written to the spool directory
+        self.pending_size = 0
+        self.spool_dir = os.path.join(self.opts['cachedir'], 'syndic_spool')
+        # Number of spooled batches, None until the spool directory is read
+        self.spooled = None
+        # Seconds between receiving the oldest return of the last batch sent
+        # to each master and its delivery: {master_id: lag, ...}
+        self.forward_lag = {}
+        self._forward_stats_time = 0
+        self.serial = salt.payload.Serial(self.opts)
+        # The minions behind this syndic as (stamp, [minion_id, ...]), the
+        # stamp last reported to each master and the pending reports
+        self._membership = (None, [])
+        self._membership_sent = {}
+        self._membership_pending = set()
 
     def _spawn_syndics(self):
         '''
@@ -3298,6 +3558,10 @@ class SyndicManager(MinionBase):
                                                            timeout=self._return_retry_timer(),
                                                            sync=False)
             self.pub_futures[master] = (future, values)
+            if isinstance(future, tornado.concurrent.Future):
+                # Send the next pending batch as soon as this one is delivered
+                self.io_loop.add_future(
+                    future, functools.partial(self._forward_done, master, values))
             return True
         # Loop done and didn't exit: wasn't sent, try again later
         return False
@@ -3354,6 +3618,12 @@ class SyndicManager(MinionBase):
                                                               )
         self.forward_events.start()
 
+        if self.opts.get('syndic_membership', False):
+            self.report_membership = tornado.ioloop.PeriodicCallback(self._report_membership,
+                                                                     self.opts['loop_interval'] * 1000,
+                                                                     )
+            self.report_membership.start()
+
         # Make sure to gracefully handle SIGUSR1
         enable_sigusr1_handler()
 
@@ -3364,6 +3634,10 @@ class SyndicManager(MinionBase):
         mtag, data = self.local.event.unpack(raw, self.local.event.serial)
         log.trace('Got event %s', mtag)  # pylint: disable=no-member
 
+        if self.opts.get('syndic_membership', False) and self._membership_changed(mtag, data):
+            # Don't wait for the next loop_interval to report new minions
+            self._report_membership()
+
         tag_parts = mtag.split('/')
         if len(tag_parts) >= 4 and tag_parts[1] == 'job' and \
             salt.utils.jid.is_jid(tag_parts[2]) and tag_parts[3] == 'ret' and \
@@ -3378,6 +3652,7 @@ class SyndicManager(MinionBase):
             master = data.get('master_id')
             jdict = self.job_rets.setdefault(master, {}).setdefault(mtag, {})
             if not jdict:
+                jdict['__time__'] = time.time()
                 jdict['__fun__'] = data.get('fun')
                 jdict['__jid__'] = data['jid']
                 jdict['__load__'] = {}
@@ -3424,14 +3699,245 @@ class SyndicManager(MinionBase):
                                       },
                               )
         if self.delayed:
-            res = self._return_pub_syndic(self.delayed)
-            if res:
-                self.delayed = []
+            # Returns which failed to reach their master go to any master
+            for size, batch in self._batch_job_rets(self.delayed):
+                self._queue_batch(None, size, batch)
+            self.delayed = []
         for master in list(six.iterkeys(self.job_rets)):
-            values = list(six.itervalues(self.job_rets[master]))
-            res = self._return_pub_syndic(values, master_id=master)
-            if res:
-                del self.job_rets[master]
+            for size, batch in self._batch_job_rets(list(six.itervalues(self.job_rets[master]))):
+                self._queue_batch(master, size, batch)
+        self.job_rets = {}
+        self._flush_pending()
+        self._report_forward_stats()
+
+    def _batch_job_rets(self, job_rets):
+        '''
+        Split the job returns into batches of up to syndic_forward_batch_size
+        bytes, splitting the returns of a single job if they do not fit. Yields
+        the size and the job returns of each batch, the size is 0 if neither
+        syndic_forward_batch_size nor syndic_forward_spool_size is set.
+        '''
+        limit = self.opts.get('syndic_forward_batch_size', 0)
+        if not limit:
+            size = 0
+            if self.opts.get('syndic_forward_spool_size', 0):
+                size = len(self.serial.dumps(job_rets))
+            yield size, job_rets
+            return
+        batch = []
+        batch_size = 0
+        for jdict in job_rets:
+            for size, part in self._split_job_ret(jdict, limit):
+                if batch and batch_size + size > limit:
+                    yield batch_size, batch
+                    batch = []
+                    batch_size = 0
+                batch.append(part)
+                batch_size += size
+        if batch:
+            yield batch_size, batch
+
+    def _split_job_ret(self, jdict, limit):
+        '''
+        Split the returns of a job into parts of up to limit bytes, only the
+        first part carries the job load. Yields the size and each part.
+        '''
+        size = len(self.serial.dumps(jdict))
+        if size <= limit:
+            yield size, jdict
+            return
+        meta = dict((key, value) for key, value in six.iteritems(jdict)
+                    if key.startswith('__'))
+        part = dict(meta)
+        part_size = len(self.serial.dumps(part))
+        for minion_id, ret in six.iteritems(jdict):
+            if minion_id.startswith('__'):
+                continue
+            ret_size = len(self.serial.dumps({minion_id: ret}))
+            if len(part) > len(meta) and part_size + ret_size > limit:
+                yield part_size, part
+                part = dict(meta, __load__={})
+                part_size = len(self.serial.dumps(part))
+            part[minion_id] = ret
+            part_size += ret_size
+        yield part_size, part
+
+    def _queue_batch(self, master, size, batch):
+        '''
+        Queue a batch of job returns for master, or write it to the spool
+        directory if the pending batches are over syndic_forward_spool_size
+        '''
+        spool_size = self.opts.get('syndic_forward_spool_size', 0)
+        if spool_size and self.pending_size + size > spool_size:
+            if not os.path.isdir(self.spool_dir):
+                os.makedirs(self.spool_dir)
+            name = '{0:.6f}-{1}.p'.format(time.time(), randint(0, 1 << 30))
+            with salt.utils.files.fopen(os.path.join(self.spool_dir, name), 'wb') as fp_:
+                self.serial.dump({'master': master, 'size': size, 'batch': batch}, fp_)
+            self.spooled = (self.spooled or 0) + 1
+            log.debug('Spooled a batch of %d bytes for %s', size, master)
+            return
+        self.pending.setdefault(master, deque()).append((size, batch))
+        self.pending_size += size
+
+    def _unspool(self):
+        '''
+        Move the oldest spooled batches back to the pending batches, up to
+        syndic_forward_spool_size
+        '''
+        if self.spooled == 0 or not self.opts.get('syndic_forward_spool_size', 0):
+            return
+        try:
+            names = sorted(os.listdir(self.spool_dir))
+        except OSError:
+            names = []
+        self.spooled = len(names)
+        for name in names:
+            path = os.path.join(self.spool_dir, name)
+            try:
+                with salt.utils.files.fopen(path, 'rb') as fp_:
+                    data = self.serial.load(fp_)
+            except Exception as exc:
+                log.error('Unable to read the spooled batch %s: %s', path, exc)
+                os.remove(path)
+                self.spooled -= 1
+                continue
+            if self.pending_size + data['size'] > self.opts['syndic_forward_spool_size'] \
+                    and self.pending_size:
+                break
+            os.remove(path)
+            self.spooled -= 1
+            self.pending.setdefault(data['master'], deque()).append((data['size'], data['batch']))
+            self.pending_size += data['size']
+
+    def _flush_pending(self):
+        '''
+        Send the next pending batch of each master which is not busy sending
+        an earlier one
+        '''
+        self._unspool()
+        for master in list(self.pending):
+            queue = self.pending[master]
+            if queue and self._return_pub_syndic(queue[0][1], master_id=master):
+                self.pending_size -= queue.popleft()[0]
+            if not queue:
+                del self.pending[master]
+
+    def _forward_done(self, master, values, future):
+        '''
+        Record the forward lag of a delivered batch and send the next ones, or
+        requeue the batch if it was not delivered
+        '''
+        if future.exception() is not None:
+            if self.pub_futures.get(master, (None, None))[0] is future:
+                log.error('Unable to forward returns to %s, trying another...', master)
+                self._mark_master_dead(master)
+                del self.pub_futures[master]
+                # Resent to any master on the next forward
+                self.delayed.extend(values)
+            return
+        received = [jdict['__time__'] for jdict in values if '__time__' in jdict]
+        if received:
+            self.forward_lag[master] = time.time() - min(received)
+            log.trace('Forward lag to %s: %.3fs', master, self.forward_lag[master])  # pylint: disable=no-member
+        self._flush_pending()
+
+    def _report_forward_stats(self):
+        '''
+        Fire an event with the forward queue and lag statistics every
+        syndic_forward_stats_interval seconds
+        '''
+        interval = self.opts.get('syndic_forward_stats_interval', 0)
+        if not interval or time.time() - self._forward_stats_time < interval:
+            return
+        self._forward_stats_time = time.time()
+        stats = {'pending_batches': sum(len(queue) for queue in six.itervalues(self.pending)),
+                 'pending_bytes': self.pending_size,
+                 'spooled_batches': self.spooled or 0,
+                 'lag': dict((six.text_type(master), lag)
+                             for master, lag in six.iteritems(self.forward_lag))}
+        log.debug('Syndic forward stats: %s', stats)
+        self.local.event.fire_event(stats, tagify([self.opts['id'], 'forward'], 'syndic'))
+
+    def _membership_stamp(self):
+        '''
+        Return the modification times of the accepted keys of the local master
+        and of the minions reported by its own syndics
+        '''
+        stamp = []
+        for path in (os.path.join(self.opts['master_pki_dir'], 'minions'),
+                     os.path.join(self.opts['cachedir'], 'syndic_members')):
+            try:
+                stamp.append(os.path.getmtime(path))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _minion_membership(self):
+        '''
+        Return the sorted ids of the minions behind this syndic
+        '''
+        stamp = self._membership_stamp()
+        if stamp != self._membership[0]:
+            minions = set()
+            acc = os.path.join(self.opts['master_pki_dir'], 'minions')
+            try:
+                minions.update(fn_ for fn_ in os.listdir(acc)
+                               if not fn_.startswith('.') and os.path.isfile(os.path.join(acc, fn_)))
+            except OSError:
+                pass
+            for members in six.itervalues(salt.utils.minions.syndic_members(self.opts)):
+                minions.update(members)
+            self._membership = (stamp, sorted(minions))
+        return self._membership
+
+    @staticmethod
+    def _membership_changed(mtag, data):
+        '''
+        Return True if the event may change the minions behind this syndic: a
+        key was accepted or deleted, or a syndic of the local master reported
+        its minions
+        '''
+        if mtag == tagify(prefix='key'):
+            return True
+        if mtag == tagify(prefix='auth'):
+            return isinstance(data, dict) and data.get('act') == 'accept'
+        return mtag.startswith(tagify('', 'syndic') + '/') and mtag.endswith('/membership')
+
+    def _report_membership(self):
+        '''
+        Report the minions behind this syndic to the masters which have not
+        received them since they last changed
+        '''
+        stamp, minions = self._minion_membership()
+        for master, syndic_future in six.iteritems(self._syndics):
+            if not syndic_future.done() or syndic_future.exception():
+                continue
+            if master in self._membership_pending:
+                continue
+            sent_stamp, sent_time = self._membership_sent.get(master, (None, 0))
+            # Report again before the master expires the minions
+            if sent_stamp == stamp and \
+                    time.time() - sent_time < self.opts.get('syndic_membership_expire', 3600) / 2:
+                continue
+            self._membership_pending.add(master)
+            future = syndic_future.result().send_membership(minions)
+            self.io_loop.add_future(
+                future, functools.partial(self._membership_done, master, stamp))
+
+    def _membership_done(self, master, stamp, future):
+        '''
+        Record the minions reported to a master, failed reports are sent again
+        on the next call to _report_membership
+        '''
+        self._membership_pending.discard(master)
+        if future.exception() is not None or future.result() is not True:
+            log.error('Unable to report the minions of this syndic to %s', master)
+            return
+        self._membership_sent[master] = (stamp, time.time())
+        if self._membership_stamp() != stamp:
+            # The minions changed while this report was being sent
+            self._report_membership()
 
 
 class ProxyMinionManager(MinionManager):
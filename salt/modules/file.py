@@ -4536,6 +4536,11 @@ def get_managed(
                 context_dict = defaults if defaults else {}
                 if context:
                     context_dict = salt.utils.dictupdate.merge(context_dict, context)
+                if template == 'jinja':
+                    # Reuse Jinja environments for the rest of the run, if
+                    # jinja_env_reuse is enabled
+                    kwargs['_jinja_env_cache'] = \
+                        __context__.setdefault('jinja.env_cache', {})
                 data = salt.utils.templates.TEMPLATE_REGISTRY[template](
                     sfn,
                     name=name,
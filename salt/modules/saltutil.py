@@ -1325,6 +1325,10 @@ def signal_job(jid, sig):
     '''
     Sends a signal to the named salt job's process
 
+    With :conf_minion:`minion_job_pool` enabled the job's process is the pool
+    worker running it, which ends along with the job and is replaced by the
+    pool.
+
     CLI Example:
 
     .. code-block:: bash
@@ -24,6 +24,7 @@ import salt.utils.args
 import salt.utils.cache
 import salt.utils.crypt
 import salt.utils.data
+import salt.utils.dictdiffer
 import salt.utils.dictupdate
 import salt.utils.url
 from salt.exceptions import SaltClientError
@@ -40,6 +41,9 @@ from salt.ext import six
 
 log = logging.getLogger(__name__)
 
+# The grains last sent to each master, see RemotePillarMixin.grains_delta_load
+SENT_GRAINS = {}
+
 
 def get_pillar(opts, grains, minion_id, saltenv=None, ext=None, funcs=None,
                pillar_override=None, pillarenv=None, extra_minion_data=None):
@@ -128,6 +132,34 @@ class RemotePillarMixin(object):
         log.trace('ext_pillar_extra_data = %s', extra_data)
         return extra_data
 
+    def _sent_grains_key(self):
+        return (six.text_type(self.opts.get('master')), self.minion_id)
+
+    def grains_delta_load(self, load):
+        '''
+        Return a copy of the pillar load in which the grains are replaced by
+        the changes since the grains were last sent to the master, or None
+        if ``minion_data_delta`` is disabled or no grains were sent yet.
+        '''
+        if not self.opts.get('minion_data_delta', False):
+            return None
+        sent = SENT_GRAINS.get(self._sent_grains_key())
+        if sent is None:
+            return None
+        delta_load = dict((key, val) for key, val in six.iteritems(load) if key != 'grains')
+        # The master sets the id grain before it caches the grains
+        delta_load['grains_delta'] = salt.utils.dictdiffer.delta(
+            sent, dict(self.grains, id=self.minion_id))
+        return delta_load
+
+    def grains_sent(self):
+        '''
+        Remember the grains which the master has now
+        '''
+        if self.opts.get('minion_data_delta', False):
+            SENT_GRAINS[self._sent_grains_key()] = copy.deepcopy(
+                dict(self.grains, id=self.minion_id))
+
 
 class AsyncRemotePillar(RemotePillarMixin):
     '''
@@ -173,10 +205,21 @@ class AsyncRemotePillar(RemotePillarMixin):
         if self.ext:
             load['ext'] = self.ext
         try:
-            ret_pillar = yield self.channel.crypted_transfer_decode_dictentry(
-                load,
-                dictkey='pillar',
-            )
+            ret_pillar = None
+            delta_load = self.grains_delta_load(load)
+            if delta_load is not None:
+                ret_pillar = yield self.channel.crypted_transfer_decode_dictentry(
+                    delta_load,
+                    dictkey='pillar',
+                )
+                if not isinstance(ret_pillar, dict):
+                    log.debug('Master did not accept the grains delta, sending all grains')
+                    ret_pillar = None
+            if ret_pillar is None:
+                ret_pillar = yield self.channel.crypted_transfer_decode_dictentry(
+                    load,
+                    dictkey='pillar',
+                )
         except Exception:
             log.exception('Exception getting pillar:')
             raise SaltClientError('Exception getting pillar.')
@@ -187,6 +230,7 @@ class AsyncRemotePillar(RemotePillarMixin):
             log.error(msg)
             # raise an exception! Pillar isn't empty, we can't sync it!
             raise SaltClientError(msg)
+        self.grains_sent()
         raise tornado.gen.Return(ret_pillar)
 
     def destroy(self):
@@ -242,9 +286,19 @@ class RemotePillar(RemotePillarMixin):
                 'cmd': '_pillar'}
         if self.ext:
             load['ext'] = self.ext
-        ret_pillar = self.channel.crypted_transfer_decode_dictentry(load,
-                                                                    dictkey='pillar',
-                                                                    )
+        ret_pillar = None
+        delta_load = self.grains_delta_load(load)
+        if delta_load is not None:
+            ret_pillar = self.channel.crypted_transfer_decode_dictentry(delta_load,
+                                                                        dictkey='pillar',
+                                                                        )
+            if not isinstance(ret_pillar, dict):
+                log.debug('Master did not accept the grains delta, sending all grains')
+                ret_pillar = None
+        if ret_pillar is None:
+            ret_pillar = self.channel.crypted_transfer_decode_dictentry(load,
+                                                                        dictkey='pillar',
+                                                                        )
 
         if not isinstance(ret_pillar, dict):
             log.error(
@@ -252,6 +306,7 @@ class RemotePillar(RemotePillarMixin):
                 type(ret_pillar).__name__, ret_pillar
             )
             return {}
+        self.grains_sent()
         return ret_pillar
 
     def destroy(self):
@@ -11,6 +11,7 @@ import logging
 
 # Import salt libs
 from salt.exceptions import SaltRenderError
+import salt.template
 import salt.utils.templates
 
 # Import 3rd-party libs
@@ -42,6 +43,28 @@ def _split_module_dicts():
     return mod_dict
 
 
+def _template_free(data, sls):
+    '''
+    Return True if the data contains no Jinja syntax, with the delimiters
+    configured for this kind of template, so rendering it would not change it
+    '''
+    env = __opts__.get('jinja_sls_env' if sls else 'jinja_env') or {}
+    if not isinstance(env, dict):
+        env = {}
+    for option, default in (('block_start_string', '{%'),
+                            ('variable_start_string', '{{'),
+                            ('comment_start_string', '{#')):
+        if (env.get(option) or default) in data:
+            return False
+    prefixes = tuple(x for x in (env.get('line_statement_prefix'),
+                                 env.get('line_comment_prefix')) if x)
+    if prefixes:
+        for line in data.splitlines():
+            if line.lstrip().startswith(prefixes):
+                return False
+    return True
+
+
 def render(template_file, saltenv='base', sls='', argline='',
                           context=None, tmplpath=None, **kws):
     '''
@@ -56,6 +79,19 @@ def render(template_file, saltenv='base', sls='', argline='',
             'Unknown renderer option: {opt}'.format(opt=argline)
         )
 
+    if __opts__.get('render_cache', False) \
+            and (from_str or hasattr(template_file, 'read')):
+        if from_str:
+            template_file = StringIO(template_file)
+        data = template_file.read()
+        template_file.seek(0)
+        if _template_free(data, sls):
+            # Nothing to render, hand the data to the next renderer as is
+            salt.template.record_render_stat('jinja', 'skipped')
+            return template_file
+        if from_str:
+            template_file = data
+
     tmp_data = salt.utils.templates.JINJA(template_file,
                                           to_str=True,
                                           salt=_split_module_dicts(),
@@ -67,6 +103,8 @@ def render(template_file, saltenv='base', sls='', argline='',
                                           context=context,
                                           tmplpath=tmplpath,
                                           proxy=__proxy__,
+                                          _jinja_env_cache=__context__.setdefault(
+                                              'jinja.env_cache', {}),
                                           **kws)
     if not tmp_data.get('result', False):
         raise SaltRenderError(
@@ -15,6 +15,7 @@ from yaml.parser import ParserError
 from yaml.constructor import ConstructorError
 
 # Import salt libs
+import salt.template
 import salt.utils.url
 import salt.utils.yamlloader as yamlloader_new
 import salt.utils.yamlloader_old as yamlloader_old
@@ -60,6 +61,16 @@ def render(yaml_data, saltenv='base', sls='', argline='', **kws):
         yamlloader = yamlloader_new
     if not isinstance(yaml_data, string_types):
         yaml_data = yaml_data.read()
+    cache_key = None
+    if __opts__.get('render_cache', False):
+        cache_key = salt.template.render_cache_key(
+            yaml_data, 'yaml', argline,
+            bool(__opts__.get('use_yamlloader_old')))
+        data = salt.template.render_cache_get(cache_key)
+        if data is not None:
+            salt.template.record_render_stat('yaml', 'cache_hits')
+            return data
+        salt.template.record_render_stat('yaml', 'cache_misses')
     with warnings.catch_warnings(record=True) as warn_list:
         try:
             data = yamlloader.load(yaml_data, Loader=get_yaml_loader(argline))
@@ -97,4 +108,7 @@ def render(yaml_data, saltenv='base', sls='', argline='', **kws):
                     _validate_data(item)
 
         _validate_data(data)
+        if cache_key is not None:
+            salt.template.render_cache_set(
+                cache_key, data, __opts__.get('render_cache_size', 128))
         return data
@@ -20,7 +20,6 @@ import salt.utils.atomicfile
 import salt.utils.files
 import salt.utils.jid
 import salt.utils.minions
-import salt.utils.msgpack
 import salt.utils.stringutils
 import salt.exceptions
 
@@ -519,10 +518,10 @@ def save_reg(data):
         else:
             raise
     try:
-        with salt.utils.files.fopen(regfile, 'a') as fh_:
-            salt.utils.msgpack.dump(data, fh_)
+        with salt.utils.atomicfile.atomic_open(regfile, 'wb') as fh_:
+            salt.payload.Serial(__opts__).dump(data, fh_)
     except Exception:
-        log.error('Could not write to msgpack file %s', __opts__['outdir'])
+        log.error('Could not write to msgpack file %s', regfile)
         raise
 
 
@@ -533,8 +532,8 @@ def load_reg():
     reg_dir = _reg_dir()
     regfile = os.path.join(reg_dir, 'register')
     try:
-        with salt.utils.files.fopen(regfile, 'r') as fh_:
-            return salt.utils.msgpack.load(fh_)
+        with salt.utils.files.fopen(regfile, 'rb') as fh_:
+            return salt.payload.Serial(__opts__).load(fh_)
     except Exception:
-        log.error('Could not write to msgpack file %s', __opts__['outdir'])
+        log.error('Could not read msgpack file %s', regfile)
         raise
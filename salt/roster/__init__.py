@@ -8,8 +8,12 @@ systems that cannot or should not host a minion agent.
 from __future__ import absolute_import, print_function, unicode_literals
 
 # Import salt libs
+import salt.cache
+import salt.exceptions
 import salt.loader
 import salt.syspaths
+import salt.utils.hashutils
+import salt.utils.stringutils
 
 import os
 import logging
@@ -59,6 +63,41 @@ def get_roster_file(options):
     return template
 
 
+def cached_inventory(opts, backend, source, parse):
+    '''
+    Return the inventory of a roster backend, as returned by the parse function
+    for the source file. When roster_cache is set, the inventory is kept in
+    the master cache and is only parsed again once the file has changed.
+
+    :param opts: The master options
+    :param backend: The name of the roster backend
+    :param source: The path of the file the inventory is parsed from
+    :param parse: The function parsing the inventory, called without arguments
+    :return:
+    '''
+    if not opts.get('roster_cache', False) or not os.path.isfile(source):
+        return parse()
+    bank = 'roster/inventory'
+    key = salt.utils.hashutils.sha1_digest(salt.utils.stringutils.to_bytes(
+        '{0}:{1}'.format(backend, os.path.abspath(source))))
+    digest = salt.utils.hashutils.get_hash(source, 'sha1')
+    cache = salt.cache.factory(opts)
+    try:
+        cached = cache.fetch(bank, key)
+    except salt.exceptions.SaltCacheError as exc:
+        log.warning('Unable to read the cached %s inventory: %s', backend, exc)
+        cached = None
+    if cached and cached.get('digest') == digest:
+        log.debug('Using the cached %s inventory of %s', backend, source)
+        return cached['data']
+    data = parse()
+    try:
+        cache.store(bank, key, {'digest': digest, 'data': data})
+    except salt.exceptions.SaltCacheError as exc:
+        log.warning('Unable to cache the %s inventory: %s', backend, exc)
+    return data
+
+
 class Roster(object):
     '''
     Used to manage a roster of minions allowing the master to become outwardly
@@ -91,10 +91,11 @@ Any of the [groups] or direct hostnames will return.  The 'all' is special, and
 from __future__ import absolute_import, print_function, unicode_literals
 import copy
 import fnmatch
+import os
 
 # Import Salt libs
 import salt.utils.path
-from salt.roster import get_roster_file
+from salt.roster import cached_inventory, get_roster_file
 
 CONVERSION = {
     'ansible_ssh_host': 'host',
@@ -117,8 +118,17 @@ def targets(tgt, tgt_type='glob', **kwargs):
     Return the targets from the ansible inventory_file
     Default: /etc/salt/roster
     '''
-    inventory = __runner__['salt.cmd']('cmd.run', 'ansible-inventory -i {0} --list'.format(get_roster_file(__opts__)))
-    __context__['inventory'] = __utils__['json.loads'](__utils__['stringutils.to_str'](inventory))
+    roster_file = get_roster_file(__opts__)
+
+    def _parse():
+        inventory = __runner__['salt.cmd']('cmd.run', 'ansible-inventory -i {0} --list'.format(roster_file))
+        return __utils__['json.loads'](__utils__['stringutils.to_str'](inventory))
+
+    if os.access(roster_file, os.X_OK):
+        # Dynamic inventory scripts can return new hosts on every run
+        __context__['inventory'] = _parse()
+    else:
+        __context__['inventory'] = cached_inventory(__opts__, 'ansible', roster_file, _parse)
 
     if tgt_type == 'glob':
         hosts = [host for host in _get_hosts_from_group('all') if fnmatch.fnmatch(host, tgt)]
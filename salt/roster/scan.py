@@ -8,6 +8,7 @@ from __future__ import absolute_import, print_function, unicode_literals
 import socket
 import logging
 import copy
+from multiprocessing.pool import ThreadPool
 
 # Import salt libs
 import salt.utils.network
@@ -55,19 +56,42 @@ class RosterMatcher(object):
                 addrs = ipaddress.ip_network(self.tgt).hosts()
             except ValueError:
                 pass
-        for addr in addrs:
-            addr = six.text_type(addr)
-            ret[addr] = copy.deepcopy(__opts__.get('roster_defaults', {}))
-            log.trace('Scanning host: %s', addr)
-            for port in ports:
-                log.trace('Scanning port: %s', port)
-                try:
-                    sock = salt.utils.network.get_socket(addr, socket.SOCK_STREAM)
-                    sock.settimeout(float(__opts__['ssh_scan_timeout']))
-                    sock.connect((addr, port))
-                    sock.shutdown(socket.SHUT_RDWR)
-                    sock.close()
+        workers = int(__opts__.get('ssh_scan_workers', 1))
+        pool = None
+        if workers > 1:
+            # Probe up to ssh_scan_workers hosts at a time
+            pool = ThreadPool(workers)
+            results = pool.imap(lambda addr: self._probe(addr, ports), addrs)
+        else:
+            results = (self._probe(addr, ports) for addr in addrs)
+        try:
+            for addr, port in results:
+                ret[addr] = copy.deepcopy(__opts__.get('roster_defaults', {}))
+                if port is not None:
                     ret[addr].update({'host': addr, 'port': port})
-                except socket.error:
-                    pass
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
         return ret
+
+    def _probe(self, addr, ports):
+        '''
+        Return the address and the last of the ports it accepts connections
+        on, or None
+        '''
+        addr = six.text_type(addr)
+        found = None
+        log.trace('Scanning host: %s', addr)
+        for port in ports:
+            log.trace('Scanning port: %s', port)
+            try:
+                sock = salt.utils.network.get_socket(addr, socket.SOCK_STREAM)
+                sock.settimeout(float(__opts__['ssh_scan_timeout']))
+                sock.connect((addr, port))
+                sock.shutdown(socket.SHUT_RDWR)
+                sock.close()
+                found = port
+            except socket.error:
+                pass
+        return addr, found
@@ -62,6 +62,7 @@ import os.path
 # Import Salt libs
 import salt.utils.files
 import salt.utils.json
+from salt.roster import cached_inventory
 
 log = logging.getLogger(__name__)
 
@@ -154,7 +155,6 @@ def _parse_state_file(state_file_path='terraform.tfstate'):
 
             if MINION_ID in roster_entry:
                 del roster_entry[MINION_ID]
-            _add_ssh_key(roster_entry)
             ret[minion_id] = roster_entry
     return ret
 
@@ -177,6 +177,9 @@ def targets(tgt, tgt_type='glob', **kwargs):  # pylint: disable=W0613
         log.error("Terraform roster can only be used with terraform state files")
         return {}
 
-    raw = _parse_state_file(roster_file)
+    raw = cached_inventory(__opts__, 'terraform', roster_file,
+                           lambda: _parse_state_file(roster_file))
+    for roster_entry in raw.values():
+        _add_ssh_key(roster_entry)
     log.debug('%s hosts in terraform state file', len(raw))
     return __utils__['roster_matcher.targets'](raw, tgt, tgt_type, 'ipv4')
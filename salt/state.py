@@ -48,7 +48,7 @@ import salt.utils.url
 import salt.syspaths as syspaths
 import salt.transport.client
 from salt.serializers.msgpack import serialize as msgpack_serialize, deserialize as msgpack_deserialize
-from salt.template import compile_template, compile_template_str
+from salt.template import compile_template, compile_template_str, render_stats
 from salt.exceptions import (
     SaltRenderError,
     SaltReqTimeoutError
@@ -754,6 +754,9 @@ class State(object):
                     self.opts.get('pillar_merge_lists', False))
         log.debug('Finished gathering pillar data for state run')
         self.state_con = context or {}
+        # Jinja environments are only reused within a state run, a new run
+        # fetches the templates it imports again.
+        self.state_con.pop('jinja.env_cache', None)
         self.load_modules()
         self.active = set()
         self.mod_init = set()
@@ -4000,6 +4003,8 @@ class BaseHighState(object):
                     all_errors.extend(errors)
 
         self.clean_duplicate_extends(highstate)
+        if self.opts.get('render_cache', False):
+            log.debug('Renderer statistics: %s', render_stats())
         return highstate, all_errors
 
     def clean_duplicate_extends(self, highstate):
@@ -4165,13 +4170,15 @@ class BaseHighState(object):
 
         return high
 
-    def compile_low_chunks(self):
+    def compile_low_chunks(self, matches=None):
         '''
         Compile the highstate but don't run it, return the low chunks to
-        see exactly what the highstate will execute
+        see exactly what the highstate will execute. The top matches are
+        evaluated unless they are passed.
         '''
-        top = self.get_top()
-        matches = self.top_matches(top)
+        if matches is None:
+            top = self.get_top()
+            matches = self.top_matches(top)
         high, errors = self.render_highstate(matches)
 
         # If there is extension data reconcile it
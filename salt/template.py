@@ -9,10 +9,13 @@ from __future__ import absolute_import, print_function, unicode_literals
 import time
 import os
 import codecs
+import copy
 import logging
+import threading
 
 # Import Salt libs
 import salt.utils.data
+import salt.utils.hashutils
 import salt.utils.files
 import salt.utils.stringio
 import salt.utils.versions
@@ -21,9 +24,17 @@ import salt.utils.sanitizers
 # Import 3rd-party libs
 from salt.ext import six
 from salt.ext.six.moves import StringIO
+from salt.utils.odict import OrderedDict
 
 log = logging.getLogger(__name__)
 
+# Per-renderer statistics for this process, see render_stats()
+RENDER_STATS = {}
+
+# Rendered data cached by content hash, see render_cache_get()
+_RENDER_CACHE = OrderedDict()
+_RENDER_CACHE_LOCK = threading.Lock()
+
 
 # FIXME: we should make the default encoding of a .sls file a configurable
 #        option in the config, and default it to 'utf-8'.
@@ -99,12 +110,16 @@ def compile_template(template,
             render_kwargs['argline'] = argline
         start = time.time()
         ret = render(input_data, saltenv, sls, **render_kwargs)
+        rend_name = render.__module__.split('.')[-1]
+        elapsed = time.time() - start
         log.profile(
             'Time (in seconds) to render \'%s\' using \'%s\' renderer: %s',
             template,
-            render.__module__.split('.')[-1],
-            time.time() - start
+            rend_name,
+            elapsed
         )
+        record_render_stat(rend_name, 'calls')
+        record_render_stat(rend_name, 'time', elapsed)
         if ret is None:
             # The file is empty or is being written elsewhere
             time.sleep(0.01)
@@ -139,6 +154,72 @@ def compile_template(template,
     return ret
 
 
+def record_render_stat(renderer, stat, value=1):
+    '''
+    Add value to a statistic of a renderer. compile_template() records the
+    number of ``calls`` and the ``time`` spent in each renderer, renderers
+    record their own statistics such as ``cache_hits``.
+    '''
+    stats = RENDER_STATS.setdefault(renderer, {})
+    stats[stat] = stats.get(stat, 0) + value
+
+
+def render_stats(reset=False):
+    '''
+    Return a copy of the renderer statistics of this process, and optionally
+    reset them
+    '''
+    ret = copy.deepcopy(RENDER_STATS)
+    if reset:
+        RENDER_STATS.clear()
+    return ret
+
+
+def render_cache_key(data, *args):
+    '''
+    Return the render cache key of the data to render, args hold whatever
+    else the result depends on, such as the renderer name and arguments
+    '''
+    return salt.utils.hashutils.sha256_digest(
+        '\0'.join([six.text_type(x) for x in args] + [data]))
+
+
+def render_cache_get(key):
+    '''
+    Return a copy of the data cached for key, or None. A copy is returned
+    so that callers are free to modify it.
+    '''
+    with _RENDER_CACHE_LOCK:
+        try:
+            data = _RENDER_CACHE.pop(key)
+        except KeyError:
+            return None
+        # Move the entry to the end, so that it is evicted last
+        _RENDER_CACHE[key] = data
+    return copy.deepcopy(data)
+
+
+def render_cache_set(key, data, size):
+    '''
+    Cache a copy of rendered data, keeping at most size entries. The least
+    recently used entries are evicted first.
+    '''
+    data = copy.deepcopy(data)
+    with _RENDER_CACHE_LOCK:
+        _RENDER_CACHE.pop(key, None)
+        _RENDER_CACHE[key] = data
+        while len(_RENDER_CACHE) > max(size, 0):
+            _RENDER_CACHE.popitem(last=False)
+
+
+def clear_render_cache():
+    '''
+    Empty the render cache of this process
+    '''
+    with _RENDER_CACHE_LOCK:
+        _RENDER_CACHE.clear()
+
+
 def compile_template_str(template, renderers, default, blacklist, whitelist):
     '''
     Take template as a string and return the high data structure
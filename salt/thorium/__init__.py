@@ -21,6 +21,7 @@ import salt.cache
 import salt.state
 import salt.loader
 import salt.payload
+import salt.utils.stringutils
 from salt.exceptions import SaltRenderError
 
 # Import 3rd-party libs
@@ -28,6 +29,9 @@ from salt.ext import six
 
 log = logging.getLogger(__name__)
 
+# The thorium modules whose functions read the register named after the state
+REGISTER_READERS = frozenset(['calc', 'check'])
+
 
 class ThorState(salt.state.HighState):
     '''
@@ -66,6 +70,8 @@ class ThorState(salt.state.HighState):
         self.event = salt.utils.event.get_master_event(
                 self.opts,
                 self.opts['sock_dir'])
+        # The chunks evaluated at least once, see incremental_chunks
+        self.evaluated = set()
 
     def gather_cache(self):
         '''
@@ -160,6 +166,110 @@ class ThorState(salt.state.HighState):
                 return ret
             ret.append(event)
 
+    @staticmethod
+    def _chunk_key(chunk):
+        return (chunk['state'], chunk['__id__'], chunk['name'], chunk['fun'])
+
+    def incremental_chunks(self, chunks, events):
+        '''
+        Return the chunks to evaluate for the given events when
+        ``thorium_incremental`` is enabled, all of them otherwise.
+
+        The chunks matching events, with a ``match`` argument or ``check.event``,
+        only run when one of the events matches, unless they have a ``window``
+        over which values expire, like ``reg.mean``. The ``check`` and ``calc``
+        chunks only run when the chunks matching events of the same name, which
+        fill the register they read, run. The chunks with requisites only run
+        when one of their requisites does, and then so do all of their
+        requisites. The other chunks, and every chunk the first time, always
+        run.
+        '''
+        if not self.opts.get('thorium_incremental', False):
+            return chunks
+        tags = set(event['tag'] for event in events)
+        changed = set()
+        dirty = set()
+        for idx, chunk in enumerate(chunks):
+            match = chunk.get('match')
+            if match is None and chunk['state'] == 'check' and chunk['fun'] == 'event':
+                match = chunk['name']
+            if match is None:
+                continue
+            # Values expire from a window even without matching events
+            if self._chunk_key(chunk) not in self.evaluated or chunk.get('window') or \
+                    any(salt.utils.stringutils.expr_match(tag, match) for tag in tags):
+                dirty.add(idx)
+                changed.add(chunk['name'])
+
+        requisites = {}
+        for idx, chunk in enumerate(chunks):
+            if idx in dirty:
+                continue
+            reqs = []
+            for keyword in salt.state.STATE_REQUISITE_KEYWORDS:
+                if not isinstance(chunk.get(keyword), list):
+                    continue
+                for req in chunk[keyword]:
+                    if not isinstance(req, dict):
+                        continue
+                    for state, ref in six.iteritems(req):
+                        reqs.extend(
+                            ridx for ridx, rchunk in enumerate(chunks)
+                            if rchunk['state'] == state and ref in (rchunk['__id__'], rchunk['name'])
+                        )
+            if reqs:
+                requisites[idx] = reqs
+            elif chunk.get('match') is not None or \
+                    (chunk['state'] == 'check' and chunk['fun'] == 'event'):
+                continue
+            elif chunk['state'] in REGISTER_READERS and \
+                    self._chunk_key(chunk) in self.evaluated and \
+                    chunk['name'] not in changed:
+                continue
+            else:
+                dirty.add(idx)
+        for idx in requisites:
+            if self._chunk_key(chunks[idx]) not in self.evaluated:
+                dirty.add(idx)
+
+        # Run the chunks whose requisites run, until no more are added
+        added = True
+        while added:
+            added = False
+            for idx, reqs in six.iteritems(requisites):
+                if idx not in dirty and dirty.intersection(reqs):
+                    dirty.add(idx)
+                    added = True
+
+        # The requisites of the chunks which run have to run too
+        todo = list(dirty)
+        while todo:
+            for ridx in requisites.get(todo.pop(), ()):
+                if ridx not in dirty:
+                    dirty.add(ridx)
+                    todo.append(ridx)
+
+        ret = [chunk for idx, chunk in enumerate(chunks) if idx in dirty]
+        self.evaluated.update(self._chunk_key(chunk) for chunk in ret)
+        log.trace('Thorium evaluating %d of %d chunks', len(ret), len(chunks))  # pylint: disable=no-member
+        return ret
+
+    def save_reg(self):
+        '''
+        Save the register through the register_returner, sets are saved as
+        lists
+        '''
+        regdata = {}
+        for name, reg in six.iteritems(self.state.inject_globals['__reg__']):
+            regdata[name] = dict(
+                (key, sorted(val, key=repr) if isinstance(val, set) else val)
+                for key, val in six.iteritems(reg)
+            )
+        try:
+            self.returners['{0}.save_reg'.format(self.reg_ret)](regdata)
+        except Exception as exc:
+            log.error('Unable to save the thorium register: %s', exc)
+
     def call_runtime(self):
         '''
         Execute the runtime
@@ -176,7 +286,7 @@ class ThorState(salt.state.HighState):
                 continue
             start = time.time()
             self.state.inject_globals['__events__'] = events
-            self.state.call_chunks(chunks)
+            self.state.call_chunks(self.incremental_chunks(chunks, events))
             elapsed = time.time() - start
             left = interval - elapsed
             if left > 0:
@@ -186,5 +296,5 @@ class ThorState(salt.state.HighState):
                 cache = self.gather_cache()
                 chunks = self.get_chunks()
                 if self.reg_ret is not None:
-                    self.returners['{0}.save_reg'.format(self.reg_ret)](chunks)
+                    self.save_reg()
                 r_start = time.time()
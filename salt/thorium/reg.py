@@ -6,6 +6,8 @@ values are stored and computed, such as averages etc.
 
 # import python libs
 from __future__ import absolute_import, division, print_function, unicode_literals
+import time
+
 import salt.utils.stringutils
 
 __func_alias__ = {
@@ -34,6 +36,9 @@ def set_(name, add, match):
     if name not in __reg__:
         __reg__[name] = {}
         __reg__[name]['val'] = set()
+    elif not isinstance(__reg__[name]['val'], set):
+        # Sets are saved as lists by the register_returner
+        __reg__[name]['val'] = set(__reg__[name]['val'])
     for event in __events__:
         if salt.utils.stringutils.expr_match(event['tag'], match):
             try:
@@ -53,7 +58,7 @@ def list_(name, add, match, stamp=False, prune=0):
 
     If ``stamp`` is True, then the timestamp from the event will also be added
     if ``prune`` is set to an integer higher than ``0``, then only the last
-    ``prune`` values will be kept in the list.
+    ``prune`` values will be kept in the list, as in a ring buffer.
 
     USAGE:
 
@@ -87,17 +92,20 @@ def list_(name, add, match, stamp=False, prune=0):
                     if stamp is True:
                         item['time'] = event['data']['_stamp']
             __reg__[name]['val'].append(item)
-    if prune > 0:
-        __reg__[name]['val'] = __reg__[name]['val'][:prune]
+    if prune > 0 and len(__reg__[name]['val']) > prune:
+        del __reg__[name]['val'][:-prune]
     return ret
 
 
-def mean(name, add, match):
+def mean(name, add, match, window=0):
     '''
     Accept a numeric value from the matched events and store a running average
     of the values in the given register. If the specified value is not numeric
     it will be skipped
 
+    If ``window`` is set to a number of seconds higher than ``0``, the average
+    is only taken over the values received in the last ``window`` seconds.
+
     USAGE:
 
     .. code-block:: yaml
@@ -106,6 +114,7 @@ def mean(name, add, match):
           reg.mean:
             - add: data_field
             - match: my/custom/event
+            - window: 300
     '''
     ret = {'name': name,
            'changes': {},
@@ -116,20 +125,37 @@ def mean(name, add, match):
         __reg__[name]['val'] = 0
         __reg__[name]['total'] = 0
         __reg__[name]['count'] = 0
+    reg = __reg__[name]
+    now = time.time()
+    if window > 0:
+        # [[receive time, value], ...] in the order received
+        values = reg.setdefault('window', [])
+        expired = 0
+        for stamp, comp in values:
+            if now - stamp <= window:
+                break
+            reg['total'] -= comp
+            reg['count'] -= 1
+            expired += 1
+        if expired:
+            del values[:expired]
     for event in __events__:
         try:
             event_data = event['data']['data']
         except KeyError:
             event_data = event['data']
         if salt.utils.stringutils.expr_match(event['tag'], match):
-            if add in event_data:
-                try:
-                    comp = int(event_data)
-                except ValueError:
-                    continue
-            __reg__[name]['total'] += comp
-            __reg__[name]['count'] += 1
-            __reg__[name]['val'] = __reg__[name]['total'] / __reg__[name]['count']
+            if add not in event_data:
+                continue
+            try:
+                comp = int(event_data[add])
+            except (TypeError, ValueError):
+                continue
+            reg['total'] += comp
+            reg['count'] += 1
+            if window > 0:
+                values.append([now, comp])
+    reg['val'] = reg['total'] / reg['count'] if reg['count'] else 0
     return ret
 
 
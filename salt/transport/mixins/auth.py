@@ -405,6 +405,10 @@ class AESReqServerMixin(object):
                     'load': {'ret': False}}
 
         log.info('Authentication accepted from %s', load['id'])
+        if load.get('syndic') and self.opts.get('order_masters'):
+            # Publishes are only narrowed down to the syndics with matching
+            # minions once all of the known syndics have reported them
+            salt.utils.minions.register_syndic(self.opts, load['id'])
         # only write to disk if you are adding the file, and in open mode,
         # which implies we accept any key from a minion.
         if not os.path.isfile(pubfn) and not self.opts['open_mode']:
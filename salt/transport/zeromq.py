@@ -411,6 +411,12 @@ class AsyncZeroMQPubChannel(salt.transport.mixins.auth.AESPubClientMixin, salt.t
             self._socket.setsockopt(zmq.SUBSCRIBE, b'broadcast')
             if self.opts.get('__role') == 'syndic':
                 self._socket.setsockopt(zmq.SUBSCRIBE, b'syndic')
+                if self.opts.get('syndic_membership', False):
+                    # Publishes sent only to the syndics with matching minions
+                    self._socket.setsockopt(
+                        zmq.SUBSCRIBE,
+                        salt.utils.stringutils.to_bytes(self.hexid)
+                    )
             else:
                 self._socket.setsockopt(
                     zmq.SUBSCRIBE,
@@ -540,8 +546,14 @@ class AsyncZeroMQPubChannel(salt.transport.mixins.auth.AESPubClientMixin, salt.t
         # 2 includes a header which says who should do it
         elif messages_len == 2:
             message_target = salt.utils.stringutils.to_str(messages[0])
-            if (self.opts.get('__role') != 'syndic' and message_target not in ('broadcast', self.hexid)) or \
-                (self.opts.get('__role') == 'syndic' and message_target not in ('broadcast', 'syndic')):
+            if self.opts.get('__role') != 'syndic':
+                targets = ('broadcast', self.hexid)
+            elif self.opts.get('syndic_membership', False):
+                # Publishes sent only to the syndics with matching minions
+                targets = ('broadcast', 'syndic', self.hexid)
+            else:
+                targets = ('broadcast', 'syndic')
+            if message_target not in targets:
                 log.debug('Publish received for not this minion: %s', message_target)
                 raise tornado.gen.Return(None)
             payload = self.serial.loads(messages[1])
@@ -930,7 +942,17 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
                                 log.trace('Filtered data has been sent')
 
                             # Syndic broadcast
-                            if self.opts.get('order_masters'):
+                            if self.opts.get('order_masters') and 'syndic_lst' in unpacked_package:
+                                # Only the syndics with matching minions, which
+                                # did not get it from the topic list already
+                                for syndic_id in unpacked_package['syndic_lst']:
+                                    if syndic_id in unpacked_package['topic_lst']:
+                                        continue
+                                    log.trace('Sending filtered data to syndic %s', syndic_id)
+                                    htopic = salt.utils.stringutils.to_bytes(hashlib.sha1(salt.utils.stringutils.to_bytes(syndic_id)).hexdigest())
+                                    pub_sock.send(htopic, flags=zmq.SNDMORE)
+                                    pub_sock.send(payload)
+                            elif self.opts.get('order_masters'):
                                 log.trace('Sending filtered data to syndic')
                                 pub_sock.send(b'syndic', flags=zmq.SNDMORE)
                                 pub_sock.send(payload)
@@ -1046,6 +1068,11 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
             log.debug("Publish Side Match: %s", match_ids)
             # Send list of miions thru so zmq can target them
             int_payload['topic_lst'] = match_ids
+            if self.opts.get('order_masters') and self.opts.get('syndic_membership', False):
+                syndics = self.ckminions.check_syndics(load['tgt'], load['tgt_type'])
+                if syndics is not None:
+                    log.debug("Publish Side Syndic Match: %s", syndics)
+                    int_payload['syndic_lst'] = syndics
         payload = self.serial.dumps(int_payload)
         log.debug(
             'Sending payload to publish daemon. jid=%s size=%d',
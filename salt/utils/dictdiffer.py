@@ -13,8 +13,11 @@
 '''
 from __future__ import absolute_import, print_function, unicode_literals
 import copy
+import hashlib
 from collections import Mapping
 from salt.ext import six
+import salt.utils.json
+import salt.utils.stringutils
 
 
 def diff(current_dict, past_dict):
@@ -80,6 +83,95 @@ def deep_diff(old, new, ignore=None):
     return res
 
 
+def _canonical(data):
+    '''
+    Return ``data`` with the dictionaries turned into lists of key/value
+    pairs sorted by key, so that it serializes the same way regardless of
+    the ordering of the keys
+    '''
+    if isinstance(data, Mapping):
+        return [[_canonical(key), _canonical(val)]
+                for key, val in sorted(six.iteritems(data),
+                                       key=lambda item: six.text_type(item[0]))]
+    if isinstance(data, (list, tuple)):
+        return [_canonical(item) for item in data]
+    return data
+
+
+def data_hash(data):
+    '''
+    Return a sha256 hex digest of the content of ``data``. The digest does
+    not depend on the ordering of dictionary keys, nor on the difference
+    between lists and tuples, so it is stable across a round-trip through
+    the transport or the cache.
+    '''
+    return hashlib.sha256(
+        salt.utils.stringutils.to_bytes(
+            salt.utils.json.dumps(_canonical(data), default=repr)
+        )
+    ).hexdigest()
+
+
+def _changes(old, new):
+    changes = {}
+    for key in old:
+        if key not in new:
+            changes.setdefault('del', []).append(key)
+    for key, val in six.iteritems(new):
+        if key in old:
+            if old[key] == val:
+                continue
+            if isinstance(old[key], Mapping) and isinstance(val, Mapping):
+                changes.setdefault('sub', {})[key] = _changes(old[key], val)
+                continue
+        changes.setdefault('set', {})[key] = val
+    return changes
+
+
+def _apply_changes(data, changes):
+    for key in changes.get('del', []):
+        data.pop(key, None)
+    for key, val in six.iteritems(changes.get('set', {})):
+        data[key] = val
+    for key, sub in six.iteritems(changes.get('sub', {})):
+        if not isinstance(data.get(key), dict):
+            data[key] = {}
+        _apply_changes(data[key], sub)
+
+
+def delta(old, new):
+    '''
+    Return the structural difference between the dictionaries ``old`` and
+    ``new``, to be applied to a copy of ``old`` with :py:func:`apply_delta`.
+
+    The delta holds the hashes of both dictionaries and the changes, which
+    are made of the keys to set (``set``), the keys to delete (``del``) and
+    the changes to nested dictionaries (``sub``). If nothing changed, the
+    delta only holds the hashes.
+    '''
+    return {'base': data_hash(old),
+            'hash': data_hash(new),
+            'changes': _changes(old, new)}
+
+
+def apply_delta(data, delta_):
+    '''
+    Apply a delta returned by :py:func:`delta` to a copy of ``data`` and
+    return it. ``None`` is returned if ``data`` is not the dictionary the
+    delta was computed against, in which case the sender needs to send the
+    full dictionary again.
+    '''
+    if not isinstance(data, Mapping) or not isinstance(delta_, Mapping):
+        return None
+    if data_hash(data) != delta_.get('base'):
+        return None
+    data = copy.deepcopy(dict(data))
+    _apply_changes(data, delta_.get('changes', {}))
+    if data_hash(data) != delta_.get('hash'):
+        return None
+    return data
+
+
 def recursive_diff(past_dict, current_dict, ignore_missing_keys=True):
     '''
     Returns a RecursiveDictDiffer object that computes the recursive diffs
@@ -5,6 +5,7 @@ Classes which provide the shared base for GitFS, git_pillar, and winrepo
 
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import binascii
 import contextlib
 import copy
 import errno
@@ -13,17 +14,23 @@ import glob
 import hashlib
 import logging
 import os
+import posixpath
 import shlex
 import shutil
 import stat
 import subprocess
 import sys
+import tempfile
+import threading
 import time
 import tornado.ioloop
 import weakref
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 
 # Import salt libs
+import salt.payload
+import salt.utils.atomicfile
 import salt.utils.configparser
 import salt.utils.data
 import salt.utils.files
@@ -40,6 +47,10 @@ import salt.fileserver
 from salt.config import DEFAULT_MASTER_OPTS as _DEFAULT_MASTER_OPTS
 from salt.utils.odict import OrderedDict
 from salt.utils.process import os_is_running as pid_exists
+
+# Serializes the cache maintenance done by concurrent updates of single
+# remotes in the same process, see fileserver_update_workers
+_UPDATE_LOCK = threading.Lock()
 from salt.exceptions import (
     FileserverConfigError,
     GitLockError,
@@ -61,6 +72,11 @@ GLOBAL_ONLY = ()
 
 SYMLINK_RECURSE_DEPTH = 100
 
+# Number of root tree indexes kept in memory by a GitFS instance, and the
+# number of paths held by its subtree indexes before they are dropped
+TREE_INDEX_CACHE_SIZE = 32
+TREE_INDEX_MEMO_SIZE = 200000
+
 # Auth support (auth params can be global or per-remote, too)
 AUTH_PROVIDERS = ('pygit2',)
 AUTH_PARAMS = ('user', 'password', 'pubkey', 'privkey', 'passphrase',
@@ -772,6 +788,13 @@ class GitProvider(object):
         '''
         try:
             with self.gen_lock(lock_type='update'):
+                if self.opts.get('{0}_fetch_on_change'.format(self.role),
+                                 False) and self.remote_unchanged():
+                    log.debug(
+                        'Refs for %s remote \'%s\' are unchanged, skipping '
+                        'fetch', self.role, self.id
+                    )
+                    return None
                 log.debug('Fetching %s remote \'%s\'', self.role, self.id)
                 # Run provider-specific fetch code
                 return self._fetch()
@@ -999,6 +1022,62 @@ class GitProvider(object):
         '''
         raise NotImplementedError()
 
+    def get_blob(self, blob_sha):
+        '''
+        This function must be overridden in a sub-class
+        '''
+        raise NotImplementedError()
+
+    def local_refs(self):
+        '''
+        This function must be overridden in a sub-class
+        '''
+        raise NotImplementedError()
+
+    def ls_remote(self):
+        '''
+        This function must be overridden in a sub-class
+        '''
+        raise NotImplementedError()
+
+    def remote_unchanged(self):
+        '''
+        Compare the heads and tags advertised by the remote to the ones which
+        were fetched into the local copy. Return True if they match, meaning
+        that a fetch would not update anything. Remotes with custom refspecs
+        are always fetched.
+        '''
+        default_refspecs = _DEFAULT_MASTER_OPTS.get(
+            '{0}_refspecs'.format(self.role))
+        if sorted(self.refspecs) != sorted(default_refspecs or []):
+            return False
+        try:
+            remote_refs = self.ls_remote()
+        except Exception as exc:
+            log.debug(
+                'Unable to list refs for %s remote \'%s\': %s',
+                self.role, self.id, exc
+            )
+            return False
+        if not remote_refs:
+            return False
+
+        remote_refs = dict(
+            (name, sha) for name, sha in remote_refs
+            if name.startswith(('refs/heads/', 'refs/tags/'))
+            and not name.endswith('^{}')
+        )
+        local_refs = {}
+        for name, sha in self.local_refs():
+            if name.startswith('refs/remotes/origin/'):
+                name = 'refs/heads/' + name[len('refs/remotes/origin/'):]
+                if name == 'refs/heads/HEAD':
+                    continue
+            elif not name.startswith('refs/tags/'):
+                continue
+            local_refs[name] = sha
+        return remote_refs == local_refs
+
     def get_checkout_target(self):
         '''
         Resolve dynamically-set branch
@@ -1103,6 +1182,18 @@ class GitProvider(object):
         '''
         pass
 
+    def tree_entries(self, tree):
+        '''
+        This function must be overridden in a sub-class
+        '''
+        raise NotImplementedError()
+
+    def tree_sha(self, tree):
+        '''
+        This function must be overridden in a sub-class
+        '''
+        raise NotImplementedError()
+
     def verify_auth(self):
         '''
         Override this function in a sub-class to implement auth checking.
@@ -1368,6 +1459,32 @@ class GitPython(GitProvider):
             return blob, blob.hexsha, blob.mode
         return None, None, None
 
+    def get_blob(self, blob_sha):
+        '''
+        Return a git.Blob object matching a blob SHA
+        '''
+        return git.Blob(self.repo, binascii.a2b_hex(blob_sha))
+
+    def local_refs(self):
+        '''
+        Return a list of (refname, sha) tuples for the local refs
+        '''
+        return [(ref.path, ref.object.hexsha) for ref in self.repo.refs]
+
+    def ls_remote(self):
+        '''
+        Return a list of (refname, sha) tuples for the refs advertised by the
+        remote, using ``git ls-remote``
+        '''
+        ret = []
+        for line in self.repo.git.ls_remote('origin').splitlines():
+            try:
+                sha, name = line.split(None, 1)
+            except ValueError:
+                continue
+            ret.append((name.strip(), sha))
+        return ret
+
     def get_tree_from_branch(self, ref):
         '''
         Return a git.Tree object matching a head ref fetched into
@@ -1400,6 +1517,28 @@ class GitPython(GitProvider):
         except (gitdb.exc.ODBError, AttributeError):
             return None
 
+    def tree_entries(self, tree):
+        '''
+        Yield a (name, sha, mode, subtree, size, link_tgt) tuple for each
+        blob and tree in a git.Tree object. subtree is None for blobs, and
+        link_tgt is only set for symlinks.
+        '''
+        for obj in tree:
+            if isinstance(obj, git.Tree):
+                yield obj.name, obj.hexsha, obj.mode, obj, None, None
+            elif isinstance(obj, git.Blob):
+                link_tgt = None
+                if stat.S_ISLNK(obj.mode):
+                    link_tgt = salt.utils.stringutils.to_unicode(
+                        obj.data_stream.read())
+                yield obj.name, obj.hexsha, obj.mode, None, obj.size, link_tgt
+
+    def tree_sha(self, tree):
+        '''
+        Return the SHA of a git.Tree object
+        '''
+        return tree.hexsha
+
     def write_file(self, blob, dest):
         '''
         Using the blob object, write the file to the destination path
@@ -1780,6 +1919,13 @@ class Pygit2(GitProvider):
             # pygit2.Remote.fetch() returns a class instance in
             # pygit2 >= 0.21.0
             received_objects = fetch_results.received_objects
+        try:
+            self.received_bytes = fetch_results['received_bytes']
+        except (AttributeError, TypeError):
+            self.received_bytes = getattr(
+                fetch_results, 'received_bytes', None)
+        except KeyError:
+            pass
         if received_objects != 0:
             log.debug(
                 '%s received %s objects for remote \'%s\'',
@@ -1890,6 +2036,38 @@ class Pygit2(GitProvider):
             return blob, blob.hex, mode
         return None, None, None
 
+    def get_blob(self, blob_sha):
+        '''
+        Return a pygit2.Blob object matching a blob SHA
+        '''
+        return self.repo[blob_sha]
+
+    def local_refs(self):
+        '''
+        Return a list of (refname, sha) tuples for the local refs
+        '''
+        return [
+            (name, six.text_type(
+                self.repo.lookup_reference(name).resolve().target))
+            for name in self.repo.listall_references()
+        ]
+
+    def ls_remote(self):
+        '''
+        Return a list of (refname, sha) tuples for the refs advertised by the
+        remote. Listing remote refs requires pygit2 1.4.0 or newer, None is
+        returned for older versions so that the remote is always fetched.
+        '''
+        origin = self.repo.remotes[0]
+        if not hasattr(origin, 'ls_remotes'):
+            return None
+        if self.credentials is not None and self.remotecallbacks is None:
+            origin.credentials = self.credentials
+        return [
+            (head['name'], six.text_type(head['oid']))
+            for head in origin.ls_remotes(callbacks=self.remotecallbacks)
+        ]
+
     def get_tree_from_branch(self, ref):
         '''
         Return a pygit2.Tree object matching a head ref fetched into
@@ -1943,6 +2121,32 @@ class Pygit2(GitProvider):
                     )
                 )
 
+    def tree_entries(self, tree):
+        '''
+        Yield a (name, sha, mode, subtree, size, link_tgt) tuple for each
+        blob and tree in a pygit2.Tree object. subtree is None for blobs, and
+        link_tgt is only set for symlinks.
+        '''
+        for entry in iter(tree):
+            if entry.oid not in self.repo:
+                # Entry is a submodule, skip it
+                continue
+            obj = self.repo[entry.oid]
+            if isinstance(obj, pygit2.Tree):
+                yield entry.name, obj.hex, entry.filemode, obj, None, None
+            elif isinstance(obj, pygit2.Blob):
+                link_tgt = None
+                if stat.S_ISLNK(entry.filemode):
+                    link_tgt = salt.utils.stringutils.to_unicode(obj.data)
+                yield entry.name, obj.hex, entry.filemode, None, obj.size, \
+                    link_tgt
+
+    def tree_sha(self, tree):
+        '''
+        Return the SHA of a pygit2.Tree object
+        '''
+        return tree.hex
+
     def verify_auth(self):
         '''
         Check the username and password/keypair info for validity. If valid,
@@ -2138,8 +2342,15 @@ class GitBase(object):
             self.remote_root = salt.utils.path.join(self.cache_root, 'remotes')
         self.env_cache = salt.utils.path.join(self.cache_root, 'envs.p')
         self.hash_cachedir = salt.utils.path.join(self.cache_root, 'hash')
+        self.tree_index_dir = salt.utils.path.join(self.cache_root,
+                                                   'tree_index')
+        self.blob_cachedir = salt.utils.path.join(self.cache_root, 'blobs')
+        self._tree_indexes = {}
+        self._subtree_indexes = {}
+        self._subtree_index_size = 0
         self.file_list_cachedir = salt.utils.path.join(
             self.opts['cachedir'], 'file_lists', self.role)
+        self.fetch_stats = {}
         if init_remotes:
             self.init_remotes(
                 remotes if remotes is not None else [],
@@ -2288,7 +2499,7 @@ class GitBase(object):
                 pass
         to_remove = []
         for item in cachedir_ls:
-            if item in ('hash', 'refs'):
+            if item in ('hash', 'refs', 'tree_index', 'blobs'):
                 continue
             path = salt.utils.path.join(self.cache_root, item)
             if os.path.isdir(path):
@@ -2364,27 +2575,100 @@ class GitBase(object):
             )
             remotes = []
 
+        repos = [repo for repo in self.remotes
+                 if not remotes
+                 or (repo.id, getattr(repo, 'name', None)) in remotes]
+        self.fetch_stats = {}
+        workers = self.opts.get('{0}_fetch_workers'.format(self.role), 1)
+        if workers > 1 and len(repos) > 1:
+            return self._fetch_remotes_parallel(repos, workers)
+
         changed = False
-        for repo in self.remotes:
-            name = getattr(repo, 'name', None)
-            if not remotes or (repo.id, name) in remotes:
-                try:
-                    if repo.fetch():
-                        # We can't just use the return value from repo.fetch()
-                        # because the data could still have changed if old
-                        # remotes were cleared above. Additionally, we're
-                        # running this in a loop and later remotes without
-                        # changes would override this value and make it
-                        # incorrect.
-                        changed = True
-                except Exception as exc:
-                    log.error(
-                        'Exception caught while fetching %s remote \'%s\': %s',
-                        self.role, repo.id, exc,
-                        exc_info=True
-                    )
+        for repo in repos:
+            repo_changed, self.fetch_stats[repo.id] = self._fetch_remote(repo)
+            if repo_changed:
+                # We can't just use the return value from repo.fetch()
+                # because the data could still have changed if old
+                # remotes were cleared above. Additionally, we're
+                # running this in a loop and later remotes without
+                # changes would override this value and make it
+                # incorrect.
+                changed = True
         return changed
 
+    def _fetch_remote(self, repo, started=None):
+        '''
+        Fetch a single remote. Returns whether or not the remote changed, and
+        the stats of the fetch: how long it took and how many bytes were
+        received (if the provider reports it).
+        '''
+        start = time.time()
+        if started is not None:
+            started[repo.id] = start
+        repo.received_bytes = None
+        try:
+            changed = bool(repo.fetch())
+        except Exception as exc:
+            log.error(
+                'Exception caught while fetching %s remote \'%s\': %s',
+                self.role, repo.id, exc,
+                exc_info=True
+            )
+            changed = False
+        duration = time.time() - start
+        log.debug(
+            'Fetched %s remote \'%s\' in %.3f seconds (%s bytes received)',
+            self.role, repo.id, duration,
+            'unknown' if repo.received_bytes is None else repo.received_bytes
+        )
+        return changed, {'duration': round(duration, 3),
+                         'bytes': repo.received_bytes,
+                         'changed': changed}
+
+    def _fetch_remotes_parallel(self, repos, workers):
+        '''
+        Fetch remotes using a pool of threads. A remote which takes longer than
+        the fetch timeout to fetch is no longer waited for. Its fetch carries
+        on in the background while holding the remote's update lock, so the
+        next update will skip it if it is still running. Its stats are only
+        recorded by this function, so a fetch which completes late can not
+        write to the stats of a later update.
+        '''
+        timeout = self.opts.get('{0}_fetch_timeout'.format(self.role), 0)
+        started = {}
+        pool = ThreadPool(min(workers, len(repos)))
+        try:
+            pending = dict(
+                (repo.id,
+                 pool.apply_async(self._fetch_remote, (repo, started)))
+                for repo in repos)
+            changed = False
+            while pending:
+                for repo_id, result in list(pending.items()):
+                    if result.ready():
+                        del pending[repo_id]
+                        repo_changed, self.fetch_stats[repo_id] = result.get()
+                        if repo_changed:
+                            changed = True
+                    elif timeout and repo_id in started \
+                            and time.time() - started[repo_id] > timeout:
+                        del pending[repo_id]
+                        self.fetch_stats[repo_id] = {'duration': None,
+                                                     'bytes': None,
+                                                     'changed': False,
+                                                     'timed_out': True}
+                        log.warning(
+                            'Fetch of %s remote \'%s\' did not complete '
+                            'within %s seconds, no longer waiting for it',
+                            self.role, repo_id, timeout
+                        )
+                if pending:
+                    next(iter(pending.values())).wait(0.1)
+            return changed
+        finally:
+            # Don't join, a timed out fetch must not hold up the update
+            pool.close()
+
     def lock(self, remote=None):
         '''
         Place an update.lk
@@ -2421,9 +2705,36 @@ class GitBase(object):
         data = {'changed': False,
                 'backend': 'gitfs'}
 
-        data['changed'] = self.clear_old_remotes()
+        with _UPDATE_LOCK:
+            data['changed'] = self.clear_old_remotes()
         if self.fetch_remotes(remotes=remotes):
             data['changed'] = True
+        data['fetch_stats'] = self.fetch_stats
+
+        # The fetches of single remotes may run in parallel, the caches
+        # shared by all remotes are updated by one of them at a time.
+        with _UPDATE_LOCK:
+            self._update_caches(data)
+
+        # if there is a change, fire an event
+        if self.opts.get('fileserver_events', False):
+            event = salt.utils.event.get_event(
+                    'master',
+                    self.opts['sock_dir'],
+                    self.opts['transport'],
+                    opts=self.opts,
+                    listen=False)
+            event.fire_event(
+                data,
+                tagify(['gitfs', 'update'], prefix='fileserver')
+            )
+
+    def _update_caches(self, data):
+        '''
+        Refresh the env cache, file list generation and the cached files once
+        the remotes have been fetched
+        '''
+        self.clear_old_tree_cache()
 
         # A masterless minion will need a new env cache file even if no changes
         # were fetched.
@@ -2438,22 +2749,14 @@ class GitBase(object):
         if refresh_env_cache:
             new_envs = self.envs(ignore_cache=True)
             serial = salt.payload.Serial(self.opts)
-            with salt.utils.files.fopen(self.env_cache, 'wb+') as fp_:
+            with salt.utils.atomicfile.atomic_open(self.env_cache, 'wb+') as fp_:
                 fp_.write(serial.dumps(new_envs))
                 log.trace('Wrote env cache data to %s', self.env_cache)
 
-        # if there is a change, fire an event
-        if self.opts.get('fileserver_events', False):
-            event = salt.utils.event.get_event(
-                    'master',
-                    self.opts['sock_dir'],
-                    self.opts['transport'],
-                    opts=self.opts,
-                    listen=False)
-            event.fire_event(
-                data,
-                tagify(['gitfs', 'update'], prefix='fileserver')
-            )
+        if data['changed'] is True or salt.fileserver.get_file_list_generation(
+                self.file_list_cachedir) is None:
+            salt.fileserver.bump_file_list_generation(
+                self.opts, self.file_list_cachedir)
         try:
             salt.fileserver.reap_fileserver_cache_dir(
                 self.hash_cachedir,
@@ -2801,9 +3104,19 @@ class GitFS(GitBase):
             if repo.root(tgt_env):
                 repo_path = salt.utils.path.join(repo.root(tgt_env), repo_path)
 
-            blob, blob_hexsha, blob_mode = repo.find_file(repo_path, tgt_env)
-            if blob is None:
-                continue
+            if self.opts.get('gitfs_tree_index', False):
+                # Only the blob SHA is needed to tell whether the cached copy
+                # is current, the blob itself is only read to write it out.
+                blob = None
+                blob_hexsha, blob_mode = \
+                    self._indexed_find_file(repo, repo_path, tgt_env)
+                if blob_hexsha is None:
+                    continue
+            else:
+                blob, blob_hexsha, blob_mode = \
+                    repo.find_file(repo_path, tgt_env)
+                if blob is None:
+                    continue
 
             def _add_file_stat(fnd, mode):
                 '''
@@ -2840,7 +3153,17 @@ class GitFS(GitBase):
                 except Exception:
                     pass
             # Write contents of file to their destination in the FS cache
-            repo.write_file(blob, dest)
+            if blob is None:
+                self._link_blob(repo, blob_hexsha, dest)
+            else:
+                # dest may be a hard link into the blob cache if the tree
+                # index was used before, so replace it instead of writing
+                # through it.
+                try:
+                    os.remove(dest)
+                except OSError:
+                    pass
+                repo.write_file(blob, dest)
             with salt.utils.files.fopen(blobshadest, 'w+') as fp_:
                 fp_.write(blob_hexsha)
             try:
@@ -2855,6 +3178,269 @@ class GitFS(GitBase):
         # so the calling function knows the file could not be found.
         return fnd
 
+    def tree_index(self, repo, tgt_env):
+        '''
+        Return the index of the tree that tgt_env points to in the repo, or
+        None if the ref does not exist. The index maps each path in the tree
+        to a [blob_sha, mode, size] list under the ``files`` key, and also
+        holds the symlink targets and the directories of the tree.
+
+        Indexes are keyed by tree SHA and kept on disk, so they are built once
+        per tree and shared by every ref, commit and remote that points at
+        it. Subtrees which were already indexed are reused while building.
+        '''
+        tree = repo.get_tree(tgt_env)
+        if not tree:
+            return None
+        tree_sha = repo.tree_sha(tree)
+        try:
+            return self._tree_indexes[tree_sha]
+        except KeyError:
+            pass
+
+        index = self._read_tree_index(tree_sha)
+        if index is None:
+            start = time.time()
+            index = self._index_tree(repo, tree)
+            log.debug(
+                '%s indexed tree %s for remote \'%s\' (%d files) in %.3fs',
+                self.role, tree_sha, repo.id, len(index['files']),
+                time.time() - start
+            )
+            index_path = salt.utils.path.join(self.tree_index_dir,
+                                              '{0}.p'.format(tree_sha))
+            serial = salt.payload.Serial(self.opts)
+            try:
+                if not os.path.isdir(self.tree_index_dir):
+                    os.makedirs(self.tree_index_dir)
+                with salt.utils.atomicfile.atomic_open(index_path, 'wb') as fp_:
+                    fp_.write(serial.dumps(index))
+            except (IOError, OSError) as exc:
+                log.error('Unable to write tree index %s: %s', index_path, exc)
+
+        if len(self._tree_indexes) >= TREE_INDEX_CACHE_SIZE:
+            self._tree_indexes.clear()
+        self._tree_indexes[tree_sha] = index
+        return index
+
+    def _read_tree_index(self, tree_sha):
+        '''
+        Return the index of a tree from memory or disk, or None if it has not
+        been built yet
+        '''
+        try:
+            return self._tree_indexes[tree_sha]
+        except KeyError:
+            pass
+        index_path = salt.utils.path.join(self.tree_index_dir,
+                                          '{0}.p'.format(tree_sha))
+        serial = salt.payload.Serial(self.opts)
+        try:
+            with salt.utils.files.fopen(index_path, 'rb') as fp_:
+                return salt.utils.data.decode(serial.load(fp_))
+        except (IOError, OSError) as exc:
+            if exc.errno != errno.ENOENT:
+                log.debug('Unable to read tree index %s: %s', index_path, exc)
+        except Exception as exc:
+            log.debug('Unable to read tree index %s: %s', index_path, exc)
+        return None
+
+    def clear_old_tree_cache(self):
+        '''
+        Remove the tree indexes and cached blobs which are not referenced by
+        the trees that the refs of the remotes currently point at. Indexes of
+        current trees are not built here, their blobs are written again once
+        a file from them is requested.
+        '''
+        indexes = {}
+        if self.opts.get('{0}_tree_index'.format(self.role), False):
+            for repo in self.remotes:
+                for tgt_env in self.envs():
+                    try:
+                        tree = repo.get_tree(tgt_env)
+                    except Exception as exc:
+                        log.debug(
+                            'Unable to get tree for %s remote \'%s\', '
+                            'saltenv \'%s\': %s',
+                            self.role, repo.id, tgt_env, exc
+                        )
+                        continue
+                    if not tree:
+                        continue
+                    tree_sha = repo.tree_sha(tree)
+                    if tree_sha not in indexes:
+                        indexes[tree_sha] = self._read_tree_index(tree_sha)
+
+        try:
+            index_ls = os.listdir(self.tree_index_dir)
+        except OSError:
+            index_ls = []
+        for item in index_ls:
+            if os.path.splitext(item)[0] in indexes:
+                continue
+            self._tree_indexes.pop(os.path.splitext(item)[0], None)
+            try:
+                os.remove(salt.utils.path.join(self.tree_index_dir, item))
+            except OSError as exc:
+                log.error(
+                    'Unable to remove old %s tree index %s: %s',
+                    self.role, item, exc
+                )
+
+        blobs = set()
+        for index in six.itervalues(indexes):
+            if index is not None:
+                blobs.update(x[0] for x in six.itervalues(index['files']))
+        removed = 0
+        for root, _, files in salt.utils.path.os_walk(self.blob_cachedir):
+            for item in files:
+                if item in blobs:
+                    continue
+                try:
+                    os.remove(salt.utils.path.join(root, item))
+                    removed += 1
+                except OSError as exc:
+                    log.error(
+                        'Unable to remove old %s blob %s: %s',
+                        self.role, item, exc
+                    )
+        if removed:
+            log.debug('%s removed %d old cached blobs', self.role, removed)
+
+    def _index_tree(self, repo, tree):
+        '''
+        Build the index of a tree, reusing the indexes of subtrees which have
+        already been walked
+        '''
+        tree_sha = repo.tree_sha(tree)
+        try:
+            return self._subtree_indexes[tree_sha]
+        except KeyError:
+            pass
+        index = {'files': {}, 'symlinks': {}, 'dirs': []}
+        for name, sha, mode, subtree, size, link_tgt \
+                in repo.tree_entries(tree):
+            if subtree is None:
+                index['files'][name] = [sha, mode, size]
+                if link_tgt is not None:
+                    index['symlinks'][name] = link_tgt
+                continue
+            sub_index = self._index_tree(repo, subtree)
+            prefix = name + '/'
+            index['dirs'].append(name)
+            index['dirs'].extend(prefix + x for x in sub_index['dirs'])
+            for key in ('files', 'symlinks'):
+                index[key].update(
+                    (prefix + path, val)
+                    for path, val in six.iteritems(sub_index[key])
+                )
+        if self._subtree_index_size >= TREE_INDEX_MEMO_SIZE:
+            self._subtree_indexes.clear()
+            self._subtree_index_size = 0
+        self._subtree_indexes[tree_sha] = index
+        self._subtree_index_size += len(index['files'])
+        return index
+
+    def _indexed_file_list(self, repo, tgt_env):
+        '''
+        Return the files, symlinks and directories of a remote for the
+        specified environment, using the tree index. This is the equivalent
+        of the remote's file_list() and dir_list() functions.
+        '''
+        files = set()
+        symlinks = {}
+        dirs = set()
+        index = self.tree_index(repo, tgt_env)
+        if index is None:
+            return files, symlinks, dirs
+        root = repo.root(tgt_env)
+        if root:
+            root = root.strip('/')
+            if root not in index['dirs']:
+                return files, symlinks, dirs
+            prefix = root + '/'
+        else:
+            prefix = ''
+        mountpoint = repo.mountpoint(tgt_env)
+        add_mountpoint = lambda path: salt.utils.path.join(
+            mountpoint, path, use_posixpath=True)
+        for path in index['files']:
+            if path.startswith(prefix):
+                files.add(add_mountpoint(path[len(prefix):]))
+        for path, link_tgt in six.iteritems(index['symlinks']):
+            if path.startswith(prefix):
+                symlinks[add_mountpoint(path[len(prefix):])] = link_tgt
+        for path in index['dirs']:
+            if path.startswith(prefix):
+                dirs.add(add_mountpoint(path[len(prefix):]))
+        if mountpoint:
+            dirs.add(mountpoint)
+        return files, symlinks, dirs
+
+    def _indexed_find_file(self, repo, path, tgt_env):
+        '''
+        Find the specified file using the tree index, following symlinks.
+        Returns the blob SHA and mode of the file, or a tuple of Nones if it
+        is not present.
+        '''
+        index = self.tree_index(repo, tgt_env)
+        if index is None:
+            return None, None
+        for _ in range(SYMLINK_RECURSE_DEPTH):
+            try:
+                blob_sha, mode = index['files'][path][:2]
+            except KeyError:
+                return None, None
+            link_tgt = index['symlinks'].get(path)
+            if link_tgt is None:
+                return blob_sha, mode
+            path = posixpath.normpath(
+                posixpath.join(posixpath.dirname(path), link_tgt))
+        return None, None
+
+    def _link_blob(self, repo, blob_sha, dest):
+        '''
+        Place the contents of a blob at dest. Each blob is written once to a
+        cache keyed by its SHA, and hard linked (or copied, if the filesystem
+        does not support hard links) to the destination, so that identical
+        files in different refs and remotes share one copy.
+        '''
+        blob_path = salt.utils.path.join(
+            self.blob_cachedir, blob_sha[:2], blob_sha)
+        blob_dir = os.path.dirname(blob_path)
+        if not os.path.isfile(blob_path):
+            if not os.path.isdir(blob_dir):
+                try:
+                    os.makedirs(blob_dir)
+                except OSError as exc:
+                    if exc.errno != errno.EEXIST:
+                        raise
+            fd_, tmp = tempfile.mkstemp(dir=blob_dir, prefix='.tmp')
+            os.close(fd_)
+            try:
+                repo.write_file(repo.get_blob(blob_sha), tmp)
+                os.rename(tmp, blob_path)
+            except Exception:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+        tmp = '{0}.{1}.tmp'.format(dest, os.getpid())
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        try:
+            os.link(blob_path, tmp)
+        except OSError as exc:
+            if exc.errno == errno.ENOENT:
+                # The blob was removed by clear_old_tree_cache meanwhile
+                repo.write_file(repo.get_blob(blob_sha), tmp)
+            else:
+                shutil.copyfile(blob_path, tmp)
+        os.rename(tmp, dest)
+
     def serve_file(self, load, fnd):
         '''
         Return a chunk from a file based on the data received
@@ -2957,10 +3543,16 @@ class GitFS(GitBase):
             if salt.utils.stringutils.is_hex(load['saltenv']) \
                     or load['saltenv'] in self.envs():
                 for repo in self.remotes:
-                    repo_files, repo_symlinks = repo.file_list(load['saltenv'])
+                    if self.opts.get('gitfs_tree_index', False):
+                        repo_files, repo_symlinks, repo_dirs = \
+                            self._indexed_file_list(repo, load['saltenv'])
+                    else:
+                        repo_files, repo_symlinks = \
+                            repo.file_list(load['saltenv'])
+                        repo_dirs = repo.dir_list(load['saltenv'])
                     ret['files'].update(repo_files)
                     ret['symlinks'].update(repo_symlinks)
-                    ret['dirs'].update(repo.dir_list(load['saltenv']))
+                    ret['dirs'].update(repo_dirs)
             ret['files'] = sorted(ret['files'])
             ret['dirs'] = sorted(ret['dirs'])
 
@@ -187,16 +187,23 @@ class DigestCollector(object):
             raise ValueError('Invalid hash type: {0}'.format(form))
         self.__buff = buff
 
-    def add(self, path):
+    def add(self, path, file_form=None):
         '''
         Update digest with the file content by path.
 
         :param path:
+        :param file_form: also return the digest of this file alone, using
+                          this hash type
         :return:
         '''
+        file_digest = getattr(hashlib, file_form)() if file_form else None
         with salt.utils.files.fopen(path, 'rb') as ifile:
             for chunk in iter(lambda: ifile.read(self.__buff), b''):
                 self.__digest.update(chunk)
+                if file_digest is not None:
+                    file_digest.update(chunk)
+        if file_digest is not None:
+            return file_digest.hexdigest()
 
     def digest(self):
         '''
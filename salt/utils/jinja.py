@@ -6,6 +6,8 @@ Jinja loading utils to enable a more powerful backend for jinja templates
 # Import python libs
 from __future__ import absolute_import, unicode_literals
 import collections
+import errno
+import hashlib
 import logging
 import os.path
 import pipes
@@ -19,7 +21,8 @@ from xml.etree.ElementTree import Element, SubElement, tostring
 # Import third party libs
 import jinja2
 from salt.ext import six
-from jinja2 import BaseLoader, Markup, TemplateNotFound, nodes
+from jinja2 import BaseLoader, BytecodeCache, Markup, TemplateNotFound, nodes
+from jinja2.bccache import Bucket
 from jinja2.environment import TemplateModule
 from jinja2.exceptions import TemplateRuntimeError
 from jinja2.ext import Extension
@@ -27,6 +30,7 @@ from jinja2.ext import Extension
 # Import salt libs
 from salt.exceptions import TemplateError
 import salt.fileclient
+import salt.utils.atomicfile
 import salt.utils.data
 import salt.utils.files
 import salt.utils.json
@@ -39,12 +43,18 @@ from salt.utils.odict import OrderedDict
 log = logging.getLogger(__name__)
 
 __all__ = [
+    'SaltBytecodeCache',
     'SaltCacheLoader',
     'SerializerExtension'
 ]
 
 GLOBAL_UUID = uuid.UUID('91633EBF-1C86-5E33-935A-28061F4B480E')
 
+# Compiled templates kept in memory by SaltBytecodeCache, shared by every
+# environment in the process
+_BYTECODE = {}
+BYTECODE_CACHE_SIZE = 1000
+
 
 class SaltCacheLoader(BaseLoader):
     '''
@@ -52,7 +62,8 @@ class SaltCacheLoader(BaseLoader):
     Requested templates are always fetched from the server
     to guarantee that the file is up to date.
     Templates are cached like regular salt states
-    and only loaded once per loader instance.
+    and only loaded once per loader instance, so a loader that is reused
+    across renders only fetches each imported template once.
     '''
     def __init__(self, opts, saltenv='base', encoding='utf-8',
                  pillar_rend=False):
@@ -68,7 +79,7 @@ class SaltCacheLoader(BaseLoader):
         else:
             self.searchpath = [os.path.join(opts['cachedir'], 'files', saltenv)]
         log.debug('Jinja search path: %s', self.searchpath)
-        self.cached = []
+        self.cached = set()
         self._file_client = None
         # Instantiate the fileclient
         self.file_client()
@@ -95,7 +106,7 @@ class SaltCacheLoader(BaseLoader):
         '''
         if template not in self.cached:
             self.cache_file(template)
-            self.cached.append(template)
+            self.cached.add(template)
 
     def get_source(self, environment, template):
         '''
@@ -172,6 +183,74 @@ class SaltCacheLoader(BaseLoader):
         raise TemplateNotFound(template)
 
 
+class SaltBytecodeCache(BytecodeCache):
+    '''
+    A Jinja bytecode cache keyed by a hash of the template source, so that a
+    template is compiled only once, however many times it is rendered.
+    Compiled templates are kept in memory and, if a cache directory is given,
+    on disk so that they are reused by later runs.
+
+    The env_key identifies the environment options the templates are compiled
+    with, since they change the generated code.
+    '''
+    def __init__(self, cachedir=None, env_key=''):
+        self.cachedir = cachedir
+        self.env_key = env_key
+
+    def get_bucket(self, environment, name, filename, source):
+        '''
+        Return a cache bucket for the given template. The name and filename
+        are part of the key as they are embedded in the compiled code.
+        '''
+        key = hashlib.sha256(salt.utils.stringutils.to_bytes(
+            '\0'.join((self.env_key, name or '', filename or '', source))
+        )).hexdigest()
+        bucket = Bucket(environment, key, self.get_source_checksum(source))
+        self.load_bytecode(bucket)
+        return bucket
+
+    def _cache_path(self, key):
+        return os.path.join(self.cachedir, '{0}.cache'.format(key))
+
+    def load_bytecode(self, bucket):
+        data = _BYTECODE.get(bucket.key)
+        if data is None and self.cachedir:
+            try:
+                with salt.utils.files.fopen(
+                        self._cache_path(bucket.key), 'rb') as fp_:
+                    data = fp_.read()
+            except (IOError, OSError):
+                pass
+            else:
+                _BYTECODE[bucket.key] = data
+        if data is not None:
+            bucket.bytecode_from_string(data)
+
+    def dump_bytecode(self, bucket):
+        data = bucket.bytecode_to_string()
+        if len(_BYTECODE) >= BYTECODE_CACHE_SIZE:
+            _BYTECODE.clear()
+        _BYTECODE[bucket.key] = data
+        if not self.cachedir:
+            return
+        try:
+            try:
+                os.makedirs(self.cachedir)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+            with salt.utils.atomicfile.atomic_open(
+                    self._cache_path(bucket.key), 'wb') as fp_:
+                fp_.write(data)
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write Jinja bytecode cache: %s', exc)
+
+    def clear(self):
+        _BYTECODE.clear()
+        if self.cachedir and os.path.isdir(self.cachedir):
+            salt.utils.files.rm_rf(self.cachedir)
+
+
 class PrintableDict(OrderedDict):
     '''
     Ensures that dict str() and repr() are YAML friendly.
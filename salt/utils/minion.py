@@ -6,8 +6,10 @@ Utility functions for minions
 # Import Python Libs
 from __future__ import absolute_import, unicode_literals
 import os
+import fnmatch
 import logging
 import threading
+import multiprocessing
 
 # Import Salt Libs
 import salt.payload
@@ -15,6 +17,10 @@ import salt.utils.files
 import salt.utils.platform
 import salt.utils.process
 
+# Import 3rd-party libs
+from salt.ext import six
+from salt.ext.six.moves import queue  # pylint: disable=import-error,redefined-builtin
+
 log = logging.getLogger(__name__)
 
 
@@ -147,3 +153,192 @@ def _check_cmdline(data):
                 return True
     except (OSError, IOError):
         return False
+
+
+class JobPoolWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
+    '''
+    A prefork minion job worker.
+
+    The worker is forked from the minion process after the loaders have been
+    set up, so it executes jobs from the pool queue with warm module state.
+    It exits after ``max_jobs`` jobs, when the pool generation changes (the
+    minion refreshed its modules, grains or pillar) or when the minion
+    process goes away. The pool replaces exited workers.
+    '''
+    def __init__(self, target, minion_instance, opts, job_queue, generation, max_jobs, **kwargs):
+        super(JobPoolWorker, self).__init__(**kwargs)
+        self.target = target
+        self.minion_instance = minion_instance
+        self.opts = opts
+        self.job_queue = job_queue
+        self.generation = generation
+        self.start_generation = generation.value
+        self.max_jobs = max_jobs
+        self.ppid = os.getpid()
+
+    def run(self):
+        salt.utils.process.appendproctitle(self.__class__.__name__)
+        # The job runs in this process, do not daemonize it
+        self.minion_instance.job_pool_worker = True
+        proctitle = None
+        if salt.utils.process.HAS_SETPROCTITLE:
+            proctitle = salt.utils.process.setproctitle.getproctitle()
+        jobs = 0
+        while self.max_jobs <= 0 or jobs < self.max_jobs:
+            if self.generation.value != self.start_generation:
+                log.debug('%s: pool generation changed, exiting', self.name)
+                break
+            if os.getppid() != self.ppid:
+                log.debug('%s: minion process went away, exiting', self.name)
+                break
+            try:
+                item = self.job_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            if self.generation.value != self.start_generation:
+                # The modules were refreshed while waiting, leave the job
+                # to a worker forked with the new ones
+                log.debug('%s: pool generation changed, handing the job back', self.name)
+                self.job_queue.put(item)
+                break
+            data, connected = item
+            self.minion_instance.connected = connected
+            try:
+                self.target(self.minion_instance, self.opts, data, connected)
+            except Exception:
+                log.exception('Job %s failed in the minion job pool', data.get('jid'))
+            finally:
+                _remove_proc_file(self.minion_instance, data)
+                if proctitle is not None:
+                    # The job appends its jid to the process title
+                    salt.utils.process.setproctitle.setproctitle(proctitle)
+            jobs += 1
+
+
+class JobPool(object):
+    '''
+    A bounded pool of warm job workers for the minion.
+
+    In multiprocessing mode the pool keeps ``minion_job_pool_size`` prefork
+    :class:`JobPoolWorker` processes reading from a shared queue. Otherwise
+    a :class:`salt.utils.process.ThreadPool` of the same size is used. If
+    ``process_count_max`` is set it caps the size of the pool and jobs over
+    the limit wait in the queue until a worker is free.
+    '''
+    def __init__(self, opts, target, minion_instance):
+        self.opts = opts
+        self.target = target
+        self.minion_instance = minion_instance
+        self.multiprocessing = opts.get('multiprocessing', True)
+        self.size = max(opts.get('minion_job_pool_size', 4), 1)
+        process_count_max = opts.get('process_count_max', -1)
+        if process_count_max > 0:
+            self.size = min(self.size, process_count_max)
+        self.max_jobs = opts.get('minion_job_pool_max_jobs', 0)
+        self.workers = []
+        if self.multiprocessing:
+            self.job_queue = multiprocessing.Queue()
+            self.generation = multiprocessing.Value('i', 0)
+        else:
+            self.thread_pool = salt.utils.process.ThreadPool(num_threads=self.size)
+
+    def submit(self, data, connected):
+        '''
+        Queue a job for execution by the pool
+        '''
+        if self.multiprocessing:
+            self.maintain()
+            self.job_queue.put((data, connected))
+        else:
+            self.thread_pool.fire_async(self._thread_target, args=(data, connected))
+
+    def _thread_target(self, data, connected):
+        # salt.utils.minion.running() matches threaded jobs by thread name
+        thread = threading.current_thread()
+        name = thread.name
+        thread.name = data['jid']
+        try:
+            self.target(self.minion_instance, self.opts, data, connected)
+        finally:
+            thread.name = name
+            _remove_proc_file(self.minion_instance, data)
+
+    def maintain(self):
+        '''
+        Reap exited workers and start new ones up to the pool size
+        '''
+        if not self.multiprocessing:
+            return
+        current = 0
+        for worker in list(self.workers):
+            if not worker.is_alive():
+                worker.join(0)
+                self.workers.remove(worker)
+            elif worker.start_generation == self.generation.value:
+                current += 1
+        for _ in range(self.size - current):
+            worker = JobPoolWorker(
+                self.target,
+                self.minion_instance,
+                self.opts,
+                self.job_queue,
+                self.generation,
+                self.max_jobs,
+            )
+            worker.start()
+            log.debug('Started minion job pool worker with pid %s', worker.pid)
+            self.workers.append(worker)
+
+    def recycle(self):
+        '''
+        Retire the current workers once they are idle, new workers will be
+        forked with the current minion state on the next maintenance run
+        '''
+        if not self.multiprocessing:
+            return
+        with self.generation.get_lock():
+            self.generation.value += 1
+
+    def stop(self):
+        '''
+        Stop all of the pool workers
+        '''
+        if not self.multiprocessing:
+            return
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.terminate()
+        for worker in self.workers:
+            worker.join(1)
+        self.workers = []
+
+
+def job_pool_isolated(opts, data):
+    '''
+    Return True if the job should not run in the minion job pool but in a
+    dedicated process or thread, as configured by ``minion_job_pool_isolate``
+    '''
+    funs = data['fun']
+    if isinstance(funs, six.string_types):
+        funs = [funs]
+    for pattern in opts.get('minion_job_pool_isolate', []):
+        for fun in funs:
+            if fnmatch.fnmatch(fun, pattern):
+                return True
+    return False
+
+
+def _remove_proc_file(minion_instance, data):
+    '''
+    Pool workers outlive their jobs, make sure the proc file is gone once the
+    job is finished
+    '''
+    proc_dir = getattr(minion_instance, 'proc_dir', None)
+    if not proc_dir:
+        return
+    try:
+        os.remove(os.path.join(proc_dir, six.text_type(data['jid'])))
+    except (IOError, OSError):
+        pass
@@ -7,6 +7,7 @@ expected to return
 # Import python libs
 from __future__ import absolute_import, unicode_literals
 import os
+import time
 import fnmatch
 import re
 import logging
@@ -14,6 +15,7 @@ import logging
 # Import salt libs
 import salt.payload
 import salt.roster
+import salt.utils.atomicfile
 import salt.utils.data
 import salt.utils.files
 import salt.utils.network
@@ -36,6 +38,10 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+# The minions reported by each syndic, loaded from the syndic_members
+# directory of the cachedir: {syndic_id: (mtime, frozenset(minion_ids))}
+_SYNDIC_MEMBERS = {}
+
 TARGET_REX = re.compile(
         r'''(?x)
         (
@@ -64,6 +70,88 @@ def parse_target(target_expression):
     return ret
 
 
+def store_syndic_members(opts, syndic_id, minions):
+    '''
+    Store the ids of the minions behind a syndic of this master, as reported
+    by the syndic
+    '''
+    path = os.path.join(opts['cachedir'], 'syndic_members')
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    serial = salt.payload.Serial(opts)
+    with salt.utils.atomicfile.atomic_open(os.path.join(path, syndic_id), 'wb') as fp_:
+        serial.dump(sorted(minions), fp_)
+
+
+def register_syndic(opts, syndic_id):
+    '''
+    Record that a syndic authenticated with this master, publishes are only
+    narrowed down to some of the syndics once all of the known syndics have
+    reported their minions
+    '''
+    path = os.path.join(opts['cachedir'], 'syndic_known')
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    with salt.utils.files.fopen(os.path.join(path, syndic_id), 'w'):
+        pass
+
+
+def known_syndics(opts):
+    '''
+    Return the ids of the syndics which authenticated with or returned jobs to
+    this master, and whose key is still accepted
+    '''
+    ret = set()
+    for name in ('syndic_known', 'syndics'):
+        try:
+            ret.update(fn_ for fn_ in os.listdir(os.path.join(opts['cachedir'], name))
+                       if not fn_.startswith('.'))
+        except OSError:
+            pass
+    if 'pki_dir' in opts:
+        acc = os.path.join(opts['pki_dir'], 'minions')
+        ret = set(syndic_id for syndic_id in ret
+                  if os.path.isfile(os.path.join(acc, syndic_id)))
+    return ret
+
+
+def syndic_members(opts):
+    '''
+    Return the ids of the minions behind each syndic of this master, as
+    {syndic_id: frozenset(minion_ids)}. The files are only read again once
+    they change, and are removed once they have not been reported again for
+    syndic_membership_expire seconds.
+    '''
+    path = os.path.join(opts['cachedir'], 'syndic_members')
+    try:
+        names = [name for name in os.listdir(path) if not name.startswith('.')]
+    except OSError:
+        return {}
+    serial = salt.payload.Serial(opts)
+    expire = opts.get('syndic_membership_expire', 0)
+    now = time.time()
+    ret = {}
+    for syndic_id in names:
+        fn_ = os.path.join(path, syndic_id)
+        try:
+            mtime = os.path.getmtime(fn_)
+            if expire and mtime < now - expire:
+                log.debug('The minions of syndic %s expired', syndic_id)
+                os.remove(fn_)
+                _SYNDIC_MEMBERS.pop(fn_, None)
+                continue
+            cached = _SYNDIC_MEMBERS.get(fn_)
+            if cached is None or cached[0] != mtime:
+                with salt.utils.files.fopen(fn_, 'rb') as fp_:
+                    cached = (mtime, frozenset(serial.load(fp_)))
+                _SYNDIC_MEMBERS[fn_] = cached
+        except (IOError, OSError, TypeError, ValueError) as exc:
+            log.error('Unable to read the minions of syndic %s: %s', syndic_id, exc)
+            continue
+        ret[syndic_id] = cached[1]
+    return ret
+
+
 def get_minion_data(minion, opts):
     '''
     Get the grains/pillar for a specific minion.  If minion is None, it
@@ -730,6 +818,44 @@ class CkMinions(object):
             _res = {'minions': [], 'missing': []}
         return _res
 
+    def check_syndics(self, expr, tgt_type='glob'):
+        '''
+        Return the ids of the syndics which have reported minions matching a
+        list or glob target. Returns None if the syndics cannot be narrowed
+        down, because of the target type, because a syndic known to this
+        master has not reported its minions, or because a targeted minion id
+        is not behind any syndic as far as this master knows.
+        '''
+        if tgt_type not in ('list', 'glob'):
+            return None
+        members = syndic_members(self.opts)
+        missing = known_syndics(self.opts).difference(members)
+        if missing:
+            log.trace('Syndics %s have not reported their minions', sorted(missing))
+            return None
+        if tgt_type == 'list':
+            if isinstance(expr, six.string_types):
+                expr = [m for m in expr.split(',') if m]
+            targets = set(expr)
+        elif not any(char in expr for char in '*?['):
+            targets = set([expr])
+        else:
+            targets = None
+        if targets is not None:
+            reported = set()
+            for minions in six.itervalues(members):
+                reported.update(minions)
+            unknown = targets.difference(reported)
+            if unknown:
+                # The minion may be new, or not behind a syndic at all
+                log.trace('Minions %s are not behind a known syndic', sorted(unknown))
+                return None
+            return sorted(syndic_id for syndic_id, minions in six.iteritems(members)
+                          if not targets.isdisjoint(minions))
+        regex = re.compile(fnmatch.translate(expr))
+        return sorted(syndic_id for syndic_id, minions in six.iteritems(members)
+                      if any(regex.match(minion) for minion in minions))
+
     def validate_tgt(self, valid, expr, tgt_type, minions=None, expr_form=None):
         '''
         Return a Bool. This function returns if the expression sent in is
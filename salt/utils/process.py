@@ -320,6 +320,12 @@ class ThreadPool(object):
         except queue.Full:
             return False
 
+    def qsize(self):
+        '''
+        Return the approximate number of jobs waiting for a worker
+        '''
+        return self._job_queue.qsize()
+
     def _thread_target(self):
         while True:
             # 1s timeout so that if the parent dies this thread will die within 1s
@@ -7,9 +7,12 @@ Functions which implement running reactor jobs
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
 import collections
+import datetime
 import fnmatch
 import glob
 import logging
+import os
+import re
 import time
 
 # Import salt libs
@@ -43,6 +46,9 @@ REACTOR_INTERNAL_KEYWORDS = frozenset([
     'state',
 ])
 
+# The characters which make a reactor tag a glob
+GLOB_CHARS = re.compile(r'[*?[]')
+
 
 class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.state.Compiler):
     '''
@@ -59,12 +65,22 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
         super(Reactor, self).__init__(**kwargs)
         local_minion_opts = opts.copy()
         local_minion_opts['file_client'] = 'local'
+        if opts.get('reactor_render_cache', False):
+            # Compile each reactor SLS once, the templates are still rendered
+            # with the data of each event. The Jinja environments are not
+            # reused, the reactor runs for good and they would never pick up
+            # changes to the templates they import.
+            local_minion_opts['jinja_bytecode_cache'] = True
         self.minion = salt.minion.MasterMinion(local_minion_opts)
         salt.state.Compiler.__init__(self, opts, self.minion.rend)
         self.event = salt.utils.event.get_master_event(opts, opts['sock_dir'], listen=False)
         self.stats = collections.defaultdict(lambda: {'mean': 0, 'latency': 0, 'runs': 0})
         self.stat_clock = time.time()
         self.is_leader = True
+        # The files the salt:// reactor SLS were cached to
+        self.ref_cache = salt.utils.cache.CacheDict(opts['reactor_refresh_interval'])
+        # The reactor map indexed by tag, see _index_reactors
+        self.react_index = None
 
     # We need __setstate__ and __getstate__ to avoid pickling errors since
     # 'self.rend' (from salt.state.Compiler) contains a function reference
@@ -93,10 +109,40 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
         end_time = time.time()
         if end_time - self.stat_clock > self.opts['master_stats_event_iter']:
             # Fire the event with the stats and wipe the tracker
-            self.event.fire_event({'time': end_time - self.stat_clock, 'worker': self.name, 'stats': stats}, tagify(self.name, 'stats'))
+            self.event.fire_event({'time': end_time - self.stat_clock,
+                                   'worker': self.name,
+                                   'stats': stats,
+                                   'queue_depth': self.wrap.pool.qsize(),
+                                   'queue_full': self.wrap.queue_full},
+                                  tagify(self.name, 'stats'))
+            self.wrap.queue_full = 0
             self.stats = collections.defaultdict(lambda: {'mean': 0, 'latency': 0, 'runs': 0})
             self.stat_clock = end_time
 
+    def _update_stats(self, reactors, start_time, data):
+        '''
+        Update the stats of the reactor SLS files an event was rendered and
+        dispatched with. The latency is the time between the event being fired
+        and its reactions being rendered.
+        '''
+        end_time = time.time()
+        latency = 0
+        stamp = data.get('_stamp')
+        if stamp:
+            try:
+                fired = datetime.datetime.strptime(stamp, '%Y-%m-%dT%H:%M:%S.%f')
+            except ValueError:
+                fired = None
+            if fired is not None:
+                latency = max(0, (datetime.datetime.utcfromtimestamp(start_time) - fired).total_seconds())
+        duration = end_time - start_time
+        for reactor in reactors:
+            stats = self.stats[reactor]
+            stats['runs'] += 1
+            stats['latency'] = (stats['latency'] * (stats['runs'] - 1) + latency) / stats['runs']
+            stats['mean'] = (stats['mean'] * (stats['runs'] - 1) + duration) / stats['runs']
+        return self.stats
+
     def render_reaction(self, glob_ref, tag, data):
         '''
         Execute the render system against a single reaction file and return
@@ -105,7 +151,15 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
         react = {}
 
         if glob_ref.startswith('salt://'):
-            glob_ref = self.minion.functions['cp.cache_file'](glob_ref) or ''
+            if not self.opts.get('reactor_render_cache', False):
+                glob_ref = self.minion.functions['cp.cache_file'](glob_ref) or ''
+            elif glob_ref in self.ref_cache:
+                glob_ref = self.ref_cache[glob_ref]
+            else:
+                cached = self.minion.functions['cp.cache_file'](glob_ref) or ''
+                if cached:
+                    self.ref_cache[glob_ref] = cached
+                glob_ref = cached
         globbed_ref = glob.glob(glob_ref)
         if not globbed_ref:
             log.error('Can not render SLS %s for tag %s. File missing or not found.', glob_ref, tag)
@@ -126,35 +180,84 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                 log.exception('Failed to render "%s": ', fn_)
         return react
 
-    def list_reactors(self, tag):
+    def _index_reactors(self, react_map):
         '''
-        Take in the tag from an event and return a list of the reactors to
-        process
+        Index the reactor map by tag. The tags without wildcards are looked up
+        directly, the globs are grouped by the literal prefix before their
+        first wildcard so that only the globs whose prefix starts the tag of an
+        event are matched against it.
         '''
-        log.debug('Gathering reactors for tag %s', tag)
-        reactors = []
-        if isinstance(self.opts['reactor'], six.string_types):
+        exact = {}
+        globs = {}
+        for idx, ropt in enumerate(react_map or []):
+            if not isinstance(ropt, dict):
+                continue
+            if len(ropt) != 1:
+                continue
+            key = next(six.iterkeys(ropt))
+            val = ropt[key]
+            if isinstance(val, six.string_types):
+                val = [val]
+            elif not isinstance(val, list):
+                continue
+            key = os.path.normcase(six.text_type(key))
+            prefix = GLOB_CHARS.split(key, 1)[0]
+            if prefix == key:
+                exact.setdefault(key, []).append((idx, val))
+            else:
+                globs.setdefault(prefix, []).append(
+                    (idx, re.compile(fnmatch.translate(key)).match, val))
+        return {'exact': exact,
+                'globs': globs,
+                'lengths': sorted(set(len(prefix) for prefix in globs))}
+
+    def _reactor_index(self):
+        '''
+        Return the index of the reactor map, the reactor map file is only read
+        again once it changes
+        '''
+        if not isinstance(self.opts['reactor'], six.string_types):
+            if self.react_index is None:
+                self.react_index = (None, self._index_reactors(self.opts['reactor']))
+            return self.react_index[1]
+        try:
+            stamp = os.path.getmtime(self.opts['reactor'])
+        except OSError:
+            stamp = None
+        if stamp is None or self.react_index is None or self.react_index[0] != stamp:
+            react_map = []
             try:
                 with salt.utils.files.fopen(self.opts['reactor']) as fp_:
                     react_map = salt.utils.yaml.safe_load(fp_)
             except (OSError, IOError):
                 log.error('Failed to read reactor map: "%s"', self.opts['reactor'])
+                stamp = None
             except Exception:
                 log.error('Failed to parse YAML in reactor map: "%s"', self.opts['reactor'])
-        else:
-            react_map = self.opts['reactor']
-        for ropt in react_map:
-            if not isinstance(ropt, dict):
-                continue
-            if len(ropt) != 1:
-                continue
-            key = next(six.iterkeys(ropt))
-            val = ropt[key]
-            if fnmatch.fnmatch(tag, key):
-                if isinstance(val, six.string_types):
-                    reactors.append(val)
-                elif isinstance(val, list):
-                    reactors.extend(val)
+                stamp = None
+            self.react_index = (stamp, self._index_reactors(react_map))
+        return self.react_index[1]
+
+    def list_reactors(self, tag):
+        '''
+        Take in the tag from an event and return a list of the reactors to
+        process
+        '''
+        log.debug('Gathering reactors for tag %s', tag)
+        index = self._reactor_index()
+        tag = os.path.normcase(tag)
+        matches = list(index['exact'].get(tag, ()))
+        for length in index['lengths']:
+            if length > len(tag):
+                break
+            for idx, match, val in index['globs'].get(tag[:length], ()):
+                if match(tag):
+                    matches.append((idx, val))
+        # Keep the order of the reactor map
+        matches.sort(key=lambda match: match[0])
+        reactors = []
+        for _, val in matches:
+            reactors.extend(val)
         return reactors
 
     def list_all(self):
@@ -189,6 +292,7 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                 return {'status': False, 'comment': 'Reactor already exists.'}
 
         self.minion.opts['reactor'].append({tag: reaction})
+        self.react_index = None
         return {'status': True, 'comment': 'Reactor added.'}
 
     def delete_reactor(self, tag):
@@ -200,6 +304,7 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
             _tag = next(six.iterkeys(reactor))
             if _tag == tag:
                 self.minion.opts['reactor'].remove(reactor)
+                self.react_index = None
                 return {'status': True, 'comment': 'Reactor deleted.'}
 
         return {'status': False, 'comment': 'Reactor does not exists.'}
@@ -310,19 +415,18 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                     reactors = self.list_reactors(data['tag'])
                     if not reactors:
                         continue
+                    if self.opts['master_stats']:
+                        start = time.time()
                     chunks = self.reactions(data['tag'], data['data'], reactors)
                     if chunks:
-                        if self.opts['master_stats']:
-                            _data = data['data']
-                            start = time.time()
                         try:
                             self.call_reactions(chunks)
                         except SystemExit:
                             log.warning('Exit ignored by reactor')
 
-                        if self.opts['master_stats']:
-                            stats = salt.utils.event.update_stats(self.stats, start, _data)
-                            self._post_stats(stats)
+                    if self.opts['master_stats']:
+                        stats = self._update_stats(reactors, start, data['data'])
+                        self._post_stats(stats)
 
 
 class ReactWrap(object):
@@ -349,6 +453,8 @@ class ReactWrap(object):
             self.opts['reactor_worker_threads'],  # number of workers for runner/wheel
             queue_size=self.opts['reactor_worker_hwm']  # queue size for those workers
         )
+        # Number of reactions dropped because the queue was full
+        self.queue_full = 0
 
     def populate_client_cache(self, low):
         '''
@@ -472,6 +578,7 @@ class ReactWrap(object):
             ret = l_fun(*args, **kwargs)
 
             if ret is False:
+                self.queue_full += 1
                 log.error('Reactor \'%s\' failed  to execute %s \'%s\': '
                             'TaskPool queue is full!'
                             ' Consider tuning reactor_worker_threads and/or'
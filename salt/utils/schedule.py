@@ -18,6 +18,7 @@ import time
 import copy
 import signal
 import datetime
+import heapq
 import itertools
 import threading
 import logging
@@ -153,6 +154,16 @@ class Schedule(object):
         self.schedule_returner = self.option('schedule_returner')
         # Keep track of the lowest loop interval needed in this variable
         self.loop_interval = six.MAXSIZE
+        # With schedule_lazy_eval, the time before which each job does not
+        # need to be evaluated: {job: (data, deadline)}, the deadlines in a
+        # heap of (deadline, job) and the jobs to evaluate every time
+        self.deadlines = {}
+        self._deadline_heap = []
+        self._deadline_always = set()
+        self._deadline_sig = None
+        # Called when the schedule changes, so that a caller waiting for the
+        # next deadline evaluates the schedule again
+        self.wakeup = None
         if not self.standalone:
             clean_proc_dir(opts)
         if cleanup:
@@ -246,6 +257,78 @@ class Schedule(object):
                             return data
         return data
 
+    def changed(self):
+        '''
+        Forget the deadlines of the jobs, so that all of them are evaluated by
+        the next call to eval, and wake up the caller waiting for the next one
+        '''
+        self.deadlines = {}
+        self._deadline_heap = []
+        self._deadline_always = set()
+        if self.wakeup is not None:
+            self.wakeup()
+
+    @staticmethod
+    def _job_deadline(data, now, loop_interval):
+        '''
+        Return the time before which evaluating a job cannot run it or change
+        its state, datetime.max if only a change to the schedule can, or None
+        if it has to be evaluated every time
+        '''
+        if data.get('_error'):
+            return datetime.datetime.max
+        if data.get('splay') or data.get('_splay') or \
+                data.get('_run_on_start') or 'run_explicit' in data:
+            return None
+        next_fire = data.get('_next_fire_time')
+        if 'once' in data:
+            if next_fire is None:
+                return datetime.datetime.max if data.get('_continue') else None
+            if next_fire > now:
+                return next_fire
+            if next_fire < now - loop_interval:
+                return datetime.datetime.max
+            return None
+        if data.get('_continue'):
+            return datetime.datetime.max
+        if next_fire is None:
+            return None
+        if '_seconds' in data or 'cron' in data:
+            # These run once the next fire time, without the microseconds, is
+            # reached
+            return next_fire - datetime.timedelta(microseconds=next_fire.microsecond)
+        if 'when' in data and data.get('_run'):
+            return next_fire
+        return None
+
+    def _set_deadline(self, job, data, deadline):
+        self.deadlines[job] = (data, deadline)
+        if deadline is None:
+            self._deadline_always.add(job)
+        else:
+            self._deadline_always.discard(job)
+            if deadline != datetime.datetime.max:
+                heapq.heappush(self._deadline_heap, (deadline, job))
+
+    def next_deadline(self, now=None):
+        '''
+        Return the number of seconds until a job has to be evaluated, 0 if
+        one has to be evaluated every time or None if no job has to be until
+        the schedule changes. Only meaningful with ``schedule_lazy_eval``.
+        '''
+        if self._deadline_always:
+            return 0
+        if not now:
+            now = datetime.datetime.now()
+        while self._deadline_heap:
+            deadline, job = self._deadline_heap[0]
+            if self.deadlines.get(job, (None, None))[1] != deadline:
+                # Replaced by a later deadline
+                heapq.heappop(self._deadline_heap)
+                continue
+            return max(0, (deadline - now).total_seconds())
+        return None
+
     def persist(self):
         '''
         Persist the modified schedule into <<configdir>>/<<default_include>>/_schedule.conf
@@ -300,6 +383,7 @@ class Schedule(object):
         # remove from self.intervals
         if name in self.intervals:
             del self.intervals[name]
+        self.changed()
 
         if persist:
             self.persist()
@@ -313,6 +397,7 @@ class Schedule(object):
         self.enabled = True
         self.splay = None
         self.opts['schedule'] = {}
+        self.changed()
 
     def delete_job_prefix(self, name, persist=True):
         '''
@@ -336,6 +421,7 @@ class Schedule(object):
         for job in list(self.intervals.keys()):
             if job.startswith(name):
                 del self.intervals[job]
+        self.changed()
 
         if persist:
             self.persist()
@@ -372,6 +458,7 @@ class Schedule(object):
         else:
             log.info('Added new job %s to scheduler', new_job)
             self.opts['schedule'].update(data)
+        self.changed()
 
         # Fire the complete event back along with updated list of schedule
         with salt.utils.event.get_event('minion', opts=self.opts, listen=False) as evt:
@@ -390,6 +477,7 @@ class Schedule(object):
         if name in self.opts['schedule']:
             self.opts['schedule'][name]['enabled'] = True
             log.info('Enabling job %s in scheduler', name)
+            self.changed()
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
 
@@ -410,6 +498,7 @@ class Schedule(object):
         if name in self.opts['schedule']:
             self.opts['schedule'][name]['enabled'] = False
             log.info('Disabling job %s in scheduler', name)
+            self.changed()
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
 
@@ -434,6 +523,7 @@ class Schedule(object):
             return
 
         self.opts['schedule'][name] = schedule
+        self.changed()
 
         if persist:
             self.persist()
@@ -479,6 +569,7 @@ class Schedule(object):
         Enable the scheduler.
         '''
         self.opts['schedule']['enabled'] = True
+        self.changed()
 
         # Fire the complete event back along with updated list of schedule
         with salt.utils.event.get_event('minion', opts=self.opts, listen=False) as evt:
@@ -491,6 +582,7 @@ class Schedule(object):
         Disable the scheduler.
         '''
         self.opts['schedule']['enabled'] = False
+        self.changed()
 
         # Fire the complete event back along with updated list of schedule
         with salt.utils.event.get_event('minion', opts=self.opts, listen=False) as evt:
@@ -508,6 +600,7 @@ class Schedule(object):
         if 'schedule' in schedule:
             schedule = schedule['schedule']
         self.opts.setdefault('schedule', {}).update(schedule)
+        self.changed()
 
     def list(self, where):
         '''
@@ -556,6 +649,7 @@ class Schedule(object):
                 self.opts['schedule'][name]['run_explicit'] = []
             self.opts['schedule'][name]['run_explicit'].append({'time': new_time,
                                                                 'time_fmt': time_fmt})
+            self.changed()
 
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
@@ -580,6 +674,7 @@ class Schedule(object):
                 self.opts['schedule'][name]['skip_explicit'] = []
             self.opts['schedule'][name]['skip_explicit'].append({'time': time,
                                                                  'time_fmt': time_fmt})
+            self.changed()
 
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
@@ -1359,12 +1454,39 @@ class Schedule(object):
                    'skip_function',
                    'skip_during_range',
                    'splay']
+
+        if not now:
+            now = datetime.datetime.now()
+
+        lazy = self.opts.get('schedule_lazy_eval', False)
+        if lazy:
+            # Evaluate all of the jobs again if the schedule was replaced, or
+            # the pillar or grains it can refer to
+            sig = (id(self.opts.get('schedule')),
+                   id(self.opts.get('pillar')),
+                   id(self.opts.get('grains')))
+            if sig != self._deadline_sig:
+                self.deadlines = {}
+                self._deadline_heap = []
+                self._deadline_always = set()
+                self._deadline_sig = sig
+
         for job, data in six.iteritems(schedule):
 
             # Skip anything that is a global setting
             if job in _hidden:
                 continue
 
+            if lazy:
+                deadline = self.deadlines.get(job)
+                if deadline is not None and deadline[0] is data and \
+                        deadline[1] is not None and now < deadline[1]:
+                    # Nothing to do for this job yet
+                    continue
+                # The jobs ignored below are only evaluated again once the
+                # schedule changes
+                self._set_deadline(job, data, datetime.datetime.max)
+
             # Clear these out between runs
             for item in ['_continue',
                          '_error',
@@ -1415,9 +1537,6 @@ class Schedule(object):
                     '_run_on_start' not in data:
                 data['_run_on_start'] = True
 
-            if not now:
-                now = datetime.datetime.now()
-
             # Used for quick lookups when detecting invalid option
             # combinations.
             schedule_keys = set(data.keys())
@@ -1675,6 +1794,9 @@ class Schedule(object):
                     elif run:
                         data['_next_fire_time'] = now + datetime.timedelta(seconds=data['_seconds'])
 
+            if lazy:
+                self._set_deadline(job, data, self._job_deadline(data, now, loop_interval))
+
     def _run_job(self, func, data):
         job_dry_run = data.get('dry_run', False)
         if job_dry_run:
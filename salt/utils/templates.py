@@ -288,9 +288,44 @@ def _get_jinja_error(trace, context=None):
     return line, out
 
 
+def _jinja_env_key(env_args, allow_undefined):
+    '''
+    Return a key identifying the Jinja environment options, as they change the
+    code that templates are compiled to
+    '''
+    options = sorted(
+        (key, repr(val)) for key, val in six.iteritems(env_args)
+        if key not in ('loader', 'bytecode_cache')
+    )
+    return salt.utils.hashutils.sha256_digest(
+        repr((options, bool(allow_undefined))))
+
+
+def _jinja_from_string(jinja_env, tmplstr):
+    '''
+    Load a template from a string, going through the bytecode cache of the
+    environment if it has one. Jinja only uses the bytecode cache for
+    templates loaded through the environment's loader.
+    '''
+    bcc = jinja_env.bytecode_cache
+    if bcc is None:
+        return jinja_env.from_string(tmplstr)
+    bucket = bcc.get_bucket(jinja_env, None, None, tmplstr)
+    code = bucket.code
+    if code is None:
+        code = jinja_env.compile(tmplstr)
+        bucket.code = code
+        bcc.set_bucket(bucket)
+    return jinja_env.template_class.from_code(
+        jinja_env, code, jinja_env.make_globals(None), None)
+
+
 def render_jinja_tmpl(tmplstr, context, tmplpath=None):
     opts = context['opts']
     saltenv = context['saltenv']
+    # Environments which can be reused by the renders of a single run, the
+    # caller owns this dict and decides how long the run lasts.
+    env_cache = context.pop('_jinja_env_cache', None)
     loader = None
     newline = False
 
@@ -301,13 +336,7 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
     if tmplstr.endswith(os.linesep):
         newline = True
 
-    if not saltenv:
-        if tmplpath:
-            loader = jinja2.FileSystemLoader(os.path.dirname(tmplpath))
-    else:
-        loader = salt.utils.jinja.SaltCacheLoader(opts, saltenv, pillar_rend=context.get('_pillar_rend', False))
-
-    env_args = {'extensions': [], 'loader': loader}
+    env_args = {'extensions': []}
 
     if hasattr(jinja2.ext, 'with_'):
         env_args['extensions'].append('jinja2.ext.with_')
@@ -352,25 +381,65 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
     else:
         opt_jinja_env_helper(opt_jinja_env, 'jinja_env')
 
-    if opts.get('allow_undefined', False):
-        jinja_env = jinja2.Environment(**env_args)
+    allow_undefined = opts.get('allow_undefined', False)
+    env_key = _jinja_env_key(env_args, allow_undefined)
+    pillar_rend = context.get('_pillar_rend', False)
+    if not opts.get('jinja_env_reuse', False):
+        env_cache = None
+    if env_cache is not None:
+        cache_key = (saltenv,
+                     bool(pillar_rend),
+                     None if saltenv or not tmplpath
+                     else os.path.dirname(tmplpath),
+                     env_key)
+        cached = env_cache.get(cache_key)
     else:
-        jinja_env = jinja2.Environment(undefined=jinja2.StrictUndefined,
-                                       **env_args)
+        cached = None
+
+    if cached is not None:
+        # Start from the state the environment was in before its first
+        # render, so that nothing leaks from one render to the next. The
+        # loader keeps the templates it fetched, and compiled templates are
+        # kept by the bytecode cache, if enabled.
+        jinja_env, base_globals = cached
+        jinja_env.globals.clear()
+        jinja_env.globals.update(base_globals)
+        if jinja_env.cache is not None:
+            jinja_env.cache.clear()
+    else:
+        if not saltenv:
+            if tmplpath:
+                loader = jinja2.FileSystemLoader(os.path.dirname(tmplpath))
+        else:
+            loader = salt.utils.jinja.SaltCacheLoader(opts, saltenv, pillar_rend=pillar_rend)
+        env_args['loader'] = loader
+
+        if opts.get('jinja_bytecode_cache', False):
+            env_args['bytecode_cache'] = salt.utils.jinja.SaltBytecodeCache(
+                os.path.join(opts['cachedir'], 'jinja'), env_key)
+
+        if allow_undefined:
+            jinja_env = jinja2.Environment(**env_args)
+        else:
+            jinja_env = jinja2.Environment(undefined=jinja2.StrictUndefined,
+                                           **env_args)
+
+        tojson_filter = jinja_env.filters.get('tojson')
+        jinja_env.tests.update(JinjaTest.salt_jinja_tests)
+        jinja_env.filters.update(JinjaFilter.salt_jinja_filters)
+        if tojson_filter is not None:
+            # Use the existing tojson filter, if present (jinja2 >= 2.9)
+            jinja_env.filters['tojson'] = tojson_filter
+        jinja_env.globals.update(JinjaGlobal.salt_jinja_globals)
 
-    tojson_filter = jinja_env.filters.get('tojson')
-    jinja_env.tests.update(JinjaTest.salt_jinja_tests)
-    jinja_env.filters.update(JinjaFilter.salt_jinja_filters)
-    if tojson_filter is not None:
-        # Use the existing tojson filter, if present (jinja2 >= 2.9)
-        jinja_env.filters['tojson'] = tojson_filter
-    jinja_env.globals.update(JinjaGlobal.salt_jinja_globals)
+        # globals
+        jinja_env.globals['odict'] = OrderedDict
+        jinja_env.globals['show_full_context'] = salt.utils.jinja.show_full_context
 
-    # globals
-    jinja_env.globals['odict'] = OrderedDict
-    jinja_env.globals['show_full_context'] = salt.utils.jinja.show_full_context
+        jinja_env.tests['list'] = salt.utils.data.is_list
 
-    jinja_env.tests['list'] = salt.utils.data.is_list
+        if env_cache is not None:
+            env_cache[cache_key] = (jinja_env, dict(jinja_env.globals))
 
     decoded_context = {}
     for key, value in six.iteritems(context):
@@ -388,7 +457,7 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
             decoded_context[key] = salt.utils.data.decode(value)
 
     try:
-        template = jinja_env.from_string(tmplstr)
+        template = _jinja_from_string(jinja_env, tmplstr)
         template.globals.update(decoded_context)
         output = template.render(**decoded_context)
     except jinja2.exceptions.UndefinedError as exc:
@@ -9,6 +9,7 @@ from __future__ import absolute_import, print_function, unicode_literals
 import copy
 import logging
 import os
+import re
 import shutil
 import subprocess
 import sys
@@ -320,6 +321,71 @@ def _get_supported_py_config(tops, extended_cfg):
     return salt.utils.stringutils.to_bytes(os.linesep.join(pymap))
 
 
+# The number of manifests of earlier thin versions kept to build deltas from
+THIN_MANIFEST_HISTORY = 20
+
+
+def _reproducible_tarinfo(tarinfo):
+    '''
+    Drop the owner and the modification time from the thin members, so that
+    the same files always make the same tar stream. The shim resets the
+    modification times when it unpacks the thin.
+    '''
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = ''
+    tarinfo.mtime = 0
+    return tarinfo
+
+
+def _read_manifest(path):
+    '''
+    Read a thin manifest, which maps the name of each file in the thin to its
+    sha1 digest. Returns None if the manifest does not exist.
+    '''
+    if not os.path.isfile(path):
+        return None
+    manifest = {}
+    with salt.utils.files.fopen(path, 'r') as fp_:
+        for line in fp_:
+            digest, _, name = line.rstrip('\n').partition('  ')
+            if name:
+                manifest[name] = digest
+    return manifest
+
+
+def _write_manifest(path, manifest):
+    '''
+    Write a thin manifest, in the format of sha1sum
+    '''
+    with salt.utils.files.fopen(path, 'w') as fp_:
+        for name in sorted(manifest):
+            fp_.write('{0}  {1}\n'.format(manifest[name], name))
+
+
+def _archive_manifest(thindir, code_checksum):
+    '''
+    Keep a copy of the manifest of the thin generated for code_checksum, so
+    that deltas can be built for the targets which still have it
+    '''
+    manifest = os.path.join(thindir, 'manifest')
+    manifests = os.path.join(thindir, 'manifests')
+    if not os.path.isfile(manifest):
+        return
+    if not os.path.isdir(manifests):
+        os.makedirs(manifests)
+    shutil.copyfile(manifest, os.path.join(manifests, code_checksum))
+    history = sorted(
+        (os.path.join(manifests, name) for name in os.listdir(manifests)),
+        key=os.path.getmtime, reverse=True)
+    for old in history[THIN_MANIFEST_HISTORY:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    # The deltas were all built for the previous thin
+    shutil.rmtree(os.path.join(thindir, 'delta'), ignore_errors=True)
+
+
 def _get_thintar_prefix(tarname):
     '''
     Make sure thintar temporary name is concurrent and secure.
@@ -467,11 +533,14 @@ def gen_thin(cachedir, extra_mods='', overwrite=False, so_mods='',
         fp_.write(_get_supported_py_config(tops=tops_py_version_mapping, extended_cfg=extended_cfg))
 
     tmp_thintar = _get_thintar_prefix(thintar)
+    add_kwargs = {}
     if compress == 'gzip':
         tfp = tarfile.open(tmp_thintar, 'w:gz', dereference=True)
+        add_kwargs['filter'] = _reproducible_tarinfo
     elif compress == 'zip':
         tfp = zipfile.ZipFile(tmp_thintar, 'w', compression=zlib and zipfile.ZIP_DEFLATED or zipfile.ZIP_STORED)
         tfp.add = tfp.write
+    manifest = {}
     try:  # cwd may not exist if it was removed but salt was run from it
         start_dir = os.getcwd()
     except OSError:
@@ -480,7 +549,8 @@ def gen_thin(cachedir, extra_mods='', overwrite=False, so_mods='',
 
     # Pack default data
     log.debug('Packing default libraries based on current Salt version')
-    for py_ver, tops in _six.iteritems(tops_py_version_mapping):
+    for py_ver, tops in sorted(_six.iteritems(tops_py_version_mapping),
+                               key=lambda item: str(item[0])):  # future lint: disable=blacklisted-function
         for top in tops:
             if absonly and not os.path.isabs(top):
                 continue
@@ -502,12 +572,17 @@ def gen_thin(cachedir, extra_mods='', overwrite=False, so_mods='',
             if not os.path.isdir(top):
                 # top is a single file module
                 if os.path.exists(os.path.join(top_dirname, base)):
-                    tfp.add(base, arcname=os.path.join(site_pkg_dir, base))
+                    arcname = os.path.join(site_pkg_dir, base)
+                    tfp.add(base, arcname=arcname, **add_kwargs)
+                    manifest[arcname] = salt.utils.hashutils.get_hash(
+                        os.path.join(top_dirname, base), 'sha1')
                 continue
             for root, dirs, files in salt.utils.path.os_walk(base, followlinks=True):
-                for name in files:
+                dirs.sort()
+                for name in sorted(files):
                     if not name.endswith(('.pyc', '.pyo')):
-                        digest_collector.add(os.path.join(root, name))
+                        digest = digest_collector.add(os.path.join(root, name),
+                                                      file_form='sha1')
                         arcname = os.path.join(site_pkg_dir, root, name)
                         if hasattr(tfp, 'getinfo'):
                             try:
@@ -517,7 +592,8 @@ def gen_thin(cachedir, extra_mods='', overwrite=False, so_mods='',
                             except KeyError:
                                 log.debug('ZIP: Unable to add "%s" with "getinfo"', arcname)
                         if arcname:
-                            tfp.add(os.path.join(root, name), arcname=arcname)
+                            tfp.add(os.path.join(root, name), arcname=arcname, **add_kwargs)
+                            manifest[arcname] = digest
 
             if tempdir is not None:
                 shutil.rmtree(tempdir)
@@ -537,12 +613,17 @@ def gen_thin(cachedir, extra_mods='', overwrite=False, so_mods='',
             if not os.path.isdir(top):
                 # top is a single file module
                 if os.path.exists(os.path.join(top_dirname, base)):
-                    tfp.add(base, arcname=os.path.join(ns, site_pkg_dir, base))
+                    arcname = os.path.join(ns, site_pkg_dir, base)
+                    tfp.add(base, arcname=arcname, **add_kwargs)
+                    manifest[arcname] = salt.utils.hashutils.get_hash(
+                        os.path.join(top_dirname, base), 'sha1')
                 continue
             for root, dirs, files in salt.utils.path.os_walk(base, followlinks=True):
-                for name in files:
+                dirs.sort()
+                for name in sorted(files):
                     if not name.endswith(('.pyc', '.pyo')):
-                        digest_collector.add(os.path.join(root, name))
+                        digest = digest_collector.add(os.path.join(root, name),
+                                                      file_form='sha1')
                         arcname = os.path.join(ns, site_pkg_dir, root, name)
                         if hasattr(tfp, 'getinfo'):
                             try:
@@ -551,7 +632,8 @@ def gen_thin(cachedir, extra_mods='', overwrite=False, so_mods='',
                             except KeyError:
                                 log.debug('ZIP: Unable to add "%s" with "getinfo"', arcname)
                         if arcname:
-                            tfp.add(os.path.join(root, name), arcname=arcname)
+                            tfp.add(os.path.join(root, name), arcname=arcname, **add_kwargs)
+                            manifest[arcname] = digest
 
     os.chdir(thindir)
     with salt.utils.files.fopen(thinver, 'w+') as fp_:
@@ -562,18 +644,74 @@ def gen_thin(cachedir, extra_mods='', overwrite=False, so_mods='',
         fp_.write(digest_collector.digest())
     os.chdir(os.path.dirname(thinver))
 
-    for fname in ['version', '.thin-gen-py-version', 'salt-call', 'supported-versions', 'code-checksum']:
-        tfp.add(fname)
+    control_files = ['version', '.thin-gen-py-version', 'salt-call', 'supported-versions', 'code-checksum']
+    for fname in control_files:
+        manifest[fname] = salt.utils.hashutils.get_hash(os.path.join(thindir, fname), 'sha1')
+    _write_manifest(os.path.join(thindir, 'manifest'), manifest)
+    for fname in control_files + ['manifest']:
+        tfp.add(fname, **add_kwargs)
 
     if start_dir:
         os.chdir(start_dir)
     tfp.close()
 
     shutil.move(tmp_thintar, thintar)
+    _archive_manifest(thindir, digest_collector.digest().strip())
 
     return thintar
 
 
+def gen_thin_delta(cachedir, code_checksum):
+    '''
+    Generate a tarball holding only the files of the current thin which are
+    new or changed since the thin with the passed code checksum, along with
+    the current manifest. The shim removes the files which are no longer part
+    of the thin using the manifest.
+
+    Returns the path of the tarball, or None if the manifest of the earlier
+    thin is not known.
+    '''
+    if not re.match(r'^[0-9a-f]+$', code_checksum or ''):
+        return None
+    thintar = gen_thin(cachedir)
+    thindir = os.path.dirname(thintar)
+    old_manifest = _read_manifest(os.path.join(thindir, 'manifests', code_checksum))
+    new_manifest = _read_manifest(os.path.join(thindir, 'manifest'))
+    if old_manifest is None or new_manifest is None \
+            or not thintar.endswith('.tgz'):
+        return None
+
+    with salt.utils.files.fopen(os.path.join(thindir, 'code-checksum'), 'r') as fh_:
+        new_checksum = fh_.read().strip()
+    deltadir = os.path.join(thindir, 'delta')
+    if not os.path.isdir(deltadir):
+        os.makedirs(deltadir)
+    delta = os.path.join(deltadir, '{0}-{1}.tgz'.format(code_checksum, new_checksum))
+    if os.path.isfile(delta):
+        return delta
+
+    changed = set(name for name, digest in _six.iteritems(new_manifest)
+                  if old_manifest.get(name) != digest)
+    changed.add('manifest')
+    log.debug('Packing %d of %d thin files in delta from %s',
+              len(changed), len(new_manifest), code_checksum)
+    tmp_delta = _get_thintar_prefix(delta)
+    full = tarfile.open(thintar, 'r:gz')
+    try:
+        out = tarfile.open(tmp_delta, 'w:gz')
+        try:
+            for member in full:
+                if member.name in changed:
+                    out.addfile(member, full.extractfile(member) if member.isfile() else None)
+        finally:
+            out.close()
+    finally:
+        full.close()
+    # Concurrent routines may build the same delta, the last one wins
+    shutil.move(tmp_delta, delta)
+    return delta
+
+
 def thin_sum(cachedir, form='sha1'):
     '''
     Return the checksum of the current thin tarball
@@ -10,6 +10,9 @@ import warnings
 import yaml  # pylint: disable=blacklisted-import
 from yaml.nodes import MappingNode, SequenceNode
 from yaml.constructor import ConstructorError
+# The pure-Python loader, yaml.SafeLoader is replaced below when libyaml is
+# available
+from yaml.loader import SafeLoader as PySafeLoader
 try:
     yaml.Loader = yaml.CLoader
     yaml.Dumper = yaml.CDumper
@@ -20,7 +23,9 @@ except Exception:
 
 import salt.utils.stringutils
 
-__all__ = ['SaltYamlSafeLoader', 'load', 'safe_load']
+__all__ = ['SaltYamlSafeLoader', 'SaltYamlSafePyLoader', 'load', 'safe_load']
+
+HAS_LIBYAML = hasattr(yaml, 'CSafeLoader')
 
 
 class DuplicateKeyWarning(RuntimeWarning):
@@ -33,14 +38,14 @@ warnings.simplefilter('always', category=DuplicateKeyWarning)
 
 
 # with code integrated from https://gist.github.com/844388
-class SaltYamlSafeLoader(yaml.SafeLoader):
+class SaltYamlSafeConstructor(object):
     '''
-    Create a custom YAML loader that uses the custom constructor. This allows
+    Custom constructor, shared by the C and pure-Python loaders. This allows
     for the YAML loading defaults to be manipulated based on needs within salt
     to make things like sls file more intuitive.
     '''
     def __init__(self, stream, dictclass=dict):
-        super(SaltYamlSafeLoader, self).__init__(stream)
+        super(SaltYamlSafeConstructor, self).__init__(stream)
         if dictclass is not dict:
             # then assume ordered dict and use it for both !map and !omap
             self.add_constructor(
@@ -118,7 +123,7 @@ class SaltYamlSafeLoader(yaml.SafeLoader):
                 # an empty string. Change it to '0'.
                 if node.value == '':
                     node.value = '0'
-        return super(SaltYamlSafeLoader, self).construct_scalar(node)
+        return super(SaltYamlSafeConstructor, self).construct_scalar(node)
 
     def construct_yaml_str(self, node):
         value = self.construct_scalar(node)
@@ -166,6 +171,22 @@ class SaltYamlSafeLoader(yaml.SafeLoader):
             node.value = mergeable_items + node.value
 
 
+class SaltYamlSafeLoader(SaltYamlSafeConstructor,
+                         getattr(yaml, 'CSafeLoader', PySafeLoader)):
+    '''
+    Create a custom YAML loader that uses the custom constructor. The scanner
+    and parser come from libyaml when it is available, which is several times
+    faster than the pure-Python ones on large documents.
+    '''
+
+
+class SaltYamlSafePyLoader(SaltYamlSafeConstructor, PySafeLoader):
+    '''
+    The custom YAML loader on top of the pure-Python scanner and parser. Its
+    error messages include a snippet of the document around the error.
+    '''
+
+
 def load(stream, Loader=SaltYamlSafeLoader):
     return yaml.load(stream, Loader=Loader)
 
@@ -5,9 +5,12 @@
 
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import importlib
 import os
 import shutil
+import tarfile
 import tempfile
+import time
 
 # Import Salt Testing libs
 from tests.support.runtests import RUNTIME_VARS
@@ -16,7 +19,10 @@ from tests.support.case import ShellCase
 from tests.support.mock import NO_MOCK, NO_MOCK_REASON, patch, MagicMock
 
 # Import Salt libs
+import salt.client.ssh.shell
+import salt.client.ssh.state
 import salt.config
+import salt.defaults.exitcodes
 import salt.roster
 import salt.utils.files
 import salt.utils.path
@@ -24,6 +30,14 @@ import salt.utils.thin
 import salt.utils.yaml
 
 from salt.client import ssh
+# salt.client.ssh binds the name ssh_py_shim to the opened shim file
+ssh_py_shim = importlib.import_module('salt.client.ssh.ssh_py_shim')
+
+# Import 3rd-party libs
+import tornado.concurrent
+import tornado.gen
+import tornado.ioloop
+import tornado.process
 
 ROSTER = '''
 localhost:
@@ -150,3 +164,308 @@ class SSHSingleTests(TestCase):
                          'PasswordAuthentication=yes -o ConnectTimeout=65 -o Port=22 '
                          '-o IdentityFile=/etc/salt/pki/master/ssh/salt-ssh.rsa '
                          '-o User=root  date +%s')
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class SSHAsyncTests(TestCase):
+    def setUp(self):
+        self.tmp_cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.tmp_cachedir, ignore_errors=True)
+
+    def _single(self):
+        opts = {
+            'argv': ['test.ping'],
+            '__role': 'master',
+            'cachedir': self.tmp_cachedir,
+            'extension_modules': os.path.join(self.tmp_cachedir, 'extmods'),
+        }
+        return ssh.Single(
+                opts,
+                opts['argv'],
+                'localhost',
+                host='login1',
+                mods={},
+                thin=salt.utils.thin.thin_path(opts['cachedir']))
+
+    @staticmethod
+    def _future(result):
+        future = tornado.concurrent.Future()
+        future.set_result(result)
+        return future
+
+    def test_run_cmd_async(self):
+        '''
+        Check that commands are run with non-blocking pipes, and killed at the
+        deadline
+        '''
+        shell = salt.client.ssh.shell.Shell({}, 'localhost')
+        io_loop = tornado.ioloop.IOLoop()
+        self.addCleanup(io_loop.close)
+        self.addCleanup(tornado.process.Subprocess.uninitialize)
+        # The exit is waited for without polling
+        with patch('tornado.gen.sleep', side_effect=AssertionError):
+            ret = io_loop.run_sync(
+                lambda: shell._run_cmd_async('echo out; echo err >&2; exit 3'))
+        self.assertEqual(ret, ('out\n', 'err\n', 3))
+
+        start = time.time()
+        ret = io_loop.run_sync(
+            lambda: shell._run_cmd_async('sleep 10',
+                                         deadline=io_loop.time() + 0.5))
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(ret[2], salt.defaults.exitcodes.EX_GENERIC)
+
+    def test_cmd_block_deploy(self):
+        '''
+        Check that cmd_block and cmd_block_async both deploy the thin when the
+        shim asks for it
+        '''
+        shim_rets = [
+            (ssh.RSTR + '\ndeploy\n', '', salt.defaults.exitcodes.EX_THIN_DEPLOY),
+            (ssh.RSTR + '\n{"local": true}\n', ssh.RSTR + '\n', 0),
+        ]
+        single = self._single()
+        with patch.object(single, 'shim_cmd', MagicMock(side_effect=shim_rets)), \
+                patch.object(single, 'deploy', MagicMock(return_value=True)) as deploy:
+            self.assertEqual(single.cmd_block(), ('{"local": true}', '', 0))
+        deploy.assert_called_once_with()
+
+        single = self._single()
+        exec_cmd_async = MagicMock(side_effect=[self._future(ret) for ret in shim_rets])
+        deploy_async = MagicMock(return_value=self._future(True))
+        io_loop = tornado.ioloop.IOLoop()
+        self.addCleanup(io_loop.close)
+        with patch.object(single.shell, 'exec_cmd_async', exec_cmd_async), \
+                patch.object(single, 'deploy_async', deploy_async):
+            self.assertEqual(io_loop.run_sync(single.cmd_block_async),
+                             ('{"local": true}', '', 0))
+        deploy_async.assert_called_once_with(deadline=None)
+        self.assertEqual(exec_cmd_async.call_count, 2)
+
+    def test_cmd_block_async_deploy_python(self):
+        '''
+        Check that cmd_block_async deploys Python on Windows targets, away
+        from the IOLoop
+        '''
+        shim_rets = [
+            ('', 'The system cannot find the path specified', 1),
+            (ssh.RSTR + '\n{"local": true}\n', ssh.RSTR + '\n', 0),
+        ]
+        single = self._single()
+        exec_cmd_async = MagicMock(side_effect=[self._future(ret) for ret in shim_rets])
+        winshell = MagicMock()
+        winshell.deploy_python.return_value = True
+        io_loop = tornado.ioloop.IOLoop()
+        self.addCleanup(io_loop.close)
+        with patch.object(single.shell, 'exec_cmd_async', exec_cmd_async), \
+                patch.object(single, 'categorize_shim_errors',
+                             MagicMock(side_effect=['Python environment not found on Windows system', None])), \
+                patch('salt.client.ssh.saltwinshell', winshell, create=True):
+            self.assertEqual(io_loop.run_sync(single.cmd_block_async),
+                             ('{"local": true}', '', 0))
+        winshell.deploy_python.assert_called_once_with(single)
+        self.assertEqual(exec_cmd_async.call_count, 2)
+
+    def test_handle_ssh_async(self):
+        '''
+        Check that returns are yielded as they complete, and that targets
+        which need a terminal are run in processes
+        '''
+        delays = {'slow': 0.5, 'fast': 0, 'medium': 0.2}
+
+        class _Single(object):
+            def __init__(self, opts, argv, id_, **kwargs):
+                self.id = id_
+
+            @tornado.gen.coroutine
+            def run_async(self, deadline=None):
+                yield tornado.gen.sleep(delays[self.id])
+                raise tornado.gen.Return(
+                    ('{{"local": "{0}"}}'.format(self.id), '', 0))
+
+        client = ssh.SSH.__new__(ssh.SSH)
+        client.opts = {'argv': ['uptime'], 'raw_shell': True,
+                       'ssh_async': True, 'ssh_async_concurrency': 10}
+        client.targets = dict((host, {}) for host in delays)
+        client.targets['tty'] = {'tty': True}
+        client.defaults = {'user': 'root'}
+        client.mods = client.fsclient = client.thin = None
+        procs_ret = [{'tty': 'tty'}]
+        with patch('salt.client.ssh.Single', _Single), \
+                patch.object(ssh.SSH, 'handle_ssh_procs',
+                             MagicMock(return_value=procs_ret)) as handle_ssh_procs:
+            start = time.time()
+            rets = list(client.handle_ssh())
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(rets, [{'fast': 'fast'}, {'medium': 'medium'},
+                                {'slow': 'slow'}, {'tty': 'tty'}])
+        handle_ssh_procs.assert_called_once_with(
+            {'tty': {'tty': True, 'user': 'root', 'host': 'tty'}}, mine=False)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class SSHControlMasterTests(TestCase):
+    def setUp(self):
+        self.tmp_cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.tmp_cachedir, ignore_errors=True)
+        self.opts = {'cachedir': self.tmp_cachedir,
+                     'ssh_control_master': True}
+
+    def test_control_opts(self):
+        '''
+        Check that ssh and scp commands share one control socket per host
+        '''
+        shell = salt.client.ssh.shell.Shell(self.opts, 'login1', user='root', port='22')
+        control_path = shell._control_path()
+        self.assertTrue(control_path.startswith(os.path.join(self.tmp_cachedir, 'ssh_control')))
+        for cmd in (shell._cmd_str('date'), shell._cmd_str('a login1:b', ssh='scp')):
+            self.assertIn('-o ControlMaster=auto -o ControlPath={0} '
+                          '-o ControlPersist=yes'.format(control_path), cmd)
+
+        other = salt.client.ssh.shell.Shell(self.opts, 'login2', user='root', port='22')
+        self.assertNotEqual(other._control_path(), control_path)
+
+        self.opts['ssh_control_persist'] = 600
+        self.assertIn('-o ControlPersist=600', shell._cmd_str('date'))
+
+        self.opts['ssh_control_master'] = False
+        self.assertNotIn('ControlPath', shell._cmd_str('date'))
+
+    def test_close_sessions(self):
+        '''
+        Check that the sessions are closed in parallel at the end of a run,
+        unless they persist
+        '''
+        client = ssh.SSH.__new__(ssh.SSH)
+        client.opts = self.opts
+        client.defaults = {'user': 'root', 'port': '22'}
+        client.targets = {'web1': {'host': 'login1'},
+                          'web2': {'host': 'login2'},
+                          'web3': {'host': 'login3'},
+                          'win1': {'winrm': True}}
+        for host in ('login1', 'login2', 'login3'):
+            control_path = salt.client.ssh.shell.Shell(
+                self.opts, host, user='root', port='22')._control_path()
+            with salt.utils.files.fopen(control_path, 'w'):
+                pass
+        events = []
+
+        def _popen(cmd, **kwargs):
+            events.append(('start', cmd.rsplit(' ', 1)[-1]))
+            proc = MagicMock()
+            proc.wait.side_effect = lambda: events.append(('wait', cmd.rsplit(' ', 1)[-1])) or 0
+            return proc
+
+        with patch('subprocess.Popen', MagicMock(side_effect=_popen)) as popen:
+            client.close_sessions()
+            self.opts['ssh_control_persist'] = 600
+            client.close_sessions()
+        self.assertEqual(popen.call_count, 3)
+        self.assertTrue(popen.call_args[0][0].startswith('ssh -O exit -o ControlPath='))
+        # Every session is being closed before any of them is waited for
+        self.assertEqual([event[0] for event in events], ['start'] * 3 + ['wait'] * 3)
+        self.assertEqual(sorted(event[1] for event in events[:3]),
+                         ['login1', 'login2', 'login3'])
+
+
+class SSHStateCacheTests(TestCase):
+    def setUp(self):
+        self.tmp_cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.tmp_cachedir, ignore_errors=True)
+        self.opts = {'cachedir': self.tmp_cachedir,
+                     'ssh_state_cache': True,
+                     'ssh_state_cache_grains': ['os'],
+                     'grains': {'id': 'web1', 'os': 'Debian'}}
+
+    def test_state_cache_key(self):
+        '''
+        Check that the hosts share a key when they match the same sls with the
+        same pillar and the same grains of ssh_state_cache_grains
+        '''
+        matches = {'base': ['core', 'web']}
+        key = salt.client.ssh.state.state_cache_key(self.opts, matches, {'role': 'web'})
+        self.opts['grains'] = {'id': 'web2', 'os': 'Debian'}
+        self.assertEqual(
+            salt.client.ssh.state.state_cache_key(self.opts, matches, {'role': 'web'}), key)
+        self.assertNotEqual(
+            salt.client.ssh.state.state_cache_key(self.opts, matches, {'role': 'db'}), key)
+        self.assertNotEqual(
+            salt.client.ssh.state.state_cache_key(self.opts, {'base': ['core']}, {'role': 'web'}), key)
+        self.opts['grains'] = {'id': 'web2', 'os': 'CentOS'}
+        self.assertNotEqual(
+            salt.client.ssh.state.state_cache_key(self.opts, matches, {'role': 'web'}), key)
+        self.opts['ssh_state_cache'] = False
+        self.assertIsNone(salt.client.ssh.state.state_cache_key(self.opts, matches, {'role': 'web'}))
+
+    def test_cached_state(self):
+        '''
+        Check that the cached files are packed with the pillar and grains of
+        each host
+        '''
+        chunks = [{'state': 'file', 'fun': 'managed', 'name': '/etc/motd',
+                   'source': 'salt://motd'}]
+        fsclient = MagicMock()
+        fsclient.cache_file = MagicMock(
+            side_effect=lambda name, saltenv, cachedir: os.path.join(self.tmp_cachedir, 'motd')
+            if name == 'salt://motd' else '')
+        fsclient.cache_dir = MagicMock(return_value=[])
+        with salt.utils.files.fopen(os.path.join(self.tmp_cachedir, 'motd'), 'w') as fp_:
+            fp_.write('hello')
+        key = salt.client.ssh.state.state_cache_key(self.opts, {'base': ['motd']})
+        self.assertEqual(salt.client.ssh.state.get_cached_state(self.opts, key), (None, None))
+
+        files_tar = salt.client.ssh.state.prep_files_tar(
+            fsclient, salt.client.ssh.state.lowstate_file_refs(chunks), 'web1')
+        files_tar = salt.client.ssh.state.cache_state(self.opts, key, chunks, files_tar)
+        cached_chunks, cached_tar = salt.client.ssh.state.get_cached_state(self.opts, key)
+        self.assertEqual(cached_chunks, chunks)
+        self.assertEqual(cached_tar, files_tar)
+
+        fsclient.cache_file.reset_mock()
+        trans_tar = salt.client.ssh.state.prep_trans_tar(
+            fsclient, cached_chunks, {}, {'role': 'web'}, 'web2', {'id': 'web2'},
+            files_tar=cached_tar)
+        self.addCleanup(os.remove, trans_tar)
+        with tarfile.open(trans_tar, 'r:gz') as tfp:
+            self.assertEqual(
+                sorted(tfp.getnames()),
+                ['base/motd', 'lowstate.json', 'pillar.json', 'roster_grains.json'])
+        fsclient.cache_file.assert_not_called()
+
+        self.opts['ssh_state_cache_ttl'] = -1
+        self.assertEqual(salt.client.ssh.state.get_cached_state(self.opts, key), (None, None))
+
+
+class SSHShimTests(TestCase):
+    def setUp(self):
+        self.saltdir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.saltdir, ignore_errors=True)
+
+    def test_unpack_thin_replaces_old_thin(self):
+        '''
+        Check that a full thin sent after a delta request replaces the old
+        thin instead of being unpacked over it
+        '''
+        os.makedirs(os.path.join(self.saltdir, 'salt', 'stale'))
+        for path in ('code-checksum', os.path.join('salt', 'stale', 'mod.py')):
+            with salt.utils.files.fopen(os.path.join(self.saltdir, path), 'w') as fp_:
+                fp_.write('old')
+
+        src = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, src, ignore_errors=True)
+        os.makedirs(os.path.join(src, 'salt'))
+        for path in ('code-checksum', 'salt-call', os.path.join('salt', 'mod.py')):
+            with salt.utils.files.fopen(os.path.join(src, path), 'w') as fp_:
+                fp_.write('new')
+        thin_path = os.path.join(self.saltdir, ssh_py_shim.THIN_ARCHIVE)
+        with tarfile.open(thin_path, 'w:gz') as tfile:
+            for path in ('code-checksum', 'salt-call', 'salt'):
+                tfile.add(os.path.join(src, path), arcname=path)
+
+        with patch.object(ssh_py_shim.OPTIONS, 'saltdir', self.saltdir, create=True):
+            ssh_py_shim.unpack_thin(thin_path)
+        self.assertEqual(sorted(os.listdir(self.saltdir)),
+                         ['code-checksum', 'salt', 'salt-call'])
+        self.assertEqual(os.listdir(os.path.join(self.saltdir, 'salt')), ['mod.py'])
+        with salt.utils.files.fopen(os.path.join(self.saltdir, 'code-checksum')) as fp_:
+            self.assertEqual(fp_.read(), 'new')
@@ -10,6 +10,7 @@ import stat
 # Import Salt libs
 import salt.config
 import salt.daemons.masterapi as masterapi
+import salt.utils.dictdiffer
 import salt.utils.platform
 
 # Import Salt Testing Libs
@@ -658,3 +659,23 @@ class RemoteFuncsTestCase(TestCase):
                 }
             )
         self.assertDictEqual(ret, dict(ip_addr=dict(webserver='2001:db8::1:3'), ip4_addr=dict(webserver='127.0.0.1')))
+
+    def test_mine_delta(self):
+        '''
+        Asserts that a mine delta is applied to the cached mine data of the
+        functions it covers, and refused if it was not computed against them.
+        '''
+        self.funcs.opts['minion_data_cache'] = True
+        self.funcs.cache.store('minions/webserver', 'mine',
+                               dict(ip_addr=['10.0.0.1'], disk={'/': 10}))
+        delta = salt.utils.dictdiffer.delta({'ip_addr': ['10.0.0.1']},
+                                            {'ip_addr': ['10.0.0.2']})
+        delta['keys'] = ['ip_addr']
+        self.assertTrue(self.funcs._mine({'id': 'webserver', 'mine_delta': delta}))
+        self.assertDictEqual(self.funcs.cache.fetch('minions/webserver', 'mine'),
+                             dict(ip_addr=['10.0.0.2'], disk={'/': 10}))
+
+        # The same delta does not apply anymore
+        self.assertFalse(self.funcs._mine({'id': 'webserver', 'mine_delta': delta}))
+        self.assertDictEqual(self.funcs.cache.fetch('minions/webserver', 'mine'),
+                             dict(ip_addr=['10.0.0.2'], disk={'/': 10}))
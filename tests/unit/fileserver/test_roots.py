@@ -13,7 +13,7 @@ import tempfile
 from tests.integration import AdaptedConfigurationTestCaseMixin
 from tests.support.mixins import LoaderModuleMockMixin
 from tests.support.unit import TestCase, skipIf
-from tests.support.mock import patch, NO_MOCK, NO_MOCK_REASON
+from tests.support.mock import patch, MagicMock, NO_MOCK, NO_MOCK_REASON
 from tests.support.runtests import RUNTIME_VARS
 from tests.support.paths import TMP
 
@@ -195,3 +195,123 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
         self.assertEqual('dynamo.sls', ret1['rel'])
         self.assertIn('top.sls', ret2)
         self.assertIn('dynamo.sls', ret2)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class RootsIndexTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMixin):
+
+    def setup_loader_modules(self):
+        self.root_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.cache_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(salt.utils.files.rm_rf, self.root_dir)
+        self.addCleanup(salt.utils.files.rm_rf, self.cache_dir)
+        self.opts = self.get_temp_config('master')
+        self.opts.update({'file_roots': {'base': [self.root_dir]},
+                          'cachedir': self.cache_dir,
+                          'roots_index': True,
+                          'fileserver_events': False})
+        return {roots: {'__opts__': self.opts}}
+
+    def setUp(self):
+        os.makedirs(os.path.join(self.root_dir, 'sub'))
+        for path in ('top.sls', 'sub/init.sls'):
+            with salt.utils.files.fopen(
+                    os.path.join(self.root_dir, path), 'w') as fp_:
+                fp_.write(path)
+        roots._INDEX_CACHE.clear()
+
+    def tearDown(self):
+        del self.opts
+
+    def test_update_writes_index(self):
+        '''
+        Ensure the periodic update writes the index, and that the file lists
+        are then answered from it without walking the file_roots
+        '''
+        roots.update()
+        with patch('salt.utils.path.os_walk', side_effect=AssertionError):
+            self.assertEqual(roots.file_list({'saltenv': 'base'}),
+                             ['sub/init.sls', 'top.sls'])
+            self.assertEqual(roots.dir_list({'saltenv': 'base'}), ['sub'])
+        self.assertEqual(roots.find_file('top.sls')['rel'], 'top.sls')
+
+        # A file missing from the index is still found on disk
+        with salt.utils.files.fopen(
+                os.path.join(self.root_dir, 'new.sls'), 'w') as fp_:
+            fp_.write('new')
+        self.assertEqual(roots.find_file('new.sls')['rel'], 'new.sls')
+        self.assertNotIn('new.sls', roots._read_index('base')['data']['files'])
+
+    def test_update_skipped_while_watching(self):
+        '''
+        Ensure the file_roots are not walked while the watcher is running
+        '''
+        roots.WATCHING.set()
+        try:
+            with patch('salt.fileserver.generate_mtime_map',
+                       side_effect=AssertionError):
+                roots.update()
+        finally:
+            roots.WATCHING.clear()
+
+    def test_index_apply(self):
+        '''
+        Ensure file changes are applied to the index without a walk
+        '''
+        index = roots._walk_file_lists('base')
+        os.remove(os.path.join(self.root_dir, 'sub', 'init.sls'))
+        with salt.utils.files.fopen(
+                os.path.join(self.root_dir, 'new.sls'), 'w') as fp_:
+            fp_.write('new')
+        ret = roots._index_apply(index, 'base', ['sub/init.sls', 'new.sls'])
+        self.assertEqual(ret['files'], ['new.sls', 'top.sls'])
+        self.assertEqual(ret['empty_dirs'], ['sub'])
+        self.assertEqual(ret['dirs'], ['sub'])
+
+    def test_hash_index(self):
+        '''
+        Ensure hashes are served from the hash index and that changed files
+        are not served stale hashes
+        '''
+        self.opts['roots_hash_index'] = True
+        roots.update()
+        top = os.path.join(self.root_dir, 'top.sls')
+        fnd = roots.find_file('top.sls')
+        load = {'saltenv': 'base', 'path': 'top.sls'}
+        with patch('salt.utils.hashutils.get_hash',
+                   side_effect=AssertionError):
+            ret = roots.file_hash(load, fnd)
+        self.assertEqual(
+            ret['hsum'],
+            salt.utils.hashutils.get_hash(top, self.opts['hash_type']))
+
+        with salt.utils.files.fopen(top, 'w') as fp_:
+            fp_.write('changed file')
+        self.assertIsNone(roots._indexed_hash(top))
+        ret = roots.file_hash(load, fnd)
+        self.assertEqual(
+            ret['hsum'],
+            salt.utils.hashutils.get_hash(top, self.opts['hash_type']))
+
+        # Only the changed file is hashed again
+        with patch('salt.utils.hashutils.get_hash',
+                   MagicMock(return_value='abc')) as get_hash:
+            roots._update_hash_index(
+                [top, os.path.join(self.root_dir, 'sub', 'init.sls')])
+        get_hash.assert_called_once_with(top, self.opts['hash_type'])
+        self.assertEqual(roots._indexed_hash(top), 'abc')
+
+    def test_serve_file_chunks(self):
+        '''
+        Ensure several chunks are served at once, up to fileserver_max_chunks
+        '''
+        with salt.utils.files.fopen(
+                os.path.join(self.root_dir, 'big'), 'wb') as fp_:
+            fp_.write(b'x' * 100)
+        fnd = roots.find_file('big')
+        load = {'saltenv': 'base', 'path': 'big', 'loc': 10, 'chunks': 4}
+        with patch.dict(roots.__opts__, {'file_buffer_size': 10,
+                                         'fileserver_max_chunks': 3}):
+            self.assertEqual(roots.serve_file(load, fnd)['data'], b'x' * 30)
+            load.pop('chunks')
+            self.assertEqual(roots.serve_file(load, fnd)['data'], b'x' * 10)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+# Import Python Libs
+from __future__ import absolute_import, print_function, unicode_literals
+
+# Import Salt Testing libs
+from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.unit import TestCase
+from tests.support.mock import patch, MagicMock
+
+# Import Salt libs
+import salt.renderers.jinja as jinja
+from salt.ext.six.moves import StringIO
+
+
+class JinjaRendererTestCase(TestCase, LoaderModuleMockMixin):
+
+    def setup_loader_modules(self):
+        return {jinja: {'__opts__': {'render_cache': True}}}
+
+    def test_template_free(self):
+        '''
+        Test the detection of sources without Jinja syntax
+        '''
+        self.assertTrue(jinja._template_free('foo: bar\n', 'top'))
+        for data in ('foo: {{ bar }}', 'foo: {% bar %}', '{# comment #}'):
+            self.assertFalse(jinja._template_free(data, 'top'))
+
+        env = {'variable_start_string': '<<',
+               'line_statement_prefix': '%'}
+        with patch.dict(jinja.__opts__, {'jinja_sls_env': env}):  # pylint: disable=no-member
+            self.assertTrue(jinja._template_free('foo: {{ bar }}', 'top'))
+            self.assertFalse(jinja._template_free('foo: << bar >>', 'top'))
+            self.assertFalse(
+                jinja._template_free('  % if bar\nfoo: bar\n', 'top'))
+            # jinja_sls_env only applies to SLS files
+            self.assertFalse(jinja._template_free('foo: {{ bar }}', ''))
+
+    def test_render_skips_template_free(self):
+        '''
+        Sources without Jinja syntax are passed on without rendering
+        '''
+        data = StringIO('foo: bar\n')
+        with patch('salt.utils.templates.JINJA', MagicMock()) as jinja_mock:
+            self.assertIs(jinja.render(data, sls='top'), data)
+            self.assertEqual(data.read(), 'foo: bar\n')
+            jinja_mock.assert_not_called()
@@ -15,6 +15,7 @@ from tests.support.mock import (
 
 # Import Salt libs
 import salt.renderers.yaml as yaml
+import salt.template
 from salt.ext import six
 
 
@@ -66,3 +67,24 @@ class YAMLRendererTestCase(TestCase, LoaderModuleMockMixin):
                       b: {'a': u'\\u0414'}''')),
                 {'foo': {'a': u'\u0414', 'b': {'a': u'\u0414'}}}
             )
+
+    def test_yaml_render_cache(self):
+        '''
+        Parsed data is cached by content when render_cache is enabled, and
+        callers get their own copy
+        '''
+        salt.template.clear_render_cache()
+        data = textwrap.dedent('''\
+            foo:
+              - a
+              - b''')
+        with patch.dict(yaml.__opts__, {'render_cache': True}):  # pylint: disable=no-member
+            first = yaml.render(data)
+            first['foo'].append('c')
+            second = yaml.render(data)
+            self.assertEqual(second, {'foo': ['a', 'b']})
+            second['bar'] = 1
+            self.assertEqual(yaml.render(data), {'foo': ['a', 'b']})
+        stats = salt.template.render_stats()
+        self.assertEqual(stats['yaml']['cache_misses'], 1)
+        self.assertGreaterEqual(stats['yaml']['cache_hits'], 2)
@@ -61,6 +61,16 @@ class LocalCacheCleanOldJobsTestCase(TestCase, LoaderModuleMockMixin):
         if os.path.exists(self.TMP_CACHE_DIR):
             shutil.rmtree(self.TMP_CACHE_DIR)
 
+    def test_save_load_reg(self):
+        '''
+        Test that the thorium register is saved over its previous copy and
+        loaded back
+        '''
+        local_cache.save_reg({'foo': {'val': [1, 2]}})
+        local_cache.save_reg({'foo': {'val': [3]}, 'bar': {'val': 'baz'}})
+        self.assertEqual(local_cache.load_reg(),
+                         {'foo': {'val': [3]}, 'bar': {'val': 'baz'}})
+
     def test_clean_old_jobs_no_jid_root(self):
         '''
         Tests that the function returns None when no jid_root is found.
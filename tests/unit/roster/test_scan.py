@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+'''
+unittests for scan roster
+'''
+# Import Python libs
+from __future__ import absolute_import, print_function, unicode_literals
+import socket
+
+# Import Salt Testing Libs
+from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.unit import TestCase, skipIf
+from tests.support.mock import (
+    MagicMock,
+    patch,
+    NO_MOCK,
+    NO_MOCK_REASON
+)
+
+# Import Salt Libs
+from salt.roster import scan
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ScanTestCase(TestCase, LoaderModuleMockMixin):
+    '''
+    Test cases for salt.roster.scan
+    '''
+    def setup_loader_modules(self):
+        return {
+            scan: {
+                '__opts__': {'ssh_scan_ports': '22,2222',
+                             'ssh_scan_timeout': 0.01,
+                             'roster_defaults': {'user': 'root'}},
+            }
+        }
+
+    def _get_socket(self, addr, *args, **kwargs):
+        '''
+        Return a socket which only connects to port 22 of the even addresses
+        and port 2222 of 10.0.0.4
+        '''
+        def connect(address):
+            host, port = address
+            last = int(host.rsplit('.', 1)[1])
+            if (port == 22 and last % 2 == 0) or (host == '10.0.0.4' and port == 2222):
+                return
+            raise socket.error('Connection refused')
+        sock = MagicMock()
+        sock.connect = MagicMock(side_effect=connect)
+        return sock
+
+    def test_scan(self):
+        '''
+        Test that serial and concurrent scans find the same hosts
+        '''
+        with patch('salt.utils.network.get_socket', self._get_socket):
+            serial = scan.targets('10.0.0.0/28')
+            with patch.dict(scan.__opts__, {'ssh_scan_workers': 4}):
+                concurrent = scan.targets('10.0.0.0/28')
+        self.assertEqual(len(serial), 14)
+        self.assertEqual(serial, concurrent)
+        self.assertEqual(serial['10.0.0.2'], {'user': 'root', 'host': '10.0.0.2', 'port': 22})
+        self.assertEqual(serial['10.0.0.4'], {'user': 'root', 'host': '10.0.0.4', 'port': 2222})
+        self.assertEqual(serial['10.0.0.3'], {'user': 'root'})
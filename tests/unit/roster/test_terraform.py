@@ -5,12 +5,15 @@ unittests for terraform roster
 # Import Python libs
 from __future__ import absolute_import, unicode_literals
 import os.path
+import shutil
+import tempfile
 
 # Import Salt Testing Libs
 from tests.support.mixins import LoaderModuleMockMixin
 from tests.support.unit import TestCase, skipIf
 from tests.support.runtests import RUNTIME_VARS
 from tests.support.mock import (
+    MagicMock,
     patch,
     NO_MOCK,
     NO_MOCK_REASON
@@ -19,6 +22,7 @@ from tests.support.mock import (
 # Import Salt Libs
 import salt.config
 import salt.loader
+import salt.utils.files
 from salt.roster import terraform
 
 
@@ -102,3 +106,30 @@ class TerraformTestCase(TestCase, LoaderModuleMockMixin):
 
             ret = terraform.targets('*web*')
             self.assertDictEqual(expected_result, ret)
+
+    def test_cached_inventory(self):
+        '''
+        Test that the tfstate file is only parsed again once it has changed
+        '''
+        tmpdir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        tfstate = os.path.join(tmpdir, 'terraform.tfstate')
+        shutil.copy(os.path.join(os.path.dirname(__file__), 'terraform.data', 'terraform.tfstate'),
+                    tfstate)
+        pki_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'terraform.data'))
+        opts = salt.config.master_config(os.path.join(RUNTIME_VARS.TMP_CONF_DIR, 'master'))
+        opts.update({'roster_file': tfstate, 'pki_dir': pki_dir, 'roster_cache': True,
+                     'cachedir': tmpdir})
+        parse = MagicMock(wraps=terraform._parse_state_file)
+
+        with patch.dict(terraform.__opts__, opts), \
+                patch('salt.roster.terraform._parse_state_file', parse):
+            ret = terraform.targets('*')
+            self.assertEqual(terraform.targets('*'), ret)
+            self.assertEqual(parse.call_count, 1)
+            self.assertEqual(ret['web0']['priv'], os.path.join(pki_dir, 'ssh', 'salt-ssh.rsa'))
+
+            with salt.utils.files.fopen(tfstate, 'a') as fp_:
+                fp_.write('\n')
+            self.assertEqual(terraform.targets('*'), ret)
+            self.assertEqual(parse.call_count, 2)
@@ -459,3 +459,210 @@ class FileclientCacheTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderMod
                    _salt('dev'))
 
             _check('/foo/bar', '/foo/bar')
+
+    def _write_shared_file(self, content='This file is the same everywhere.\n'):
+        for saltenv in SALTENVS:
+            path = os.path.join(self.FS_ROOT, saltenv, 'shared.txt')
+            with salt.utils.files.fopen(path, 'w') as fp_:
+                fp_.write(content)
+
+    def _blob_client(self):
+        patched_opts = dict((x, y) for x, y in six.iteritems(self.minion_opts))
+        patched_opts.update(self.MOCKED_OPTS)
+        patched_opts['fileclient_blob_cache'] = True
+        client = fileclient.FSClient(patched_opts)
+        sent = []
+        orig_send = client.channel.send
+
+        def _send(load, **kwargs):
+            sent.append(load['cmd'])
+            return orig_send(load, **kwargs)
+
+        client.channel.send = _send
+        return client, sent
+
+    def test_cache_files_blob_cache(self):
+        '''
+        Ensure identical files in different saltenvs share a single blob, are
+        only transferred once, and that hashes are looked up in one request
+        '''
+        self._write_shared_file()
+        client, sent = self._blob_client()
+        paths = ['salt://shared.txt', 'salt://foo.txt']
+        ret = {}
+        for saltenv in SALTENVS:
+            ret[saltenv] = client.cache_files(paths, saltenv)
+            self.assertEqual(len(ret[saltenv]), 2)
+
+        self.assertEqual(
+            os.stat(ret['base'][0]).st_ino, os.stat(ret['dev'][0]).st_ino)
+        self.assertNotEqual(
+            os.stat(ret['base'][1]).st_ino, os.stat(ret['dev'][1]).st_ino)
+        # A single batched hash lookup per saltenv
+        self.assertEqual(sent.count('_file_hash_and_stat_list'), 2)
+        self.assertNotIn('_file_hash', sent)
+
+        # With the per-saltenv caches gone everything is restored from blobs
+        served = []
+        orig_serve = client.channel.fs.serve_file
+
+        def _serve(load):
+            if load['loc'] == 0:
+                served.append((load['saltenv'], load['path']))
+            return orig_serve(load)
+
+        with patch.object(client.channel.fs, 'serve_file', _serve):
+            shutil.rmtree(os.path.join(self.CACHE_ROOT, 'files'))
+            for saltenv in SALTENVS:
+                client.cache_files(paths, saltenv)
+        self.assertEqual(served, [])
+        with salt.utils.files.fopen(ret['dev'][0]) as fp_:
+            self.assertEqual(fp_.read(), 'This file is the same everywhere.\n')
+
+    def test_get_file_corrupt_blob(self):
+        '''
+        Ensure a blob which no longer matches its hash is not reused
+        '''
+        self._write_shared_file()
+        client, _ = self._blob_client()
+        base_loc = client.cache_file('salt://shared.txt', 'base')
+        # Modifying the cached file in place also modifies the blob
+        with salt.utils.files.fopen(base_loc, 'w') as fp_:
+            fp_.write('corrupted')
+        dev_loc = client.cache_file('salt://shared.txt', 'dev')
+        with salt.utils.files.fopen(dev_loc) as fp_:
+            self.assertEqual(fp_.read(), 'This file is the same everywhere.\n')
+
+    def test_get_file_user_dest_blob_cache(self):
+        '''
+        Ensure a file fetched to a user destination is not stored as a blob,
+        nor logged as missing
+        '''
+        self._write_shared_file()
+        client, _ = self._blob_client()
+        dest = os.path.join(self.CACHE_ROOT, 'user_dest.txt')
+        with patch.object(client, '_blob_store', MagicMock()) as blob_store, \
+                patch.object(fileclient.log, 'debug', MagicMock()) as log_debug:
+            self.assertEqual(client.get_file('salt://shared.txt', dest), dest)
+            blob_store.assert_not_called()
+            missing = [call for call in log_debug.call_args_list
+                       if '** missing **' in call[0][0]]
+            self.assertEqual(missing, [])
+
+    def _manifest_client(self, **opts):
+        patched_opts = dict((x, y) for x, y in six.iteritems(self.minion_opts))
+        patched_opts.update(self.MOCKED_OPTS)
+        patched_opts['fileclient_manifest_sync'] = True
+        patched_opts.update(opts)
+        client = fileclient.FSClient(patched_opts)
+        sent = []
+        orig_send = client.channel.send
+
+        def _send(load, **kwargs):
+            sent.append(load['cmd'])
+            return orig_send(load, **kwargs)
+
+        client.channel.send = _send
+        return client, sent
+
+    def test_cache_dir_manifest_sync(self):
+        '''
+        Ensure a directory is synced with one manifest request and a batched
+        transfer, and that only stale files are fetched again
+        '''
+        client, sent = self._manifest_client(fileclient_manifest_sync_gzip=6)
+        ret = client.cache_dir('salt://{0}'.format(SUBDIR), 'base')
+        expected = sorted(
+            os.path.join(self.CACHE_ROOT, 'files', 'base', SUBDIR, x)
+            for x in SUBDIR_FILES)
+        self.assertEqual(ret, expected)
+        self.assertEqual(sent, ['_file_manifest_sync', '_serve_files'])
+        for path in ret:
+            with salt.utils.files.fopen(path) as fp_:
+                self.assertIn(os.path.basename(path), fp_.read())
+
+        # Change one file on the fileserver, only it should be transferred
+        changed = os.path.join(self.FS_ROOT, 'base', SUBDIR, 'bar.txt')
+        with salt.utils.files.fopen(changed, 'w') as fp_:
+            fp_.write('changed')
+        del sent[:]
+        with patch.object(client.channel.fs, 'serve_files',
+                          MagicMock(wraps=client.channel.fs.serve_files)) as serve:
+            self.assertEqual(
+                client.cache_dir('salt://{0}'.format(SUBDIR), 'base'),
+                expected)
+        self.assertEqual(serve.call_args[0][0]['paths'],
+                         ['{0}/bar.txt'.format(SUBDIR)])
+        with salt.utils.files.fopen(expected[0]) as fp_:
+            self.assertEqual(fp_.read(), 'changed')
+
+        # Nothing is transferred when everything is current
+        del sent[:]
+        client.cache_master('base')
+        client.cache_dir('salt://{0}'.format(SUBDIR), 'base',
+                         include_pat='*foo.txt')
+        self.assertEqual(
+            sent, ['_file_manifest_sync', '_serve_files', '_file_manifest_sync'])
+
+    def test_cache_dir_manifest_sync_master_limit(self):
+        '''
+        Ensure files which the master leaves out of a batch because of
+        fileserver_serve_files_max_size are fetched on their own
+        '''
+        client, sent = self._manifest_client(
+            fileserver_serve_files_max_size=1)
+        with patch.object(client.channel.fs, 'serve_files',
+                          MagicMock(wraps=client.channel.fs.serve_files)) as serve:
+            ret = client.cache_dir('salt://{0}'.format(SUBDIR), 'base')
+        self.assertEqual(len(ret), len(SUBDIR_FILES))
+        self.assertEqual(serve.call_count, 1)
+        self.assertEqual(
+            client.channel.fs.serve_files(serve.call_args[0][0])['files'], {})
+        self.assertIn('_serve_file', sent)
+        for path in ret:
+            with salt.utils.files.fopen(path) as fp_:
+                self.assertIn(os.path.basename(path), fp_.read())
+
+        # The master stops once the response is full
+        paths = sorted('{0}/{1}'.format(SUBDIR, x) for x in SUBDIR_FILES)
+        client.opts['fileserver_serve_files_max_size'] = os.path.getsize(
+            os.path.join(self.FS_ROOT, 'base', paths[0]))
+        served = client.channel.fs.serve_files(
+            {'paths': paths, 'saltenv': 'base'})['files']
+        self.assertEqual(list(served), [paths[0]])
+
+    def test_cache_dir_manifest_sync_fallback(self):
+        '''
+        Ensure files are cached one at a time when the master does not
+        support manifest sync or files do not fit in a batch
+        '''
+        client, sent = self._manifest_client(
+            fileclient_manifest_sync_batch_size=1)
+        ret = client.cache_dir('salt://{0}'.format(SUBDIR), 'base')
+        self.assertEqual(len(ret), len(SUBDIR_FILES))
+        self.assertNotIn('_serve_files', sent)
+        self.assertNotIn('_file_hash', sent)
+
+        with patch.object(client.channel.fs, 'file_manifest_sync',
+                          MagicMock(return_value=False)):
+            ret = client.cache_dir('salt://{0}'.format(SUBDIR), 'dev')
+        self.assertEqual(len(ret), len(SUBDIR_FILES))
+
+    def test_get_file_chunks_per_request(self):
+        '''
+        Ensure large files are fetched several chunks at a time
+        '''
+        path = os.path.join(self.FS_ROOT, 'base', 'big.bin')
+        with salt.utils.files.fopen(path, 'wb') as fp_:
+            fp_.write(os.urandom(1000))
+        client, sent = self._manifest_client(
+            fileclient_manifest_sync=False,
+            file_buffer_size=100,
+            fileserver_max_chunks=4,
+            fileclient_chunks_per_request=4)
+        dest = client.cache_file('salt://big.bin', 'base')
+        with salt.utils.files.fopen(path, 'rb') as src, \
+                salt.utils.files.fopen(dest, 'rb') as cached:
+            self.assertEqual(src.read(), cached.read())
+        # 3 requests for the data and one to find the end of the file
+        self.assertEqual(sent.count('_serve_file'), 4)
@@ -5,11 +5,17 @@
 
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import os
+import shutil
+import tempfile
 
 # Import Salt Testing libs
+from tests.support.mock import patch, MagicMock
+from tests.support.runtests import RUNTIME_VARS
 from tests.support.unit import TestCase
 
 from salt import fileserver
+import salt.utils.files
 
 
 class MapDiffTestCase(TestCase):
@@ -28,3 +34,70 @@ class MapDiffTestCase(TestCase):
         map1 = {'file1': 12345}
         map2 = {'file1': 1234}
         assert fileserver.diff_mtime_map(map1, map2) is True
+
+
+class FileListGenerationTestCase(TestCase):
+    '''
+    Tests for the generation counter based file list cache
+    '''
+    def setUp(self):
+        self.list_cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.list_cachedir, ignore_errors=True)
+        self.list_cache = os.path.join(self.list_cachedir, 'base.p')
+        self.w_lock = os.path.join(self.list_cachedir, '.base.w')
+        self.opts = {'fileserver_list_cache_generations': True,
+                     'fileserver_list_cache_time': 20}
+        fileserver._FILE_LIST_CACHE.clear()
+
+    def _check(self):
+        return fileserver.check_file_list_cache(
+            self.opts, 'files', self.list_cache, self.w_lock)
+
+    def _refresh(self, files):
+        ret, refresh, save = self._check()
+        self.assertEqual((ret, refresh, save), (None, True, True))
+        fileserver.write_file_list_cache(
+            self.opts, {'files': files}, self.list_cache, self.w_lock)
+
+    def test_generation_cache(self):
+        fileserver.bump_file_list_generation(self.opts, self.list_cachedir)
+        self.assertEqual(
+            fileserver.get_file_list_generation(self.list_cachedir), 1)
+        self._refresh(['top.sls'])
+
+        # Served from memory without reading the cache file
+        with patch('salt.utils.files.fopen', side_effect=AssertionError):
+            with patch('salt.fileserver.get_file_list_generation',
+                       MagicMock(return_value=1)):
+                self.assertEqual(self._check(), (['top.sls'], False, False))
+
+        # Another worker loads the list written for the current generation
+        fileserver._FILE_LIST_CACHE.clear()
+        self.assertEqual(self._check(), (['top.sls'], False, False))
+
+        # A bump makes the list stale no matter how young it is
+        fileserver.bump_file_list_generation(self.opts, self.list_cachedir)
+        self._refresh(['top.sls', 'new.sls'])
+        self.assertEqual(self._check(), (['top.sls', 'new.sls'], False, False))
+
+    def test_generation_no_lock(self):
+        '''
+        A worker seeing a new generation rebuilds the list without waiting on
+        or creating a lock file
+        '''
+        fileserver.bump_file_list_generation(self.opts, self.list_cachedir)
+        with salt.utils.files.fopen(self.w_lock, 'w'):
+            pass
+        with patch('salt.fileserver.wait_lock', side_effect=AssertionError):
+            self._refresh(['top.sls'])
+        # A stale lock is left alone, it belongs to the lock file protocol
+        self.assertTrue(os.path.exists(self.w_lock))
+        fileserver._FILE_LIST_CACHE.clear()
+        self.assertEqual(self._check(), (['top.sls'], False, False))
+
+    def test_without_generation(self):
+        '''
+        Backends which do not maintain a generation use the lock file protocol
+        '''
+        self.assertEqual(self._check(), (None, True, True))
+        self.assertEqual(fileserver._FILE_LIST_CACHE, {})
@@ -331,3 +331,161 @@ class ClearFuncsTestCase(TestCase):
                 patch('salt.utils.master.get_values_of_matching_keys', MagicMock(return_value=['test'])), \
                 patch('salt.utils.minions.CkMinions.auth_check', MagicMock(return_value=False)):
             self.assertEqual(mock_ret, self.clear_funcs.publish(load))
+
+
+class AESFuncsTestCase(TestCase):
+    '''
+    TestCase for salt.master.AESFuncs class
+    '''
+
+    def setUp(self):
+        opts = salt.config.master_config(None)
+        with patch('salt.master.AESFuncs.__init__', MagicMock(return_value=None)):
+            self.aes_funcs = salt.master.AESFuncs(opts)
+        self.aes_funcs.opts = opts
+        self.aes_funcs.masterapi = MagicMock()
+
+    def test_minion_batch(self):
+        '''
+        Asserts that each load of a batch is handled by its own command, on
+        behalf of the minion which sent the batch.
+        '''
+        load = {'cmd': '_minion_batch', 'id': 'minion', 'tok': 'tok',
+                'loads': [{'cmd': '_return', 'id': 'other', 'jid': '1', 'return': True},
+                          {'cmd': '_minion_event', 'tag': 'foo', 'data': {}, 'tok': 'tok'},
+                          {'cmd': '_mine', 'data': {'test.ping': True}},
+                          {'cmd': '_pillar'}]}
+        with patch('salt.master.AESFuncs._AESFuncs__verify_minion', MagicMock(return_value=True)), \
+                patch('salt.master.AESFuncs._return', MagicMock()) as mock_return, \
+                patch('salt.master.AESFuncs._handle_minion_event', MagicMock()) as mock_event:
+            self.assertTrue(self.aes_funcs._minion_batch(load))
+        mock_return.assert_called_once_with({'cmd': '_return', 'id': 'minion', 'jid': '1', 'return': True})
+        mock_event.assert_called_once_with({'cmd': '_minion_event', 'id': 'minion', 'tag': 'foo', 'data': {}})
+        self.aes_funcs.masterapi._minion_event.assert_called_once()
+        self.aes_funcs.masterapi._mine.assert_called_once_with(
+            {'cmd': '_mine', 'id': 'minion', 'data': {'test.ping': True}}, skip_verify=True)
+
+    def test_minion_batch_mine_without_data(self):
+        '''
+        Asserts that a batched mine load without data is rejected, the
+        minion never batches mine deltas.
+        '''
+        delta = {'keys': ['test.ping'], 'changed': {'test.ping': True}}
+        load = {'cmd': '_minion_batch', 'id': 'minion', 'tok': 'tok',
+                'loads': [{'cmd': '_mine', 'mine_delta': delta},
+                          {'cmd': '_mine', 'clear': True}]}
+        with patch('salt.master.AESFuncs._AESFuncs__verify_minion', MagicMock(return_value=True)):
+            self.assertTrue(self.aes_funcs._minion_batch(load))
+        self.aes_funcs.masterapi._mine.assert_not_called()
+
+    def test_minion_batch_not_verified(self):
+        '''
+        Asserts that nothing in a batch is handled if the minion token can
+        not be verified.
+        '''
+        load = {'cmd': '_minion_batch', 'id': 'minion', 'tok': 'tok',
+                'loads': [{'cmd': '_return', 'jid': '1', 'return': True}]}
+        with patch('salt.master.AESFuncs._AESFuncs__verify_minion', MagicMock(return_value=False)), \
+                patch('salt.master.AESFuncs._return', MagicMock()) as mock_return:
+            self.assertEqual(self.aes_funcs._minion_batch(load), {})
+        mock_return.assert_not_called()
+
+
+class FileserverUpdateTestCase(TestCase):
+    '''
+    TestCase for the worker scheduling in salt.master.FileserverUpdate
+    '''
+
+    def setUp(self):
+        opts = salt.config.master_config(None)
+        opts['fileserver_update_workers'] = 2
+        with patch('salt.master.FileserverUpdate.__init__', MagicMock(return_value=None)):
+            self.fs_update = salt.master.FileserverUpdate(opts)
+        self.fs_update.opts = opts
+
+    def tearDown(self):
+        del self.fs_update
+
+    def test_update_jobs(self):
+        '''
+        Asserts that one job is created per backend, or per remote for
+        backends with per-remote intervals.
+        '''
+        roots_update, gitfs_update = MagicMock(), MagicMock()
+        self.fs_update.buckets = {
+            60: {('roots', roots_update): None,
+                 ('gitfs', gitfs_update): ['repo1', 'repo2']},
+            300: {('gitfs', gitfs_update): ['repo3']},
+        }
+        jobs = dict((job['name'], job) for job in self.fs_update.update_jobs())
+        self.assertEqual(sorted(jobs), ['gitfs:repo1', 'gitfs:repo2', 'gitfs:repo3', 'roots'])
+        self.assertEqual(jobs['roots']['args'], ())
+        self.assertEqual(jobs['gitfs:repo2']['args'], (['repo2'],))
+        self.assertEqual(jobs['gitfs:repo3']['interval'], 300)
+
+    def test_schedule_updates(self):
+        '''
+        Asserts that a slow job does not hold up the others, and that a job
+        is skipped while its previous run is still going.
+        '''
+        clock = [1000.0]
+        calls = {'slow': 0, 'fast': 0}
+
+        class _Pool(object):
+            '''
+            Run the fast job right away and leave the slow one running
+            '''
+            def __init__(self, processes):
+                pass
+
+            def apply_async(self, func, args):
+                calls[args[0]['name']] += 1
+                if args[0]['name'] == 'fast':
+                    func(*args)
+
+            def close(self):
+                pass
+
+        class _Stop(object):
+            '''
+            Advance the clock instead of sleeping, for 10 iterations
+            '''
+            def __init__(self):
+                self.waits = []
+
+            def is_set(self):
+                return len(self.waits) >= 10
+
+            def wait(self, timeout):
+                self.waits.append(timeout)
+                clock[0] += timeout
+
+        jobs = [
+            {'name': 'slow', 'func': MagicMock(), 'args': (),
+             'interval': 0.25, 'next': 0, 'running': False},
+            {'name': 'fast', 'func': MagicMock(), 'args': (),
+             'interval': 0.25, 'next': 0, 'running': False},
+        ]
+        stop = _Stop()
+        with patch('salt.master.ThreadPool', _Pool), \
+                patch('salt.master.time.time', MagicMock(side_effect=lambda: clock[0])):
+            self.fs_update.schedule_updates(jobs, stop)
+        self.assertEqual(calls, {'slow': 1, 'fast': 10})
+        self.assertEqual(stop.waits, [0.25] * 10)
+        self.assertTrue(jobs[0]['running'])
+        self.assertFalse(jobs[1]['running'])
+
+    def test_run_update_job(self):
+        '''
+        Asserts that the running flag is cleared under the lock, even when
+        the update fails.
+        '''
+        lock = MagicMock()
+        lock.__enter__ = MagicMock(
+            side_effect=lambda: self.assertTrue(job['running']))
+        lock.__exit__ = MagicMock(return_value=False)
+        job = {'name': 'roots', 'func': MagicMock(side_effect=Exception),
+               'args': (), 'interval': 60, 'next': 0, 'running': True}
+        self.fs_update._run_update_job(job, lock)
+        self.assertFalse(job['running'])
+        self.assertEqual(lock.__enter__.call_count, 1)
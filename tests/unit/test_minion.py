@@ -7,15 +7,25 @@
 from __future__ import absolute_import
 import copy
 import os
+import shutil
+import tempfile
+import threading
+import time
 
 # Import Salt Testing libs
 from tests.support.unit import TestCase, skipIf
 from tests.support.mock import NO_MOCK, NO_MOCK_REASON, patch, MagicMock
 from tests.support.mixins import AdaptedConfigurationTestCaseMixin
 from tests.support.helpers import skip_if_not_root
+from tests.support.runtests import RUNTIME_VARS
 # Import salt libs
+import salt.master
 import salt.minion
+import salt.payload
 import salt.utils.event as event
+import salt.utils.files
+import salt.utils.minion
+import salt.utils.minions
 from salt.exceptions import SaltSystemExit, SaltMasterUnresolvableError
 import salt.syspaths
 from tornado.concurrent import Future
@@ -235,6 +245,185 @@ class MinionTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
             finally:
                 minion.destroy()
 
+    def test_minion_job_pool(self):
+        '''
+        Tests that the _handle_decoded_payload function hands jobs to the job
+        pool instead of spawning a process, unless the function is isolated.
+        '''
+        with patch('salt.minion.Minion.ctx', MagicMock(return_value={})), \
+                patch('salt.utils.process.SignalHandlingMultiprocessingProcess.start', MagicMock(return_value=True)), \
+                patch('salt.utils.process.SignalHandlingMultiprocessingProcess.join', MagicMock(return_value=True)), \
+                patch('salt.utils.minion.JobPool') as job_pool:
+            mock_opts = salt.config.DEFAULT_MINION_OPTS.copy()
+            mock_opts['minion_job_pool'] = True
+            mock_opts['minion_job_pool_isolate'] = ['state.*']
+            io_loop = tornado.ioloop.IOLoop()
+            minion = salt.minion.Minion(mock_opts, jid_queue=[], io_loop=io_loop)
+            try:
+                mock_data = {'fun': 'test.ping', 'jid': 1}
+                io_loop.run_sync(lambda: minion._handle_decoded_payload(mock_data))
+                job_pool.return_value.submit.assert_called_once_with(mock_data, minion.connected)
+                self.assertEqual(salt.utils.process.SignalHandlingMultiprocessingProcess.start.call_count, 0)
+
+                mock_data = {'fun': 'state.apply', 'jid': 2}
+                io_loop.run_sync(lambda: minion._handle_decoded_payload(mock_data))
+                self.assertEqual(job_pool.return_value.submit.call_count, 1)
+                self.assertEqual(salt.utils.process.SignalHandlingMultiprocessingProcess.start.call_count, 1)
+                self.assertEqual(job_pool.call_count, 1)
+
+                minion.schedule = MagicMock()
+                with patch.object(minion, '_load_modules', MagicMock(return_value=({}, {}, {}, {}))):
+                    minion.module_refresh()
+                job_pool.return_value.recycle.assert_called_once_with()
+            finally:
+                minion.destroy()
+        job_pool.return_value.stop.assert_called_once_with()
+
+    def test_minion_job_pool_threads(self):
+        '''
+        Tests that with multiprocessing disabled the job pool runs jobs in its
+        threads, named after the jid while the job runs.
+        '''
+        mock_opts = salt.config.DEFAULT_MINION_OPTS.copy()
+        mock_opts['multiprocessing'] = False
+        mock_opts['minion_job_pool_size'] = 1
+        names = []
+        done = threading.Event()
+
+        def target(minion_instance, opts, data, connected):
+            names.append(threading.current_thread().name)
+            done.set()
+
+        pool = salt.utils.minion.JobPool(mock_opts, target, MagicMock(proc_dir=None))
+        pool.submit({'fun': 'test.ping', 'jid': '20190101010101010101'}, True)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(names, ['20190101010101010101'])
+
+    def test_job_pool_worker_generation(self):
+        '''
+        Tests that a pool worker hands a job back to the queue, instead of
+        running it, when the modules were refreshed while it waited for it
+        '''
+        generation = MagicMock(value=0)
+        item = ({'fun': 'test.ping', 'jid': '20190101010101010101'}, True)
+        job_queue = MagicMock()
+
+        def _get(timeout):
+            generation.value = 1
+            return item
+
+        job_queue.get.side_effect = _get
+        target = MagicMock()
+        worker = salt.utils.minion.JobPoolWorker(
+            target, MagicMock(proc_dir=None), {}, job_queue, generation, 0)
+        worker.ppid = os.getppid()
+        worker.run()
+        target.assert_not_called()
+        job_queue.put.assert_called_once_with(item)
+
+    def test_job_pool_isolated(self):
+        '''
+        Tests the matching of minion_job_pool_isolate globs
+        '''
+        opts = {'minion_job_pool_isolate': ['state.*', 'pkg.install']}
+        self.assertTrue(salt.utils.minion.job_pool_isolated(opts, {'fun': 'state.highstate'}))
+        self.assertTrue(salt.utils.minion.job_pool_isolated(opts, {'fun': ['test.ping', 'pkg.install']}))
+        self.assertFalse(salt.utils.minion.job_pool_isolated(opts, {'fun': 'test.ping'}))
+        self.assertFalse(salt.utils.minion.job_pool_isolated({}, {'fun': 'state.apply'}))
+
+    def test_minion_return_batch(self):
+        '''
+        Tests that scheduled job returns and mine updates are coalesced into
+        a single request to the master when minion_return_batch is enabled.
+        '''
+        with patch('salt.minion.Minion.ctx', MagicMock(return_value={})), \
+                patch('salt.minion.Minion._send_req_async', MagicMock()) as send_req:
+            mock_opts = salt.config.DEFAULT_MINION_OPTS.copy()
+            mock_opts['minion_return_batch'] = True
+            mock_opts['minion_return_batch_size'] = 3
+            minion = salt.minion.Minion(mock_opts, io_loop=tornado.ioloop.IOLoop())
+            minion.tok = 'tok'
+            minion.proc_dir = '/nonexistent'
+            minion.functions = {}
+            try:
+                minion._handle_tag_schedule_return(
+                    '__schedule_return',
+                    {'schedule': 'job1', 'jid': '1', 'fun': 'test.ping', 'return': True})
+                minion._mine_send('_minion_mine', {'cmd': '_mine', 'id': 'minion', 'data': {}})
+                self.assertEqual(len(minion.batch_loads), 2)
+                send_req.assert_not_called()
+
+                minion._fire_master(events=[{'tag': 'beacon', 'data': {}}], batch=True)
+                self.assertEqual(minion.batch_loads, [])
+                self.assertEqual(send_req.call_count, 1)
+                load = send_req.call_args[0][0]
+                self.assertEqual(load['cmd'], '_minion_batch')
+                self.assertEqual(load['tok'], 'tok')
+                self.assertEqual([x['cmd'] for x in load['loads']], ['_return', '_mine', '_minion_event'])
+                self.assertTrue(all('tok' not in x for x in load['loads']))
+
+                # Nothing queued, nothing sent
+                minion._flush_batch_loads()
+                self.assertEqual(send_req.call_count, 1)
+            finally:
+                minion.destroy()
+
+    def test_minion_destroy_flushes_batch(self):
+        '''
+        Tests that the loads still queued for a batch are sent to the master
+        when the minion is destroyed.
+        '''
+        with patch('salt.minion.Minion.ctx', MagicMock(return_value={})), \
+                patch('salt.minion.Minion._send_req_sync', MagicMock()) as send_req:
+            mock_opts = salt.config.DEFAULT_MINION_OPTS.copy()
+            mock_opts['minion_return_batch'] = True
+            mock_opts['minion_return_batch_size'] = 3
+            minion = salt.minion.Minion(mock_opts, io_loop=tornado.ioloop.IOLoop())
+            minion.tok = 'tok'
+            minion._mine_send('_minion_mine', {'cmd': '_mine', 'id': 'minion', 'data': {}})
+            self.assertEqual(len(minion.batch_loads), 1)
+            minion.destroy()
+            self.assertEqual(send_req.call_count, 1)
+            load = send_req.call_args[0][0]
+            self.assertEqual(load['cmd'], '_minion_batch')
+            self.assertEqual([x['cmd'] for x in load['loads']], ['_mine'])
+            self.assertEqual(minion.batch_loads, [])
+
+    def test_mine_send_delta(self):
+        '''
+        Tests that with minion_data_delta enabled only the changes to the mine
+        data are sent, and the full data if the master refuses the delta.
+        '''
+        mock_opts = salt.config.DEFAULT_MINION_OPTS.copy()
+        mock_opts['minion_data_delta'] = True
+        minion = salt.minion.Minion(mock_opts, io_loop=tornado.ioloop.IOLoop())
+        minion.tok = 'tok'
+        channel = MagicMock()
+        try:
+            with patch('salt.transport.client.ReqChannel.factory', MagicMock(return_value=channel)):
+                channel.send.return_value = True
+                load = {'cmd': '_mine', 'id': 'minion', 'clear': False, 'data': {'test.ping': True}}
+                minion._mine_send('_minion_mine', copy.deepcopy(load))
+                sent = channel.send.call_args[0][0]
+                self.assertNotIn('data', sent)
+                self.assertEqual(sent['mine_delta']['keys'], ['test.ping'])
+                self.assertEqual(sent['mine_delta']['changes'], {'set': {'test.ping': True}})
+                self.assertEqual(minion.mine_data, {'test.ping': True})
+
+                # Nothing changed, only the hashes are sent
+                minion._mine_send('_minion_mine', copy.deepcopy(load))
+                sent = channel.send.call_args[0][0]
+                self.assertEqual(sent['mine_delta']['changes'], {})
+
+                # The master refuses the delta, the full data is sent
+                channel.send.reset_mock()
+                channel.send.side_effect = [False, True]
+                minion._mine_send('_minion_mine', copy.deepcopy(load))
+                self.assertEqual(channel.send.call_count, 2)
+                self.assertEqual(channel.send.call_args[0][0]['data'], {'test.ping': True})
+        finally:
+            minion.destroy()
+
     def test_beacons_before_connect(self):
         '''
         Tests that the 'beacons_before_connect' option causes the beacons to be initialized before connect.
@@ -469,3 +658,147 @@ class MinionAsyncTestCase(TestCase, AdaptedConfigurationTestCaseMixin, tornado.t
 
             for _patch in patches:
                 _patch.stop()
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class SyndicManagerTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
+    def setUp(self):
+        self.opts = self.get_temp_config('minion')
+        self.opts['cachedir'] = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.opts['cachedir'], ignore_errors=True)
+        with patch('salt.minion.MasterMinion', MagicMock()):
+            self.syndic = salt.minion.SyndicManager(self.opts, io_loop=MagicMock())
+
+    def _job_ret(self, jid, minions):
+        job_ret = {'__jid__': jid, '__fun__': 'test.ping', '__load__': {'fun': 'test.ping'},
+                   '__time__': 0}
+        for idx in range(minions):
+            job_ret['minion{0}'.format(idx)] = {'return': 'x' * 100, 'retcode': 0}
+        return job_ret
+
+    def test_batch_job_rets(self):
+        '''
+        Test that the job returns are split into batches of bounded size, and
+        that only the first part of a job carries its load
+        '''
+        self.opts['syndic_forward_batch_size'] = 2048
+        job_rets = [self._job_ret('20190101000000000001', 2),
+                    self._job_ret('20190101000000000002', 60)]
+        batches = list(self.syndic._batch_job_rets(job_rets))
+        self.assertTrue(len(batches) > 2)
+        minions = set()
+        loads = 0
+        for size, batch in batches:
+            self.assertTrue(size <= 2048)
+            for part in batch:
+                minions.update((part['__jid__'], key) for key in part if not key.startswith('__'))
+                loads += bool(part['__load__'])
+        self.assertEqual(len(minions), 62)
+        self.assertEqual(loads, 2)
+
+        self.opts['syndic_forward_batch_size'] = 0
+        self.assertEqual(list(self.syndic._batch_job_rets(job_rets)), [(0, job_rets)])
+
+    def test_spool(self):
+        '''
+        Test that the batches over syndic_forward_spool_size are spooled to
+        disk, and sent once the pending batches are delivered
+        '''
+        self.opts['syndic_forward_batch_size'] = 2048
+        self.opts['syndic_forward_spool_size'] = 4096
+        job_ret = self._job_ret('20190101000000000001', 120)
+        for size, batch in self.syndic._batch_job_rets([job_ret]):
+            self.syndic._queue_batch('master1', size, batch)
+        self.assertTrue(self.syndic.spooled > 0)
+        self.assertTrue(self.syndic.pending_size <= 4096)
+
+        sent = []
+
+        def _return_pub_syndic(values, master_id=None):
+            sent.append((master_id, values))
+            return True
+
+        with patch.object(self.syndic, '_return_pub_syndic', _return_pub_syndic):
+            while self.syndic.pending or self.syndic.spooled:
+                self.syndic._flush_pending()
+        self.assertEqual(self.syndic.pending_size, 0)
+        self.assertEqual(os.listdir(self.syndic.spool_dir), [])
+        minions = set()
+        for master_id, values in sent:
+            self.assertEqual(master_id, 'master1')
+            for part in values:
+                minions.update(key for key in part if not key.startswith('__'))
+        self.assertEqual(len(minions), 120)
+
+    def test_forward_compressed(self):
+        '''
+        Test that the upper master unpacks compressed syndic returns
+        '''
+        self.opts['syndic_forward_compress'] = True
+        syndic = salt.minion.Syndic.__new__(salt.minion.Syndic)
+        syndic.opts = dict(self.opts, id='syndic1', multiprocessing=False, cache_jobs=False)
+        syndic._running = False
+        syndic._send_req_sync = MagicMock(return_value={})
+        syndic._return_pub_multi([self._job_ret('20190101000000000001', 2)], '_syndic_return')
+        load = syndic._send_req_sync.call_args[0][0]
+        self.assertNotIn('load', load)
+
+        funcs = salt.master.AESFuncs.__new__(salt.master.AESFuncs)
+        funcs.opts = {'cachedir': self.opts['cachedir'], 'master_job_cache': 'local_cache'}
+        funcs.serial = salt.payload.Serial(funcs.opts)
+        funcs.mminion = MagicMock()
+        funcs._return = MagicMock()
+        funcs._syndic_return(load)
+        self.assertEqual(sorted(call[0][0]['id'] for call in funcs._return.call_args_list),
+                         ['minion0', 'minion1'])
+
+    def test_report_membership(self):
+        '''
+        Test that the minions behind the syndic are only reported to its
+        masters again once they change
+        '''
+        self.opts['master_pki_dir'] = os.path.join(self.opts['cachedir'], 'pki')
+        acc = os.path.join(self.opts['master_pki_dir'], 'minions')
+        os.makedirs(acc)
+        for minion_id in ('web1', 'web2'):
+            with salt.utils.files.fopen(os.path.join(acc, minion_id), 'w'):
+                pass
+        salt.utils.minions.store_syndic_members(self.opts, 'syndic2', ['db1'])
+
+        syndic = MagicMock()
+        syndic_future = Future()
+        syndic_future.set_result(syndic)
+        self.syndic._syndics = {'master1': syndic_future}
+        self.syndic._report_membership()
+        syndic.send_membership.assert_called_once_with(['db1', 'web1', 'web2'])
+
+        done = Future()
+        done.set_result(True)
+        self.syndic._membership_done('master1', self.syndic._membership[0], done)
+        self.syndic._report_membership()
+        self.assertEqual(syndic.send_membership.call_count, 1)
+
+        # Reported again before the master expires them
+        with patch('time.time', MagicMock(return_value=time.time() + 1800)):
+            self.syndic._report_membership()
+        self.assertEqual(syndic.send_membership.call_count, 2)
+
+    def test_report_membership_on_change(self):
+        '''
+        Test that the minions are reported as soon as the keys of the local
+        master or the minions of its syndics change
+        '''
+        self.opts['syndic_membership'] = True
+        self.syndic.local = MagicMock()
+        events = [
+            ('salt/key', {'act': 'delete'}),
+            ('salt/auth', {'act': 'pend'}),
+            ('salt/auth', {'act': 'accept'}),
+            ('salt/syndic/syndic2/membership', {'id': 'syndic2'}),
+            ('salt/syndic/syndic2/forward', {}),
+        ]
+        with patch.object(self.syndic, '_report_membership') as report:
+            for tag, data in events:
+                self.syndic.local.event.unpack.return_value = (tag, data)
+                self.syndic._process_event(b'')
+        self.assertEqual(report.call_count, 3)
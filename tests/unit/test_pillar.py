@@ -1051,6 +1051,37 @@ class RemotePillarTestCase(TestCase):
         self.assertEqual(excinfo.exception.strerror,
                          '\'pass_to_ext_pillars\' config is malformed.')
 
+    def test_pillar_grains_delta(self):
+        '''
+        Tests that with minion_data_delta enabled only the changes to the
+        grains are sent once the master has the grains, and all grains again
+        if the master refuses the delta.
+        '''
+        opts = {'renderer': 'json', 'pillarenv': None, 'master': 'salt',
+                'minion_data_delta': True}
+        mock_channel = MagicMock(
+            crypted_transfer_decode_dictentry=MagicMock(return_value={}))
+        with patch('salt.transport.client.ReqChannel.factory',
+                   MagicMock(return_value=mock_channel)), \
+                patch.dict(salt.pillar.SENT_GRAINS, clear=True):
+            salt.pillar.RemotePillar(opts, {'os': 'Linux'}, 'delta_minion', 'base').compile_pillar()
+            load = mock_channel.crypted_transfer_decode_dictentry.call_args[0][0]
+            self.assertEqual(load['grains'], {'os': 'Linux'})
+
+            salt.pillar.RemotePillar(opts, {'os': 'BSD'}, 'delta_minion', 'base').compile_pillar()
+            load = mock_channel.crypted_transfer_decode_dictentry.call_args[0][0]
+            self.assertNotIn('grains', load)
+            self.assertEqual(load['grains_delta']['changes'], {'set': {'os': 'BSD'}})
+
+            mock_channel.crypted_transfer_decode_dictentry.reset_mock()
+            mock_channel.crypted_transfer_decode_dictentry.side_effect = [False, {}]
+            salt.pillar.RemotePillar(opts, {'os': 'SunOS'}, 'delta_minion', 'base').compile_pillar()
+            self.assertEqual(mock_channel.crypted_transfer_decode_dictentry.call_count, 2)
+            load = mock_channel.crypted_transfer_decode_dictentry.call_args[0][0]
+            self.assertEqual(load['grains'], {'os': 'SunOS'})
+            self.assertEqual(salt.pillar.SENT_GRAINS[('salt', 'delta_minion')],
+                             {'os': 'SunOS', 'id': 'delta_minion'})
+
     def test_pillar_send_extra_minion_data_from_config(self):
         opts = {
             'renderer': 'json',
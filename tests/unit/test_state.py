@@ -23,6 +23,7 @@ from tests.support.runtests import RUNTIME_VARS
 # Import Salt libs
 import salt.exceptions
 import salt.state
+import salt.utils.files
 from salt.utils.odict import OrderedDict
 from salt.utils.decorators import state as statedecorators
 
@@ -195,6 +196,39 @@ class StateCompilerTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
             return_result = state_obj._run_check_unless(low_data, '')
             self.assertEqual(expected_result, return_result)
 
+    def test_jinja_env_reuse_per_run(self):
+        '''
+        Ensure Jinja environments are only reused within a state run, so that
+        an edited macro is picked up by the next run
+        '''
+        root_dir = tempfile.mkdtemp(dir=integration.TMP)
+        self.addCleanup(shutil.rmtree, root_dir, ignore_errors=True)
+        macro = os.path.join(root_dir, 'macro.jinja')
+        with salt.utils.files.fopen(macro, 'w') as fp_:
+            fp_.write('{% macro value() %}old{% endmacro %}')
+        template = os.path.join(root_dir, 'tmpl.jinja')
+        with salt.utils.files.fopen(template, 'w') as fp_:
+            fp_.write("{% from 'macro.jinja' import value %}{{ value() }}")
+
+        minion_opts = self.get_temp_config(
+            'minion',
+            file_client='local',
+            file_roots={'base': [root_dir]},
+            jinja_env_reuse=True)
+        # The state module passes its __context__, which outlives the run
+        context = {'retcode': 0}
+
+        def _render():
+            with patch('salt.state.State._gather_pillar'):
+                state_obj = salt.state.State(minion_opts, context=context)
+            return state_obj.rend['jinja'](template, saltenv='base').read()
+
+        self.assertEqual(_render(), 'old')
+        self.assertIn('jinja.env_cache', context)
+        with salt.utils.files.fopen(macro, 'w') as fp_:
+            fp_.write('{% macro value() %}new{% endmacro %}')
+        self.assertEqual(_render(), 'new')
+
 
 class HighStateTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
     def setUp(self):
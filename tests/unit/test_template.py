@@ -100,3 +100,41 @@ class TemplateTestCase(TestCase):
         self.assertListEqual([], ret)
         ret = template.check_render_pipe_str('jinja|json', self.render_dict, ['jinja'], ['jinja', 'json'])
         self.assertListEqual([('fake_json_func', '')], ret)
+
+    def test_render_cache(self):
+        '''
+        Test the render cache returns copies and evicts the least recently
+        used entries
+        '''
+        template.clear_render_cache()
+        keys = [template.render_cache_key('data{0}'.format(x), 'yaml', '')
+                for x in range(3)]
+        self.assertEqual(len(set(keys)), 3)
+        template.render_cache_set(keys[0], {'a': [1]}, 2)
+        template.render_cache_set(keys[1], {'b': [2]}, 2)
+        cached = template.render_cache_get(keys[0])
+        cached['a'].append(3)
+        self.assertEqual(template.render_cache_get(keys[0]), {'a': [1]})
+        # keys[1] is now the least recently used
+        template.render_cache_set(keys[2], {'c': [3]}, 2)
+        self.assertIsNone(template.render_cache_get(keys[1]))
+        self.assertEqual(template.render_cache_get(keys[2]), {'c': [3]})
+        template.clear_render_cache()
+        self.assertIsNone(template.render_cache_get(keys[0]))
+
+    @skipIf(NO_MOCK, NO_MOCK_REASON)
+    def test_compile_template_render_stats(self):
+        '''
+        Test that compile_template records the calls of each renderer
+        '''
+        template.render_stats(reset=True)
+        render = MagicMock(return_value={'foo': 'bar'})
+        render.__module__ = 'salt.loaded.int.render.fake'
+        ret = template.compile_template(
+            ':string:', {'fake': render}, 'fake', [], [],
+            input_data='foo: bar')
+        self.assertEqual(ret, {'foo': 'bar'})
+        stats = template.render_stats(reset=True)
+        self.assertEqual(stats['fake']['calls'], 1)
+        self.assertIn('time', stats['fake'])
+        self.assertEqual(template.render_stats(), {})
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+'''
+    Tests for the thorium runtime
+'''
+# Import Python libs
+from __future__ import absolute_import, print_function, unicode_literals
+
+# Import Salt Testing Libs
+from tests.support.unit import TestCase
+
+# Import Salt Libs
+import salt.thorium
+
+
+def _chunk(state, fun, name, **kwargs):
+    chunk = {'state': state, 'fun': fun, 'name': name, '__id__': name}
+    chunk.update(kwargs)
+    return chunk
+
+
+class ThorStateTestCase(TestCase):
+    '''
+    Test cases for salt.thorium.ThorState
+    '''
+    def setUp(self):
+        self.thor = salt.thorium.ThorState.__new__(salt.thorium.ThorState)
+        self.thor.opts = {'thorium_incremental': True}
+        self.thor.evaluated = set()
+        self.chunks = [
+            _chunk('reg', 'mean', 'load', add='load', match='my/load'),
+            _chunk('check', 'gt', 'load', value=10),
+            _chunk('local', 'cmd', 'restart', tgt='*', func='service.restart',
+                   require=[{'check': 'load'}]),
+            _chunk('reg', 'set', 'seen', add='id', match='my/seen'),
+            _chunk('check', 'event', 'my/ping'),
+            _chunk('runner', 'cmd', 'notify', func='test.arg',
+                   require=[{'check': 'my/ping'}]),
+            _chunk('key', 'timeout', 'keys', delete=300),
+        ]
+
+    def _names(self, events):
+        return [(chunk['state'], chunk['name']) for chunk in
+                self.thor.incremental_chunks(self.chunks, [{'tag': tag} for tag in events])]
+
+    def test_incremental_chunks(self):
+        '''
+        Test that only the chunks whose inputs changed are evaluated, after all
+        of them were evaluated once
+        '''
+        self.assertEqual(len(self._names(['other'])), len(self.chunks))
+        self.assertEqual(self._names(['other']), [('key', 'keys')])
+        self.assertEqual(self._names(['my/load']),
+                         [('reg', 'load'), ('check', 'load'), ('local', 'restart'), ('key', 'keys')])
+        self.assertEqual(self._names(['my/ping', 'my/seen']),
+                         [('reg', 'seen'), ('check', 'my/ping'), ('runner', 'notify'), ('key', 'keys')])
+
+    def test_incremental_chunks_window(self):
+        '''
+        Test that the chunks with a window are evaluated without matching
+        events, so that expired values leave the register
+        '''
+        self.chunks[0]['window'] = 300
+        self.assertEqual(len(self._names(['other'])), len(self.chunks))
+        self.assertEqual(self._names(['other']),
+                         [('reg', 'load'), ('check', 'load'), ('local', 'restart'), ('key', 'keys')])
+
+    def test_incremental_chunks_disabled(self):
+        '''
+        Test that all of the chunks are evaluated by default
+        '''
+        self.thor.opts = {}
+        self.assertEqual(self.thor.incremental_chunks(self.chunks, []), self.chunks)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+'''
+    Tests for the thorium reg module
+'''
+# Import Python libs
+from __future__ import absolute_import, print_function, unicode_literals
+
+# Import Salt Testing Libs
+from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.unit import TestCase
+from tests.support.mock import patch
+
+# Import Salt Libs
+import salt.thorium.reg as reg
+
+
+class RegTestCase(TestCase, LoaderModuleMockMixin):
+    '''
+    Test cases for salt.thorium.reg
+    '''
+    def setup_loader_modules(self):
+        return {reg: {'__reg__': {}, '__events__': []}}
+
+    @staticmethod
+    def _events(tag, key, values):
+        return [{'tag': tag, 'data': {'data': {key: value}}} for value in values]
+
+    def test_list_prune(self):
+        '''
+        Test that a pruned list keeps its most recent values
+        '''
+        with patch.dict(reg.__reg__, {}), \
+                patch.object(reg, '__events__', self._events('my/event', 'bar', range(5))):
+            reg.list_('foo', 'bar', 'my/event', prune=3)
+            self.assertEqual(reg.__reg__['foo']['val'], [{'bar': 2}, {'bar': 3}, {'bar': 4}])
+            reg.list_('foo', 'bar', 'my/event', prune=3)
+            self.assertEqual(reg.__reg__['foo']['val'], [{'bar': 2}, {'bar': 3}, {'bar': 4}])
+
+    def test_mean(self):
+        '''
+        Test the running average, with and without a window
+        '''
+        with patch.dict(reg.__reg__, {}), \
+                patch.object(reg, '__events__',
+                             self._events('my/event', 'load', [1, 2, 'x', 6])):
+            reg.mean('foo', 'load', 'my/event')
+            self.assertEqual(reg.__reg__['foo']['val'], 3)
+
+            with patch('time.time', return_value=1000):
+                reg.mean('bar', 'load', 'my/event', window=60)
+            self.assertEqual(reg.__reg__['bar']['val'], 3)
+            with patch('time.time', return_value=1030), \
+                    patch.object(reg, '__events__', self._events('my/event', 'load', [12])):
+                reg.mean('bar', 'load', 'my/event', window=60)
+            self.assertEqual(reg.__reg__['bar']['val'], 5.25)
+            with patch('time.time', return_value=1070), \
+                    patch.object(reg, '__events__', []):
+                reg.mean('bar', 'load', 'my/event', window=60)
+            self.assertEqual(reg.__reg__['bar']['val'], 12)
+            self.assertEqual(len(reg.__reg__['bar']['window']), 1)
+
+    def test_set_from_list(self):
+        '''
+        Test that a set saved as a list is a set again
+        '''
+        with patch.dict(reg.__reg__, {'foo': {'val': ['a']}}), \
+                patch.object(reg, '__events__', self._events('my/event', 'bar', ['b'])):
+            reg.set_('foo', 'bar', 'my/event')
+            self.assertEqual(reg.__reg__['foo']['val'], set(['a', 'b']))
@@ -32,6 +32,7 @@ import salt.log.setup
 from salt.ext import six
 import salt.utils.process
 import salt.utils.platform
+import salt.utils.stringutils
 import salt.transport.server
 import salt.transport.client
 import salt.exceptions
@@ -372,6 +373,45 @@ class ZMQConfigTest(TestCase):
                                                          source_port=s_port) == 'tcp://0.0.0.0:{0};{1}:{2}'.format(s_port, m_ip, m_port)
 
 
+class SyndicDecodeMessagesTest(TestCase, AdaptedConfigurationTestCaseMixin):
+    '''
+    Test the topics a syndic accepts in AsyncZeroMQPubChannel._decode_messages
+    '''
+    def _decode(self, target, **opts):
+        opts = dict(self.get_temp_config('minion'), id='syndic1',
+                    zmq_filtering=True, __role='syndic',
+                    master_ip='127.0.0.1', master_uri='tcp://127.0.0.1:4506',
+                    **opts)
+        channel = salt.transport.zeromq.AsyncZeroMQPubChannel(opts)
+        self.addCleanup(channel.close)
+        if target == 'hexid':
+            target = channel.hexid
+        message = [salt.utils.stringutils.to_bytes(target),
+                   channel.serial.dumps({'enc': 'aes', 'load': 'payload'})]
+        with patch.object(channel, '_decode_payload',
+                          MagicMock(side_effect=tornado.gen.coroutine(lambda payload: payload))):
+            return channel._decode_messages(message).result()
+
+    def test_syndic_membership_topic(self):
+        '''
+        A syndic with syndic_membership decodes the publishes sent to its own
+        topic
+        '''
+        expected = {'enc': 'aes', 'load': 'payload'}
+        self.assertEqual(self._decode('hexid', syndic_membership=True), expected)
+        self.assertEqual(self._decode('syndic', syndic_membership=True), expected)
+        self.assertEqual(self._decode('broadcast', syndic_membership=True), expected)
+        self.assertIsNone(self._decode('0' * 40, syndic_membership=True))
+
+    def test_syndic_topic(self):
+        '''
+        Without syndic_membership a syndic only decodes the syndic and
+        broadcast publishes
+        '''
+        self.assertIsNone(self._decode('hexid'))
+        self.assertEqual(self._decode('syndic'), {'enc': 'aes', 'load': 'payload'})
+
+
 class PubServerChannel(TestCase, AdaptedConfigurationTestCaseMixin):
 
     @classmethod
@@ -93,3 +93,35 @@ class RecursiveDictDifferTestCase(TestCase):
                          '  g from nothing to \'new_key\'\n'
                          'h from nothing to \'new_key\'\n'
                          'i from nothing to None')
+
+
+class DeltaTestCase(TestCase):
+
+    def test_data_hash(self):
+        self.assertEqual(dictdiffer.data_hash({'a': 1, 'b': (1, 2)}),
+                         dictdiffer.data_hash({'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(dictdiffer.data_hash({'a': 1}),
+                            dictdiffer.data_hash({'a': 2}))
+
+    def test_delta(self):
+        old = {'a': {'b': 1, 'c': 2}, 'd': [1, 2], 'e': 'removed'}
+        new = {'a': {'b': 1, 'c': 3}, 'd': [1, 2], 'f': 'added'}
+        delta = dictdiffer.delta(old, new)
+        self.assertEqual(delta['changes'],
+                         {'del': ['e'],
+                          'set': {'f': 'added'},
+                          'sub': {'a': {'set': {'c': 3}}}})
+        self.assertEqual(dictdiffer.apply_delta(old, delta), new)
+        # The original data is left alone
+        self.assertEqual(old['a']['c'], 2)
+
+    def test_delta_unchanged(self):
+        delta = dictdiffer.delta({'a': 1}, {'a': 1})
+        self.assertEqual(delta['changes'], {})
+        self.assertEqual(delta['base'], delta['hash'])
+        self.assertEqual(dictdiffer.apply_delta({'a': 1}, delta), {'a': 1})
+
+    def test_apply_delta_wrong_base(self):
+        delta = dictdiffer.delta({'a': 1}, {'a': 2})
+        self.assertIsNone(dictdiffer.apply_delta({'a': 3}, delta))
+        self.assertIsNone(dictdiffer.apply_delta(None, delta))
@@ -6,12 +6,20 @@ any remotes.
 
 # Import python libs
 from __future__ import absolute_import, unicode_literals, print_function
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import threading
 
 # Import Salt Testing libs
 from tests.support.unit import skipIf, TestCase
 from tests.support.mock import MagicMock, patch, NO_MOCK, NO_MOCK_REASON
+from tests.support.paths import TMP
 
 # Import salt libs
+import salt.utils.files
 import salt.utils.gitfs
 from salt.exceptions import FileserverConfigError
 
@@ -90,3 +98,354 @@ class TestGitFSProvider(TestCase):
                                 role_class,
                                 *args,
                                 **kwargs)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class TestGitBaseFetchRemotes(TestCase):
+    '''
+    Tests for fetching remotes, using mocked remotes
+    '''
+    def _gitfs(self, **opts):
+        opts.update(OPTS)
+        with patch.object(salt.utils.gitfs.GitFS, 'verify_gitpython',
+                          MagicMock(return_value=True)), \
+                patch.object(salt.utils.gitfs.GitFS, 'verify_pygit2',
+                             MagicMock(return_value=False)):
+            gitfs = salt.utils.gitfs.GitFS(opts, {}, init_remotes=False)
+        return gitfs
+
+    @staticmethod
+    def _remote(id_, changed=False, wait=None, exc=None):
+        remote = MagicMock()
+        remote.id = id_
+        remote.name = id_
+
+        def _fetch():
+            if wait is not None:
+                wait()
+            if exc is not None:
+                raise exc
+            return changed
+
+        remote.fetch = MagicMock(side_effect=_fetch)
+        return remote
+
+    def test_fetch_remotes_parallel(self):
+        '''
+        Ensure remotes are fetched concurrently and stats are recorded
+        '''
+        gitfs = self._gitfs(gitfs_fetch_workers=4)
+        lock = threading.Lock()
+        running = []
+        all_running = threading.Event()
+
+        def _wait():
+            # Only returns once the other fetches run at the same time
+            with lock:
+                running.append(None)
+                if len(running) == 3:
+                    all_running.set()
+            if not all_running.wait(10):
+                raise Exception('fetches did not run concurrently')
+
+        gitfs.remotes = [self._remote('r{0}'.format(x), wait=_wait)
+                         for x in range(4)]
+        gitfs.remotes[2].fetch.side_effect = lambda: True
+        self.assertTrue(gitfs.fetch_remotes())
+        self.assertEqual(sorted(gitfs.fetch_stats), ['r0', 'r1', 'r2', 'r3'])
+        self.assertTrue(gitfs.fetch_stats['r2']['changed'])
+        self.assertFalse(gitfs.fetch_stats['r0']['changed'])
+        self.assertTrue(all_running.is_set())
+
+        # Only the requested remotes are fetched, errors are not fatal
+        gitfs.remotes[1].fetch.side_effect = Exception('fetch failed')
+        self.assertFalse(gitfs.fetch_remotes(remotes=[('r1', 'r1'),
+                                                      ('r3', 'r3')]))
+        self.assertEqual(sorted(gitfs.fetch_stats), ['r1', 'r3'])
+
+    def test_fetch_remotes_timeout(self):
+        '''
+        Ensure a slow remote does not hold up the update, and that its stats
+        are not recorded once it completes
+        '''
+        gitfs = self._gitfs(gitfs_fetch_workers=2, gitfs_fetch_timeout=0.1)
+        release = threading.Event()
+        finished = threading.Event()
+        gitfs.remotes = [self._remote('slow', wait=lambda: release.wait(10)),
+                         self._remote('fast', changed=True)]
+        fetch_remote = gitfs._fetch_remote
+
+        def _fetch_remote(repo, started=None):
+            try:
+                return fetch_remote(repo, started)
+            finally:
+                if repo.id == 'slow':
+                    finished.set()
+
+        gitfs._fetch_remote = _fetch_remote
+        try:
+            self.assertTrue(gitfs.fetch_remotes())
+            self.assertFalse(finished.is_set())
+            self.assertTrue(gitfs.fetch_stats['slow']['timed_out'])
+            self.assertTrue(gitfs.fetch_stats['fast']['changed'])
+        finally:
+            release.set()
+
+        # The stats of the next update are not touched by the late fetch
+        gitfs.fetch_stats = {}
+        self.assertTrue(finished.wait(10))
+        self.assertEqual(gitfs.fetch_stats, {})
+
+    def test_update_caches_locked(self):
+        '''
+        Ensure remotes are fetched outside of the update lock, and the shared
+        caches are only updated while holding it
+        '''
+        gitfs = self._gitfs()
+        locked = []
+        fetch = lambda remotes: locked.append(
+            ('fetch', salt.utils.gitfs._UPDATE_LOCK.locked()))
+        update_caches = lambda data: locked.append(
+            ('caches', salt.utils.gitfs._UPDATE_LOCK.locked()))
+        with patch.object(gitfs, 'clear_old_remotes',
+                          MagicMock(return_value=False)), \
+                patch.object(gitfs, 'fetch_remotes',
+                             MagicMock(side_effect=fetch)), \
+                patch.object(gitfs, '_update_caches',
+                             MagicMock(side_effect=update_caches)):
+            gitfs.update(remotes=[('r1', 'r1')])
+        self.assertEqual(locked, [('fetch', False), ('caches', True)])
+
+    def test_fetch_on_change(self):
+        '''
+        Ensure the fetch is skipped when the remote refs match the local ones
+        '''
+        repo = salt.utils.gitfs.GitProvider.__new__(
+            salt.utils.gitfs.GitProvider)
+        repo.opts = {'gitfs_fetch_on_change': True}
+        repo.role = 'gitfs'
+        repo.id = 'https://example.com/repo.git'
+        repo.refspecs = salt.utils.gitfs._DEFAULT_MASTER_OPTS['gitfs_refspecs']
+        repo.gen_lock = MagicMock()
+        repo._fetch = MagicMock(return_value=True)
+        repo.local_refs = MagicMock(return_value=[
+            ('refs/remotes/origin/HEAD', 'a' * 40),
+            ('refs/remotes/origin/master', 'a' * 40),
+            ('refs/tags/v1.0', 'b' * 40),
+            ('refs/heads/master', 'c' * 40),
+        ])
+        repo.ls_remote = MagicMock(return_value=[
+            ('HEAD', 'a' * 40),
+            ('refs/heads/master', 'a' * 40),
+            ('refs/tags/v1.0', 'b' * 40),
+            ('refs/tags/v1.0^{}', 'd' * 40),
+            ('refs/pull/1/head', 'e' * 40),
+        ])
+        self.assertTrue(repo.remote_unchanged())
+        self.assertIsNone(repo.fetch())
+        repo._fetch.assert_not_called()
+
+        # A new head on the remote triggers a fetch
+        repo.ls_remote.return_value.append(('refs/heads/dev', 'f' * 40))
+        self.assertFalse(repo.remote_unchanged())
+        self.assertTrue(repo.fetch())
+        repo._fetch.assert_called_once_with()
+
+        # Remotes with custom refspecs are always fetched
+        repo.ls_remote.return_value.pop()
+        repo.refspecs = ['+refs/pull/*:refs/remotes/origin/pr/*']
+        self.assertFalse(repo.remote_unchanged())
+
+        # So are remotes whose refs cannot be listed
+        repo.refspecs = salt.utils.gitfs._DEFAULT_MASTER_OPTS['gitfs_refspecs']
+        repo.ls_remote.side_effect = Exception('connection refused')
+        self.assertFalse(repo.remote_unchanged())
+
+
+class _FakeTree(object):
+    '''
+    Minimal stand-in for a provider's tree object, entries map names to either
+    a _FakeTree or a (data, mode) tuple
+    '''
+    def __init__(self, sha, entries):
+        self.sha = sha
+        self.entries = entries
+
+
+class _FakeRepo(object):
+    '''
+    Minimal stand-in for a gitfs provider, which records the trees it walks
+    '''
+    def __init__(self, trees, root='', mountpoint=''):
+        self.id = 'fake'
+        self.trees = trees
+        self._root = root
+        self._mountpoint = mountpoint
+        self.walked = []
+        self.blobs = {}
+
+    def get_tree(self, tgt_env):
+        return self.trees.get(tgt_env)
+
+    def root(self, tgt_env):  # pylint: disable=unused-argument
+        return self._root
+
+    def mountpoint(self, tgt_env):  # pylint: disable=unused-argument
+        return self._mountpoint
+
+    def tree_sha(self, tree):
+        return tree.sha
+
+    def tree_entries(self, tree):
+        self.walked.append(tree.sha)
+        for name, val in sorted(tree.entries.items()):
+            if isinstance(val, _FakeTree):
+                yield name, val.sha, 0o40000, val, None, None
+            else:
+                data, mode = val
+                sha = hashlib.sha1(data).hexdigest()
+                self.blobs[sha] = data
+                link_tgt = data.decode() if stat.S_ISLNK(mode) else None
+                yield name, sha, mode, None, len(data), link_tgt
+
+    def get_blob(self, blob_sha):
+        return self.blobs[blob_sha]
+
+    def write_file(self, blob, dest):
+        with salt.utils.files.fopen(dest, 'wb') as fp_:
+            fp_.write(blob)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class TestGitFSTreeIndex(TestCase):
+    '''
+    Tests for the gitfs tree index, using fake trees
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(dir=TMP)
+        opts = {'cachedir': self.cachedir, 'gitfs_tree_index': True}
+        with patch.object(salt.utils.gitfs.GitFS, 'verify_gitpython',
+                          MagicMock(return_value=True)), \
+                patch.object(salt.utils.gitfs.GitFS, 'verify_pygit2',
+                             MagicMock(return_value=False)):
+            self.gitfs = salt.utils.gitfs.GitFS(opts, {}, init_remotes=False)
+        shared = _FakeTree('s1', {'init.sls': (b'shared', 0o100644)})
+        self.base = _FakeTree('t1', {
+            'top.sls': (b'top', 0o100644),
+            'link.sls': (b'states/init.sls', 0o120000),
+            'states': shared,
+        })
+        self.dev = _FakeTree('t2', {
+            'top.sls': (b'dev top', 0o100644),
+            'states': shared,
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    def test_tree_index_shared(self):
+        '''
+        Refs sharing a tree share its index, shared subtrees are walked once
+        and indexes are persisted by tree SHA
+        '''
+        repo = _FakeRepo({'base': self.base, 'other': self.base,
+                          'dev': self.dev})
+        index = self.gitfs.tree_index(repo, 'base')
+        self.assertEqual(index['files']['states/init.sls'][2], 6)
+        self.assertEqual(index['symlinks'], {'link.sls': 'states/init.sls'})
+        self.assertEqual(index['dirs'], ['states'])
+        self.assertIs(self.gitfs.tree_index(repo, 'other'), index)
+        self.gitfs.tree_index(repo, 'dev')
+        self.assertEqual(repo.walked, ['t1', 's1', 't2'])
+        self.assertIsNone(self.gitfs.tree_index(repo, 'missing'))
+
+        # A new instance loads the index from disk
+        self.gitfs._tree_indexes.clear()
+        self.gitfs._subtree_indexes.clear()
+        repo.walked = []
+        self.assertEqual(self.gitfs.tree_index(repo, 'base'), index)
+        self.assertEqual(repo.walked, [])
+
+    def test_indexed_file_list(self):
+        '''
+        Ensure the root and mountpoint are applied to the indexed file list
+        '''
+        repo = _FakeRepo({'base': self.base})
+        files, symlinks, dirs = self.gitfs._indexed_file_list(repo, 'base')
+        self.assertEqual(sorted(files),
+                         ['link.sls', 'states/init.sls', 'top.sls'])
+        self.assertEqual(symlinks, {'link.sls': 'states/init.sls'})
+        self.assertEqual(dirs, set(['states']))
+
+        repo = _FakeRepo({'base': self.base}, root='states', mountpoint='mnt')
+        files, symlinks, dirs = self.gitfs._indexed_file_list(repo, 'base')
+        self.assertEqual(files, set(['mnt/init.sls']))
+        self.assertEqual(symlinks, {})
+        self.assertEqual(dirs, set(['mnt']))
+
+    def test_indexed_find_file(self):
+        '''
+        Ensure symlinks are followed and identical blobs are written once
+        '''
+        repo = _FakeRepo({'base': self.base, 'dev': self.dev})
+        blob_sha, mode = self.gitfs._indexed_find_file(repo, 'link.sls', 'base')
+        self.assertEqual(blob_sha, hashlib.sha1(b'shared').hexdigest())
+        self.assertEqual(mode, 0o100644)
+        self.assertEqual(
+            self.gitfs._indexed_find_file(repo, 'nope.sls', 'base'),
+            (None, None))
+        self.assertEqual(
+            self.gitfs._indexed_find_file(repo, 'states', 'base'),
+            (None, None))
+
+        dests = [os.path.join(self.cachedir, x) for x in ('base', 'dev')]
+        with patch.object(repo, 'get_blob',
+                          MagicMock(side_effect=repo.get_blob)) as get_blob:
+            for dest in dests:
+                self.gitfs._link_blob(repo, blob_sha, dest)
+            get_blob.assert_called_once_with(blob_sha)
+        for dest in dests:
+            with salt.utils.files.fopen(dest, 'rb') as fp_:
+                self.assertEqual(fp_.read(), b'shared')
+
+    def test_clear_old_tree_cache(self):
+        '''
+        Ensure the indexes and blobs of trees which no ref points at anymore
+        are removed, and that they survive clearing old remotes
+        '''
+        repo = _FakeRepo({'base': self.base, 'dev': self.dev})
+        repo.cachedir_basename = 'fake'
+        self.gitfs.remotes = [repo]
+        blob_path = lambda sha: os.path.join(
+            self.gitfs.blob_cachedir, sha[:2], sha)
+        for tgt_env in ('base', 'dev'):
+            for path in ('top.sls', 'states/init.sls'):
+                blob_sha, _ = self.gitfs._indexed_find_file(
+                    repo, path, tgt_env)
+                self.gitfs._link_blob(
+                    repo, blob_sha,
+                    os.path.join(self.cachedir, '{0}.{1}'.format(
+                        tgt_env, os.path.basename(path))))
+        self.assertFalse(self.gitfs.clear_old_remotes())
+        self.assertEqual(sorted(os.listdir(self.gitfs.tree_index_dir)),
+                         ['t1.p', 't2.p'])
+
+        del repo.trees['dev']
+        with patch.object(self.gitfs, 'envs',
+                          MagicMock(return_value=['base', 'dev'])):
+            self.gitfs.clear_old_tree_cache()
+        self.assertEqual(os.listdir(self.gitfs.tree_index_dir), ['t1.p'])
+        for data in (b'top', b'shared'):
+            self.assertTrue(os.path.isfile(
+                blob_path(hashlib.sha1(data).hexdigest())))
+        self.assertFalse(os.path.exists(
+            blob_path(hashlib.sha1(b'dev top').hexdigest())))
+
+        # A blob removed while it is being linked is written out again
+        dest = os.path.join(self.cachedir, 'relinked')
+        blob_sha = hashlib.sha1(b'top').hexdigest()
+        with patch('os.path.isfile', MagicMock(return_value=True)):
+            os.remove(blob_path(blob_sha))
+            self.gitfs._link_blob(repo, blob_sha, dest)
+        with salt.utils.files.fopen(dest, 'rb') as fp_:
+            self.assertEqual(fp_.read(), b'top')
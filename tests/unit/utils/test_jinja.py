@@ -42,6 +42,7 @@ from salt.utils.templates import JINJA, render_jinja_tmpl
 # dateutils is needed so that the strftime jinja filter is loaded
 import salt.utils.dateutils  # pylint: disable=unused-import
 import salt.utils.files
+import salt.utils.jinja
 import salt.utils.stringutils
 import salt.utils.yaml
 
@@ -309,6 +310,74 @@ class TestGetTemplate(TestCase):
             self.assertEqual(out, 'Hey world !Hi Salt !' + os.linesep)
             self.assertEqual(fc.requests[0]['path'], 'salt://macro')
 
+    def _remote_opts(self, **kwargs):
+        opts = {'cachedir': self.tempdir, 'file_client': 'remote',
+                'file_roots': self.local_opts['file_roots'],
+                'pillar_roots': self.local_opts['pillar_roots']}
+        opts.update(kwargs)
+        return opts
+
+    def test_bytecode_cache(self):
+        '''
+        Templates and the macros they import are compiled once, and the
+        compiled code is kept under the cachedir
+        '''
+        fc = MockFileClient()
+        opts = self._remote_opts(jinja_bytecode_cache=True)
+        filename = os.path.join(self.template_dir, 'hello_import')
+        with salt.utils.files.fopen(filename) as fp_:
+            tmplstr = salt.utils.stringutils.to_unicode(fp_.read())
+        salt.utils.jinja._BYTECODE.clear()
+        compile_ = Environment.compile
+        with patch.object(SaltCacheLoader, 'file_client',
+                          MagicMock(return_value=fc)), \
+                patch.object(Environment, 'compile', autospec=True,
+                             side_effect=compile_) as compile_mock:
+            for ext in ('Hi', 'Salt'):
+                out = render_jinja_tmpl(
+                    tmplstr,
+                    dict(opts=opts, a=ext, b='Salt', saltenv='test',
+                         salt=self.local_salt))
+                self.assertEqual(out, 'Hey world !{0} Salt !'.format(ext) + os.linesep)
+            self.assertEqual(compile_mock.call_count, 2)
+
+            # Compiled templates are loaded again from the cachedir
+            salt.utils.jinja._BYTECODE.clear()
+            render_jinja_tmpl(
+                tmplstr,
+                dict(opts=opts, saltenv='test', salt=self.local_salt))
+            self.assertEqual(compile_mock.call_count, 2)
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.tempdir, 'jinja'))), 2)
+
+    def test_env_reuse(self):
+        '''
+        An environment is reused by the renders of a run, imported templates
+        are fetched once and the context of one render does not leak into the
+        next one
+        '''
+        fc = MockFileClient()
+        env_cache = {}
+        filename = os.path.join(self.template_dir, 'hello_import')
+        with salt.utils.files.fopen(filename) as fp_:
+            tmplstr = salt.utils.stringutils.to_unicode(fp_.read())
+        with patch.object(SaltCacheLoader, 'file_client',
+                          MagicMock(return_value=fc)):
+            out = render_jinja_tmpl(
+                tmplstr,
+                dict(opts=self._remote_opts(jinja_env_reuse=True),
+                     a='Hi', b='Salt', saltenv='test', salt=self.local_salt,
+                     _jinja_env_cache=env_cache))
+            self.assertEqual(out, 'Hey world !Hi Salt !' + os.linesep)
+            out = render_jinja_tmpl(
+                tmplstr,
+                dict(opts=self._remote_opts(jinja_env_reuse=True),
+                     saltenv='test', salt=self.local_salt,
+                     _jinja_env_cache=env_cache))
+            self.assertEqual(out, 'Hey world !a b !' + os.linesep)
+        self.assertEqual(len(env_cache), 1)
+        self.assertEqual([x['path'] for x in fc.requests], ['salt://macro'])
+
     def test_macro_additional_log_for_generalexc(self):
         '''
         If we failed in a macro because of e.g. a TypeError, get
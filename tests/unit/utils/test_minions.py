@@ -2,12 +2,18 @@
 
 # Import python libs
 from __future__ import absolute_import, unicode_literals
+import os
+import shutil
 import sys
+import tempfile
+import time
 
 # Import Salt Libs
+import salt.utils.files
 import salt.utils.minions
 
 # Import Salt Testing Libs
+from tests.support.runtests import RUNTIME_VARS
 from tests.support.unit import TestCase, skipIf
 from tests.support.mock import (
     patch,
@@ -369,6 +375,91 @@ class CkMinionsTestCase(TestCase):
         self.assertTrue(ret)
 
 
+class CheckSyndicsTestCase(TestCase):
+    '''
+    TestCase for the minions reported by the syndics of a master
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        self.opts = {'cachedir': self.cachedir, 'serial': 'msgpack'}
+        self.ckminions = salt.utils.minions.CkMinions(self.opts)
+        os.makedirs(os.path.join(self.cachedir, 'syndics'))
+        for syndic_id, minions in (('syndic1', ['web1', 'web2']),
+                                   ('syndic2', ['db1', 'web10'])):
+            salt.utils.minions.store_syndic_members(self.opts, syndic_id, minions)
+            with salt.utils.files.fopen(os.path.join(self.cachedir, 'syndics', syndic_id), 'w'):
+                pass
+
+    def test_syndic_members(self):
+        '''
+        Test the stored minions are read back per syndic
+        '''
+        self.assertEqual(salt.utils.minions.syndic_members(self.opts),
+                         {'syndic1': frozenset(['web1', 'web2']),
+                          'syndic2': frozenset(['db1', 'web10'])})
+        salt.utils.minions.store_syndic_members(self.opts, 'syndic1', ['web3'])
+        os.utime(os.path.join(self.cachedir, 'syndic_members', 'syndic1'), (0, 0))
+        self.assertEqual(salt.utils.minions.syndic_members(self.opts)['syndic1'],
+                         frozenset(['web3']))
+
+    def test_check_syndics_glob(self):
+        '''
+        Test glob targets are only sent to the syndics with matching minions
+        '''
+        self.assertEqual(self.ckminions.check_syndics('web1'), ['syndic1'])
+        self.assertEqual(self.ckminions.check_syndics('web1*'), ['syndic1', 'syndic2'])
+        self.assertEqual(self.ckminions.check_syndics('db*'), ['syndic2'])
+        self.assertEqual(self.ckminions.check_syndics('app*'), [])
+
+    def test_check_syndics_list(self):
+        '''
+        Test list targets are only sent to the syndics with matching minions
+        '''
+        self.assertEqual(self.ckminions.check_syndics('web2,db1', 'list'), ['syndic1', 'syndic2'])
+        self.assertEqual(self.ckminions.check_syndics(['db1'], 'list'), ['syndic2'])
+
+        # A minion no syndic has reported may be new, send to all of them
+        self.assertIsNone(self.ckminions.check_syndics(['db1', 'new1'], 'list'))
+        self.assertIsNone(self.ckminions.check_syndics('new1'))
+
+    def test_check_syndics_unknown(self):
+        '''
+        Test the publishes go to all the syndics when they cannot be narrowed
+        down
+        '''
+        self.assertIsNone(self.ckminions.check_syndics('G@os:Debian', 'compound'))
+        with salt.utils.files.fopen(os.path.join(self.cachedir, 'syndics', 'syndic3'), 'w'):
+            pass
+        self.assertIsNone(self.ckminions.check_syndics('web1'))
+
+    def test_check_syndics_registered(self):
+        '''
+        Test a syndic which authenticated but never returned a job nor
+        reported its minions still gets all of the publishes, until its key
+        is deleted
+        '''
+        salt.utils.minions.register_syndic(self.opts, 'syndic3')
+        self.assertIsNone(self.ckminions.check_syndics('web1'))
+
+        self.opts['pki_dir'] = os.path.join(self.cachedir, 'pki')
+        os.makedirs(os.path.join(self.opts['pki_dir'], 'minions'))
+        for syndic_id in ('syndic1', 'syndic2'):
+            with salt.utils.files.fopen(os.path.join(self.opts['pki_dir'], 'minions', syndic_id), 'w'):
+                pass
+        self.assertEqual(self.ckminions.check_syndics('web1'), ['syndic1'])
+
+    def test_syndic_members_expire(self):
+        '''
+        Test the minions of a syndic which stopped reporting them expire
+        '''
+        self.opts['syndic_membership_expire'] = 3600
+        os.utime(os.path.join(self.cachedir, 'syndic_members', 'syndic2'),
+                 (time.time() - 7200, time.time() - 7200))
+        self.assertEqual(list(salt.utils.minions.syndic_members(self.opts)), ['syndic1'])
+        self.assertFalse(os.path.exists(os.path.join(self.cachedir, 'syndic_members', 'syndic2')))
+
+
 @skipIf(sys.version_info < (2, 7), 'Python 2.7 needed for dictionary equality assertions')
 class TargetParseTestCase(TestCase):
 
@@ -2,10 +2,12 @@
 
 from __future__ import absolute_import, print_function, unicode_literals
 import codecs
+import datetime
 import glob
 import logging
 import os
 import textwrap
+import time
 
 import salt.loader
 import salt.utils.data
@@ -417,6 +419,65 @@ class TestReactor(TestCase, AdaptedConfigurationTestCaseMixin):
                     self.reaction_map[tag]
                 )
 
+    def test_list_reactors_globs(self):
+        '''
+        Ensure that the indexed reactor map returns the reactors of all the
+        matching tags and globs, in the order of the map
+        '''
+        react_map = [
+            {'salt/beacon/*/inotify/*': ['/srv/reactor/inotify.sls']},
+            {'salt/minion/*/start': '/srv/reactor/start.sls'},
+            {'salt/beacon/web1/inotify/etc': ['/srv/reactor/web1.sls']},
+            {'salt/beacon/web[12]/*': ['/srv/reactor/web.sls']},
+            {'*': ['/srv/reactor/all.sls']},
+            {'salt/beacon/web1/inotify/etc': ['/srv/reactor/web1_2.sls']},
+        ]
+        with patch.dict(self.reactor.opts, {'reactor': react_map}):
+            self.reactor.react_index = None
+            try:
+                self.assertEqual(
+                    self.reactor.list_reactors('salt/beacon/web1/inotify/etc'),
+                    ['/srv/reactor/inotify.sls', '/srv/reactor/web1.sls',
+                     '/srv/reactor/web.sls', '/srv/reactor/all.sls',
+                     '/srv/reactor/web1_2.sls'])
+                self.assertEqual(
+                    self.reactor.list_reactors('salt/minion/db1/start'),
+                    ['/srv/reactor/start.sls', '/srv/reactor/all.sls'])
+                self.assertEqual(
+                    self.reactor.list_reactors('salt/beacon/web3/inotify/etc'),
+                    ['/srv/reactor/inotify.sls', '/srv/reactor/all.sls'])
+                self.assertEqual(
+                    self.reactor.list_reactors('salt/minion/db1/stop'),
+                    ['/srv/reactor/all.sls'])
+            finally:
+                self.reactor.react_index = None
+
+    def test_render_cache_opts(self):
+        '''
+        Ensure the render cache only enables the Jinja bytecode cache, reused
+        environments would keep serving stale imported templates
+        '''
+        opts = dict(self.opts, reactor_render_cache=True)
+        with patch('salt.minion.MasterMinion') as master_minion:
+            reactor.Reactor(opts)
+        minion_opts = master_minion.call_args[0][0]
+        self.assertTrue(minion_opts['jinja_bytecode_cache'])
+        self.assertFalse(minion_opts.get('jinja_env_reuse', False))
+
+    def test_update_stats(self):
+        '''
+        Ensure that the stats are kept per reactor SLS file
+        '''
+        stats = self.reactor._update_stats(
+            ['/srv/reactor/a.sls', '/srv/reactor/b.sls'],
+            time.time() - 1,
+            {'_stamp': (datetime.datetime.utcnow() - datetime.timedelta(seconds=5)).isoformat()})
+        self.addCleanup(stats.clear)
+        self.assertEqual(stats['/srv/reactor/a.sls'], stats['/srv/reactor/b.sls'])
+        self.assertEqual(stats['/srv/reactor/a.sls']['runs'], 1)
+        self.assertTrue(stats['/srv/reactor/a.sls']['mean'] >= 1)
+        self.assertTrue(3 <= stats['/srv/reactor/a.sls']['latency'] <= 5)
+
     def test_reactions(self):
         '''
         Ensure that the correct reactions are built from the configured SLS
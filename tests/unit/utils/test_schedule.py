@@ -418,3 +418,41 @@ class ScheduleTestCase(TestCase):
         self.assertIn('_error', self.schedule.opts['schedule']['testjob'])
         _expected = 'Number of arguments is less than the number of functions. Ignoring job.'
         self.assertEqual(self.schedule.opts['schedule']['testjob']['_error'], _expected)
+
+    def test_eval_lazy(self):
+        '''
+        Tests eval with schedule_lazy_eval only evaluates a job again once its
+        next fire time is reached, or the schedule changed
+        '''
+        now = datetime.datetime(2019, 1, 1, 12, 0, 0)
+        with patch.dict(self.schedule.opts,
+                        {'schedule_lazy_eval': True,
+                         'pillar': {'schedule': {}},
+                         'schedule': {'testjob': {'function': 'test.true',
+                                                  'seconds': 60}}}), \
+                patch.object(self.schedule, '_check_max_running',
+                             side_effect=lambda func, data, opts, now: data), \
+                patch.object(self.schedule, '_run_job') as run_job:
+            self.schedule.eval(now)
+            job = self.schedule.opts['schedule']['testjob']
+            self.assertEqual(job['_next_fire_time'], now + datetime.timedelta(seconds=60))
+            self.assertEqual(self.schedule.next_deadline(now), 60)
+
+            # Not due yet, the job is not evaluated
+            del job['name']
+            self.schedule.eval(now + datetime.timedelta(seconds=30))
+            self.assertNotIn('name', job)
+            self.assertEqual(self.schedule.next_deadline(now + datetime.timedelta(seconds=30)), 30)
+
+            # Due, the job runs and its next deadline is recorded
+            self.schedule.eval(now + datetime.timedelta(seconds=60))
+            self.assertEqual(job['name'], 'testjob')
+            self.assertEqual(run_job.call_count, 1)
+            self.assertEqual(self.schedule.next_deadline(now + datetime.timedelta(seconds=60)), 60)
+
+            # A change to the schedule has all of the jobs evaluated again
+            self.schedule.disable_job('testjob')
+            del job['name']
+            self.schedule.eval(now + datetime.timedelta(seconds=90))
+            self.assertEqual(job['name'], 'testjob')
+            self.assertEqual(run_job.call_count, 1)
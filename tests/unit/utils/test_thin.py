@@ -4,10 +4,15 @@
 '''
 from __future__ import absolute_import, print_function, unicode_literals
 
+import io
 import os
+import shutil
 import sys
+import tarfile
+import tempfile
 from tests.support.unit import TestCase, skipIf
 from tests.support.helpers import TestsLoggingHandler
+from tests.support.paths import TMP
 from tests.support.mock import (
     NO_MOCK,
     NO_MOCK_REASON,
@@ -15,6 +20,9 @@ from tests.support.mock import (
     patch)
 
 import salt.exceptions
+import salt.utils.files
+import salt.utils.hashutils
+import salt.version
 from salt.utils import thin
 from salt.utils import json
 import salt.utils.stringutils
@@ -450,6 +458,8 @@ class SSHThinTestCase(TestCase):
     @patch('salt.utils.thin.shutil', MagicMock())
     @patch('salt.utils.path.which', MagicMock(return_value=''))
     @patch('salt.utils.thin._get_thintar_prefix', MagicMock())
+    @patch('salt.utils.hashutils.get_hash', MagicMock(return_value='0' * 40))
+    @patch('salt.utils.thin._archive_manifest', MagicMock())
     def test_gen_thin_python_exist_or_not(self):
         '''
         Test thin.gen_thin function if the opposite python
@@ -500,6 +510,8 @@ class SSHThinTestCase(TestCase):
     @patch('salt.utils.thin._six.PY3', True)
     @patch('salt.utils.thin._six.PY2', False)
     @patch('salt.utils.thin.sys.version_info', _version_info(None, 3, 6))
+    @patch('salt.utils.hashutils.get_hash', MagicMock(return_value='0' * 40))
+    @patch('salt.utils.thin._archive_manifest', MagicMock())
     @patch('salt.utils.path.which', MagicMock(return_value='/usr/bin/python'))
     def test_gen_thin_compression_fallback_py3(self):
         '''
@@ -542,6 +554,8 @@ class SSHThinTestCase(TestCase):
     @patch('salt.utils.thin._six.PY3', True)
     @patch('salt.utils.thin._six.PY2', False)
     @patch('salt.utils.thin.sys.version_info', _version_info(None, 3, 6))
+    @patch('salt.utils.hashutils.get_hash', MagicMock(return_value='0' * 40))
+    @patch('salt.utils.thin._archive_manifest', MagicMock())
     @patch('salt.utils.path.which', MagicMock(return_value='/usr/bin/python'))
     def test_gen_thin_control_files_written_py3(self):
         '''
@@ -588,6 +602,8 @@ class SSHThinTestCase(TestCase):
     @patch('salt.utils.thin._six.PY2', False)
     @patch('salt.utils.thin.sys.version_info', _version_info(None, 3, 6))
     @patch('salt.utils.hashutils.DigestCollector', MagicMock())
+    @patch('salt.utils.hashutils.get_hash', MagicMock(return_value='0' * 40))
+    @patch('salt.utils.thin._archive_manifest', MagicMock())
     @patch('salt.utils.path.which', MagicMock(return_value='/usr/bin/python'))
     def test_gen_thin_main_content_files_written_py3(self):
         '''
@@ -603,7 +619,7 @@ class SSHThinTestCase(TestCase):
                 files.append(os.path.join(py, 'root', 'r{0}'.format(i)))
             for i in range(4, 7):
                 files.append(os.path.join(py, 'root2', 'r{0}'.format(i)))
-        for cl in thin.tarfile.open().method_calls[:-6]:
+        for cl in thin.tarfile.open().method_calls[:-7]:
             arcname = cl[2].get('arcname')
             self.assertIn(arcname, files)
             files.pop(files.index(arcname))
@@ -641,6 +657,8 @@ class SSHThinTestCase(TestCase):
     @patch('salt.utils.thin._six.PY2', False)
     @patch('salt.utils.thin.sys.version_info', _version_info(None, 3, 6))
     @patch('salt.utils.hashutils.DigestCollector', MagicMock())
+    @patch('salt.utils.hashutils.get_hash', MagicMock(return_value='0' * 40))
+    @patch('salt.utils.thin._archive_manifest', MagicMock())
     @patch('salt.utils.path.which', MagicMock(return_value='/usr/bin/python'))
     def test_gen_thin_ext_alternative_content_files_written_py3(self):
         '''
@@ -659,7 +677,7 @@ class SSHThinTestCase(TestCase):
                 files.append(
                     os.path.join('namespace', py, 'root2', 'r{0}'.format(i)))
 
-        for idx, cl in enumerate(thin.tarfile.open().method_calls[12:-6]):
+        for idx, cl in enumerate(thin.tarfile.open().method_calls[12:-7]):
             arcname = cl[2].get('arcname')
             self.assertIn(arcname, files)
             files.pop(files.index(arcname))
@@ -703,3 +721,66 @@ class SSHThinTestCase(TestCase):
             tops=tops, extended_cfg=ext_cfg)).strip().split(os.linesep)
         for t_line in ['second-system-effect:2:7', 'solar-interference:2:6']:
             self.assertIn(t_line, out)
+
+
+class ThinDeltaTestCase(TestCase):
+    '''
+    TestCase for the thin deltas of salt-ssh.
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(dir=TMP)
+        self.thindir = os.path.join(self.cachedir, 'thin')
+        os.makedirs(os.path.join(self.thindir, 'manifests'))
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    def _write(self, name, content):
+        with salt.utils.files.fopen(os.path.join(self.thindir, name), 'w') as fp_:
+            fp_.write(content)
+
+    def _thin(self, files, checksum):
+        '''
+        Lay out a generated thin holding files, with its manifest
+        '''
+        self._write('version', salt.version.__version__)
+        self._write('.thin-gen-py-version', str(sys.version_info[0]))  # future lint: disable=blacklisted-function
+        self._write('code-checksum', checksum)
+        manifest = dict((name, salt.utils.hashutils.sha1_digest(content))
+                        for name, content in files.items())
+        thin._write_manifest(os.path.join(self.thindir, 'manifest'), manifest)
+        tfp = tarfile.open(os.path.join(self.thindir, 'thin.tgz'), 'w:gz')
+        for name, content in sorted(files.items()) + [('manifest', None)]:
+            if content is None:
+                tfp.add(os.path.join(self.thindir, 'manifest'), arcname=name)
+                continue
+            data = salt.utils.stringutils.to_bytes(content)
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tfp.addfile(info, io.BytesIO(data))
+        tfp.close()
+        thin._archive_manifest(self.thindir, checksum)
+
+    def test_gen_thin_delta(self):
+        '''
+        Test that the delta only holds the changed files and the manifest
+        '''
+        self._thin({'salt/a.py': 'a', 'salt/b.py': 'b', 'salt/c.py': 'c'}, 'aaaa')
+        self._thin({'salt/a.py': 'a', 'salt/b.py': 'B', 'salt/d.py': 'd'}, 'bbbb')
+
+        delta = thin.gen_thin_delta(self.cachedir, 'aaaa')
+        self.assertEqual(delta, os.path.join(self.thindir, 'delta', 'aaaa-bbbb.tgz'))
+        tfp = tarfile.open(delta, 'r:gz')
+        try:
+            self.assertEqual(sorted(tfp.getnames()),
+                             ['manifest', 'salt/b.py', 'salt/d.py'])
+        finally:
+            tfp.close()
+
+    def test_gen_thin_delta_unknown(self):
+        '''
+        Test that no delta is built for an unknown or invalid code checksum
+        '''
+        self._thin({'salt/a.py': 'a'}, 'aaaa')
+        self.assertIsNone(thin.gen_thin_delta(self.cachedir, 'cccc'))
+        self.assertIsNone(thin.gen_thin_delta(self.cachedir, '../manifest'))
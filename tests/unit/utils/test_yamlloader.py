@@ -10,7 +10,8 @@ import textwrap
 
 # Import Salt Libs
 from yaml.constructor import ConstructorError
-from salt.utils.yamlloader import SaltYamlSafeLoader
+from yaml.loader import SafeLoader as PySafeLoader
+from salt.utils.yamlloader import SaltYamlSafeLoader, SaltYamlSafePyLoader
 import salt.utils.files
 from salt.ext import six
 
@@ -149,3 +150,24 @@ class YamlLoaderTestCase(TestCase):
                   b: {foo: bar, one: 1, list: [1, two, 3]}''')),
             {'foo': {'b': {'foo': 'bar', 'one': 1, 'list': [1, 'two', 3]}}}
         )
+
+    def test_yaml_loaders_match(self):
+        '''
+        Test that the pure-Python loader returns the same data and catches the
+        same duplicates as the default one
+        '''
+        data = textwrap.dedent('''\
+            base: &base
+              mode: 0644
+              when: 2019-01-01
+            p1:
+              <<: *base
+              list: [1, two, 3.0]
+              text: "unicode ß"''')
+        self.assertTrue(issubclass(SaltYamlSafePyLoader, PySafeLoader))
+        self.assertEqual(SaltYamlSafePyLoader(data).get_data(),
+                         SaltYamlSafeLoader(data).get_data())
+        self.assertEqual(SaltYamlSafePyLoader(data).get_data()['p1']['mode'],
+                         644)
+        with self.assertRaises(ConstructorError):
+            SaltYamlSafePyLoader('p1: alpha\np1: beta').get_data()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+The yamlbench script compares the libyaml based and pure-Python YAML loaders
+in salt.utils.yamlloader, on generated SLS and pillar documents
+'''
+# Import Python Libs
+from __future__ import absolute_import, print_function
+import optparse
+import sys
+import textwrap
+import timeit
+
+# Import salt libs
+import salt.utils.yamlloader
+from salt.utils.odict import OrderedDict
+
+# Import third party libs
+from salt.ext.six.moves import range  # pylint: disable=import-error,redefined-builtin
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option(
+        '-s',
+        '--states',
+        dest='states',
+        default=500,
+        type='int',
+        help='The number of state IDs in the SLS document')
+    parser.add_option(
+        '-p',
+        '--pillar-users',
+        dest='users',
+        default=20000,
+        type='int',
+        help='The number of user entries in the pillar document')
+    parser.add_option(
+        '-r',
+        '--repeat',
+        dest='repeat',
+        default=3,
+        type='int',
+        help='The number of times each document is loaded, the best time is '
+             'reported')
+    options, _ = parser.parse_args()
+    return options
+
+
+def make_sls(states):
+    '''
+    Return an SLS document with pkg, file and service states, requisites and
+    a merged anchor, as rendered from a typical Jinja template
+    '''
+    chunks = [textwrap.dedent('''\
+        defaults: &defaults
+          user: root
+          group: root
+          mode: '0644'
+          makedirs: True
+        ''')]
+    for idx in range(states):
+        chunks.append(textwrap.dedent('''\
+            pkg_{0}:
+              pkg.installed:
+                - name: package-{0}
+                - version: 1.{0}.0-1
+            /etc/app{0}/app.conf:
+              file.managed:
+                - source: salt://app/files/app.conf.jinja
+                - template: jinja
+                - context:
+                    <<: *defaults
+                    port: {1}
+                    enabled: {2}
+                - require:
+                  - pkg: pkg_{0}
+            service_{0}:
+              service.running:
+                - name: app{0}
+                - enable: True
+                - watch:
+                  - file: /etc/app{0}/app.conf
+            ''').format(idx, 8000 + idx, idx % 2 == 0))
+    return ''.join(chunks)
+
+
+def make_pillar(users):
+    '''
+    Return a large generated pillar document of nested user data
+    '''
+    chunks = ['users:\n']
+    for idx in range(users):
+        chunks.append(textwrap.dedent('''\
+              user{0}:
+                fullname: "Generated User {0}"
+                uid: {1}
+                shell: /bin/bash
+                groups: [users, wheel, group{2}]
+                ssh_keys:
+                  - ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQC{0} user{0}@example.com
+                created: 2019-01-{3:02d}
+            ''').format(idx, 10000 + idx, idx % 50, idx % 28 + 1))
+    return ''.join(chunks)
+
+
+def bench(name, data, repeat):
+    '''
+    Load a document with both loaders, check they agree, and print the timings
+    '''
+    loaders = [('python', salt.utils.yamlloader.SaltYamlSafePyLoader)]
+    if salt.utils.yamlloader.HAS_LIBYAML:
+        loaders.insert(0, ('libyaml', salt.utils.yamlloader.SaltYamlSafeLoader))
+    results = []
+    timings = []
+    for loader_name, loader in loaders:
+        def _load():
+            return salt.utils.yamlloader.load(
+                data,
+                Loader=lambda stream: loader(stream, dictclass=OrderedDict))
+        results.append(_load())
+        timings.append((loader_name,
+                        min(timeit.repeat(_load, number=1, repeat=repeat))))
+    if any(result != results[0] for result in results[1:]):
+        print('{0}: loaders returned different data'.format(name))
+        sys.exit(1)
+    print('{0} ({1:.1f} KiB):'.format(name, len(data) / 1024.0))
+    for loader_name, elapsed in timings:
+        print('  {0:<8} {1:8.3f}s  x{2:.1f}'.format(
+            loader_name, elapsed, timings[-1][1] / elapsed))
+
+
+if __name__ == '__main__':
+    OPTS = parse()
+    if not salt.utils.yamlloader.HAS_LIBYAML:
+        print('libyaml is not available, only the pure-Python loader is run')
+    bench('SLS', make_sls(OPTS.states), OPTS.repeat)
+    bench('Pillar', make_pillar(OPTS.users), OPTS.repeat)